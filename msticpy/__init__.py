@@ -27,25 +27,40 @@ GitHub repo:
     https://github.com/microsoft/msticpy
 
 """
-from pkg_resources import parse_version
-
-import requests
-
-# flake8: noqa: F403
-from .nbtools.nbinit import init_notebook
-from .common import pkg_config as settings
-from . import sectools
-from . import nbtools
-from . import data
-
 from ._version import VERSION
+from .common.lazy_import import lazy_accessors, lazy_import
 
 __version__ = VERSION
 __author__ = "Ian Hellen, Pete Bryan, Ashwin Patil"
 
+# sub-packages and modules are imported on first access
+_LAZY_IMPORTS = {
+    "init_notebook": ".nbtools.nbinit:init_notebook",
+    "settings": ".common.pkg_config",
+    "sectools": ".sectools",
+    "nbtools": ".nbtools",
+    "data": ".data",
+}
+__getattr__, __dir__ = lazy_import(__name__, _LAZY_IMPORTS)
+
+# pandas accessors are registered here but their modules are
+# imported the first time that the accessor is used
+_LAZY_ACCESSORS = {
+    "mp_ioc": ".sectools.iocextract:IoCExtractAccessor",
+    "mp_b64": ".sectools.base64unpack:B64ExtractAccessor",
+    "mp_process_tree": ".nbtools.process_tree:ProcessTreeAccessor",
+    "mp_timeline": ".nbtools.timeline:TimeLineAccessor",
+}
+lazy_accessors(__name__, _LAZY_ACCESSORS)
+
 
 def check_version():
     """Check the current version against latest on PyPI."""
+    # pylint: disable=import-outside-toplevel
+    import requests
+    from pkg_resources import parse_version
+
+    # pylint: enable=import-outside-toplevel
     installed_version = parse_version(__version__)
 
     # fetch package metadata from PyPI
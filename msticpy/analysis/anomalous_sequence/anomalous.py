@@ -17,7 +17,7 @@ from ...common.exceptions import MsticpyException
 
 
 def score_sessions(
-    data: pd.DataFrame, session_column: str, window_length: int
+    data: pd.DataFrame, session_column: str, window_length: int, n_jobs: int = 1
 ) -> pd.DataFrame:
     """
     Model sessions using a sliding window approach within a markov model.
@@ -48,6 +48,9 @@ def score_sessions(
         np.nan score. (The + 1 is because we append a dummy `end_token` to each
         session before starting the sliding window, so a session of length 2,
         would be treated as length 3)
+    n_jobs: int, optional
+        number of worker processes used to train the model and score the
+        sessions. -1 uses all available CPUs. (the default is 1)
 
     Returns
     -------
@@ -64,7 +67,7 @@ def score_sessions(
     sessions_df = data.copy()
     sessions = sessions_df[session_column].values.tolist()
 
-    model = Model(sessions=sessions)
+    model = Model(sessions=sessions, n_jobs=n_jobs)
     model.train()
     model.compute_rarest_windows(
         window_len=window_length, use_geo_mean=False, use_start_end_tokens=True
@@ -6,10 +6,19 @@
 """Module for Model class for modelling sessions data."""
 
 from collections import defaultdict
-from typing import List, Union, Dict
+from typing import BinaryIO, List, Optional, Tuple, Union, Dict
 
+import numpy as np
+
+from .utils.array_model import ArrayModel, EncodedSessions
 from .utils.data_structures import Cmd
-from .utils import cmds_only, cmds_params_only, cmds_params_values, probabilities
+from .utils import (
+    cmds_only,
+    cmds_params_only,
+    cmds_params_values,
+    log_likelihoods,
+    parallel,
+)
 from ...common.exceptions import MsticpyException
 
 
@@ -19,7 +28,10 @@ class Model:
     """Class for modelling sessions data."""
 
     def __init__(
-        self, sessions: List[List[Union[str, Cmd]]], modellable_params: set = None
+        self,
+        sessions: List[List[Union[str, Cmd]]],
+        modellable_params: set = None,
+        n_jobs: int = 1,
     ):
         """
         Instantiate the Model class.
@@ -57,27 +69,21 @@ class Model:
             params and values. If your sessions include commands, params and values and
             this argument is not set, then some rough heuristics will be used to determine
             which params have values which are suitable for modelling.
+        n_jobs: int, optional
+            The number of worker processes used to train the model and
+            to compute the likelihoods of the sessions. -1 uses all
+            available CPUs. (the default is 1, which does all of the
+            work in the current process)
 
         """
-        if not isinstance(sessions, list):
-            raise MsticpyException("`sessions` should be a list")
-        if len(sessions) == 0:
-            raise MsticpyException("`sessions` should not be an empty list")
-        for i, ses in enumerate(sessions):
-            if not isinstance(ses, list):
-                raise MsticpyException(
-                    "each session in `sessions` should be a list")
-            if len(ses) == 0:
-                raise MsticpyException(
-                    "session at index {} of `sessions` is empty. Each session "
-                    "should contain at least one command".format(i)
-                )
+        _check_sessions(sessions)
 
         self.start_token = "##START##"
         self.end_token = "##END##"
         self.unk_token = "##UNK##"
 
         self.sessions = sessions
+        self.n_jobs = n_jobs
         self.session_type = None
         self._asses_input()
 
@@ -110,6 +116,7 @@ class Model:
         self.set_params_cond_cmd_probs = dict()
 
         self.session_likelihoods = None
+        self.session_log_likelihoods = None
         self.session_geomean_likelihoods = None
 
         self.rare_windows = dict()  # type: Dict[int, list]
@@ -118,6 +125,15 @@ class Model:
         self.rare_windows_geo = dict()  # type: Dict[int, list]
         self.rare_window_likelihoods_geo = dict()  # type: Dict[int, list]
 
+        # whether `modellable_params` are chosen by heuristics when training
+        self._heuristic_modellable_params = modellable_params is None
+
+        # integer encoded, array backed model. The counts and probabilities
+        # attributes above are dict views of it
+        self._array_model: Optional[ArrayModel] = None
+        self._array_views: Dict[str, object] = {}
+        self._encoded_sessions: Optional[Tuple[list, EncodedSessions]] = None
+
     def train(self):
         """
         Train the model by computing counts and probabilities.
@@ -125,10 +141,160 @@ class Model:
         In particular, computes the counts and probabilities of the commands
         (and possibly the params if provided, and possibly the values if provided)
 
+        The sessions are encoded to integer ids and the counts and
+        probabilities are computed with array operations. The count and
+        probability attributes (e.g. `trans_probs`) are `StateMatrix`
+        views of these arrays.
+
+        """
+        if self.session_type is None:
+            raise MsticpyException("session_type attribute should not be None")
+
+        self._heuristic_modellable_params = self.modellable_params is None
+        array_model = ArrayModel(
+            start_token=self.start_token,
+            end_token=self.end_token,
+            unk_token=self.unk_token,
+            use_params=self.session_type != SessionType.cmds_only,
+            use_values=self.session_type == SessionType.cmds_params_values,
+        )
+        encoded = parallel.train_array_model(
+            self.sessions,
+            array_model,
+            modellable_params=self.modellable_params,
+            n_jobs=self.n_jobs,
+        )
+        self._set_array_model(array_model, encoded)
+
+    def partial_fit(self, sessions: List[List[Union[str, Cmd]]]):
         """
-        self._compute_counts()
-        self._laplace_smooth_counts()
-        self._compute_probs()
+        Update the trained model with the counts of some new sessions.
+
+        The counts of the new sessions are added to the stored
+        (non laplace smoothed) counts, and then the laplace smoothing
+        and the probabilities are recomputed. This gives the same model
+        as training on all of the sessions at once, without recounting
+        the sessions which the model has already been trained on.
+
+        The new sessions replace the `sessions` attribute, so the
+        scoring methods (e.g. `compute_scores`) will then score them.
+        Any previously computed scores are cleared.
+
+        Parameters
+        ----------
+        sessions: List[List[Union[str, Cmd]]]
+            list of new sessions. These should be of the same format
+            as the sessions which the model was trained on.
+
+        """
+        if self._array_model is None:
+            raise MsticpyException(
+                "please train the model first before using this method"
+            )
+        _check_sessions(sessions)
+        if _get_session_type(sessions) != self.session_type:
+            raise MsticpyException(
+                "the new sessions should be of the same type as the sessions "
+                "the model was trained on ({})".format(self.session_type)
+            )
+
+        encoded = parallel.count_sessions(
+            sessions, self._array_model, n_jobs=self.n_jobs
+        )
+        self._array_model.fit(
+            None if self._heuristic_modellable_params else self.modellable_params
+        )
+        self.sessions = sessions
+        self._set_array_model(self._array_model, encoded)
+
+        self.set_params_cond_cmd_probs = dict()
+        self.session_likelihoods = None
+        self.session_log_likelihoods = None
+        self.session_geomean_likelihoods = None
+        self.rare_windows = dict()
+        self.rare_window_likelihoods = dict()
+        self.rare_windows_geo = dict()
+        self.rare_window_likelihoods_geo = dict()
+
+    def save(self, file: Union[str, BinaryIO]):
+        """
+        Save the counts of the trained model to a compressed binary file.
+
+        Only the tokens and the (non laplace smoothed) counts are saved,
+        not the sessions. Use `Model.load` to create a trained model
+        from the file, which can then be updated with `partial_fit`.
+
+        Parameters
+        ----------
+        file: Union[str, BinaryIO]
+            path or file object to write to. The file is a numpy .npz
+            archive - ".npz" is appended to a path which does not end
+            with it.
+
+        """
+        if self._array_model is None:
+            raise MsticpyException(
+                "please train the model first before using this method"
+            )
+        modellable_params = None
+        if not self._heuristic_modellable_params:
+            modellable_params = list(self.modellable_params)
+        self._array_model.save_counts(
+            file,
+            metadata={
+                "session_type": self.session_type,
+                "modellable_params": modellable_params,
+            },
+        )
+
+    @classmethod
+    def load(
+        cls,
+        file: Union[str, BinaryIO],
+        sessions: List[List[Union[str, Cmd]]],
+        n_jobs: int = 1,
+    ) -> "Model":
+        """
+        Create a trained model from the counts saved with `Model.save`.
+
+        Parameters
+        ----------
+        file: Union[str, BinaryIO]
+            path or file object of the saved counts
+        sessions: List[List[Union[str, Cmd]]]
+            list of sessions to score with the model. These should be
+            of the same format as the sessions which the model was
+            trained on. (Use `partial_fit` to also add their counts
+            to the model)
+        n_jobs: int, optional
+            The number of worker processes used to update the model
+            and to compute the likelihoods of the sessions.
+            (the default is 1)
+
+        Returns
+        -------
+        Model
+            the trained model
+
+        """
+        array_model, metadata = ArrayModel.load_counts(file)
+        modellable_params = metadata["modellable_params"]
+        if modellable_params is not None:
+            modellable_params = set(modellable_params)
+        model = cls(
+            sessions=sessions, modellable_params=modellable_params, n_jobs=n_jobs
+        )
+        if model.session_type != metadata["session_type"]:
+            raise MsticpyException(
+                "the sessions should be of the same type as the sessions "
+                "the model was trained on ({})".format(metadata["session_type"])
+            )
+        for token in ("start_token", "end_token", "unk_token"):
+            setattr(model, token, getattr(array_model, token))
+        array_model.fit(modellable_params)
+        # pylint: disable=protected-access
+        model._set_array_model(array_model, None)
+        return model
 
     def compute_scores(self, use_start_end_tokens: bool):
         """
@@ -171,180 +337,6 @@ class Model:
             use_geo_mean=False,
             use_start_end_tokens=use_start_end_tokens)
 
-    def _compute_counts(self):
-        """
-        Compute all the counts for the model.
-
-        The items we will count depend on the the `session_type` attribute.
-        We will compute the individual command and transition command counts.
-
-        If params are provided with the commands, then, in addition,
-        we will compute the individual param counts and param conditional
-        on the command counts.
-
-        If values are provided with the params, then in addition, we
-        will compute the individual value counts and value conditional
-        on the param counts. Also, we will use rough heuristics
-        to determine which params take categorical values, and hence
-        have modellable values.
-
-        """
-        if self.session_type is None:
-            raise MsticpyException("session_type attribute should not be None")
-
-        if self.session_type == SessionType.cmds_only:
-            seq1_counts, seq2_counts = cmds_only.compute_counts(
-                sessions=self.sessions,
-                start_token=self.start_token,
-                end_token=self.end_token,
-                unk_token=self.unk_token,
-            )
-            self._seq1_counts = seq1_counts
-            self._seq2_counts = seq2_counts
-
-        elif self.session_type == SessionType.cmds_params_only:
-            (
-                seq1_counts,
-                seq2_counts,
-                param_counts,
-                cmd_param_counts,
-            ) = cmds_params_only.compute_counts(
-                sessions=self.sessions,
-                start_token=self.start_token,
-                end_token=self.end_token,
-            )
-
-            self._seq1_counts = seq1_counts
-            self._seq2_counts = seq2_counts
-            self._param_counts = param_counts
-            self._cmd_param_counts = cmd_param_counts
-
-        elif self.session_type == SessionType.cmds_params_values:
-            (
-                seq1_counts,
-                seq2_counts,
-                param_counts,
-                cmd_param_counts,
-                value_counts,
-                param_value_counts,
-            ) = cmds_params_values.compute_counts(
-                sessions=self.sessions,
-                start_token=self.start_token,
-                end_token=self.end_token,
-            )
-
-            if self.modellable_params is None:
-                modellable_params = cmds_params_values.get_params_to_model_values(
-                    param_counts=param_counts, param_value_counts=param_value_counts
-                )
-                self.modellable_params = modellable_params
-
-            self._seq1_counts = seq1_counts
-            self._seq2_counts = seq2_counts
-            self._param_counts = param_counts
-            self._cmd_param_counts = cmd_param_counts
-            self._value_counts = value_counts
-            self._param_value_counts = param_value_counts
-
-    def _laplace_smooth_counts(self):
-        """
-        Laplace smooth all the counts for the model.
-
-        We do this by adding 1 to all the counts. This is so we shift
-        some of the probability mass from the very probable
-        commands/params/values to the unseen and very unlikely
-        commands/params/values. The `unk_token` means we can handle
-        unseen commands, params, values, sequences of commands.
-
-        """
-        if self._seq1_counts is None:
-            raise MsticpyException(
-                "Please run the _compute_counts method first.")
-
-        if self.session_type == SessionType.cmds_only:
-            seq1_counts_ls, seq2_counts_ls = cmds_only.laplace_smooth_counts(
-                seq1_counts=self._seq1_counts,
-                seq2_counts=self._seq2_counts,
-                start_token=self.start_token,
-                end_token=self.end_token,
-                unk_token=self.unk_token,
-            )
-            self.seq1_counts = seq1_counts_ls
-            self.seq2_counts = seq2_counts_ls
-
-        elif self.session_type == SessionType.cmds_params_only:
-            (
-                seq1_counts_ls,
-                seq2_counts_ls,
-                param_counts_ls,
-                cmd_param_counts_ls,
-            ) = cmds_params_only.laplace_smooth_counts(
-                seq1_counts=self._seq1_counts,
-                seq2_counts=self._seq2_counts,
-                param_counts=self._param_counts,
-                cmd_param_counts=self._cmd_param_counts,
-                start_token=self.start_token,
-                end_token=self.end_token,
-                unk_token=self.unk_token,
-            )
-
-            self.seq1_counts = seq1_counts_ls
-            self.seq2_counts = seq2_counts_ls
-            self.param_counts = param_counts_ls
-            self.cmd_param_counts = cmd_param_counts_ls
-
-        elif self.session_type == SessionType.cmds_params_values:
-            (
-                seq1_counts_ls,
-                seq2_counts_ls,
-                param_counts_ls,
-                cmd_param_counts_ls,
-                value_counts_ls,
-                param_value_counts_ls,
-            ) = cmds_params_values.laplace_smooth_counts(
-                seq1_counts=self._seq1_counts,
-                seq2_counts=self._seq2_counts,
-                param_counts=self._param_counts,
-                cmd_param_counts=self._cmd_param_counts,
-                value_counts=self._value_counts,
-                param_value_counts=self._param_value_counts,
-                start_token=self.start_token,
-                end_token=self.end_token,
-                unk_token=self.unk_token,
-            )
-            self.seq1_counts = seq1_counts_ls
-            self.seq2_counts = seq2_counts_ls
-            self.param_counts = param_counts_ls
-            self.cmd_param_counts = cmd_param_counts_ls
-            self.value_counts = value_counts_ls
-            self.param_value_counts = param_value_counts_ls
-
-    def _compute_probs(self):
-        """
-        Compute all the probabilities for the model.
-
-        The probabilities we compute depends on the `session_type` attribute.
-        We will compute the individual command and transition
-        command probabilities.
-
-        If params are provided with the commands, then, in addition,
-        we will compute the individual param probabilities and param
-        conditional on the command probabilities.
-
-        If values are provided with the params, then in addition,
-        we will compute the individual value probabilities and
-        value conditional on the param probabilities.
-
-        """
-        self._compute_probs_cmds()
-        if self.session_type in [
-            SessionType.cmds_params_only,
-            SessionType.cmds_params_values,
-        ]:
-            self._compute_probs_params()
-        if self.session_type == SessionType.cmds_params_values:
-            self._compute_probs_values()
-
     def compute_setof_params_cond_cmd(self, use_geo_mean: bool):  # noqa: MC0001
         """
         Compute likelihood of combinations of params conditional on the cmd.
@@ -454,47 +446,20 @@ class Model:
                 "please train the model first before using this method"
             )
 
-        result = []
-
-        for sess in self.sessions:
-            if self.session_type == SessionType.cmds_only:
-                tmp = cmds_only.compute_likelihood_window(
-                    window=sess,
-                    prior_probs=self.prior_probs,
-                    trans_probs=self.trans_probs,
-                    use_start_token=use_start_end_tokens,
-                    use_end_token=use_start_end_tokens,
-                    start_token=self.start_token,
-                    end_token=self.end_token,
-                )
-            elif self.session_type == SessionType.cmds_params_only:
-                tmp = cmds_params_only.compute_likelihood_window(
-                    window=sess,
-                    prior_probs=self.prior_probs,
-                    trans_probs=self.trans_probs,
-                    param_cond_cmd_probs=self.param_cond_cmd_probs,
-                    use_start_token=use_start_end_tokens,
-                    use_end_token=use_start_end_tokens,
-                    start_token=self.start_token,
-                    end_token=self.end_token,
-                )
-            else:
-                tmp = cmds_params_values.compute_likelihood_window(
-                    window=sess,
-                    prior_probs=self.prior_probs,
-                    trans_probs=self.trans_probs,
-                    param_cond_cmd_probs=self.param_cond_cmd_probs,
-                    value_cond_param_probs=self.value_cond_param_probs,
-                    modellable_params=self.modellable_params,
-                    use_start_token=use_start_end_tokens,
-                    use_end_token=use_start_end_tokens,
-                    start_token=self.start_token,
-                    end_token=self.end_token,
+        array_log_liks = self._array_scores(use_start_end_tokens)
+        if array_log_liks is not None:
+            log_liks = list(array_log_liks)
+        else:
+            log_liks = [
+                log_likelihoods.session_log_likelihood(
+                    self._compute_step_log_probs(
+                        session=sess, use_start_end_tokens=use_start_end_tokens
+                    )
                 )
-
-            result.append(tmp)
-
-        self.session_likelihoods = result
+                for sess in self.sessions
+            ]
+        self.session_log_likelihoods = log_liks
+        self.session_likelihoods = list(np.exp(log_liks))
 
     def compute_geomean_lik_of_sessions(self):
         """
@@ -513,15 +478,14 @@ class Model:
         lengths.
 
         """
-        if self.session_likelihoods is None:
+        if self.session_log_likelihoods is None:
             self.compute_likelihoods_of_sessions()
-        result = []
-        for i in range(len(self.sessions)):
-            lik = self.session_likelihoods[i]
-            k = len(self.sessions[i])
-            result.append(lik ** (1 / k))
-
-        self.session_geomean_likelihoods = result
+        # computed from the log likelihoods which do not underflow
+        # for long sessions
+        self.session_geomean_likelihoods = [
+            np.exp(log_lik / len(sess))
+            for sess, log_lik in zip(self.sessions, self.session_log_likelihoods)
+        ]
 
     def compute_rarest_windows(
         self,
@@ -569,52 +533,32 @@ class Model:
                 "please train the model first before using this method"
             )
 
-        if self.session_type == SessionType.cmds_only:
-            rare_tuples = [
-                cmds_only.rarest_window_session(
-                    session=ses,
-                    prior_probs=self.prior_probs,
-                    trans_probs=self.trans_probs,
-                    window_len=window_len,
-                    use_start_end_tokens=use_start_end_tokens,
-                    start_token=self.start_token,
-                    end_token=self.end_token,
-                    use_geo_mean=use_geo_mean,
-                )
-                for ses in self.sessions
-            ]
-        elif self.session_type == SessionType.cmds_params_only:
-            rare_tuples = [
-                cmds_params_only.rarest_window_session(
-                    session=ses,
-                    prior_probs=self.prior_probs,
-                    trans_probs=self.trans_probs,
-                    param_cond_cmd_probs=self.param_cond_cmd_probs,
-                    window_len=window_len,
-                    use_start_end_tokens=use_start_end_tokens,
-                    start_token=self.start_token,
-                    end_token=self.end_token,
-                    use_geo_mean=use_geo_mean,
-                )
-                for ses in self.sessions
-            ]
+        array_rarest = self._array_scores(use_start_end_tokens, window_len)
+        if array_rarest is not None:
+            inds, min_log_liks = array_rarest
         else:
-            rare_tuples = [
-                cmds_params_values.rarest_window_session(
-                    session=ses,
-                    prior_probs=self.prior_probs,
-                    trans_probs=self.trans_probs,
-                    param_cond_cmd_probs=self.param_cond_cmd_probs,
-                    value_cond_param_probs=self.value_cond_param_probs,
-                    modellable_params=self.modellable_params,
-                    window_len=window_len,
-                    use_start_end_tokens=use_start_end_tokens,
-                    start_token=self.start_token,
-                    end_token=self.end_token,
-                    use_geo_mean=use_geo_mean,
+            inds, min_log_liks = [], []
+            for ses in self.sessions:
+                log_liks = log_likelihoods.window_log_likelihoods(
+                    self._compute_step_log_probs(
+                        session=ses, use_start_end_tokens=use_start_end_tokens
+                    ),
+                    window_len,
                 )
-                for ses in self.sessions
-            ]
+                ind = log_likelihoods.rarest_window_index(log_liks)
+                inds.append(ind)
+                min_log_liks.append(log_liks[ind] if ind >= 0 else np.nan)
+
+        rare_tuples = []
+        for ses, ind, min_lik in zip(self.sessions, inds, min_log_liks):
+            if ind < 0:
+                rare_tuples.append(([], np.nan))
+                continue
+            if use_geo_mean:
+                min_lik = min_lik / window_len
+            rare_tuples.append(
+                (ses[ind: ind + window_len], np.exp(min_lik))  # noqa E203
+            )
 
         if use_geo_mean:
             self.rare_windows_geo[window_len] = [rare[0]
@@ -627,57 +571,96 @@ class Model:
             self.rare_window_likelihoods[window_len] = [
                 rare[1] for rare in rare_tuples]
 
-    def _compute_probs_cmds(self):
-        """Compute the individual and transition command probabilties."""
-        if self.seq1_counts is None:
-            raise MsticpyException("seq1_counts attribute should not be None")
-        if self.seq2_counts is None:
-            raise MsticpyException("seq2_counts attribute should not be None")
-
-        prior_probs, trans_probs = probabilities.compute_cmds_probs(
-            seq1_counts=self.seq1_counts,
-            seq2_counts=self.seq2_counts,
-            unk_token=self.unk_token,
-        )
+    def _set_array_model(
+        self, array_model: ArrayModel, encoded: Optional[EncodedSessions]
+    ):
+        """Set the count and probability attributes from the trained array model."""
+        if array_model.use_values and self._heuristic_modellable_params:
+            self.modellable_params = array_model.modellable_param_tokens()
+
+        views = array_model.state_matrices()
+        for name, view in views.items():
+            setattr(self, name, view)
+        views["modellable_params"] = self.modellable_params
+        self._array_model = array_model
+        self._array_views = views
+        self._encoded_sessions = None
+        if encoded is not None:
+            self._encoded_sessions = (self.sessions, encoded)
+
+    def _array_scores(
+        self, use_start_end_tokens: bool, window_len: Optional[int] = None
+    ) -> Optional[Union[np.ndarray, Tuple[np.ndarray, np.ndarray]]]:
+        """
+        Compute the likelihoods of the sessions with the array model.
 
-        self.prior_probs = prior_probs
-        self.trans_probs = trans_probs
+        Returns the log likelihood of each session if `window_len` is
+        None, otherwise the index and log likelihood of the rarest window
+        of each session. See `parallel.score_sessions`.
 
-    def _compute_probs_params(self):
-        """Compute the individual param probs and param conditional on command probs."""
-        if self.param_counts is None:
-            raise MsticpyException("param_counts attribute should not be None")
-        if self.cmd_param_counts is None:
-            raise MsticpyException(
-                "cmd_param_counts attribute should not be None")
+        Returns None if any of the count or probability attributes have
+        been replaced since the model was trained. In this case, the
+        likelihoods are computed from the attributes instead.
 
-        param_probs, param_cond_cmd_probs = probabilities.compute_params_probs(
-            param_counts=self.param_counts,
-            cmd_param_counts=self.cmd_param_counts,
-            seq1_counts=self.seq1_counts,
-            unk_token=self.unk_token,
+        """
+        if self._array_model is None or any(
+            getattr(self, name) is not view for name, view in self._array_views.items()
+        ):
+            return None
+        if (
+            self._encoded_sessions is None
+            or self._encoded_sessions[0] is not self.sessions
+        ):
+            self._encoded_sessions = (
+                self.sessions,
+                self._array_model.encode(self.sessions),
+            )
+        return parallel.score_sessions(
+            self._array_model,
+            self._encoded_sessions[1],
+            use_start_end_tokens=use_start_end_tokens,
+            window_len=window_len,
+            n_jobs=self.n_jobs,
         )
 
-        self.param_probs = param_probs
-        self.param_cond_cmd_probs = param_cond_cmd_probs
-
-    def _compute_probs_values(self):
-        """Compute the individual value probs and value conditional on param probs."""
-        if self.value_counts is None:
-            raise MsticpyException("value_counts attribute should not be None")
-        if self.param_value_counts is None:
-            raise MsticpyException(
-                "param_value_counts attribute should not be None")
-
-        value_probs, value_cond_param_probs = probabilities.compute_values_probs(
-            value_counts=self.value_counts,
-            param_value_counts=self.param_value_counts,
-            unk_token=self.unk_token,
+    def _compute_step_log_probs(
+        self, session: List[Union[str, Cmd]], use_start_end_tokens: bool
+    ) -> np.ndarray:
+        """Compute the log probabilities of each step of the session."""
+        if self.session_type == SessionType.cmds_only:
+            return cmds_only.compute_step_log_probs(
+                session=session,
+                prior_probs=self.prior_probs,
+                trans_probs=self.trans_probs,
+                use_start_token=use_start_end_tokens,
+                use_end_token=use_start_end_tokens,
+                start_token=self.start_token,
+                end_token=self.end_token,
+            )
+        if self.session_type == SessionType.cmds_params_only:
+            return cmds_params_only.compute_step_log_probs(
+                session=session,
+                prior_probs=self.prior_probs,
+                trans_probs=self.trans_probs,
+                param_cond_cmd_probs=self.param_cond_cmd_probs,
+                use_start_token=use_start_end_tokens,
+                use_end_token=use_start_end_tokens,
+                start_token=self.start_token,
+                end_token=self.end_token,
+            )
+        return cmds_params_values.compute_step_log_probs(
+            session=session,
+            prior_probs=self.prior_probs,
+            trans_probs=self.trans_probs,
+            param_cond_cmd_probs=self.param_cond_cmd_probs,
+            value_cond_param_probs=self.value_cond_param_probs,
+            modellable_params=self.modellable_params,
+            use_start_token=use_start_end_tokens,
+            use_end_token=use_start_end_tokens,
+            start_token=self.start_token,
+            end_token=self.end_token,
         )
 
-        self.value_probs = value_probs
-        self.value_cond_param_probs = value_cond_param_probs
-
     def _asses_input(self):
         """
         Determine what type of sessions we have.
@@ -688,33 +671,51 @@ class Model:
         attribute of the Cmd datatype is a set or a dict.
 
         """
-        session = self.sessions[0]
-        cmd = session[0]
-        if isinstance(cmd, str):
-            self.session_type = SessionType.cmds_only
-        elif self._check_cmd_type():
-            if isinstance(cmd.params, set):
-                self.session_type = SessionType.cmds_params_only
-            elif isinstance(cmd.params, dict):
-                self.session_type = SessionType.cmds_params_values
-            else:
-                raise MsticpyException(
-                    "Params attribute of Cmd data structure should "
-                    + "be either a set or a dict"
-                )
-        else:
+        self.session_type = _get_session_type(self.sessions)
+
+
+def _check_sessions(sessions: List[List[Union[str, Cmd]]]):
+    """Check that `sessions` is a non empty list of non empty lists."""
+    if not isinstance(sessions, list):
+        raise MsticpyException("`sessions` should be a list")
+    if len(sessions) == 0:
+        raise MsticpyException("`sessions` should not be an empty list")
+    for i, ses in enumerate(sessions):
+        if not isinstance(ses, list):
+            raise MsticpyException(
+                "each session in `sessions` should be a list")
+        if len(ses) == 0:
             raise MsticpyException(
-                "Each element of 'sessions' should be a list of either "
-                + "strings, or Cmd data types"
+                "session at index {} of `sessions` is empty. Each session "
+                "should contain at least one command".format(i)
             )
 
-    def _check_cmd_type(self):
-        """Check whether the Cmd datatype has the expected attributes."""
-        session = self.sessions[0]
-        cmd = session[0]
-        if "name" in dir(cmd) and "params" in dir(cmd):
-            return True
-        return False
+
+def _get_session_type(sessions: List[List[Union[str, Cmd]]]) -> str:
+    """Return the `SessionType` of the sessions (judged by the first command)."""
+    cmd = sessions[0][0]
+    if isinstance(cmd, str):
+        return SessionType.cmds_only
+    if _check_cmd_type(cmd):
+        if isinstance(cmd.params, set):
+            return SessionType.cmds_params_only
+        if isinstance(cmd.params, dict):
+            return SessionType.cmds_params_values
+        raise MsticpyException(
+            "Params attribute of Cmd data structure should "
+            + "be either a set or a dict"
+        )
+    raise MsticpyException(
+        "Each element of 'sessions' should be a list of either "
+        + "strings, or Cmd data types"
+    )
+
+
+def _check_cmd_type(cmd) -> bool:
+    """Check whether the Cmd datatype has the expected attributes."""
+    if "name" in dir(cmd) and "params" in dir(cmd):
+        return True
+    return False
 
 
 class SessionType:
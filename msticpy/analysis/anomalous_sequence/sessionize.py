@@ -102,7 +102,6 @@ def sessionize_data(
     return agg_df
 
 
-# pylint: disable=too-many-locals, too-many-branches
 def create_session_col(
     data: pd.DataFrame,
     user_identifier_cols: List[str],
@@ -141,8 +140,8 @@ def create_session_col(
     pd.DataFrame with an additional "session_ind" column
 
     """
-    max_sep = pd.to_timedelta(max_event_separation_mins, unit="min")
-    max_ses = pd.to_timedelta(max_session_time_mins, unit="min")
+    max_sep = pd.to_timedelta(max_event_separation_mins, unit="min").value
+    max_ses = pd.to_timedelta(max_session_time_mins, unit="min").value
 
     df_with_sesind = data.copy()
     if not isinstance(df_with_sesind[time_col].dtype, DatetimeTZDtype):
@@ -163,43 +162,93 @@ def create_session_col(
         user_identifier_cols + [time_col]
     ).reset_index(drop=True)
 
-    # initialise first row
-    ses_ind = 0
-    df_with_sesind.loc[0, "time_diff"] = pd.to_timedelta(0)
-    df_with_sesind.loc[0, "cml_time"] = pd.to_timedelta(0)
-    df_with_sesind.loc[0, "session_ind"] = ses_ind
-
-    for i in range(1, len(df_with_sesind)):
-        cur = df_with_sesind.iloc[i]
-        prev = df_with_sesind.iloc[i - 1]
-
-        # if any of the user_identifier_cols values change, a new session
-        # should start
-        new_flag = False
-        for col in user_identifier_cols:
-            if cur[col] != prev[col]:
-                new_flag = True
-                break
-
-        dif = cur[time_col] - prev[time_col]
-        cml = prev["cml_time"] + dif
-        # if the max session length is exceeded or the max separation between events is exceeded,
-        # a new session should start
-        if dif > max_sep or cml > max_ses:
-            new_flag = True
-
-        if new_flag:
-            df_with_sesind.loc[i, "time_diff"] = pd.to_timedelta(0)
-            df_with_sesind.loc[i, "cml_time"] = pd.to_timedelta(0)
-            ses_ind += 1
-            df_with_sesind.loc[i, "session_ind"] = ses_ind
-        else:
-            df_with_sesind.loc[i, "time_diff"] = dif
-            df_with_sesind.loc[i, "cml_time"] = cml
-            df_with_sesind.loc[i, "session_ind"] = ses_ind
+    # a new session starts if any of the user_identifier_cols values change
+    user_cols = df_with_sesind[user_identifier_cols]
+    new_user = user_cols.ne(user_cols.shift()).any(axis=1).to_numpy()
+    new_user[0] = True
+
+    # or if the max separation between events is exceeded
+    times = df_with_sesind[time_col].values.astype("datetime64[ns]").view("int64")
+    is_nat = np.isnat(df_with_sesind[time_col].values)
+    time_diff = np.diff(times, prepend=times[0])
+    # comparisons with missing times do not start a new session
+    time_diff[is_nat | np.roll(is_nat, 1)] = 0
+    ses_start = new_user | (time_diff > max_sep)
+
+    # or if the max session length is exceeded
+    ses_start = _split_long_sessions(times, is_nat, ses_start, max_ses)
+
+    df_with_sesind["session_ind"] = np.cumsum(ses_start) - 1
 
     # replace dummy_str with nan values
     for col in user_identifier_cols:
         df_with_sesind[col] = df_with_sesind[col].replace("dummy_str", np.nan)
 
     return df_with_sesind[final_cols]
+
+
+def _split_long_sessions(
+    times: np.ndarray, is_nat: np.ndarray, ses_start: np.ndarray, max_ses: int
+) -> np.ndarray:
+    """
+    Return session start flags with sessions split at `max_ses`.
+
+    Parameters
+    ----------
+    times: np.ndarray
+        Event times (int64 nanoseconds) sorted within each session.
+    is_nat: np.ndarray
+        Boolean array - True where the event time is missing.
+        Missing times are sorted after the other times in a session.
+    ses_start: np.ndarray
+        Boolean array - True for the first event of each session.
+    max_ses: int
+        The maximum length of a session in nanoseconds.
+
+    Returns
+    -------
+    np.ndarray
+        Boolean array of session start flags. A new session starts at
+        the first event more than `max_ses` after the start of the
+        current session.
+
+    Notes
+    -----
+    Each split depends on the previous split in the session so the
+    sessions that are too long are processed together, one split at
+    a time. The number of iterations is the maximum number of splits
+    in a single session.
+
+    """
+    starts = np.flatnonzero(ses_start)
+    # end of the events with known times in each session
+    ends = starts + np.add.reduceat(~is_nat, starts)
+    long_ses = ends > starts
+    long_ses[long_ses] = times[ends[long_ses] - 1] - times[starts[long_ses]] > max_ses
+    cur_pos, ends = starts[long_ses], ends[long_ses]
+
+    ses_start = ses_start.copy()
+    while len(cur_pos):
+        next_pos = _bounded_search(times, times[cur_pos] + max_ses, cur_pos, ends)
+        in_ses = next_pos < ends
+        ses_start[next_pos[in_ses]] = True
+        cur_pos, ends = next_pos[in_ses], ends[in_ses]
+    return ses_start
+
+
+def _bounded_search(
+    times: np.ndarray, values: np.ndarray, low: np.ndarray, high: np.ndarray
+) -> np.ndarray:
+    """Return the position of the first time > value in each [low, high) range."""
+    # times are only sorted within each range, so np.searchsorted
+    # cannot be used on the whole array.
+    low, high = low.copy(), high.copy()
+    while True:
+        searching = low < high
+        if not searching.any():
+            return low
+        mid = (low + high) // 2
+        is_after = np.zeros(len(mid), dtype=bool)
+        is_after[searching] = times[mid[searching]] > values[searching]
+        high = np.where(searching & is_after, mid, high)
+        low = np.where(searching & ~is_after, mid + 1, low)
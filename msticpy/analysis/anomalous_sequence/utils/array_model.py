@@ -0,0 +1,1012 @@
+# -------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# --------------------------------------------------------------------------
+"""
+Helper module for integer encoded, array backed modelling of sessions.
+
+Commands, params and values are interned to integer ids and the
+sessions are encoded once to flat integer arrays. The counts and
+probabilities are then computed with array operations rather than
+by iterating over dicts of dicts:
+
+- individual command counts/probabilities are 1d arrays indexed by
+  command id
+- transition counts/probabilities are dense (n_cmds, n_cmds) arrays,
+  since laplace smoothing makes them dense anyway
+- params conditional on the command and values conditional on the
+  param are stored sparsely as sorted (row, col) coordinates, since
+  most commands only take a few of the params
+
+The `StateMatrix` dicts used by the rest of this package can be
+built from the arrays with `ArrayModel.state_matrices`.
+"""
+
+import itertools
+import json
+from collections import defaultdict
+from operator import attrgetter
+from typing import Any, BinaryIO, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from ..utils.data_structures import Cmd, StateMatrix, TokenIndex
+from ....common.exceptions import MsticpyException
+
+# maximum number of (row, col) pairs for which sparse coordinates
+# are looked up with a dense table
+_DENSE_LOOKUP_SIZE = 1_000_000
+
+# version of the file format written by `ArrayModel.save_counts`
+_COUNTS_FORMAT_VERSION = 1
+
+# the ArrayModel attributes used by `ArrayModel.compute_step_log_probs`
+SCORING_ATTRS = (
+    "prior_probs",
+    "trans_probs",
+    "param_probs",
+    "cmd_param_counts_ls",
+    "param_cond_cmd_probs",
+    "value_probs",
+    "param_value_counts_ls",
+    "value_cond_param_probs",
+    "modellable",
+)
+
+
+# pylint: disable=too-few-public-methods
+class EncodedSessions:
+    """Class for sessions encoded as flat arrays of integer ids."""
+
+    def __init__(
+        self,
+        cmds: np.ndarray,
+        offsets: np.ndarray,
+        params: Optional[np.ndarray] = None,
+        values: Optional[np.ndarray] = None,
+        param_offsets: Optional[np.ndarray] = None,
+    ):
+        """
+        Instantiate the EncodedSessions class.
+
+        Parameters
+        ----------
+        cmds: np.ndarray
+            command ids of all of the sessions concatenated
+        offsets: np.ndarray
+            start of each session in `cmds` followed by the total
+            number of commands. So session i is
+            cmds[offsets[i]:offsets[i + 1]]
+        params: Optional[np.ndarray]
+            param ids of all of the commands concatenated
+            (-1 for unseen params)
+        values: Optional[np.ndarray]
+            value id of each of the `params` (-1 for unseen values)
+        param_offsets: Optional[np.ndarray]
+            start of the params of each command in `params` followed
+            by the total number of params
+
+        """
+        self.cmds = cmds
+        self.offsets = offsets
+        self.params = params
+        self.values = values
+        self.param_offsets = param_offsets
+
+    @property
+    def n_sessions(self) -> int:
+        """Return the number of sessions."""
+        return len(self.offsets) - 1
+
+    def select(self, start: int, stop: int) -> "EncodedSessions":
+        """
+        Return the encoded sessions from `start` up to (excluding) `stop`.
+
+        Parameters
+        ----------
+        start: int
+            index of the first session
+        stop: int
+            index after the last session
+
+        Returns
+        -------
+        EncodedSessions
+            the selected sessions
+
+        """
+        first, last = self.offsets[start], self.offsets[stop]
+        offsets = self.offsets[start : stop + 1] - first  # noqa: E203
+        if self.param_offsets is None:
+            return EncodedSessions(self.cmds[first:last], offsets)
+        par_first, par_last = self.param_offsets[first], self.param_offsets[last]
+        return EncodedSessions(
+            self.cmds[first:last],
+            offsets,
+            self.params[par_first:par_last],
+            None if self.values is None else self.values[par_first:par_last],
+            self.param_offsets[first : last + 1] - par_first,  # noqa: E203
+        )
+
+    def remap(
+        self, cmd_map: np.ndarray, param_map: np.ndarray, value_map: np.ndarray
+    ) -> "EncodedSessions":
+        """
+        Return the sessions with the ids replaced using the maps.
+
+        Parameters
+        ----------
+        cmd_map: np.ndarray
+            new id of each command id
+        param_map: np.ndarray
+            new id of each param id
+        value_map: np.ndarray
+            new id of each value id
+
+        Returns
+        -------
+        EncodedSessions
+            the re-encoded sessions. See `ArrayModel.merge`.
+
+        """
+        if self.param_offsets is None:
+            return EncodedSessions(cmd_map[self.cmds], self.offsets)
+        return EncodedSessions(
+            cmd_map[self.cmds],
+            self.offsets,
+            param_map[self.params],
+            None if self.values is None else value_map[self.values],
+            self.param_offsets,
+        )
+
+    @staticmethod
+    def concat(encoded_list: List["EncodedSessions"]) -> "EncodedSessions":
+        """
+        Concatenate encoded sessions.
+
+        Parameters
+        ----------
+        encoded_list: List[EncodedSessions]
+            encoded sessions (encoded with the same token ids)
+
+        Returns
+        -------
+        EncodedSessions
+            all of the sessions
+
+        """
+
+        def _concat_offsets(offsets_list):
+            starts = np.cumsum([0] + [offsets[-1] for offsets in offsets_list])
+            return np.concatenate(
+                [[0]]
+                + [
+                    offsets[1:] + start
+                    for offsets, start in zip(offsets_list, starts)
+                ]
+            )
+
+        first = encoded_list[0]
+        cmds = np.concatenate([enc.cmds for enc in encoded_list])
+        offsets = _concat_offsets([enc.offsets for enc in encoded_list])
+        if first.param_offsets is None:
+            return EncodedSessions(cmds, offsets)
+        return EncodedSessions(
+            cmds,
+            offsets,
+            np.concatenate([enc.params for enc in encoded_list]),
+            None
+            if first.values is None
+            else np.concatenate([enc.values for enc in encoded_list]),
+            _concat_offsets([enc.param_offsets for enc in encoded_list]),
+        )
+
+
+# pylint: disable=too-many-instance-attributes
+class ArrayModel:
+    """Class for the array backed counts and probabilities of sessions."""
+
+    def __init__(
+        self,
+        start_token: str,
+        end_token: str,
+        unk_token: str,
+        use_params: bool = False,
+        use_values: bool = False,
+    ):
+        """
+        Instantiate the ArrayModel class.
+
+        Parameters
+        ----------
+        start_token: str
+            dummy command to signify the start of a session (e.g. "##START##")
+        end_token: str
+            dummy command to signify the end of a session (e.g. "##END##")
+        unk_token: str
+            dummy command to signify an unseen command (e.g. "##UNK##")
+        use_params: bool
+            if True, the sessions are lists of the Cmd datatype and the
+            params of the commands are modelled
+        use_values: bool
+            if True, the params of the Cmd datatype are dicts and the
+            values of the modellable params are also modelled
+
+        """
+        self.start_token = start_token
+        self.end_token = end_token
+        self.unk_token = unk_token
+        self.use_params = use_params or use_values
+        self.use_values = use_values
+
+        self.cmds = TokenIndex([start_token, end_token, unk_token])
+        self.params = TokenIndex([unk_token])
+        self.values = TokenIndex([unk_token])
+        self.start_id = self.cmds.ids[start_token]
+        self.end_id = self.cmds.ids[end_token]
+        self.unk_id = self.cmds.ids[unk_token]
+        self.unk_param_id = self.params.ids[unk_token]
+        self.unk_value_id = self.values.ids[unk_token]
+
+        # non laplace smoothed counts
+        self.seq1_counts = np.zeros(0, dtype=np.int64)
+        self.seq2_counts = np.zeros((0, 0), dtype=np.int64)
+        self.param_counts = np.zeros(0, dtype=np.int64)
+        self.cmd_param_counts = _empty_coords()
+        self.value_counts = np.zeros(0, dtype=np.int64)
+        self.param_value_counts = _empty_coords()
+
+        self.modellable = np.zeros(0, dtype=bool)
+
+        # laplace smoothed counts and probabilities.
+        # These are set by `train`
+        self.seq1_counts_ls: np.ndarray
+        self.seq2_counts_ls: np.ndarray
+        self.prior_probs: np.ndarray
+        self.trans_probs: np.ndarray
+        self.param_counts_ls: np.ndarray
+        self.cmd_param_counts_ls: Tuple[np.ndarray, ...]
+        self.param_probs: np.ndarray
+        self.param_cond_cmd_probs: np.ndarray
+        self.value_counts_ls: np.ndarray
+        self.param_value_counts_ls: Tuple[np.ndarray, ...]
+        self.value_probs: np.ndarray
+        self.value_cond_param_probs: np.ndarray
+
+    def encode(
+        self, sessions: List[List[Union[str, Cmd]]], add_tokens: bool = False
+    ) -> EncodedSessions:
+        """
+        Encode the sessions to flat arrays of integer ids.
+
+        Parameters
+        ----------
+        sessions: List[List[Union[str, Cmd]]]
+            list of sessions, where each session is a list of either
+            strings or a list of the Cmd datatype
+        add_tokens: bool
+            if True, unseen commands, params and values are assigned
+            new ids (use this for the training sessions).
+            Otherwise, unseen commands are encoded as the `unk_token`
+            and unseen params and values as -1.
+
+        Returns
+        -------
+        EncodedSessions
+            the encoded sessions
+
+        """
+        lengths = np.fromiter(
+            (len(ses) for ses in sessions), dtype=np.int64, count=len(sessions)
+        )
+        offsets = np.concatenate(([0], np.cumsum(lengths)))
+        flat_cmds = list(itertools.chain.from_iterable(sessions))
+        if not self.use_params:
+            return EncodedSessions(
+                self.cmds.encode(flat_cmds, add_tokens, default=self.unk_id), offsets
+            )
+
+        cmd_ids = self.cmds.encode(
+            map(attrgetter("name"), flat_cmds), add_tokens, default=self.unk_id
+        )
+        cmd_params = list(map(attrgetter("params"), flat_cmds))
+        n_params = np.fromiter(
+            map(len, cmd_params), dtype=np.int64, count=len(cmd_params)
+        )
+        param_offsets = np.concatenate(([0], np.cumsum(n_params)))
+        param_ids = self.params.encode(
+            itertools.chain.from_iterable(cmd_params), add_tokens
+        )
+        value_ids = None
+        if self.use_values:
+            value_ids = self.values.encode(
+                itertools.chain.from_iterable(map(_param_values, cmd_params)),
+                add_tokens,
+            )
+        return EncodedSessions(cmd_ids, offsets, param_ids, value_ids, param_offsets)
+
+    def train(self, encoded: EncodedSessions, modellable_params: Optional[set] = None):
+        """
+        Compute the counts and probabilities of the encoded sessions.
+
+        Parameters
+        ----------
+        encoded: EncodedSessions
+            training sessions encoded with `add_tokens` set to True
+        modellable_params: Optional[set]
+            set of params for which the values are modelled.
+            If None (and `use_values` is True), rough heuristics are used
+            to determine which params have values which are suitable
+            for modelling. See `modellable_param_tokens`.
+
+        """
+        self.count(encoded)
+        self.fit(modellable_params)
+
+    def count(self, encoded: EncodedSessions):
+        """
+        Add the (non laplace smoothed) counts of the encoded sessions.
+
+        Parameters
+        ----------
+        encoded: EncodedSessions
+            sessions encoded with `add_tokens` set to True
+
+        """
+        self._grow_counts()
+        n_cmds = len(self.cmds)
+        self.seq1_counts += np.bincount(encoded.cmds, minlength=n_cmds)
+        self.seq1_counts[[self.start_id, self.end_id]] += encoded.n_sessions
+        prev, cur = self._transitions(encoded)
+        self.seq2_counts += np.bincount(
+            prev * n_cmds + cur, minlength=n_cmds * n_cmds
+        ).reshape(n_cmds, n_cmds)
+
+        if self.use_params:
+            n_params = len(self.params)
+            cmd_ids = np.repeat(encoded.cmds, np.diff(encoded.param_offsets))
+            self.param_counts += np.bincount(encoded.params, minlength=n_params)
+            self.cmd_param_counts = _add_coords(
+                self.cmd_param_counts,
+                _count_coords(cmd_ids, encoded.params, n_params),
+                n_params,
+            )
+        if self.use_values:
+            n_values = len(self.values)
+            self.value_counts += np.bincount(encoded.values, minlength=n_values)
+            self.param_value_counts = _add_coords(
+                self.param_value_counts,
+                _count_coords(encoded.params, encoded.values, n_values),
+                n_values,
+            )
+
+    def merge(
+        self, other: "ArrayModel"
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Add the tokens and (non laplace smoothed) counts of `other`.
+
+        Parameters
+        ----------
+        other: ArrayModel
+            model with counts of other sessions (e.g. computed in
+            another process)
+
+        Returns
+        -------
+        Tuple[np.ndarray, np.ndarray, np.ndarray]
+            The ids in this model of the command, param and value ids
+            of `other`. Use `EncodedSessions.remap` with these to
+            re-encode sessions which were encoded by `other`.
+
+        """
+        cmd_map = self.cmds.encode(other.cmds.tokens, add_tokens=True)
+        param_map = self.params.encode(other.params.tokens, add_tokens=True)
+        value_map = self.values.encode(other.values.tokens, add_tokens=True)
+        self._grow_counts()
+        other._grow_counts()  # pylint: disable=protected-access
+        # the maps are one to one, so there are no repeated indices
+        self.seq1_counts[cmd_map] += other.seq1_counts
+        self.seq2_counts[np.ix_(cmd_map, cmd_map)] += other.seq2_counts
+        if self.use_params:
+            rows, cols, counts = other.cmd_param_counts
+            self.cmd_param_counts = _add_coords(
+                self.cmd_param_counts,
+                (cmd_map[rows], param_map[cols], counts),
+                len(self.params),
+            )
+            self.param_counts[param_map] += other.param_counts
+        if self.use_values:
+            rows, cols, counts = other.param_value_counts
+            self.param_value_counts = _add_coords(
+                self.param_value_counts,
+                (param_map[rows], value_map[cols], counts),
+                len(self.values),
+            )
+            self.value_counts[value_map] += other.value_counts
+        return cmd_map, param_map, value_map
+
+    def fit(self, modellable_params: Optional[set] = None):
+        """
+        Laplace smooth the counts and compute the probabilities.
+
+        Parameters
+        ----------
+        modellable_params: Optional[set]
+            set of params for which the values are modelled.
+            If None (and `use_values` is True), rough heuristics are used
+            to determine which params have values which are suitable
+            for modelling. See `modellable_param_tokens`.
+
+        """
+        self._grow_counts()
+        if self.use_values:
+            if modellable_params is None:
+                self.modellable = self._modellable_heuristic()
+            else:
+                self.modellable = np.array(
+                    [param in modellable_params for param in self.params.tokens],
+                    dtype=bool,
+                )
+        self._laplace_smooth_counts()
+        self._compute_probs()
+
+    def modellable_param_tokens(self) -> set:
+        """Return the set of params for which the values are modelled."""
+        return {self.params.tokens[ind] for ind in np.flatnonzero(self.modellable)}
+
+    def compute_step_log_probs(
+        self, encoded: EncodedSessions, use_start_end_tokens: bool
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Compute the log probabilities of each step of all of the sessions.
+
+        Parameters
+        ----------
+        encoded: EncodedSessions
+            sessions encoded with `encode`
+        use_start_end_tokens: bool
+            if True, then `start_token` and `end_token` will be prepended
+            and appended to each session respectively before the
+            calculations are done
+
+        Returns
+        -------
+        Tuple[np.ndarray, np.ndarray]
+            The step log probabilities of all of the sessions
+            concatenated (see `log_likelihoods.compute_step_log_probs`)
+            and the start of the steps of each session followed by the
+            total number of steps.
+
+        """
+        cmds = encoded.cmds
+        offsets = encoded.offsets
+        if use_start_end_tokens:
+            step_offsets = offsets + np.arange(len(offsets))
+            is_cmd = np.ones(step_offsets[-1], dtype=bool)
+            is_cmd[step_offsets[1:] - 1] = False
+            steps = np.full(len(is_cmd), self.end_id)
+            steps[is_cmd] = cmds
+        else:
+            step_offsets = offsets
+            is_cmd = np.ones(len(cmds), dtype=bool)
+            steps = cmds
+        firsts = step_offsets[:-1][np.diff(step_offsets) > 0]
+
+        log_prior, log_trans = self._log_cmd_probs()
+        step_log_probs = np.empty((2, len(steps)))
+        step_log_probs[0] = log_prior[steps]
+        prev = np.concatenate(([self.start_id], steps))[:-1]
+        step_log_probs[1] = log_trans[prev, steps]
+        step_log_probs[1, firsts] = 0
+        if use_start_end_tokens:
+            step_log_probs[0, firsts] = log_trans[self.start_id, steps[firsts]]
+        if self.use_params:
+            step_log_probs[:, is_cmd] += self._param_log_probs(encoded)
+        return step_log_probs, step_offsets
+
+    def scoring_copy(self) -> "ArrayModel":
+        """
+        Return a copy of the model with only what is needed for scoring.
+
+        The copy has no token indexes or counts, so it is cheap to
+        send to other processes. It can only score sessions which have
+        already been encoded (see `compute_step_log_probs`).
+
+        Returns
+        -------
+        ArrayModel
+            the copy. Its arrays are shared with this model.
+
+        """
+        copy = ArrayModel(
+            self.start_token,
+            self.end_token,
+            self.unk_token,
+            use_params=self.use_params,
+            use_values=self.use_values,
+        )
+        for attr in SCORING_ATTRS:
+            if hasattr(self, attr):
+                setattr(copy, attr, getattr(self, attr))
+        return copy
+
+    def save_counts(self, file: Union[str, BinaryIO], metadata: Optional[dict] = None):
+        """
+        Save the tokens and (non laplace smoothed) counts to a .npz file.
+
+        The counts are saved as sparse coordinates in a compressed numpy
+        .npz archive. The tokens and `metadata` are saved as JSON, so
+        they should be JSON serializable (e.g. strings).
+
+        Parameters
+        ----------
+        file: Union[str, BinaryIO]
+            path or file object to write to.
+            ".npz" is appended to a path which does not end with it.
+        metadata: Optional[dict]
+            other JSON serializable state to save with the counts
+            (returned by `load_counts`)
+
+        """
+        self._grow_counts()
+        seq2_rows, seq2_cols = np.nonzero(self.seq2_counts)
+        header = {
+            "format_version": _COUNTS_FORMAT_VERSION,
+            "start_token": self.start_token,
+            "end_token": self.end_token,
+            "unk_token": self.unk_token,
+            "use_params": self.use_params,
+            "use_values": self.use_values,
+            "cmds": self.cmds.tokens,
+            "params": self.params.tokens,
+            "values": self.values.tokens,
+            "metadata": metadata or {},
+        }
+        np.savez_compressed(
+            file,
+            header=np.array(json.dumps(header)),
+            seq1_counts=self.seq1_counts,
+            seq2_coords=np.stack(
+                (seq2_rows, seq2_cols, self.seq2_counts[seq2_rows, seq2_cols])
+            ),
+            param_counts=self.param_counts,
+            cmd_param_coords=np.stack(self.cmd_param_counts),
+            value_counts=self.value_counts,
+            param_value_coords=np.stack(self.param_value_counts),
+        )
+
+    @classmethod
+    def load_counts(cls, file: Union[str, BinaryIO]) -> Tuple["ArrayModel", dict]:
+        """
+        Load a model with the tokens and counts saved by `save_counts`.
+
+        Parameters
+        ----------
+        file: Union[str, BinaryIO]
+            path or file object to read from
+
+        Returns
+        -------
+        Tuple[ArrayModel, dict]
+            The model with the saved (non laplace smoothed) counts and
+            the saved metadata. Use `fit` to compute the probabilities.
+
+        """
+        with np.load(file, allow_pickle=False) as data:
+            header = json.loads(str(data["header"]))
+            if header.get("format_version") != _COUNTS_FORMAT_VERSION:
+                raise MsticpyException(
+                    "unsupported format version of saved counts: {}".format(
+                        header.get("format_version")
+                    )
+                )
+            array_model = cls(
+                header["start_token"],
+                header["end_token"],
+                header["unk_token"],
+                use_params=header["use_params"],
+                use_values=header["use_values"],
+            )
+            for attr in ("cmds", "params", "values"):
+                getattr(array_model, attr).encode(header[attr], add_tokens=True)
+            n_cmds = len(array_model.cmds)
+            array_model.seq1_counts = data["seq1_counts"]
+            seq2_rows, seq2_cols, seq2_counts = data["seq2_coords"]
+            array_model.seq2_counts = np.zeros((n_cmds, n_cmds), dtype=np.int64)
+            array_model.seq2_counts[seq2_rows, seq2_cols] = seq2_counts
+            array_model.param_counts = data["param_counts"]
+            array_model.cmd_param_counts = tuple(data["cmd_param_coords"])
+            array_model.value_counts = data["value_counts"]
+            array_model.param_value_counts = tuple(data["param_value_coords"])
+        return array_model, header["metadata"]
+
+    def state_matrices(self) -> Dict[str, Any]:
+        """
+        Build the dict views of the counts and probabilities.
+
+        Returns
+        -------
+        Dict[str, Any]
+            The counts and probabilities keyed by the corresponding
+            attribute name of the `Model` class. The non laplace
+            smoothed counts are defaultdicts and the laplace smoothed
+            counts and probabilities are `StateMatrix` objects.
+
+        """
+        unk = self.unk_token
+        cmds = self.cmds.tokens
+        n_cmds = len(cmds)
+        # the end token has no transitions from it and the start token
+        # has no transitions to it
+        trans_rows = np.arange(n_cmds) != self.end_id
+        trans_cols = np.arange(n_cmds) != self.start_id
+        trans_coords = np.nonzero(trans_rows[:, None] & trans_cols[None, :])
+        raw_coords = np.nonzero(self.seq2_counts)
+        views: Dict[str, Any] = {
+            "_seq1_counts": _raw_dict(cmds, self.seq1_counts),
+            "_seq2_counts": _raw_nested_dict(
+                cmds, cmds, *raw_coords, self.seq2_counts[raw_coords]
+            ),
+            "seq1_counts": StateMatrix(_dict(cmds, self.seq1_counts_ls), unk),
+            "seq2_counts": StateMatrix(
+                _nested_dict(
+                    cmds, cmds, *trans_coords, self.seq2_counts_ls[trans_coords]
+                ),
+                unk,
+            ),
+            "prior_probs": StateMatrix(_dict(cmds, self.prior_probs), unk),
+            "trans_probs": StateMatrix(
+                _nested_dict(
+                    cmds, cmds, *trans_coords, self.trans_probs[trans_coords]
+                ),
+                unk,
+            ),
+        }
+        if self.use_params:
+            params = self.params.tokens
+            views.update(
+                {
+                    "_param_counts": _raw_dict(params, self.param_counts),
+                    "_cmd_param_counts": _raw_nested_dict(
+                        cmds, params, *self.cmd_param_counts
+                    ),
+                    "param_counts": StateMatrix(
+                        _dict(params, self.param_counts_ls), unk
+                    ),
+                    "cmd_param_counts": StateMatrix(
+                        _nested_dict(cmds, params, *self.cmd_param_counts_ls), unk
+                    ),
+                    "param_probs": StateMatrix(_dict(params, self.param_probs), unk),
+                    "param_cond_cmd_probs": StateMatrix(
+                        _nested_dict(
+                            cmds,
+                            params,
+                            *self.cmd_param_counts_ls[:2],
+                            self.param_cond_cmd_probs,
+                        ),
+                        unk,
+                    ),
+                }
+            )
+        if self.use_values:
+            params = self.params.tokens
+            values = self.values.tokens
+            views.update(
+                {
+                    "_value_counts": _raw_dict(values, self.value_counts),
+                    "_param_value_counts": _raw_nested_dict(
+                        params, values, *self.param_value_counts
+                    ),
+                    "value_counts": StateMatrix(
+                        _dict(values, self.value_counts_ls), unk
+                    ),
+                    "param_value_counts": StateMatrix(
+                        _nested_dict(params, values, *self.param_value_counts_ls),
+                        unk,
+                    ),
+                    "value_probs": StateMatrix(_dict(values, self.value_probs), unk),
+                    "value_cond_param_probs": StateMatrix(
+                        _nested_dict(
+                            params,
+                            values,
+                            *self.param_value_counts_ls[:2],
+                            self.value_cond_param_probs,
+                        ),
+                        unk,
+                    ),
+                }
+            )
+        return views
+
+    def _grow_counts(self):
+        """Pad the (non laplace smoothed) counts with zeros for new tokens."""
+        n_cmds = len(self.cmds)
+        seq2_counts = np.zeros((n_cmds, n_cmds), dtype=np.int64)
+        seq2_counts[: len(self.seq2_counts), : len(self.seq2_counts)] = self.seq2_counts
+        self.seq2_counts = seq2_counts
+        self.seq1_counts = _pad(self.seq1_counts, n_cmds)
+        self.param_counts = _pad(self.param_counts, len(self.params))
+        self.value_counts = _pad(self.value_counts, len(self.values))
+
+    def _transitions(self, encoded: EncodedSessions) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the (prev, cur) command ids of each transition in the sessions."""
+        cmds = encoded.cmds
+        starts = encoded.offsets[:-1]
+        ends = encoded.offsets[1:]
+        non_empty = ends > starts
+        prev = np.concatenate(([self.start_id], cmds))[:-1]
+        prev[starts[non_empty]] = self.start_id
+        last = np.full(encoded.n_sessions, self.start_id)
+        last[non_empty] = cmds[ends[non_empty] - 1]
+        return (
+            np.concatenate((prev, last)),
+            np.concatenate((cmds, np.full(encoded.n_sessions, self.end_id))),
+        )
+
+    def _modellable_heuristic(self) -> np.ndarray:
+        """
+        Determine using heuristics which params take categorical values.
+
+        This matches `cmds_params_values.get_params_to_model_values`.
+        """
+        n_vals = np.bincount(self.param_value_counts[0], minlength=len(self.params))
+        counts = self.param_counts
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pct = 100 * n_vals / counts
+        return (n_vals > 0) & (n_vals <= 20) & (counts >= 20) & (pct <= 10)
+
+    def _laplace_smooth_counts(self):
+        """
+        Laplace smooth all the counts.
+
+        This matches the functions in the `laplace_smooth` module.
+        """
+        n_cmds = len(self.cmds)
+        # add 1 to every transition, except from the end token or to
+        # the start token, and to the individual counts of both commands
+        not_end = (np.arange(n_cmds) != self.end_id).astype(np.int64)
+        not_start = (np.arange(n_cmds) != self.start_id).astype(np.int64)
+        self.seq2_counts_ls = self.seq2_counts + not_end[:, None] * not_start[None, :]
+        self.seq1_counts_ls = (
+            self.seq1_counts + not_end * not_start.sum() + not_start * not_end.sum()
+        )
+        if self.use_params:
+            # add 1 to the params which were seen with each command and
+            # to the unk_token param of every command
+            self.cmd_param_counts_ls = _smooth_coords(
+                self.cmd_param_counts,
+                n_cmds,
+                len(self.params),
+                self.unk_param_id,
+            )
+            self.param_counts_ls = self.param_counts + np.bincount(
+                self.cmd_param_counts_ls[1], minlength=len(self.params)
+            )
+        if self.use_values:
+            self.param_value_counts_ls = _smooth_coords(
+                self.param_value_counts,
+                len(self.params),
+                len(self.values),
+                self.unk_value_id,
+            )
+            self.value_counts_ls = self.value_counts + np.bincount(
+                self.param_value_counts_ls[1], minlength=len(self.values)
+            )
+
+    def _compute_probs(self):
+        """
+        Compute all the probabilities from the laplace smoothed counts.
+
+        This matches the functions in the `probabilities` module.
+        """
+        self.prior_probs = self.seq1_counts_ls / self.seq1_counts_ls.sum()
+        row_totals = self.seq2_counts_ls.sum(axis=1, keepdims=True)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.trans_probs = self.seq2_counts_ls / row_totals
+        # the end token has no transitions so it falls back to the unk_token
+        self.trans_probs[self.end_id] = self.trans_probs[self.unk_id]
+        self.trans_probs[:, self.start_id] = self.trans_probs[:, self.unk_id]
+        if self.use_params:
+            rows, _, counts = self.cmd_param_counts_ls
+            self.param_cond_cmd_probs = counts / self.seq1_counts_ls[rows]
+            self.param_probs = self.param_counts_ls / self.seq1_counts_ls.sum()
+        if self.use_values:
+            rows, _, counts = self.param_value_counts_ls
+            row_totals = np.bincount(rows, weights=counts, minlength=len(self.params))
+            self.value_cond_param_probs = counts / row_totals[rows]
+            self.value_probs = self.value_counts_ls / self.value_counts_ls.sum()
+
+    def _log_cmd_probs(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the log prior and transition probabilities of the commands."""
+        with np.errstate(divide="ignore"):
+            return np.log(self.prior_probs), np.log(self.trans_probs)
+
+    # pylint: disable=too-many-locals
+    def _param_log_probs(self, encoded: EncodedSessions) -> np.ndarray:
+        """
+        Compute the log probability of the params of each command.
+
+        This matches the log of `compute_prob_setofparams_given_cmd`
+        (of `cmds_params_only` or `cmds_params_values`) with
+        `use_geo_mean` set to True.
+        """
+        # the sizes are taken from the probabilities (rather than the
+        # token indexes) so that this works with a `scoring_copy`
+        shape = (len(self.prior_probs), len(self.param_probs))
+        n_cmds = len(encoded.cmds)
+        n_params = np.diff(encoded.param_offsets)
+        occurrence = np.repeat(np.arange(n_cmds), n_params)
+        params = encoded.params
+        rows, cols, _ = self.cmd_param_counts_ls
+        probs = self.param_cond_cmd_probs
+        with np.errstate(divide="ignore"):
+            log_present = np.log(probs)
+            log_absent = np.log1p(-probs)
+        # start from all of the params of each command being absent
+        # and swap in the probabilities of the params which are present
+        log_liks = np.bincount(rows, weights=log_absent, minlength=shape[0])[
+            encoded.cmds
+        ]
+        n_terms = np.bincount(rows, minlength=shape[0])[encoded.cmds].astype(float)
+        # unseen params are ignored
+        ind, found = _lookup_coords(
+            rows,
+            cols,
+            shape,
+            encoded.cmds[occurrence],
+            params,
+        )
+        log_liks += np.bincount(
+            occurrence[found],
+            weights=log_present[ind[found]] - log_absent[ind[found]],
+            minlength=n_cmds,
+        )
+        if self.use_values:
+            modelled = found & self.modellable[np.maximum(params, 0)]
+            par_ids = params[modelled]
+            val_ids = encoded.values[modelled]
+            v_rows, v_cols, _ = self.param_value_counts_ls
+            shape = (len(self.param_probs), len(self.value_probs))
+            ind, found = _lookup_coords(v_rows, v_cols, shape, par_ids, val_ids)
+            # unseen values fall back to the unk_token of the param
+            unk_ind, _ = _lookup_coords(
+                v_rows,
+                v_cols,
+                shape,
+                par_ids,
+                np.full(len(par_ids), self.unk_value_id),
+            )
+            ind = np.where(found, ind, unk_ind)
+            with np.errstate(divide="ignore"):
+                log_liks += np.bincount(
+                    occurrence[modelled],
+                    weights=np.log(self.value_cond_param_probs[ind]),
+                    minlength=n_cmds,
+                )
+            n_terms += np.bincount(occurrence[modelled], minlength=n_cmds)
+        # geometric mean over the params (and values) of the command
+        log_liks /= n_terms
+        log_liks[n_params == 0] = 0
+        return log_liks
+
+
+def _param_values(params: Union[set, dict]) -> Iterable:
+    """Return the values of the params (None for a set of params)."""
+    if isinstance(params, set):
+        return [None] * len(params)
+    return params.values()
+
+
+def _empty_coords() -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return empty sparse (rows, cols, counts) coordinates."""
+    return tuple(np.zeros(0, dtype=np.int64) for _ in range(3))  # type: ignore
+
+
+def _pad(counts: np.ndarray, length: int) -> np.ndarray:
+    """Return `counts` padded with zeros to `length`."""
+    return np.concatenate((counts, np.zeros(length - len(counts), dtype=np.int64)))
+
+
+def _count_coords(
+    rows: np.ndarray, cols: np.ndarray, n_cols: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return the distinct (row, col) pairs, sorted by row then col, with counts."""
+    keys, counts = np.unique(rows * n_cols + cols, return_counts=True)
+    return keys // n_cols, keys % n_cols, counts
+
+
+def _add_coords(
+    coords: Tuple[np.ndarray, np.ndarray, np.ndarray],
+    other: Tuple[np.ndarray, np.ndarray, np.ndarray],
+    n_cols: int,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return the sum of the counts of two sets of sparse coordinates."""
+    rows, cols, counts = (np.concatenate(arrays) for arrays in zip(coords, other))
+    keys, inverse = np.unique(rows * n_cols + cols, return_inverse=True)
+    counts = np.bincount(inverse, weights=counts, minlength=len(keys))
+    return keys // n_cols, keys % n_cols, counts.astype(np.int64)
+
+
+def _smooth_coords(
+    coords: Tuple[np.ndarray, np.ndarray, np.ndarray],
+    n_rows: int,
+    n_cols: int,
+    unk_col: int,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Add 1 to the counts of `coords` and to the `unk_col` of every row."""
+    rows, cols, counts = coords
+    keys = rows * n_cols + cols
+    all_keys = np.union1d(keys, np.arange(n_rows) * n_cols + unk_col)
+    counts_ls = np.ones(len(all_keys), dtype=np.int64)
+    counts_ls[np.searchsorted(all_keys, keys)] += counts
+    return all_keys // n_cols, all_keys % n_cols, counts_ls
+
+
+def _lookup_coords(
+    rows: np.ndarray,
+    cols: np.ndarray,
+    shape: Tuple[int, int],
+    query_rows: np.ndarray,
+    query_cols: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find the (query_row, query_col) pairs in the sorted (row, col) coordinates.
+
+    Returns the index of each pair in the coordinates and whether it
+    was found. Negative (unseen) query cols are never found.
+    """
+    n_rows, n_cols = shape
+    keys = rows * n_cols + cols
+    valid = query_cols >= 0
+    query = query_rows * n_cols + np.where(valid, query_cols, 0)
+    if n_rows * n_cols <= _DENSE_LOOKUP_SIZE:
+        # a direct lookup table is much faster than a binary search
+        table = np.full(n_rows * n_cols, -1)
+        table[keys] = np.arange(len(keys))
+        ind = table[query]
+        return np.maximum(ind, 0), valid & (ind >= 0)
+    ind = np.minimum(np.searchsorted(keys, query), len(keys) - 1)
+    return ind, valid & (keys[ind] == query)
+
+
+def _dict(tokens: List, values: np.ndarray) -> Dict:
+    """Return a dict of the `values` keyed by token."""
+    return dict(zip(tokens, values.tolist()))
+
+
+def _raw_dict(tokens: List, counts: np.ndarray) -> defaultdict:
+    """Return a defaultdict of the non zero `counts` keyed by token."""
+    result: defaultdict = defaultdict(int)
+    for ind in np.flatnonzero(counts).tolist():
+        result[tokens[ind]] = int(counts[ind])
+    return result
+
+
+def _nested_dict(
+    row_tokens: List,
+    col_tokens: List,
+    rows: np.ndarray,
+    cols: np.ndarray,
+    values: np.ndarray,
+) -> Dict[Any, Dict]:
+    """Return a dict of dicts of the `values` keyed by row then col token."""
+    result: Dict[Any, Dict] = {}
+    for row, col, val in zip(rows.tolist(), cols.tolist(), values.tolist()):
+        result.setdefault(row_tokens[row], {})[col_tokens[col]] = val
+    return result
+
+
+def _raw_nested_dict(
+    row_tokens: List,
+    col_tokens: List,
+    rows: np.ndarray,
+    cols: np.ndarray,
+    counts: np.ndarray,
+) -> defaultdict:
+    """Return a defaultdict of defaultdicts of the `counts`."""
+    result: defaultdict = defaultdict(lambda: defaultdict(int))
+    for row, col, count in zip(rows.tolist(), cols.tolist(), counts.tolist()):
+        result[row_tokens[row]][col_tokens[col]] = count
+    return result
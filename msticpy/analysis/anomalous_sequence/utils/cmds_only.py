@@ -11,6 +11,7 @@ import copy
 
 import numpy as np
 
+from ..utils import log_likelihoods
 from ..utils.data_structures import StateMatrix
 from ..utils.laplace_smooth import laplace_smooth_cmd_counts
 from ....common.exceptions import MsticpyException
@@ -167,29 +168,21 @@ def compute_likelihood_window(
                 "end_token should not be None, when use_end_token is True"
             )
 
-    w_len = len(window)
-    if w_len == 0:
+    if len(window) == 0:
         return np.nan
-    prob = 1
-
-    cur = window[0]
-    if use_start_token:
-        prob *= trans_probs[start_token][cur]
-    else:
-        prob *= prior_probs[cur]
-
-    for i in range(1, w_len):
-        prev, cur = window[i - 1], window[i]
-        prob *= trans_probs[prev][cur]
-
-    if use_end_token:
-        prob *= trans_probs[cur][end_token]
-
-    return prob
+    step_log_probs = compute_step_log_probs(
+        session=window,
+        prior_probs=prior_probs,
+        trans_probs=trans_probs,
+        use_start_token=use_start_token,
+        use_end_token=use_end_token,
+        start_token=start_token,
+        end_token=end_token,
+    )
+    return np.exp(log_likelihoods.session_log_likelihood(step_log_probs))
 
 
-# pylint: disable=too-many-locals, too-many-arguments, too-many-branches
-# pylint: disable=too-many-locals, too-many-branches
+# pylint: disable=too-many-arguments
 def compute_likelihood_windows_in_session(
     session: List[str],
     prior_probs: Union[StateMatrix, dict],
@@ -238,35 +231,70 @@ def compute_likelihood_windows_in_session(
                 "use_start_end_tokens is set to True"
             )
 
-    likelihoods = []
-    sess = session.copy()
-    if use_start_end_tokens and end_token:
-        sess += [str(end_token)]
-    end = len(sess) - window_len
-    for i in range(end + 1):
-        window = sess[i: i + window_len]  # noqa: E203
-
-        if i == 0:
-            use_start = use_start_end_tokens
-        else:
-            use_start = False
-
-        lik = compute_likelihood_window(
-            window=window,
-            prior_probs=prior_probs,
-            trans_probs=trans_probs,
-            use_start_token=use_start,
-            use_end_token=False,
-            start_token=start_token,
-            end_token=end_token,
-        )
-        if use_geo_mean:
-            k = window_len
-            lik = lik ** (1 / k)
-
-        likelihoods.append(lik)
-
-    return likelihoods
+    step_log_probs = compute_step_log_probs(
+        session=session,
+        prior_probs=prior_probs,
+        trans_probs=trans_probs,
+        use_start_token=use_start_end_tokens,
+        use_end_token=use_start_end_tokens,
+        start_token=start_token,
+        end_token=end_token,
+    )
+    log_liks = log_likelihoods.window_log_likelihoods(step_log_probs, window_len)
+    if use_geo_mean:
+        log_liks = log_liks / window_len
+    return list(np.exp(log_liks))
+
+
+# pylint: disable=too-many-arguments
+def compute_step_log_probs(
+    session: List[str],
+    prior_probs: Union[StateMatrix, dict],
+    trans_probs: Union[StateMatrix, dict],
+    use_start_token: bool,
+    use_end_token: bool,
+    start_token: str = None,
+    end_token: str = None,
+) -> np.ndarray:
+    """
+    Compute the log probabilities of each step of the session.
+
+    Parameters
+    ----------
+    session: List[str]
+        list of commands (strings)
+        an example session:
+            ['Set-User', 'Set-Mailbox']
+    prior_probs: Union[StateMatrix, dict]
+        computed probabilities of individual commands
+    trans_probs: Union[StateMatrix, dict]
+        computed probabilities of sequences of commands (length 2)
+    use_start_token: bool
+        if set to True, the start_token will be prepended to the session
+        before the calculations are done
+    use_end_token: bool
+        if set to True, the end_token will be appended to the session
+        before the calculations are done
+    start_token: str
+        dummy command to signify the start of the session (e.g. "##START##")
+    end_token: str
+        dummy command to signify the end of the session (e.g. "##END##")
+
+    Returns
+    -------
+    np.ndarray
+        step log probabilities. See `log_likelihoods.compute_step_log_probs`
+
+    """
+    return log_likelihoods.compute_step_log_probs(
+        cmds=session,
+        prior_probs=prior_probs,
+        trans_probs=trans_probs,
+        use_start_token=use_start_token,
+        use_end_token=use_end_token,
+        start_token=start_token,
+        end_token=end_token,
+    )
 
 
 # pylint: disable=too-many-arguments
@@ -311,19 +339,25 @@ def rarest_window_session(
     (rarest window part of the session, likelihood of the rarest window)
 
     """
-    likelihoods = compute_likelihood_windows_in_session(
+    if use_start_end_tokens:
+        if start_token is None or end_token is None:
+            raise MsticpyException(
+                "start_token and end_token should not be set to None when "
+                "use_start_end_tokens is set to True"
+            )
+
+    step_log_probs = compute_step_log_probs(
         session=session,
         prior_probs=prior_probs,
         trans_probs=trans_probs,
-        window_len=window_len,
-        use_start_end_tokens=use_start_end_tokens,
+        use_start_token=use_start_end_tokens,
+        use_end_token=use_start_end_tokens,
         start_token=start_token,
         end_token=end_token,
-        use_geo_mean=use_geo_mean,
     )
-
-    if len(likelihoods) == 0:
+    log_liks = log_likelihoods.window_log_likelihoods(step_log_probs, window_len)
+    ind = log_likelihoods.rarest_window_index(log_liks)
+    if ind < 0:
         return [], np.nan
-    min_lik = min(likelihoods)
-    ind = likelihoods.index(min_lik)
-    return session[ind: ind + window_len], min_lik  # noqa: E203
+    min_lik = log_liks[ind] / window_len if use_geo_mean else log_liks[ind]
+    return session[ind: ind + window_len], np.exp(min_lik)  # noqa: E203
@@ -5,8 +5,11 @@
 # --------------------------------------------------------------------------
 """Useful helper data structure classes for modelling sessions."""
 
+import itertools
 from collections import defaultdict
-from typing import Union
+from typing import Any, Dict, Hashable, Iterable, List, Union
+
+import numpy as np
 
 from ....common.exceptions import MsticpyException
 
@@ -114,3 +117,91 @@ class Cmd:
 
         """
         return str(self)
+
+
+class TokenIndex:
+    """Class for interning commands/params/values to integer ids."""
+
+    def __init__(self, tokens: Iterable[Hashable] = ()):
+        """
+        Instantiate the TokenIndex class.
+
+        Each distinct token is assigned the next free integer id,
+        so the ids are contiguous and in order of first appearance.
+
+        Parameters
+        ----------
+        tokens: Iterable[Hashable]
+            initial tokens to add to the index.
+            E.g. ['##START##', '##END##', '##UNK##']
+
+        """
+        self.ids: Dict[Any, int] = {}
+        self.tokens: List[Any] = []
+        for token in tokens:
+            self.add(token)
+
+    def __len__(self) -> int:
+        """Return the number of distinct tokens."""
+        return len(self.tokens)
+
+    def __contains__(self, token) -> bool:
+        """Return True if `token` has been assigned an id."""
+        return token in self.ids
+
+    def add(self, token: Hashable) -> int:
+        """
+        Return the id of `token`, assigning it a new id if it is unseen.
+
+        Parameters
+        ----------
+        token: Hashable
+            command, param or value to intern
+
+        Returns
+        -------
+        int
+            id of the token
+
+        """
+        tok_id = self.ids.get(token)
+        if tok_id is None:
+            tok_id = self.ids[token] = len(self.tokens)
+            self.tokens.append(token)
+        return tok_id
+
+    def encode(
+        self, tokens: Iterable[Hashable], add_tokens: bool = False, default: int = -1
+    ) -> np.ndarray:
+        """
+        Encode `tokens` to an array of integer ids.
+
+        Parameters
+        ----------
+        tokens: Iterable[Hashable]
+            tokens to encode
+        add_tokens: bool
+            if True, unseen tokens are assigned new ids.
+            Otherwise, unseen tokens are encoded as `default`.
+        default: int
+            id to use for unseen tokens when `add_tokens` is False
+
+        Returns
+        -------
+        np.ndarray
+            int64 array of the token ids
+
+        """
+        tokens = list(tokens)
+        if add_tokens:
+            # dict.fromkeys de-duplicates the tokens in order of appearance
+            for token in dict.fromkeys(tokens):
+                self.add(token)
+            return np.fromiter(
+                map(self.ids.__getitem__, tokens), dtype=np.int64, count=len(tokens)
+            )
+        return np.fromiter(
+            map(self.ids.get, tokens, itertools.repeat(default)),
+            dtype=np.int64,
+            count=len(tokens),
+        )
@@ -0,0 +1,322 @@
+# -------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# --------------------------------------------------------------------------
+"""
+Helper module for computing sliding window likelihoods in log space.
+
+The log probability of each step of a session is computed once.
+The log likelihood of every window in the session is then derived
+from prefix sums of these step log probabilities, so computing all
+of the windows of a session is O(len(session)) rather than
+O(len(session) * window_len). Working with log probabilities also
+avoids the product of the probabilities underflowing to zero for
+long windows.
+"""
+
+import math
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+
+from ..utils.data_structures import StateMatrix
+
+
+def log_prob(prob: float) -> float:
+    """Return the natural log of `prob` (-inf for a zero probability)."""
+    return math.log(prob) if prob > 0 else -math.inf
+
+
+# pylint: disable=too-many-arguments
+def compute_step_log_probs(
+    cmds: List[str],
+    prior_probs: Union[StateMatrix, dict],
+    trans_probs: Union[StateMatrix, dict],
+    use_start_token: bool,
+    use_end_token: bool,
+    start_token: str = None,
+    end_token: str = None,
+    param_log_probs: Optional[List[float]] = None,
+) -> np.ndarray:
+    """
+    Compute the log probabilities of each step of a session.
+
+    Parameters
+    ----------
+    cmds: List[str]
+        the command names of the session
+    prior_probs: Union[StateMatrix, dict]
+        computed probabilities of individual commands
+    trans_probs: Union[StateMatrix, dict]
+        computed probabilities of sequences of commands (length 2)
+    use_start_token: bool
+        if True, the log probability of a window starting at the
+        first command uses the transition from `start_token`
+        rather than the prior probability of the command
+    use_end_token: bool
+        if True, `end_token` is appended to the session as an
+        extra step
+    start_token: str
+        dummy command to signify the start of the session (e.g. "##START##")
+    end_token: str
+        dummy command to signify the end of the session (e.g. "##END##")
+    param_log_probs: Optional[List[float]]
+        log probabilities of the params (and values) of each command
+        conditional on the command. These are added to the log
+        probabilities of each step.
+
+    Returns
+    -------
+    np.ndarray
+        Array of shape (2, n_steps). The first row is the log
+        probability of each step as the first step of a window.
+        The second row is the log probability of each step given
+        the previous step (0 for the first step).
+
+    """
+    steps = list(cmds)
+    if use_end_token:
+        steps.append(end_token)
+    log_probs = np.zeros((2, len(steps)))
+    for i, cmd in enumerate(steps[: len(cmds)]):
+        log_probs[0, i] = log_prob(prior_probs[cmd])
+        if i > 0:
+            log_probs[1, i] = log_prob(trans_probs[steps[i - 1]][cmd])
+    if use_end_token and cmds:
+        # the prior of the end token is only used for windows of length 1
+        end_prior = prior_probs.get(end_token, np.nan)
+        log_probs[0, -1] = log_prob(end_prior) if end_prior >= 0 else np.nan
+        log_probs[1, -1] = log_prob(trans_probs[steps[-2]][end_token])
+    if use_start_token and steps:
+        log_probs[0, 0] = log_prob(trans_probs[start_token][steps[0]])
+    if param_log_probs is not None:
+        # the end token has no params
+        log_probs[:, : len(param_log_probs)] += param_log_probs
+    return log_probs
+
+
+def window_log_likelihoods(step_log_probs: np.ndarray, window_len: int) -> np.ndarray:
+    """
+    Compute the log likelihoods of a sliding window over the session steps.
+
+    Parameters
+    ----------
+    step_log_probs: np.ndarray
+        step log probabilities - the output of `compute_step_log_probs`
+    window_len: int
+        length of sliding window
+
+    Returns
+    -------
+    np.ndarray
+        log likelihood of the window starting at each step.
+        This is empty if the session is shorter than `window_len`.
+
+    """
+    n_steps = step_log_probs.shape[1]
+    if window_len < 1:
+        # windows are empty
+        return np.full(n_steps + 1, np.nan)
+    if window_len > n_steps:
+        return np.empty(0)
+    first_log_probs = step_log_probs[0, : n_steps - window_len + 1]
+    trans_log_probs = step_log_probs[1]
+    # zero probabilities (-inf) are counted separately so that
+    # differences of the prefix sums are not -inf - -inf
+    is_zero = np.isneginf(trans_log_probs)
+    cml_log_probs = np.concatenate(
+        ([0], np.cumsum(np.where(is_zero, 0, trans_log_probs)))
+    )
+    # the window starting at i includes the transitions into i+1 .. i+window_len-1
+    starts = np.arange(len(first_log_probs))
+    log_liks = (
+        first_log_probs
+        + cml_log_probs[starts + window_len]
+        - cml_log_probs[starts + 1]
+    )
+    if is_zero.any():
+        cml_zeros = np.concatenate(([0], np.cumsum(is_zero)))
+        has_zero = cml_zeros[starts + window_len] > cml_zeros[starts + 1]
+        log_liks[has_zero] = -np.inf
+    return log_liks
+
+
+def session_log_likelihood(step_log_probs: np.ndarray) -> float:
+    """
+    Compute the log likelihood of all of the steps of a session.
+
+    Parameters
+    ----------
+    step_log_probs: np.ndarray
+        step log probabilities - the output of `compute_step_log_probs`
+
+    Returns
+    -------
+    float
+        log likelihood of the session (nan for an empty session)
+
+    """
+    if step_log_probs.shape[1] == 0:
+        return np.nan
+    return step_log_probs[0, 0] + step_log_probs[1, 1:].sum()
+
+
+def rarest_window_index(log_likelihoods: np.ndarray) -> int:
+    """
+    Return the index of the window with the lowest log likelihood.
+
+    Parameters
+    ----------
+    log_likelihoods: np.ndarray
+        window log likelihoods - the output of `window_log_likelihoods`
+
+    Returns
+    -------
+    int
+        The index of the first window with the lowest likelihood
+        (-1 if there are no windows).
+        Windows with log likelihoods that differ only by rounding
+        error of the prefix sums are treated as equal.
+
+    """
+    if len(log_likelihoods) == 0 or np.isnan(log_likelihoods).all():
+        return -1
+    min_lik = np.nanmin(log_likelihoods)
+    return int(np.argmax(np.isclose(log_likelihoods, min_lik, rtol=1e-9, atol=0)))
+
+
+def sessions_log_likelihoods(
+    step_log_probs: np.ndarray, offsets: np.ndarray
+) -> np.ndarray:
+    """
+    Compute the log likelihoods of many sessions at once.
+
+    Parameters
+    ----------
+    step_log_probs: np.ndarray
+        step log probabilities of all of the sessions concatenated
+    offsets: np.ndarray
+        start of the steps of each session followed by the total
+        number of steps
+
+    Returns
+    -------
+    np.ndarray
+        log likelihood of each session (nan for an empty session)
+
+    """
+    lengths = np.diff(offsets)
+    non_empty = lengths > 0
+    firsts = offsets[:-1][non_empty]
+    trans_log_probs = step_log_probs[1].copy()
+    trans_log_probs[firsts] = 0
+    log_liks = np.full(len(lengths), np.nan)
+    if len(firsts):
+        log_liks[non_empty] = step_log_probs[0, firsts] + np.add.reduceat(
+            trans_log_probs, firsts
+        )
+    return log_liks
+
+
+def sessions_window_log_likelihoods(
+    step_log_probs: np.ndarray, offsets: np.ndarray, window_len: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Compute the sliding window log likelihoods of many sessions at once.
+
+    Parameters
+    ----------
+    step_log_probs: np.ndarray
+        step log probabilities of all of the sessions concatenated
+    offsets: np.ndarray
+        start of the steps of each session followed by the total
+        number of steps
+    window_len: int
+        length of sliding window (at least 1)
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray]
+        The window log likelihoods of all of the sessions concatenated
+        and the start of the windows of each session followed by the
+        total number of windows. Sessions shorter than `window_len`
+        have no windows.
+
+    """
+    n_windows = np.maximum(np.diff(offsets) - window_len + 1, 0)
+    win_offsets = np.concatenate(([0], np.cumsum(n_windows)))
+    # step index of the start of each window
+    starts = np.arange(win_offsets[-1]) + np.repeat(
+        offsets[:-1] - win_offsets[:-1], n_windows
+    )
+    trans_log_probs = step_log_probs[1]
+    is_zero = np.isneginf(trans_log_probs)
+    cml_log_probs = np.concatenate(
+        ([0], np.cumsum(np.where(is_zero, 0, trans_log_probs)))
+    )
+    log_liks = (
+        step_log_probs[0, starts]
+        + cml_log_probs[starts + window_len]
+        - cml_log_probs[starts + 1]
+    )
+    if is_zero.any():
+        cml_zeros = np.concatenate(([0], np.cumsum(is_zero)))
+        has_zero = cml_zeros[starts + window_len] > cml_zeros[starts + 1]
+        log_liks[has_zero] = -np.inf
+    return log_liks, win_offsets
+
+
+def sessions_rarest_windows(
+    step_log_probs: np.ndarray, offsets: np.ndarray, window_len: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find the rarest window of many sessions at once.
+
+    Parameters
+    ----------
+    step_log_probs: np.ndarray
+        step log probabilities of all of the sessions concatenated
+    offsets: np.ndarray
+        start of the steps of each session followed by the total
+        number of steps
+    window_len: int
+        length of sliding window
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray]
+        The index of the rarest window in each session (-1 if the
+        session has no windows) and its log likelihood (nan if the
+        session has no windows). See `rarest_window_index`.
+
+    """
+    n_sessions = len(offsets) - 1
+    inds = np.full(n_sessions, -1)
+    min_log_liks = np.full(n_sessions, np.nan)
+    if window_len < 1:
+        # windows are empty
+        return inds, min_log_liks
+    log_liks, win_offsets = sessions_window_log_likelihoods(
+        step_log_probs, offsets, window_len
+    )
+    n_windows = np.diff(win_offsets)
+    has_windows = n_windows > 0
+    if not has_windows.any():
+        return inds, min_log_liks
+    seg_starts = win_offsets[:-1][has_windows]
+    # fmin ignores nan likelihoods
+    seg_mins = np.fmin.reduceat(log_liks, seg_starts)
+    is_min = np.isclose(
+        log_liks, np.repeat(seg_mins, n_windows[has_windows]), rtol=1e-9, atol=0
+    )
+    win_inds = np.arange(len(log_liks)) - np.repeat(
+        seg_starts, n_windows[has_windows]
+    )
+    first_min = np.minimum.reduceat(
+        np.where(is_min, win_inds, np.iinfo(np.int64).max), seg_starts
+    )
+    found = first_min < np.iinfo(np.int64).max
+    inds[np.flatnonzero(has_windows)[found]] = first_min[found]
+    min_log_liks[np.flatnonzero(has_windows)[found]] = seg_mins[found]
+    return inds, min_log_liks
@@ -0,0 +1,321 @@
+# -------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# --------------------------------------------------------------------------
+"""
+Helper module for training and scoring sessions in worker processes.
+
+Training shards the sessions across worker processes. Each worker
+encodes its shard and counts it with its own `ArrayModel`. The
+counts are then merged (summed) in the main process in shard order,
+so the result is identical to training in a single process.
+
+Scoring splits the encoded sessions into chunks which are scored in
+worker processes. The trained probabilities are copied once to
+shared memory, which each worker maps read-only rather than
+receiving its own copy. (On Python versions without
+`multiprocessing.shared_memory`, each worker receives a copy.)
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any, List, Optional, Tuple, Union
+
+import numpy as np
+
+from ..utils import log_likelihoods
+from ..utils.array_model import SCORING_ATTRS, ArrayModel, EncodedSessions
+from ..utils.data_structures import Cmd
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # Python < 3.8
+    shared_memory = None  # type: ignore
+
+# maximum number of commands scored in one chunk - this bounds the
+# size of the intermediate arrays
+_MAX_CHUNK_CMDS = 1_000_000
+# number of chunks per worker process - so that workers which
+# finish early can pick up more work
+_CHUNKS_PER_JOB = 4
+
+_SCORE_WORKER: Optional[ArrayModel] = None
+_SCORE_WORKER_SHM: List[Any] = []
+
+
+def get_n_jobs(n_jobs: Optional[int]) -> int:
+    """Return the number of processes to use (-1 or None for all CPUs)."""
+    if n_jobs is None or n_jobs < 1:
+        return os.cpu_count() or 1
+    return n_jobs
+
+
+def train_array_model(
+    sessions: List[List[Union[str, Cmd]]],
+    array_model: ArrayModel,
+    modellable_params: Optional[set] = None,
+    n_jobs: int = 1,
+) -> EncodedSessions:
+    """
+    Train `array_model` on the sessions, counting shards in parallel.
+
+    Parameters
+    ----------
+    sessions: List[List[Union[str, Cmd]]]
+        list of sessions, where each session is a list of either
+        strings or a list of the Cmd datatype
+    array_model: ArrayModel
+        model to train. Any counts it already has are added to.
+    modellable_params: Optional[set]
+        set of params for which the values are modelled
+        (see `ArrayModel.fit`)
+    n_jobs: int
+        number of worker processes (-1 for all CPUs).
+        If 1, the sessions are counted in the current process.
+
+    Returns
+    -------
+    EncodedSessions
+        the sessions encoded with the token ids of `array_model`
+
+    """
+    encoded = count_sessions(sessions, array_model, n_jobs=n_jobs)
+    array_model.fit(modellable_params)
+    return encoded
+
+
+def count_sessions(
+    sessions: List[List[Union[str, Cmd]]], array_model: ArrayModel, n_jobs: int = 1
+) -> EncodedSessions:
+    """
+    Add the counts of the sessions to `array_model`, counting shards in parallel.
+
+    Parameters
+    ----------
+    sessions: List[List[Union[str, Cmd]]]
+        list of sessions, where each session is a list of either
+        strings or a list of the Cmd datatype
+    array_model: ArrayModel
+        model to add the (non laplace smoothed) counts to
+    n_jobs: int
+        number of worker processes (-1 for all CPUs).
+        If 1, the sessions are counted in the current process.
+
+    Returns
+    -------
+    EncodedSessions
+        the sessions encoded with the token ids of `array_model`
+
+    """
+    n_jobs = get_n_jobs(n_jobs)
+    if n_jobs == 1:
+        encoded = array_model.encode(sessions, add_tokens=True)
+        array_model.count(encoded)
+        return encoded
+
+    lengths = np.fromiter(map(len, sessions), dtype=np.int64, count=len(sessions))
+    bounds = _chunk_bounds(lengths, n_jobs * _CHUNKS_PER_JOB)
+    chunks = [sessions[start:stop] for start, stop in zip(bounds[:-1], bounds[1:])]
+    config = _model_config(array_model)
+    encoded_list = []
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        # merged in order, so the token ids match counting in one process
+        for chunk_model, chunk_encoded in executor.map(
+            partial(_count_chunk, config=config), chunks
+        ):
+            id_maps = array_model.merge(chunk_model)
+            encoded_list.append(chunk_encoded.remap(*id_maps))
+    return EncodedSessions.concat(encoded_list)
+
+
+def score_sessions(
+    array_model: ArrayModel,
+    encoded: EncodedSessions,
+    use_start_end_tokens: bool,
+    window_len: Optional[int] = None,
+    n_jobs: int = 1,
+) -> Union[np.ndarray, Tuple[np.ndarray, np.ndarray]]:
+    """
+    Compute the likelihoods of the sessions in chunks, optionally in parallel.
+
+    Parameters
+    ----------
+    array_model: ArrayModel
+        trained model
+    encoded: EncodedSessions
+        sessions encoded with the token ids of `array_model`
+    use_start_end_tokens: bool
+        if True, then the start and end tokens will be prepended and
+        appended to each session respectively before the calculations
+        are done
+    window_len: Optional[int]
+        if None, the log likelihoods of the sessions are computed.
+        Otherwise, the rarest window of this length of each session
+        is found.
+    n_jobs: int
+        number of worker processes (-1 for all CPUs).
+        If 1, the sessions are scored in the current process.
+
+    Returns
+    -------
+    Union[np.ndarray, Tuple[np.ndarray, np.ndarray]]
+        The log likelihood of each session if `window_len` is None.
+        Otherwise, the index and log likelihood of the rarest window
+        of each session (see `log_likelihoods.sessions_rarest_windows`).
+
+    """
+    n_jobs = get_n_jobs(n_jobs)
+    lengths = np.diff(encoded.offsets)
+    n_chunks = max(
+        n_jobs * _CHUNKS_PER_JOB if n_jobs > 1 else 1,
+        -(-int(lengths.sum()) // _MAX_CHUNK_CMDS),
+    )
+    bounds = _chunk_bounds(lengths, n_chunks)
+    chunks = [
+        encoded.select(start, stop) for start, stop in zip(bounds[:-1], bounds[1:])
+    ]
+    score = partial(
+        _score_chunk, use_start_end_tokens=use_start_end_tokens, window_len=window_len
+    )
+    if n_jobs == 1 or len(chunks) == 1:
+        results = list(map(partial(score, array_model=array_model), chunks))
+    else:
+        shared_model, shm_blocks = _share_arrays(array_model.scoring_copy())
+        try:
+            with ProcessPoolExecutor(
+                max_workers=n_jobs,
+                initializer=_init_score_worker,
+                initargs=(shared_model,),
+            ) as executor:
+                results = list(executor.map(score, chunks))
+        finally:
+            for shm in shm_blocks:
+                shm.close()
+                shm.unlink()
+    if window_len is None:
+        return np.concatenate(results)
+    return (
+        np.concatenate([result[0] for result in results]),
+        np.concatenate([result[1] for result in results]),
+    )
+
+
+def _chunk_bounds(lengths: np.ndarray, n_chunks: int) -> np.ndarray:
+    """Return session boundaries splitting the sessions into similar sized chunks."""
+    cml_lengths = np.concatenate(([0], np.cumsum(lengths)))
+    targets = np.linspace(0, cml_lengths[-1], max(n_chunks, 1) + 1)
+    bounds = np.searchsorted(cml_lengths, targets)
+    bounds[0], bounds[-1] = 0, len(lengths)
+    bounds = np.unique(bounds)
+    if len(bounds) == 1:
+        # no sessions - a single empty chunk
+        return np.array([0, 0])
+    return bounds
+
+
+def _model_config(array_model: ArrayModel) -> dict:
+    """Return the arguments to create an empty copy of `array_model`."""
+    return {
+        "start_token": array_model.start_token,
+        "end_token": array_model.end_token,
+        "unk_token": array_model.unk_token,
+        "use_params": array_model.use_params,
+        "use_values": array_model.use_values,
+    }
+
+
+def _count_chunk(
+    sessions: List[List[Union[str, Cmd]]], config: dict
+) -> Tuple[ArrayModel, EncodedSessions]:
+    """Encode and count a chunk of sessions (run in a worker process)."""
+    chunk_model = ArrayModel(**config)
+    encoded = chunk_model.encode(sessions, add_tokens=True)
+    chunk_model.count(encoded)
+    return chunk_model, encoded
+
+
+class _SharedArray:
+    """Reference to an array in shared memory, which is cheap to pickle."""
+
+    def __init__(self, array: np.ndarray):
+        """Copy `array` to a new block of shared memory."""
+        self.shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        self.name = self.shm.name
+        self.shape = array.shape
+        self.dtype = array.dtype.str
+        np.ndarray(self.shape, self.dtype, buffer=self.shm.buf)[...] = array
+
+    def __getstate__(self):
+        """Pickle the reference but not the shared memory handle."""
+        return {"name": self.name, "shape": self.shape, "dtype": self.dtype}
+
+    def attach(self) -> Tuple[Any, np.ndarray]:
+        """Return the shared memory and a read-only array backed by it."""
+        shm = shared_memory.SharedMemory(name=self.name)
+        array = np.ndarray(self.shape, self.dtype, buffer=shm.buf)
+        array.flags.writeable = False
+        return shm, array
+
+
+def _share_arrays(array_model: ArrayModel) -> Tuple[ArrayModel, List[Any]]:
+    """Move the scoring arrays of `array_model` to shared memory."""
+    if shared_memory is None:
+        return array_model, []
+    shm_blocks = []
+    for attr in SCORING_ATTRS:
+        value = getattr(array_model, attr, None)
+        if isinstance(value, np.ndarray):
+            shared = _SharedArray(value)
+            shm_blocks.append(shared.shm)
+            setattr(array_model, attr, shared)
+        elif isinstance(value, tuple):
+            shared_tuple = tuple(_SharedArray(array) for array in value)
+            shm_blocks.extend(shared.shm for shared in shared_tuple)
+            setattr(array_model, attr, shared_tuple)
+    return array_model, shm_blocks
+
+
+def _init_score_worker(array_model: ArrayModel):
+    """Attach the worker model to the shared memory arrays."""
+    global _SCORE_WORKER  # pylint: disable=global-statement
+    for attr in SCORING_ATTRS:
+        value = getattr(array_model, attr, None)
+        if isinstance(value, _SharedArray):
+            setattr(array_model, attr, _attach(value))
+        elif isinstance(value, tuple):
+            setattr(
+                array_model,
+                attr,
+                tuple(
+                    _attach(shared) if isinstance(shared, _SharedArray) else shared
+                    for shared in value
+                ),
+            )
+    _SCORE_WORKER = array_model
+
+
+def _attach(shared: _SharedArray) -> np.ndarray:
+    """Return the array, keeping the shared memory open for the worker."""
+    shm, array = shared.attach()
+    _SCORE_WORKER_SHM.append(shm)
+    return array
+
+
+def _score_chunk(
+    encoded: EncodedSessions,
+    use_start_end_tokens: bool,
+    window_len: Optional[int],
+    array_model: Optional[ArrayModel] = None,
+) -> Union[np.ndarray, Tuple[np.ndarray, np.ndarray]]:
+    """Score a chunk of the sessions (in a worker process if no model given)."""
+    array_model = array_model or _SCORE_WORKER
+    step_log_probs, offsets = array_model.compute_step_log_probs(  # type: ignore
+        encoded, use_start_end_tokens
+    )
+    if window_len is None:
+        return log_likelihoods.sessions_log_likelihoods(step_log_probs, offsets)
+    return log_likelihoods.sessions_rarest_windows(
+        step_log_probs, offsets, window_len
+    )
@@ -0,0 +1,124 @@
+# -------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# --------------------------------------------------------------------------
+"""
+Lazy import of package attributes and pandas accessors.
+
+Used by package `__init__` modules to defer importing sub-modules
+until an attribute is first accessed (PEP 562) or a pandas
+DataFrame accessor is first used.
+
+>>> __getattr__, __dir__ = lazy_import(
+...     __name__,
+...     {"IoCExtract": ".iocextract:IoCExtract", "ptree": ".process_tree_utils"},
+... )
+
+"""
+import importlib
+import sys
+from typing import Any, Callable, Dict, List, Tuple
+
+import pandas as pd
+
+from .._version import VERSION
+
+__version__ = VERSION
+__author__ = "Ian Hellen"
+
+
+def lazy_import(
+    importer_name: str, import_map: Dict[str, str]
+) -> Tuple[Callable[[str], Any], Callable[[], List[str]]]:
+    """
+    Return module `__getattr__` and `__dir__` functions for lazy imports.
+
+    Parameters
+    ----------
+    importer_name : str
+        The name of the importing module (`__name__`)
+    import_map : Dict[str, str]
+        Mapping of attribute name to the module to import it from.
+        Relative module names are resolved relative to
+        `importer_name`. Use "module:attribute" to return an
+        attribute of the module rather than the module itself.
+        Other (non-private) names are imported as sub-modules
+        of `importer_name` if they exist.
+
+    Returns
+    -------
+    Tuple[Callable[[str], Any], Callable[[], List[str]]]
+        The `__getattr__` and `__dir__` functions for the module.
+
+    """
+    importer = sys.modules[importer_name]
+
+    def __getattr__(name: str) -> Any:
+        """Import and return the attribute `name`."""
+        if name not in import_map:
+            if not name.startswith("_"):
+                # sub-modules were previously imported by the package
+                try:
+                    return importlib.import_module(f"{importer_name}.{name}")
+                except ModuleNotFoundError as err:
+                    if err.name != f"{importer_name}.{name}":
+                        raise
+            raise AttributeError(
+                f"module {importer_name!r} has no attribute {name!r}"
+            )
+        mod_name, _, attrib_name = import_map[name].partition(":")
+        module = importlib.import_module(mod_name, package=importer_name)
+        attrib = getattr(module, attrib_name) if attrib_name else module
+        # cache the attribute so that __getattr__ is not called again
+        setattr(importer, name, attrib)
+        return attrib
+
+    def __dir__() -> List[str]:
+        """Return the module attributes including lazy imports."""
+        return sorted(set(vars(importer)) | set(import_map))
+
+    return __getattr__, __dir__
+
+
+class _LazyAccessor:
+    """DataFrame accessor that imports its implementation on first use."""
+
+    def __init__(self, importer_name: str, import_path: str):
+        self._importer_name = importer_name
+        self._import_path = import_path
+
+    def __call__(self, pandas_obj: pd.DataFrame) -> Any:
+        """Import the accessor class and return an instance for `pandas_obj`."""
+        mod_name, _, class_name = self._import_path.partition(":")
+        module = importlib.import_module(mod_name, package=self._importer_name)
+        return getattr(module, class_name)(pandas_obj)
+
+    def __repr__(self) -> str:
+        """Return the accessor import path."""
+        return f"_LazyAccessor({self._import_path!r})"
+
+
+def lazy_accessors(importer_name: str, accessor_map: Dict[str, str]):
+    """
+    Register pandas DataFrame accessors that are imported on first use.
+
+    Parameters
+    ----------
+    importer_name : str
+        The name of the importing module (`__name__`)
+    accessor_map : Dict[str, str]
+        Mapping of accessor name to "module:class" of the accessor
+        implementation. Relative module names are resolved relative to
+        `importer_name`.
+
+    Notes
+    -----
+    The accessor classes must not also be registered with
+    `pd.api.extensions.register_dataframe_accessor`.
+
+    """
+    for accessor_name, import_path in accessor_map.items():
+        pd.api.extensions.register_dataframe_accessor(accessor_name)(
+            _LazyAccessor(importer_name, import_path)
+        )
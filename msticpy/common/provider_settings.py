@@ -50,6 +50,7 @@ class ProviderSettings:
     provider: Optional[str] = None
     args: ProviderArgs = Factory(ProviderArgs)  # type: ignore
     primary: bool = False
+    cache: Dict[str, Any] = Factory(dict)
 
 
 # pylint: enable=too-few-public-methods, too-many-ancestors
@@ -104,6 +105,7 @@ def get_provider_settings(
             ),
             primary=item_settings.get("Primary", False),
             provider=item_settings.get("Provider", provider),
+            cache=item_settings.get("Cache") or {},
         )
         settings[provider] = prov_settings
 
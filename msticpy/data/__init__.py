@@ -1,10 +1,13 @@
 """Data sub-package."""
 from ..common.exceptions import MsticpyImportExtraError
+from ..common.lazy_import import lazy_import
 
-# flake8: noqa: F403
-from .data_providers import QueryProvider
 from .query_defns import DataEnvironment, DataFamily
 
 from .._version import VERSION
 
 __version__ = VERSION
+
+_LAZY_IMPORTS = {"QueryProvider": ".data_providers:QueryProvider"}
+__getattr__, __dir__ = lazy_import(__name__, _LAZY_IMPORTS)
+__all__ = ["MsticpyImportExtraError", "DataEnvironment", "DataFamily", "QueryProvider"]
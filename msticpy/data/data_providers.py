@@ -4,12 +4,24 @@
 # license information.
 # --------------------------------------------------------------------------
 """Data provider loader."""
+import time
 import warnings
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 from functools import partial
 from itertools import tee
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Union
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 
 import pandas as pd
 from tqdm.auto import tqdm
@@ -20,6 +32,7 @@ from ..common.utility import export, valid_pyname
 from .browsers.query_browser import browse_queries
 from .drivers import import_driver, DriverBase
 from .param_extractor import extract_query_params
+from .query_cache import QueryResultCache
 from .query_container import QueryContainer
 from .query_defns import DataEnvironment
 from .query_source import QuerySource
@@ -30,6 +43,28 @@ __author__ = "Ian Hellen"
 
 
 _DB_QUERY_FLAGS = ("print", "debug_query", "print_query")
+# Options for split queries - these are not passed to the driver
+_SPLIT_QUERY_OPTS = ("max_workers", "split_query_retries", "split_query_stream")
+_DEF_SPLIT_QUERY_RETRIES = 2
+_SPLIT_RETRY_BACKOFF = 1.0  # seconds
+# Cache of parsed query definition files
+_QUERY_INDEX_PATH = "~/.msticpy/query_index.pkl"
+
+
+class _QueryFunction(partial):
+    """Query function with a doc string created on first access."""
+
+    query_source: Optional[QuerySource] = None
+
+    def _get_doc(self) -> Optional[str]:
+        """Return the doc string for the query."""
+        if "_doc" not in self.__dict__:
+            self.__dict__["_doc"] = (
+                self.query_source.create_doc_string() if self.query_source else None
+            )
+        return self.__dict__["_doc"]
+
+    __doc__ = property(_get_doc)  # type: ignore
 
 
 @export
@@ -47,6 +82,7 @@ class QueryProvider:
         data_environment: Union[str, DataEnvironment],
         driver: DriverBase = None,
         query_paths: List[str] = None,
+        query_cache: Union[bool, QueryResultCache, None] = None,
         **kwargs,
     ):
         """
@@ -62,6 +98,10 @@ class QueryProvider:
             `DriverBase`)
         query_paths : List[str]
             Additional paths to look for query definitions.
+        query_cache : Union[bool, QueryResultCache], optional
+            Cache query results on disk. Pass True to use a cache with
+            the default settings or a `QueryResultCache` instance.
+            By default, results are not cached.
         kwargs :
             Other arguments are passed to the data provider driver.
 
@@ -89,6 +129,11 @@ class QueryProvider:
                     f" {self.environment}")
 
         self._query_provider = driver
+        self.query_cache: Optional[QueryResultCache] = None
+        if query_cache is True:
+            self.query_cache = QueryResultCache()
+        elif isinstance(query_cache, QueryResultCache):
+            self.query_cache = query_cache
         self.all_queries = QueryContainer()
 
         # Add any query files
@@ -297,12 +342,18 @@ class QueryProvider:
                 f"No values found for these parameters: {missing}")
 
         split_by = kwargs.pop("split_query_by", None)
+        split_options = {
+            opt: kwargs.pop(opt) for opt in _SPLIT_QUERY_OPTS if opt in kwargs
+        }
+        use_cache = kwargs.pop("use_cache", True)
         if split_by:
             split_result = self._exec_split_query(
                 split_by=split_by,
                 query_source=query_source,
                 query_params=params,
                 args=args,
+                use_cache=use_cache,
+                **split_options,
                 **kwargs,
             )
             if split_result is not None:
@@ -319,8 +370,44 @@ class QueryProvider:
 
         # Handle any query options passed
         query_options = self._get_query_options(params, kwargs)
-        return self._query_provider.query(
-            query_str, query_source, **query_options)
+        return self._query_with_cache(
+            query_str,
+            query_source,
+            query_options,
+            end=params.get("end"),
+            use_cache=use_cache,
+        )
+
+    def _query_with_cache(
+        self,
+        query_str: str,
+        query_source: QuerySource,
+        query_options: Dict[str, Any],
+        end: Any = None,
+        use_cache: bool = True,
+    ) -> Union[pd.DataFrame, Any]:
+        """Return the query result from the cache or run the query."""
+        if self.query_cache is None or not use_cache:
+            return self._query_provider.query(query_str, query_source, **query_options)
+        connection_id = self._connection_id
+        query_df = self.query_cache.get(query_str, connection_id)
+        if query_df is not None:
+            return query_df
+        query_df = self._query_provider.query(query_str, query_source, **query_options)
+        if isinstance(query_df, pd.DataFrame):
+            self.query_cache.put(query_str, connection_id, query_df, end=end)
+        return query_df
+
+    @property
+    def _connection_id(self) -> str:
+        """Return the identity of the driver and connection for the cache."""
+        return "|".join(
+            [
+                self.environment,
+                type(self._query_provider).__name__,
+                str(self._query_provider.current_connection),
+            ]
+        )
 
     @staticmethod
     def _get_query_options(
@@ -363,7 +450,11 @@ class QueryProvider:
                 "Please check your msticpyconfig.yaml settings.",
             )
         return QueryStore.import_files(
-            source_path=all_query_paths, recursive=True)
+            source_path=all_query_paths,
+            recursive=True,
+            environment=self.environment,
+            index_path=_QUERY_INDEX_PATH,
+        )
 
     def _add_query_functions(self):
         """Add queries to the module as callable methods."""
@@ -383,13 +474,13 @@ class QueryProvider:
             query_cont_name = ".".join(query_path[:-1])
 
             # Create the partial function
-            query_func = partial(
+            query_func = _QueryFunction(
                 self._execute_query,
                 query_path=query_cont_name,
                 query_name=query_name)
-            query_func.__doc__ = self.query_store.get_query(
+            query_func.query_source = self.query_store.get_query(
                 query_path=query_cont_name, query_name=query_name
-            ).create_doc_string()
+            )
 
             query_name = valid_pyname(query_name)
             setattr(current_node, query_name, query_func)
@@ -416,7 +507,7 @@ class QueryProvider:
         query_params: Dict[str, Any],
         args,
         **kwargs,
-    ) -> Union[pd.DataFrame, str, None]:
+    ) -> Union[pd.DataFrame, str, Iterator[pd.DataFrame], None]:
         start = query_params.pop("start", None)
         end = query_params.pop("end", None)
         if not (start or end):
@@ -448,14 +539,101 @@ class QueryProvider:
 
         # Retrive any query options passed (other than query params)
         # and send to query function.
+        split_options = {
+            opt: kwargs.pop(opt) for opt in _SPLIT_QUERY_OPTS if opt in kwargs
+        }
+        use_cache = kwargs.pop("use_cache", True)
         query_options = self._get_query_options(query_params, kwargs)
-        query_dfs = [
-            self._query_provider.query(query_str, query_source, **query_options)
-            for query_str in tqdm(split_queries, unit="sub-queries", desc="Running")
-        ]
-
+        run_query = partial(
+            self._exec_query_slice,
+            query_source=query_source,
+            query_options=query_options,
+            use_cache=use_cache,
+            retries=int(
+                split_options.get("split_query_retries", _DEF_SPLIT_QUERY_RETRIES)
+            ),
+        )
+        query_dfs = self._iter_split_results(
+            run_query,
+            list(zip(split_queries, ranges)),
+            max_workers=int(split_options.get("max_workers") or 1),
+        )
+        if split_options.get("split_query_stream", False):
+            return query_dfs  # type: ignore
+        query_dfs = list(query_dfs)
+        if not query_dfs:
+            return pd.DataFrame()
         return pd.concat(query_dfs)
 
+    @staticmethod
+    def _iter_split_results(
+        run_query: Callable[..., Optional[pd.DataFrame]],
+        split_queries: List[Tuple[str, Tuple[datetime, datetime]]],
+        max_workers: int = 1,
+    ) -> Iterator[pd.DataFrame]:
+        """Run the split queries, yielding the results in time order."""
+        progress = tqdm(total=len(split_queries), unit="sub-queries", desc="Running")
+        try:
+            if max_workers <= 1:
+                for query_str, time_range in split_queries:
+                    query_df = run_query(query_str, time_range)
+                    progress.update(1)
+                    if query_df is not None:
+                        yield query_df
+                return
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures: List[Future] = []
+                for query_str, time_range in split_queries:
+                    future = executor.submit(run_query, query_str, time_range)
+                    future.add_done_callback(lambda _: progress.update(1))
+                    futures.append(future)
+                try:
+                    for future in futures:
+                        query_df = future.result()
+                        if query_df is not None:
+                            yield query_df
+                finally:
+                    # Don't run the remaining queries if the caller has
+                    # stopped reading the results (or a query failed).
+                    for future in futures:
+                        future.cancel()
+        finally:
+            progress.close()
+
+    def _exec_query_slice(
+        self,
+        query_str: str,
+        time_range: Tuple[datetime, datetime],
+        query_source: QuerySource,
+        query_options: Dict[str, Any],
+        retries: int = _DEF_SPLIT_QUERY_RETRIES,
+        use_cache: bool = True,
+    ) -> Optional[pd.DataFrame]:
+        """Run the query for a time slice, retrying if it fails."""
+        for attempt in range(retries + 1):
+            if attempt:
+                time.sleep(_SPLIT_RETRY_BACKOFF * 2 ** (attempt - 1))
+            try:
+                query_df = self._query_with_cache(
+                    query_str,
+                    query_source,
+                    query_options,
+                    end=time_range[1],
+                    use_cache=use_cache,
+                )
+            except Exception:  # pylint: disable=broad-except
+                if attempt == retries:
+                    raise
+                continue
+            if isinstance(query_df, pd.DataFrame):
+                return query_df
+        warnings.warn(
+            f"Query for time range {time_range[0]} - {time_range[1]} "
+            + f"failed after {retries + 1} attempts. "
+            + "Results for this time range are not included."
+        )
+        return None
+
     @staticmethod
     def _calc_split_ranges(
             start: datetime,
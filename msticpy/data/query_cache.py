@@ -0,0 +1,306 @@
+# -------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# --------------------------------------------------------------------------
+"""
+Query result cache.
+
+Stores query results on disk as Parquet files so that re-running
+the same query does not need to go back to the data source.
+Results are keyed by the full query text and the identity of the
+driver and connection used to run it.
+
+Results for queries with an `end` time in the past (a closed time
+window) do not expire. Other results expire after a time-to-live
+(TTL). The total size of the cache is limited - the least recently
+used results are removed first.
+
+"""
+import hashlib
+import os
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+from threading import Lock, get_ident
+from typing import Any, Optional, Union
+
+import pandas as pd
+
+from .._version import VERSION
+from ..common.exceptions import MsticpyImportExtraError
+from ..common.utility import export
+
+try:
+    import pyarrow  # noqa: F401 pylint: disable=unused-import
+
+    _PYARROW_AVAILABLE = True
+except ImportError:
+    _PYARROW_AVAILABLE = False
+
+__version__ = VERSION
+__author__ = "Ian Hellen"
+
+_DEF_CACHE_PATH = "~/.msticpy/query_cache"
+_DEF_MAX_SIZE = 1024 ** 3  # 1GB
+_DEF_TTL = 60 * 60
+# Data may be ingested some time after the event time, so
+# only time windows that ended before this are treated as closed.
+_DEF_INGESTION_DELAY = 60 * 60
+
+
+@export
+class QueryResultCache:
+    """Disk cache of query results stored as Parquet files."""
+
+    _CREATE_SQL = """
+        CREATE TABLE IF NOT EXISTS query_results (
+            key TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            created REAL NOT NULL,
+            accessed REAL NOT NULL,
+            expires REAL
+        )
+    """
+    _INDEX_SQL = """
+        CREATE INDEX IF NOT EXISTS query_results_accessed
+        ON query_results (accessed)
+    """
+
+    def __init__(
+        self,
+        path: str = _DEF_CACHE_PATH,
+        max_size: int = _DEF_MAX_SIZE,
+        ttl: float = _DEF_TTL,
+        ingestion_delay: float = _DEF_INGESTION_DELAY,
+    ):
+        """
+        Create or open the cache.
+
+        Parameters
+        ----------
+        path : str, optional
+            Cache folder, by default "~/.msticpy/query_cache"
+        max_size : int, optional
+            Maximum total size of the cached results in bytes,
+            by default 1GB
+        ttl : float, optional
+            Time in seconds for which results of queries that
+            do not have an `end` time in the past are valid,
+            by default 1 hour
+        ingestion_delay : float, optional
+            Results of queries with an `end` time more than this
+            number of seconds in the past do not expire,
+            by default 1 hour
+
+        Raises
+        ------
+        MsticpyImportExtraError
+            If the pyarrow package is not installed.
+
+        """
+        if not _PYARROW_AVAILABLE:
+            raise MsticpyImportExtraError(
+                "Cannot use the query result cache without pyarrow installed.",
+                title="Error importing pyarrow.",
+                extra="parquet",
+            )
+        self.path = Path(path).expanduser()
+        self.max_size = max_size
+        self.ttl = ttl
+        self.ingestion_delay = ingestion_delay
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._lock = Lock()
+        self._conn = sqlite3.connect(
+            str(self.path.joinpath("index.db")), timeout=30, check_same_thread=False
+        )
+        with self._lock, self._conn:
+            # WAL mode allows readers in other processes during writes
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(self._CREATE_SQL)
+            self._conn.execute(self._INDEX_SQL)
+
+    @staticmethod
+    def cache_key(query: str, connection_id: str) -> str:
+        """
+        Return the cache key for a query.
+
+        Parameters
+        ----------
+        query : str
+            The query text
+        connection_id : str
+            Identifies the driver and connection that the query is run on.
+
+        Returns
+        -------
+        str
+            The cache key.
+
+        """
+        return hashlib.sha256(f"{connection_id}\n{query}".encode()).hexdigest()
+
+    def get(self, query: str, connection_id: str) -> Optional[pd.DataFrame]:
+        """
+        Return the cached result for a query.
+
+        Parameters
+        ----------
+        query : str
+            The query text
+        connection_id : str
+            Identifies the driver and connection that the query is run on.
+
+        Returns
+        -------
+        Optional[pd.DataFrame]
+            The query result or None if the result is not cached
+            or has expired.
+
+        """
+        key = self.cache_key(query, connection_id)
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT expires FROM query_results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[0] is not None and row[0] < now:
+                self._remove(key)
+                return None
+            self._conn.execute(
+                "UPDATE query_results SET accessed = ? WHERE key = ?", (now, key)
+            )
+        try:
+            return pd.read_parquet(self._file_path(key))
+        except (OSError, ValueError):
+            # The file has been removed (or is unreadable)
+            with self._lock, self._conn:
+                self._remove(key)
+            return None
+
+    def put(
+        self,
+        query: str,
+        connection_id: str,
+        data: pd.DataFrame,
+        end: Union[datetime, str, None] = None,
+    ) -> bool:
+        """
+        Add a query result to the cache.
+
+        Parameters
+        ----------
+        query : str
+            The query text
+        connection_id : str
+            Identifies the driver and connection that the query is run on.
+        data : pd.DataFrame
+            The query result.
+        end : Union[datetime, str, None], optional
+            The end time of the query. If this is in the past,
+            the result does not expire.
+
+        Returns
+        -------
+        bool
+            True if the result was cached. Results that cannot be
+            stored as Parquet are not cached.
+
+        """
+        key = self.cache_key(query, connection_id)
+        file_path = self._file_path(key)
+        tmp_path = file_path.with_suffix(f".{os.getpid()}.{get_ident()}.tmp")
+        try:
+            data.to_parquet(tmp_path)
+            tmp_path.replace(file_path)
+        except Exception:  # pylint: disable=broad-except
+            # pyarrow raises several exception types for data it
+            # cannot convert (e.g. columns with mixed types)
+            if tmp_path.exists():
+                tmp_path.unlink()
+            return False
+        now = time.time()
+        expires = None if self._is_closed_window(end, now) else now + self.ttl
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO query_results VALUES (?, ?, ?, ?, ?)",
+                (key, file_path.stat().st_size, now, now, expires),
+            )
+            self._evict(now)
+        return True
+
+    def clear(self):
+        """Remove all results from the cache."""
+        with self._lock, self._conn:
+            for (key,) in self._conn.execute(
+                "SELECT key FROM query_results"
+            ).fetchall():
+                self._remove(key)
+
+    def __len__(self) -> int:
+        """Return the number of results in the cache."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM query_results"
+            ).fetchone()[0]
+
+    @property
+    def size(self) -> int:
+        """Return the total size of the cached results in bytes."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM query_results"
+            ).fetchone()[0]
+
+    def close(self):
+        """Close the cache index."""
+        with self._lock:
+            self._conn.close()
+
+    def _file_path(self, key: str) -> Path:
+        return self.path.joinpath(f"{key}.parquet")
+
+    def _is_closed_window(self, end: Any, now: float) -> bool:
+        """Return True if the query `end` time is before the ingestion delay."""
+        if end is None:
+            return False
+        try:
+            end_time = pd.Timestamp(end)
+        except (TypeError, ValueError):
+            return False
+        if end_time.tzinfo is None:
+            # query times are UTC
+            end_time = end_time.tz_localize("UTC")
+        return end_time.timestamp() < now - self.ingestion_delay
+
+    def _remove(self, key: str):
+        """Remove an item - must be called holding the lock."""
+        self._conn.execute("DELETE FROM query_results WHERE key = ?", (key,))
+        file_path = self._file_path(key)
+        if file_path.exists():
+            try:
+                file_path.unlink()
+            except OSError:
+                pass
+
+    def _evict(self, now: float):
+        """Remove expired items and LRU items over the size limit."""
+        for (key,) in self._conn.execute(
+            "SELECT key FROM query_results WHERE expires < ?", (now,)
+        ).fetchall():
+            self._remove(key)
+        total_size = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM query_results"
+        ).fetchone()[0]
+        if total_size <= self.max_size:
+            return
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM query_results ORDER BY accessed"
+        ).fetchall():
+            self._remove(key)
+            total_size -= size
+            if total_size <= self.max_size:
+                break
@@ -476,7 +476,7 @@ class QuerySource:
         valid_failures = []
 
         # Need req_source_items AND query item to be present
-        source_props = list(self._source.keys()) | list(self.defaults.keys())
+        source_props = set(self._source.keys()) | set(self.defaults.keys())
         if not req_source_items.issubset(source_props):
             msg = (
                 f"Source {self.name} does not have all required "
@@ -493,7 +493,7 @@ class QuerySource:
         # Now get the query and the parameter definitions from the source and
         # check that every parameter specified in the query has a corresponding
         # 'parameter definition in either the source or the defaults.
-        source_params = list(self.params.keys())
+        source_params = set(self.params.keys())
         q_params = set(re.findall(param_pattern, self._query))
 
         missing_params = q_params - source_params
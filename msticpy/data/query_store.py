@@ -4,9 +4,12 @@
 # license information.
 # --------------------------------------------------------------------------
 """QueryStore class - holds a collection of QuerySources."""
+import os
+import pickle  # nosec
 from collections import defaultdict
 from os import path
-from typing import Any, Dict, Iterable, Set, Union, Optional, List
+from pathlib import Path
+from typing import Any, Dict, Iterable, Set, Tuple, Union, Optional, List
 
 from .._version import VERSION
 from .query_defns import DataEnvironment, DataFamily
@@ -16,6 +19,8 @@ from .query_source import QuerySource
 __version__ = VERSION
 __author__ = "Ian Hellen"
 
+_DEF_INDEX_PATH = "~/.msticpy/query_index.pkl"
+
 
 def _get_dot_path(elem_path: str, data_map: dict) -> Any:
     """
@@ -50,6 +55,104 @@ def _get_dot_path(elem_path: str, data_map: dict) -> Any:
     raise KeyError(f"'{elem_path}' not found")
 
 
+class _QueryFileIndex:
+    """
+    Index of parsed query definition files.
+
+    Parsed file contents are pickled to `index_path` and re-used
+    while the file path, modification time and size are unchanged.
+
+    """
+
+    def __init__(self, index_path: str = _DEF_INDEX_PATH):
+        """
+        Load the index.
+
+        Parameters
+        ----------
+        index_path : str, optional
+            Path of the index file, by default "~/.msticpy/query_index.pkl"
+
+        """
+        self.index_path = Path(index_path).expanduser()
+        self._files: Dict[str, Tuple[int, int, Optional[Tuple[Dict, Dict, Dict]]]]
+        self._files = {}
+        self._seen: Set[str] = set()
+        self._changed = False
+        try:
+            with open(self.index_path, "rb") as index_file:
+                index = pickle.load(index_file)  # nosec
+            if index.get("version") == VERSION:
+                self._files = index["files"]
+        except Exception:  # pylint: disable=broad-except
+            # a missing, corrupt or incompatible index is rebuilt
+            self._files = {}
+
+    def read_query_def_file(self, query_file: str) -> Tuple[Dict, Dict, Dict]:
+        """
+        Return the parsed query file from the index or read the file.
+
+        Parameters
+        ----------
+        query_file : str
+            Path to yaml query definition file
+
+        Returns
+        -------
+        Tuple[Dict, Dict, Dict]
+            sources, defaults and metadata dictionaries.
+
+        Raises
+        ------
+        ValueError
+            The file is not a valid query definition file.
+
+        """
+        file_stat = os.stat(query_file)
+        self._seen.add(query_file)
+        entry = self._files.get(query_file)
+        if entry and entry[:2] == (file_stat.st_mtime_ns, file_stat.st_size):
+            query_defs = entry[2]
+        else:
+            try:
+                query_defs = read_query_def_file(query_file)
+            except ValueError:
+                query_defs = None
+            self._files[query_file] = (
+                file_stat.st_mtime_ns,
+                file_stat.st_size,
+                query_defs,
+            )
+            self._changed = True
+        if query_defs is None:
+            raise ValueError(f"{query_file} is not a valid query definition file")
+        return query_defs
+
+    def save(self):
+        """Save the index if it has changed."""
+        for file_path in list(self._files):
+            if file_path not in self._seen and not path.exists(file_path):
+                del self._files[file_path]
+                self._changed = True
+        if not self._changed:
+            return
+        tmp_path = self.index_path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, "wb") as index_file:
+                pickle.dump(
+                    {"version": VERSION, "files": self._files},
+                    index_file,
+                    protocol=pickle.HIGHEST_PROTOCOL,
+                )
+            tmp_path.replace(self.index_path)
+            self._changed = False
+        except OSError:
+            # the index is only an optimization
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+
 class QueryStore:
     """
     Repository for query definitions for a data environment.
@@ -199,7 +302,11 @@ class QueryStore:
 
     @classmethod  # noqa: MC0001
     def import_files(
-        cls, source_path: list, recursive: bool = False
+        cls,
+        source_path: list,
+        recursive: bool = False,
+        environment: Optional[str] = None,
+        index_path: Optional[str] = None,
     ) -> Dict[str, "QueryStore"]:
         """
         Import multiple query definition files from directory path.
@@ -211,6 +318,13 @@ class QueryStore:
         recursive : bool, optional
             True to recurse sub-directories
             (the default is False, which only reads from the top level)
+        environment : Optional[str], optional
+            Only import queries for this data environment,
+            by default queries for all environments are imported.
+        index_path : Optional[str], optional
+            Path of an index file used to cache the parsed query files.
+            Files are only read if they have changed since
+            they were indexed. By default, no index is used.
 
         Returns
         -------
@@ -226,13 +340,19 @@ class QueryStore:
 
         """
         env_stores: Dict[str, QueryStore] = dict()
+        environment_filter = (
+            DataEnvironment.parse(environment).name if environment else None
+        )
+        file_index = _QueryFileIndex(index_path) if index_path else None
+        read_file = (
+            file_index.read_query_def_file if file_index else read_query_def_file
+        )
         for query_dir in source_path:
             if not path.isdir(query_dir):
                 raise FileNotFoundError(f"{query_dir} is not a directory")
             for file_path in find_yaml_files(query_dir, recursive):
                 try:
-                    sources, defaults, metadata = read_query_def_file(
-                        str(file_path))
+                    sources, defaults, metadata = read_file(str(file_path))
                 except ValueError:
                     print(
                         f"{file_path} is not a valid query definition file - skipping."
@@ -242,20 +362,22 @@ class QueryStore:
                 for env_value in metadata["data_environments"]:
                     if "." in env_value:
                         env_value = env_value.split(".")[1]
-                    environment = DataEnvironment.parse(env_value)
-                    if environment == DataEnvironment.Unknown:
+                    query_env = DataEnvironment.parse(env_value)
+                    if query_env == DataEnvironment.Unknown:
                         raise ValueError(f"Unknown environment {env_value}")
+                    if environment_filter and query_env.name != environment_filter:
+                        continue
 
-                    if environment.name not in env_stores:
-                        env_stores[environment.name] = cls(
-                            environment=environment.name)
+                    if query_env.name not in env_stores:
+                        env_stores[query_env.name] = cls(environment=query_env.name)
                     for source_name, source in list(sources.items()):
                         new_source = QuerySource(
                             source_name, source, defaults, metadata
                         )
-                        env_stores[environment.name].add_data_source(
-                            new_source)
+                        env_stores[query_env.name].add_data_source(new_source)
 
+        if file_index:
+            file_index.save()
         return env_stores
 
     def get_query(
@@ -4,23 +4,37 @@
 # license information.
 # --------------------------------------------------------------------------
 """Jupyter Notebook Security Tools."""
-# flake8: noqa: F403
-
-# pylint: disable=W0401
-from . import nbwidgets
-
-from ..datamodel import entities
-from .security_alert import SecurityAlert
-from .security_event import SecurityEvent
-from .security_alert_graph import *
-from ..common import utility as utils
-
-from .observationlist import Observations
-from ..common.wsconfig import WorkspaceConfig
-from . import nbdisplay
-
-# pylint: enable=W0401
-
+from ..common.lazy_import import lazy_import
 from .._version import VERSION
 
 __version__ = VERSION
+
+# modules are imported on first access
+_LAZY_IMPORTS = {
+    "nbwidgets": ".nbwidgets",
+    "entities": "..datamodel.entities",
+    "SecurityAlert": ".security_alert:SecurityAlert",
+    "SecurityEvent": ".security_event:SecurityEvent",
+    "create_alert_graph": ".security_alert_graph:create_alert_graph",
+    "add_related_alerts": ".security_alert_graph:add_related_alerts",
+    "utils": "..common.utility",
+    "Observations": ".observationlist:Observations",
+    "WorkspaceConfig": "..common.wsconfig:WorkspaceConfig",
+    "nbdisplay": ".nbdisplay",
+}
+__getattr__, __dir__ = lazy_import(__name__, _LAZY_IMPORTS)
+# "from ... import *" imports the same names as the previous
+# eager imports, including all of the security_alert_graph names
+__all__ = [
+    *_LAZY_IMPORTS,
+    "VERSION",
+    "nbinit",
+    "observationlist",
+    "process_tree",
+    "security_alert",
+    "security_alert_graph",
+    "security_base",
+    "security_event",
+    "ti_browser",
+    "timeline",
+]
@@ -511,7 +511,7 @@ def _check_proc_tree_schema(data):
 
 
 # pylint: disable=too-few-public-methods
-@pd.api.extensions.register_dataframe_accessor("mp_process_tree")
+# registered as the "mp_process_tree" DataFrame accessor in msticpy/__init__.py
 class ProcessTreeAccessor:
     """Pandas api extension for Process Tree."""
 
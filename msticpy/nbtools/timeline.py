@@ -988,7 +988,7 @@ def _add_ref_line(plot, ref_time, ref_text="Ref time", series_count=1):
     plot.add_layout(ref_label)
 
 
-@pd.api.extensions.register_dataframe_accessor("mp_timeline")
+# registered as the "mp_timeline" DataFrame accessor in msticpy/__init__.py
 class TimeLineAccessor:
     """Pandas api extension for Timeline."""
 
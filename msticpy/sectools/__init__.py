@@ -4,21 +4,32 @@
 # license information.
 # --------------------------------------------------------------------------
 """MSTIC Security Tools."""
+import sys
 
-# flake8: noqa: F403
-# pylint: disable=W0401
-from .iocextract import IoCExtract
-from .geoip import GeoLiteLookup, IPStackLookup, geo_distance
-from .tilookup import TILookup
-from .vtlookup import VTLookup
-from . import base64unpack as base64
-from . import process_tree_utils as ptree
+from ..common.lazy_import import lazy_import
 from .._version import VERSION
 
-try:
-    from IPython import get_ipython
-    from . import sectools_magics
-except ImportError as err:
-    pass
-
 __version__ = VERSION
+
+# modules are imported on first access
+_LAZY_IMPORTS = {
+    "IoCExtract": ".iocextract:IoCExtract",
+    "GeoLiteLookup": ".geoip:GeoLiteLookup",
+    "IPStackLookup": ".geoip:IPStackLookup",
+    "geo_distance": ".geoip:geo_distance",
+    "TILookup": ".tilookup:TILookup",
+    "VTLookup": ".vtlookup:VTLookup",
+    "base64": ".base64unpack",
+    "ptree": ".process_tree_utils",
+}
+__getattr__, __dir__ = lazy_import(__name__, _LAZY_IMPORTS)
+# "from ... import *" imports all of the modules
+__all__ = list(_LAZY_IMPORTS)
+
+# Register the IPython magics if we are running in IPython.
+# IPython cannot be running if it has not been imported.
+if "IPython" in sys.modules and sys.modules["IPython"].get_ipython():
+    try:
+        from . import sectools_magics  # noqa: F401
+    except ImportError:
+        pass
@@ -853,7 +853,7 @@ def _b64_string_pad(string: str) -> str:
 
 
 # pylint: disable=too-few-public-methods
-@pd.api.extensions.register_dataframe_accessor("mp_b64")
+# registered as the "mp_b64" DataFrame accessor in msticpy/__init__.py
 class B64ExtractAccessor:
     """Base64 Unpack pandas extension."""
 
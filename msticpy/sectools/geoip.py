@@ -23,16 +23,20 @@ import math
 import os
 import random
 import tarfile
+import uuid
 import warnings
 from abc import ABCMeta, abstractmethod
 from collections.abc import Iterable
 from datetime import datetime, timedelta
+from functools import lru_cache
 from json import JSONDecodeError
 from pathlib import Path
+from threading import Lock, Thread
 from time import sleep
-from typing import Any, Dict, List, Mapping, Optional, Tuple
+from typing import Any, Dict, List, Mapping, Optional, Tuple, Union
 
-import geoip2.database  # type: ignore
+import maxminddb
+import numpy as np
 import pandas as pd
 import requests
 from geoip2.errors import AddressNotFoundError  # type: ignore
@@ -50,6 +54,9 @@ __version__ = VERSION
 __author__ = "Ian Hellen"
 
 
+_DEF_GEO_CACHE_SIZE = 65536
+
+
 class GeoIPDatabaseException(Exception):
     """Exception when GeoIP database cannot be found."""
 
@@ -377,6 +384,46 @@ Alternatively, you can pass this to the IPStackLookup class when creating it:
         return ip_loc_results
 
 
+class _GeoLiteDB:
+    """GeoLite database reader shared by GeoLiteLookup instances."""
+
+    def __init__(self, db_folder: str, db_path: str, mode: int):
+        self.db_folder = db_folder
+        self.db_path = db_path
+        self.mode = mode
+        self.reader = maxminddb.open_database(db_path, mode=mode)
+        # incremented each time the reader is replaced
+        self.generation = 0
+        self.users = 0
+        self.refresh_thread: Optional[Thread] = None
+        self.lock = Lock()
+
+    @property
+    def build_time(self) -> datetime:
+        """Return the build time (UTC) of the current database."""
+        return datetime.utcfromtimestamp(self.reader.metadata().build_epoch)
+
+    def swap(self, db_path: str):
+        """Open `db_path`, make it the current reader and remove the old DB."""
+        new_reader = maxminddb.open_database(db_path, mode=self.mode)
+        with self.lock:
+            if not self.users:
+                # all instances have been closed
+                new_reader.close()
+                return
+            old_reader, old_path = self.reader, self.db_path
+            self.db_path = db_path
+            self.reader = new_reader
+            self.generation += 1
+        old_reader.close()
+        if Path(old_path) == Path(db_path):
+            return
+        try:
+            Path(old_path).unlink()
+        except OSError as err:
+            warnings.warn(f"Could not remove old GeoIP DB file {old_path}: {err}")
+
+
 @export
 class GeoLiteLookup(GeoIpLookup):
     """
@@ -401,6 +448,35 @@ class GeoLiteLookup(GeoIpLookup):
             "GeoLite2"))
     _DB_ARCHIVE = "GeoLite2-City.mmdb.{rand}.tar.gz"
     _DB_FILE = "GeoLite2-City.mmdb"
+    # updates are extracted to a new file so the current DB stays usable
+    _DB_UPDATE_FILE = "GeoLite2-City.{suffix}.mmdb"
+
+    # Readers are shared by all instances using the same DB folder and mode.
+    _shared_dbs: Dict[Tuple[str, int], _GeoLiteDB] = {}
+    _db_lock = Lock()
+
+    _DB_MODES = {
+        "auto": maxminddb.MODE_AUTO,
+        "mmap": maxminddb.MODE_MMAP,
+        "mmap_ext": maxminddb.MODE_MMAP_EXT,
+        "file": maxminddb.MODE_FILE,
+        "memory": maxminddb.MODE_MEMORY,
+    }
+
+    # Columns returned by lookup_ips (GeoLocation properties + IpAddress)
+    _GEO_COLUMNS = [
+        "CountryCode",
+        "CountryName",
+        "State",
+        "City",
+        "Longitude",
+        "Latitude",
+        "Asn",
+        "edges",
+        "Type",
+        "AdditionalData",
+        "IpAddress",
+    ]
 
     _LICENSE_HTML = """
 This product includes GeoLite2 data created by MaxMind, available from
@@ -429,6 +505,8 @@ Alternatively, you can pass this to the GeoLiteLookup class when creating it:
         db_folder: Optional[str] = None,
         force_update: bool = False,
         auto_update: bool = True,
+        db_mode: Optional[str] = None,
+        cache_size: int = _DEF_GEO_CACHE_SIZE,
     ):
         r"""
         Return new instance of GeoLiteLookup class.
@@ -454,6 +532,21 @@ Alternatively, you can pass this to the GeoLiteLookup class when creating it:
         auto_update: bool, optional
             Auto update can be set to true or false. depending on it,
             new download request will be initiated if age criteria is matched.
+            If a database is already present, the new database is downloaded
+            in the background and used once it has been extracted.
+        db_mode : str, optional
+            How the database file is read: "auto" (default - memory-mapped,
+            using the maxminddb C extension if it is installed), "mmap",
+            "mmap_ext", "file" or "memory" (load the whole file into memory).
+            Can also be set with the `DBMode` setting.
+        cache_size : int, optional
+            Number of recent lookup results to cache, by default 65536.
+            Set to 0 to disable caching.
+
+        Notes
+        -----
+        The database reader is shared by all GeoLiteLookup instances in
+        the process that use the same `db_folder` and `db_mode`.
 
         """
         super().__init__()
@@ -464,55 +557,122 @@ Alternatively, you can pass this to the GeoLiteLookup class when creating it:
         if self._dbfolder is None:
             self._dbfolder = self.settings.args.get("DBFolder", self._DB_HOME)
 
-        self._dbfolder = str(Path(self._dbfolder).expanduser())  # type: ignore
+        self._dbfolder = str(
+            Path(self._dbfolder).expanduser().resolve()  # type: ignore
+        )
         self._force_update = force_update
         self._auto_update = auto_update
-        self._check_and_update_db(
-            self._dbfolder,
-            self._force_update,
-            self._auto_update)
-        self._dbpath = self._get_geoip_dbpath(self._dbfolder)
-        if not self._dbpath:
+        db_mode = (db_mode or self.settings.args.get("DBMode", "auto")).casefold()
+        if db_mode not in self._DB_MODES:
+            raise ValueError(
+                f"Unknown db_mode '{db_mode}'.",
+                f"Valid modes are {', '.join(self._DB_MODES)}",
+            )
+        self._closed = False
+        self._db = self._get_shared_db(self._DB_MODES[db_mode])
+        self._db_generation = self._db.generation
+        self._lookup_geo_cached = (
+            lru_cache(maxsize=cache_size)(self._lookup_geo)
+            if cache_size
+            else self._lookup_geo
+        )
+
+    @property
+    def _reader(self):
+        """Return the current (shared) database reader."""
+        return self._db.reader
+
+    @property
+    def _dbpath(self) -> str:
+        """Return the path of the database in use."""
+        return self._db.db_path
+
+    def close(self):
+        """Close an open GeoIP DB, if no other instances are using it."""
+        if self._closed:
+            return
+        self._closed = True
+        cls = self.__class__
+        with cls._db_lock:
+            self._db.users -= 1
+            if self._db.users > 0:
+                return
+            cls._shared_dbs.pop((self._db.db_folder, self._db.mode), None)
+        try:
+            with self._db.lock:
+                self._db.reader.close()
+        except Exception as err:  # pylint: disable=broad-except
+            print(f"Exception when trying to close GeoIP DB {err}")
+
+    def _get_shared_db(self, mode: int) -> _GeoLiteDB:
+        """Return the shared reader for the DB folder, opening it if needed."""
+        cls = self.__class__
+        with cls._db_lock:
+            geo_db = cls._shared_dbs.get((self._dbfolder, mode))
+            if geo_db is not None:
+                geo_db.users += 1
+        downloaded = False
+        if geo_db is None:
+            geo_db, downloaded = self._open_shared_db(mode)
+        if not downloaded:
+            self._check_and_update_db(geo_db, self._force_update, self._auto_update)
+        return geo_db
+
+    def _open_shared_db(self, mode: int) -> Tuple[_GeoLiteDB, bool]:
+        """Open (downloading if needed) and register a shared reader."""
+        cls = self.__class__
+        # The download is done without holding the lock so that
+        # instances using other DB folders are not blocked.
+        downloaded = False
+        db_path = self._get_geoip_dbpath(self._dbfolder)
+        if db_path is None:
+            # We have nothing to use until the download completes
+            print((
+                "No local Maxmind City Database found. ",
+                f"Attempting to downloading new database to {self._dbfolder}",
+            ))
+            downloaded = self._download_and_extract_archive(db_folder=self._dbfolder)
+            db_path = self._get_geoip_dbpath(self._dbfolder)
+        if db_path is None:
             raise MsticpyUserConfigError(
                 "No usable GeoIP Database could be found.",
                 "Check that you have correctly configured the Maxmind API key.",
                 ("If you are using a custom DBFolder setting in your config, " +
                  "check that this is a valid path."),
                 help_uri=(
-                    "https://msticpy.readthedocs.io/en/latest/data_acquisition/" +
-                    "GeoIPLookups.html#maxmind-geo-ip-lite-lookup-class"),
+                    "https://msticpy.readthedocs.io/en/latest/"
+                    + "data_acquisition/GeoIPLookups.html"
+                    + "#maxmind-geo-ip-lite-lookup-class"),
                 service_uri="https://www.maxmind.com/en/geolite2/signup",
                 title="Maxmind GeoIP database not found",
             )
-        self._reader = geoip2.database.Reader(self._dbpath)
-
-    def close(self):
-        """Close an open GeoIP DB."""
-        if self._reader:
-            try:
-                self._reader.close()
-            except Exception as err:  # pylint: disable=broad-except
-                print(f"Exception when trying to close GeoIP DB {err}")
+        new_db = _GeoLiteDB(self._dbfolder, db_path, mode)
+        with cls._db_lock:
+            geo_db = cls._shared_dbs.setdefault((self._dbfolder, mode), new_db)
+            geo_db.users += 1
+        if geo_db is not new_db:
+            # another instance opened the DB while we were opening ours
+            new_db.reader.close()
+        return geo_db, downloaded
 
     def _check_and_update_db(
         self,
-        db_folder: str = None,
+        geo_db: _GeoLiteDB,
         force_update: bool = False,
         auto_update: bool = True,
     ):
-        r"""
-        Check the age of geo ip database file and download if it older than 30 days.
+        """
+        Check the age of geo ip database file and update if it older than 30 days.
 
+        The download runs in a background thread. Lookups continue to
+        use the current database until the new one has been extracted.
         User can set auto_update or force_update to True or False to
         override auto-download behavior.
 
         Parameters
         ----------
-        db_folder: str, optional
-            Provide absolute path to the folder containing MMDB file
-            (e.g. '/usr/home' or 'C:\maxmind').
-            If no path provided, it is set to download to .msticpy\GeoLite2 dir under
-            user`s home directory.
+        geo_db : _GeoLiteDB
+            The shared database to check.
         force_update : bool, optional
             Force update can be set to true or false. depending on it,
             new download request will be initiated, overriding age criteria.
@@ -521,49 +681,72 @@ Alternatively, you can pass this to the GeoLiteLookup class when creating it:
             new download request will be initiated if age criteria is matched.
 
         """
-        geoip_db_path = self._get_geoip_dbpath(db_folder)
-        url = self._MAXMIND_DOWNLOAD.format(license_key=self._api_key)
-
-        if geoip_db_path is None:
+        # Check for out of date DB file according to db_age
+        db_age = datetime.utcnow() - geo_db.build_time
+        if db_age > timedelta(30) and auto_update:
             print((
-                "No local Maxmind City Database found. ",
-                f"Attempting to downloading new database to {db_folder}",
+                "Latest local Maxmind City Database present is older than 30 days.",
+                f"Downloading new database to {geo_db.db_folder} in the background",
             ))
-            self._download_and_extract_archive(url, db_folder)
-        else:
-            # Create a reader object to retrive db info and build date
-            # to check age from build_epoch property.
-            with geoip2.database.Reader(geoip_db_path) as reader:
-                last_mod_time = datetime.utcfromtimestamp(
-                    reader.metadata().build_epoch)
-
-            # Check for out of date DB file according to db_age
-            db_age = datetime.utcnow() - last_mod_time
-            db_updated = True
-            if db_age > timedelta(30) and auto_update:
-                print((
-                    "Latest local Maxmind City Database present is older than 30 days.",
-                    f"Attempting to download new database to {db_folder}",
-                ))
-                if not self._download_and_extract_archive(url, db_folder):
-                    warnings.warn("DB download failed")
-                    db_updated = False
-            elif force_update:
-                print((
-                    "force_update is set to True.",
-                    f"Attempting to download new database to {db_folder}",
-                ))
-                if not self._download_and_extract_archive(url, db_folder):
-                    warnings.warn("DB download failed")
-                    db_updated = False
-            if not db_updated:
-                warnings.warn(
-                    "Continuing with cached database. Results may inaccurate."
-                )
+            self._start_db_update(geo_db)
+        elif force_update:
+            print((
+                "force_update is set to True.",
+                f"Downloading new database to {geo_db.db_folder} in the background",
+            ))
+            self._start_db_update(geo_db)
+
+    def _start_db_update(self, geo_db: _GeoLiteDB):
+        """Start the update thread, if it is not already running."""
+        with geo_db.lock:
+            if geo_db.refresh_thread is not None and geo_db.refresh_thread.is_alive():
+                return
+            geo_db.refresh_thread = Thread(
+                target=self._update_db,
+                args=(geo_db,),
+                name="msticpy-geolite-update",
+                daemon=True,
+            )
+            geo_db.refresh_thread.start()
+
+    def _update_db(self, geo_db: _GeoLiteDB):
+        """Download a new database and switch the shared reader to it."""
+        db_file = self._DB_UPDATE_FILE.format(suffix=uuid.uuid4().hex)
+        if not self._download_and_extract_archive(
+            db_folder=geo_db.db_folder, db_file=db_file
+        ):
+            warnings.warn("DB download failed")
+            warnings.warn("Continuing with cached database. Results may inaccurate.")
+            return
+        db_path = Path(geo_db.db_folder).joinpath(db_file)
+        if db_path.is_file():
+            geo_db.swap(str(db_path))
+
+    def wait_for_update(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for a background database update to complete.
+
+        Parameters
+        ----------
+        timeout : Optional[float], optional
+            Maximum time to wait in seconds, by default wait until
+            the update has finished.
+
+        Returns
+        -------
+        bool
+            True if no update is in progress.
+
+        """
+        refresh_thread = self._db.refresh_thread
+        if refresh_thread is None:
+            return True
+        refresh_thread.join(timeout=timeout)
+        return not refresh_thread.is_alive()
 
     # pylint: disable=too-many-branches
     def _download_and_extract_archive(  # noqa: MC0001
-        self, url: str = None, db_folder: str = None
+        self, url: str = None, db_folder: str = None, db_file: str = None
     ) -> bool:
         r"""
         Download file from the given URL and extract if it is archive.
@@ -577,6 +760,9 @@ Alternatively, you can pass this to the GeoLiteLookup class when creating it:
             (e.g. '/usr/home' or 'C:\maxmind').
             If no path provided, it is set to download to .msticpy dir under
             user`s home directory.(the default is None)
+        db_file : str, optional
+            Name of the extracted MMDB file in `db_folder`
+            (the default is None - use the name from the archive)
 
         Returns
         -------
@@ -600,7 +786,7 @@ Alternatively, you can pass this to the GeoLiteLookup class when creating it:
         db_archive_path = Path(db_folder).joinpath(
             self._DB_ARCHIVE.format(rand=rand_int)
         )
-        db_file_path = Path(db_folder).joinpath(self._DB_FILE)
+        db_file_path = Path(db_folder).joinpath(db_file or self._DB_FILE)
 
         try:
             # wait a small rand amount of time in case multiple procs try
@@ -628,7 +814,7 @@ Alternatively, you can pass this to the GeoLiteLookup class when creating it:
         # pylint: enable=broad-except
         else:
             try:
-                self._extract_to_folder(db_archive_path, db_folder)
+                self._extract_to_folder(db_archive_path, db_folder, db_file)
                 print((
                     "Extraction complete. Local Maxmind city DB:",
                     f"{db_file_path}"))
@@ -652,7 +838,7 @@ Alternatively, you can pass this to the GeoLiteLookup class when creating it:
     # pylint: enable=too-many-branches
 
     @staticmethod
-    def _extract_to_folder(db_archive_path, db_folder):
+    def _extract_to_folder(db_archive_path, db_folder, db_file=None):
         with tarfile.open(db_archive_path) as tar_archive:
             for member in tar_archive.getmembers():
                 if not member.isreg():
@@ -663,6 +849,8 @@ Alternatively, you can pass this to the GeoLiteLookup class when creating it:
                 # The files are extract to a subfolder (with a date in the name)
                 # We want to move these into the main folder above this.
                 targetname = Path(member.name).name
+                if db_file and targetname.endswith(".mmdb"):
+                    targetname = db_file
                 if targetname != member.name:
                     curr_file = Path(db_folder).joinpath(member.name)
                     extr_folder = Path(db_folder).joinpath(member.name).parent
@@ -744,7 +932,7 @@ Alternatively, you can pass this to the GeoLiteLookup class when creating it:
         for ip_input in ip_list:
             geo_match = None
             try:
-                geo_match = self._reader.city(ip_input).raw
+                geo_match = self._get_raw(ip_input)
             except (AddressNotFoundError, AttributeError, ValueError):
                 continue
             if geo_match:
@@ -755,6 +943,126 @@ Alternatively, you can pass this to the GeoLiteLookup class when creating it:
 
         return output_raw, output_entities
 
+    def df_lookup_ip(self, data: pd.DataFrame, column: str) -> pd.DataFrame:
+        """
+        Lookup Geolocation data from a pandas Dataframe.
+
+        Parameters
+        ----------
+        data : pd.DataFrame
+            pandas dataframe containing IpAddress column
+        column : str
+            the name of the dataframe column to use as a source
+
+        Returns
+        -------
+        pd.DataFrame
+            Copy of original dataframe with IP Location information columns
+            appended (where a location lookup was successful)
+
+        """
+        # merge with one result row per address so that input rows with
+        # repeated addresses are not duplicated
+        return data.merge(
+            self.lookup_ips(data[[column]].drop_duplicates(), column),
+            how="left",
+            left_on=column,
+            right_on="IpAddress",
+        )
+
+    def lookup_ips(self, data: pd.DataFrame, column: str) -> pd.DataFrame:
+        """
+        Lookup Geolocation data from a pandas Dataframe.
+
+        Parameters
+        ----------
+        data : pd.DataFrame
+            pandas dataframe containing IpAddress column
+        column : str
+            the name of the dataframe column to use as a source
+
+        Returns
+        -------
+        pd.DataFrame
+            IpLookup results as DataFrame, with a row for each input
+            row whose address was found, in input order.
+
+        Notes
+        -----
+        The output has the same rows and columns as the `lookup_ip`
+        entity results but each distinct address is only looked up
+        once, without creating entities. Recent results are cached
+        (see `cache_info`).
+
+        """
+        if self._db_generation != self._db.generation:
+            # the database has been updated since the results were cached
+            self.clear_cache()
+            self._db_generation = self._db.generation
+        ip_addrs = data[column].dropna().astype(str).str.strip()
+        geo_locs = {
+            ip_addr: self._lookup_geo_cached(ip_addr)
+            for ip_addr in pd.unique(ip_addrs)
+        }
+        geo_rows = [
+            (*geo_locs[ip_addr], None, set(), "geolocation", {}, ip_addr)
+            for ip_addr in ip_addrs
+            if geo_locs[ip_addr] is not None
+        ]
+        return pd.DataFrame(geo_rows, columns=self._GEO_COLUMNS)
+
+    def cache_info(self):
+        """Return lookup cache statistics (hits, misses, maxsize, currsize)."""
+        if hasattr(self._lookup_geo_cached, "cache_info"):
+            return self._lookup_geo_cached.cache_info()
+        return None
+
+    def clear_cache(self):
+        """Clear the lookup result cache."""
+        if hasattr(self._lookup_geo_cached, "cache_clear"):
+            self._lookup_geo_cached.cache_clear()
+
+    def _get_record(self, ip_address: str) -> Tuple[Any, int]:
+        """Return the database record and prefix length for an address."""
+        reader = self._reader
+        try:
+            return reader.get_with_prefix_len(ip_address)
+        except ValueError:
+            if reader is self._reader:
+                raise
+            # the reader was replaced by an update (and closed) during the lookup
+            return self._reader.get_with_prefix_len(ip_address)
+
+    def _get_raw(self, ip_address: str) -> Optional[Dict[str, Any]]:
+        """Return the database record for an address, with its traits."""
+        geo_match, prefix_len = self._get_record(ip_address)
+        if not geo_match:
+            return None
+        traits = geo_match.setdefault("traits", {})
+        traits["ip_address"] = ip_address
+        traits["prefix_len"] = prefix_len
+        return geo_match
+
+    def _lookup_geo(self, ip_address: str) -> Optional[Tuple[Any, ...]]:
+        """Return location values for an address or None if not found."""
+        try:
+            geo_match, _ = self._get_record(ip_address)
+        except ValueError:
+            return None
+        if not geo_match:
+            return None
+        country = geo_match.get("country", {})
+        subdivs = geo_match.get("subdivisions")
+        location = geo_match.get("location", {})
+        return (
+            country.get("iso_code"),
+            country.get("names", {}).get("en"),
+            subdivs[0].get("names", {}).get("en") if subdivs else None,
+            geo_match.get("city", {}).get("names", {}).get("en"),
+            location.get("longitude"),
+            location.get("latitude"),
+        )
+
     @staticmethod
     def _create_ip_entity(
         ip_address: str, geo_match: Mapping[str, Any], ip_entity: IpAddress = None
@@ -890,3 +1198,145 @@ def geo_distance(
     )
     hav_c = 2 * math.atan2(math.sqrt(hav_a), math.sqrt(1 - hav_a))
     return _EARTH_RADIUS_KM * hav_c
+
+
+@export
+def geo_distance_array(
+    origins: Union[np.ndarray, List[Tuple[float, float]]],
+    destinations: Union[np.ndarray, List[Tuple[float, float]]],
+) -> np.ndarray:
+    """
+    Calculate the Haversine distances between arrays of locations.
+
+    Parameters
+    ----------
+    origins : Union[np.ndarray, List[Tuple[float, float]]]
+        N x 2 array of Latitude, Longitude of the origins.
+    destinations : Union[np.ndarray, List[Tuple[float, float]]]
+        N x 2 array of Latitude, Longitude of the destinations.
+        Either array can be a single (Latitude, Longitude) pair, which
+        is used for every row of the other array.
+
+    Returns
+    -------
+    np.ndarray
+        Array of N distances in kilometers. The distance is NaN
+        if either location has a missing value.
+
+    Examples
+    --------
+    >>> origins = [(48.1372, 11.5756), (48.1372, 11.5756)]  # Munich
+    >>> destinations = [(52.5186, 13.4083), (48.1372, 11.5756)]  # Berlin, Munich
+    >>> geo_distance_array(origins, destinations).round(1)
+    array([504.2,   0. ])
+
+    """
+    origins = np.radians(np.asarray(origins, dtype=np.float64))
+    destinations = np.radians(np.asarray(destinations, dtype=np.float64))
+    orig_lat, orig_lon = origins[..., 0], origins[..., 1]
+    dest_lat, dest_lon = destinations[..., 0], destinations[..., 1]
+
+    hav_a = (
+        np.sin((dest_lat - orig_lat) / 2) ** 2
+        + np.cos(orig_lat) * np.cos(dest_lat) * np.sin((dest_lon - orig_lon) / 2) ** 2
+    )
+    hav_c = 2 * np.arctan2(np.sqrt(hav_a), np.sqrt(1 - hav_a))
+    return _EARTH_RADIUS_KM * hav_c
+
+
+@export
+def geo_distance_df(
+    data: pd.DataFrame,
+    origin_lat: str,
+    origin_long: str,
+    dest_lat: str,
+    dest_long: str,
+) -> pd.Series:
+    """
+    Calculate the Haversine distance for each row of a DataFrame.
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        Input DataFrame
+    origin_lat : str
+        Name of the origin Latitude column
+    origin_long : str
+        Name of the origin Longitude column
+    dest_lat : str
+        Name of the destination Latitude column
+    dest_long : str
+        Name of the destination Longitude column
+
+    Returns
+    -------
+    pd.Series
+        Distances in kilometers, with the same index as `data`.
+
+    """
+    distances = geo_distance_array(
+        data[[origin_lat, origin_long]].to_numpy(dtype=np.float64),
+        data[[dest_lat, dest_long]].to_numpy(dtype=np.float64),
+    )
+    return pd.Series(distances, index=data.index, name="Distance")
+
+
+@export
+def geo_travel_speed(
+    data: pd.DataFrame,
+    account_col: str,
+    time_col: str,
+    lat_col: str = "Latitude",
+    long_col: str = "Longitude",
+) -> pd.DataFrame:
+    """
+    Calculate the distance and speed of travel between consecutive events.
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        Input DataFrame with one row per event (e.g. logon) with
+        the location of the event.
+    account_col : str
+        Name of the account column. Hops are only calculated between
+        events for the same account.
+    time_col : str
+        Name of the event time column
+    lat_col : str, optional
+        Name of the Latitude column, by default "Latitude"
+    long_col : str, optional
+        Name of the Longitude column, by default "Longitude"
+
+    Returns
+    -------
+    pd.DataFrame
+        `data` sorted by account and time, with the following columns
+        added for the hop from the previous event of the account:
+
+        - Distance - distance in kilometers
+        - TimeDelta - time between the events
+        - Speed - implied speed in kilometers per hour (inf if
+          the locations differ but the events have the same time)
+
+        These are NaN for the first event of each account.
+
+    """
+    data = data.sort_values([account_col, time_col], kind="mergesort")
+    accounts = data[account_col].to_numpy()
+    locations = data[[lat_col, long_col]].to_numpy(dtype=np.float64)
+    event_times = pd.to_datetime(data[time_col]).to_numpy(dtype="datetime64[ns]")
+
+    same_account = np.zeros(len(data), dtype=bool)
+    same_account[1:] = accounts[1:] == accounts[:-1]
+    prev_locations = np.roll(locations, 1, axis=0)
+    prev_locations[~same_account] = np.nan
+    distances = geo_distance_array(prev_locations, locations)
+
+    time_deltas = np.full(len(data), np.timedelta64("NaT"), dtype="timedelta64[ns]")
+    time_deltas[1:] = event_times[1:] - event_times[:-1]
+    time_deltas[~same_account] = np.timedelta64("NaT")
+    hours = time_deltas / np.timedelta64(1, "h")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        speeds = np.where(distances == 0, 0.0, distances / hours)
+
+    return data.assign(Distance=distances, TimeDelta=time_deltas, Speed=speeds)
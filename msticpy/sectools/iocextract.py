@@ -8,7 +8,9 @@ Module for IoCExtract class.
 
 Uses a set of builtin regular expressions to look for Indicator of
 Compromise (IoC) patterns. Input can be a single string or a pandas
-dataframe with one or more columns specified as input.
+dataframe with one or more columns specified as input. Large
+CSV, JSON lines or text files (or iterables) can be processed
+in chunks with `extract_stream`.
 
 The following types are built-in:
 
@@ -23,12 +25,30 @@ The following types are built-in:
 
 """
 
+import math
+import os
 import re
-from collections import defaultdict, namedtuple
+from collections import defaultdict, deque, namedtuple
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from contextlib import ExitStack
 from enum import Enum
-from typing import Any, Dict, List, Set, Tuple, Union
+from functools import lru_cache, partial
+from pathlib import Path
+from typing import (
+    Any,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
 from urllib.parse import unquote
 
+import numpy as np
 import pandas as pd
 
 from .._version import VERSION
@@ -49,6 +69,20 @@ IoCPattern = namedtuple(
 
 _RESULT_COLS = ["IoCType", "Observable", "SourceIndex", "Input"]
 
+_DEF_CHUNK_SIZE = 100_000
+# maximum number of chunks in flight per worker process
+_MAX_PENDING_PER_JOB = 2
+_DEF_TLD_CACHE_SIZE = 65536
+
+# Column used for input read as lines of plain text
+_TEXT_COL = "Text"
+_STREAM_FORMATS = {
+    ".csv": "csv",
+    ".json": "json",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+}
+
 
 @export
 class IoCType(Enum):
@@ -150,8 +184,19 @@ class IoCExtract:
 
     _content_regex: Dict[str, IoCPattern] = {}
 
-    def __init__(self):
-        """Initialize new instance of IoCExtract."""
+    def __init__(self, tld_cache_size: Optional[int] = _DEF_TLD_CACHE_SIZE):
+        """
+        Initialize new instance of IoCExtract.
+
+        Parameters
+        ----------
+        tld_cache_size : Optional[int], optional
+            The maximum number of domain names for which TLD
+            validation results are cached (the default is 65536).
+            Set to None for an unbounded cache or 0 to disable
+            caching.
+
+        """
         # IP Addresses
         self.add_ioc_type(IoCType.ipv4.name, self.IPV4_REGEX, 0, "ipaddress")
         self.add_ioc_type(IoCType.ipv6.name, self.IPV6_REGEX, 0)
@@ -182,6 +227,10 @@ class IoCExtract:
 
         self._dom_validator = DomainValidator()
         self._ignore_tld = False
+        self._tld_cache_size = tld_cache_size
+        self._validate_tld_cached = lru_cache(maxsize=tld_cache_size)(
+            self._dom_validator.validate_tld
+        )
 
     # Public members
     def add_ioc_type(
@@ -241,6 +290,23 @@ class IoCExtract:
         """
         return self._content_regex
 
+    @property
+    def tld_cache_info(self):
+        """
+        Return hit/miss statistics for the TLD validation cache.
+
+        Returns
+        -------
+        CacheInfo
+            Named tuple of `hits`, `misses`, `maxsize` and `currsize`.
+
+        """
+        return self._validate_tld_cached.cache_info()
+
+    def clear_tld_cache(self):
+        """Clear the TLD validation cache and reset its statistics."""
+        self._validate_tld_cached.cache_clear()
+
     # pylint: disable=too-many-locals
     def extract(
         self,
@@ -333,35 +399,9 @@ class IoCExtract:
                 )
             )
 
-        result_rows: List[pd.Series] = []
-        for idx, datarow in data.iterrows():
-            result_rows.extend(
-                self._search_in_row(datarow, idx, columns, ioc_types_to_use)
-            )
+        result_df = self._scan_df(data, columns, ioc_types_to_use)
         self._ignore_tld = ignore_tld_current
-        return pd.DataFrame(data=result_rows, columns=_RESULT_COLS)
-
-    # pylint: disable=too-many-arguments
-    def _search_in_row(
-        self,
-        datarow: pd.Series,
-        idx: Any,
-        columns: List[str],
-        ioc_types_to_use: List[str],
-    ) -> List[pd.Series]:
-        """Return results for a single input row."""
-        result_rows = []
-        for col in columns:
-            ioc_results = self._scan_for_iocs(datarow[col], ioc_types_to_use)
-            for result_type, result_set in list(ioc_results.items()):
-                if result_set:
-                    for observable in result_set:
-                        result_row = pd.Series(
-                            data=[result_type, observable, idx, datarow[col]],
-                            index=_RESULT_COLS,
-                        )
-                        result_rows.append(result_row)
-        return result_rows
+        return result_df
 
     def extract_df(
         self, data: pd.DataFrame, columns: Union[str, List[str]], **kwargs
@@ -391,6 +431,14 @@ class IoCExtract:
             If True, ignore the official Top Level Domains
             list when determining whether a domain name is
             a legal domain.
+        n_jobs : int, optional
+            The number of worker processes to use. If greater than 1
+            the input is split into row chunks that are scanned in
+            parallel. -1 uses all available CPUs. (the default is 1,
+            which scans in the current process)
+        chunk_size : int, optional
+            The number of rows in each chunk. If not specified and
+            `n_jobs` is greater than 1, chunks of 100,000 rows are used.
 
         Returns
         -------
@@ -415,9 +463,24 @@ class IoCExtract:
         is True or explicitly included in `ioc_paths`.
 
         """
-        check_kwargs(kwargs, ["ioc_types", "include_paths", "ignore_tlds"])
+        check_kwargs(
+            kwargs,
+            ["ioc_types", "include_paths", "ignore_tlds", "n_jobs", "chunk_size"],
+        )
+        return self._extract_df(data, columns, **kwargs)
+
+    def _extract_df(
+        self,
+        data: pd.DataFrame,
+        columns: Union[str, List[str]],
+        executor: Optional[Executor] = None,
+        **kwargs,
+    ) -> pd.DataFrame:
+        """Extract IoCs from `data`, optionally using an existing worker pool."""
         ioc_types = kwargs.get("ioc_types", None)
         include_paths = kwargs.get("include_paths", False)
+        n_jobs = kwargs.get("n_jobs", 1)
+        chunk_size = kwargs.get("chunk_size", None)
         ignore_tld_current = self._ignore_tld
         self._ignore_tld = kwargs.get("ignore_tlds", False)
 
@@ -434,13 +497,104 @@ class IoCExtract:
                 )
             )
 
-        result_rows = []
-        for idx, datarow in data.iterrows():
-            result_rows.extend(
-                self._search_in_row(datarow, idx, columns, ioc_types_to_use)
+        if n_jobs == 1 and chunk_size is None and executor is None:
+            result_df = self._scan_df(data, columns, ioc_types_to_use)
+        else:
+            result_df = self._scan_df_chunked(
+                data, columns, ioc_types_to_use, n_jobs, chunk_size, executor
             )
         self._ignore_tld = ignore_tld_current
-        return pd.DataFrame(data=result_rows, columns=_RESULT_COLS)
+        return result_df
+
+    def extract_stream(
+        self,
+        source: Union[str, Path, Iterable[Any]],
+        columns: Union[str, List[str]] = None,
+        chunk_size: int = _DEF_CHUNK_SIZE,
+        file_format: str = None,
+        **kwargs,
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Extract IoCs incrementally from a file or iterable.
+
+        The input is read and scanned in chunks of `chunk_size` rows
+        and a DataFrame of results is yielded for each chunk, so
+        memory use does not depend on the size of the input.
+
+        Parameters
+        ----------
+        source : Union[str, Path, Iterable[Any]]
+            Path to a CSV, JSON, JSON lines or plain text file, or an
+            iterable of strings (lines), dicts (records) or
+            DataFrames (chunks).
+        columns : Union[str, List[str]], optional
+            The column(s) to use as source strings. Required for
+            CSV, JSON, JSON lines, record and DataFrame input. Ignored
+            for text input (a text file or an iterable of strings),
+            where each line is scanned.
+        chunk_size : int, optional
+            The number of rows/lines to read for each chunk
+            (the default is 100,000)
+        file_format : str, optional
+            The format of a `source` file - "csv", "json", "jsonl"
+            or "text". If not specified, this is inferred from the
+            file extension (.csv, .json, .jsonl, .ndjson), defaulting
+            to "text". A "json" file (a JSON array of records) is
+            read in full before it is scanned in chunks - use JSON
+            lines for large inputs.
+
+        Other Parameters
+        ----------------
+        kwargs :
+            Other parameters (e.g. `ioc_types`, `include_paths`,
+            `ignore_tlds`, `n_jobs`) are passed to `extract_df`.
+            If `n_jobs` is greater than 1, one pool of worker processes
+            is used for the whole input and each chunk is split
+            between the workers.
+
+        Yields
+        ------
+        pd.DataFrame
+            DataFrame of observables for each chunk of input that
+            contains any. SourceIndex is the row (or line) number
+            in the whole input.
+
+        Raises
+        ------
+        ValueError
+            If `columns` is not supplied for tabular input or
+            `file_format` is not recognized.
+
+        """
+        check_kwargs(kwargs, ["ioc_types", "include_paths", "ignore_tlds", "n_jobs"])
+        if isinstance(columns, str):
+            columns = [columns]
+        n_jobs = _get_n_jobs(kwargs.get("n_jobs", 1))
+        with ExitStack() as exit_stack:
+            executor = None
+            if n_jobs > 1:
+                # the worker pool is created once and used for all chunks
+                executor = exit_stack.enter_context(
+                    self._create_scan_executor(
+                        n_jobs, kwargs.get("ignore_tlds", False)
+                    )
+                )
+                kwargs["chunk_size"] = math.ceil(chunk_size / n_jobs)
+            for chunk, is_text in _read_chunks(source, chunk_size, file_format):
+                if is_text:
+                    chunk_cols = [_TEXT_COL]
+                elif columns:
+                    chunk_cols = columns
+                else:
+                    raise ValueError(
+                        "A value for the columns parameter is required "
+                        "for tabular input."
+                    )
+                result_df = self._extract_df(
+                    data=chunk, columns=chunk_cols, executor=executor, **kwargs
+                )
+                if not result_df.empty:
+                    yield result_df
 
     def _get_ioc_types_to_use(
         self, ioc_types: List[str], include_paths: bool
@@ -563,7 +717,7 @@ class IoCExtract:
         """If validate TLDS check with TLD list."""
         if self._ignore_tld:
             return True
-        return self._dom_validator.validate_tld(domain)
+        return self._validate_tld_cached(domain)
 
     def _scan_for_iocs(
         self, src: str, ioc_types: List[str] = None
@@ -572,48 +726,171 @@ class IoCExtract:
         ioc_results: Dict[str, Set] = defaultdict(set)
         iocs_found: Dict[str, Tuple[str, int]] = {}
 
-        # pylint: disable=too-many-nested-blocks
         for (ioc_type, rgx_def) in list(self._content_regex.items()):
             if ioc_types and ioc_type not in ioc_types:
                 continue
-
-            match_pos = 0
-            for rgx_match in rgx_def.comp_regex.finditer(src, match_pos):
-                if rgx_match is None:
-                    break
-                # If the rgx_def names a group to match on, use that
-                match_str = (
-                    rgx_match.groupdict()[rgx_def.group]
-                    if rgx_def.group
-                    else rgx_match.group()
-                )
-
-                if ioc_type == "dns" and not self._validate_tld(match_str):
-                    continue
-
-                self._add_highest_pri_match(iocs_found, match_str, rgx_def)
-                if ioc_type == "url":
-                    self._check_decode_url(
-                        match_str, rgx_def, match_pos, iocs_found)
-                match_pos = rgx_match.end()
+            for match_str, match_def in self._iter_matches(src, rgx_def):
+                self._add_highest_pri_match(iocs_found, match_str, match_def)
 
         for ioc, ioc_result in list(iocs_found.items()):
             ioc_results[ioc_result[0]].add(ioc)
 
         return ioc_results
 
-    def _check_decode_url(self, match_str, rgx_def, match_pos, iocs_found):
+    def _iter_matches(
+        self, src: str, rgx_def: IoCPattern
+    ) -> Iterable[Tuple[str, IoCPattern]]:
+        """Yield matched strings and the pattern that they should be typed as."""
+        match_pos = 0
+        for rgx_match in rgx_def.comp_regex.finditer(src, match_pos):
+            if rgx_match is None:
+                break
+            # If the rgx_def names a group to match on, use that
+            match_str = (
+                rgx_match.groupdict()[rgx_def.group]
+                if rgx_def.group
+                else rgx_match.group()
+            )
+
+            if rgx_def.ioc_type == "dns" and not self._validate_tld(match_str):
+                continue
+
+            yield match_str, rgx_def
+            if rgx_def.ioc_type == "url":
+                yield from self._check_decode_url(match_str, rgx_def, match_pos)
+            match_pos = rgx_match.end()
+
+    def _check_decode_url(self, match_str, rgx_def, match_pos):
         """Get any other IoCs from decoded URL."""
         decoded_url = unquote(match_str)
         for url_match in rgx_def.comp_regex.finditer(decoded_url, match_pos):
             if url_match is not None:
-                self._add_highest_pri_match(
-                    iocs_found, url_match.group(), rgx_def)
-                self._add_highest_pri_match(
-                    iocs_found,
-                    url_match.groupdict()["host"],
-                    self._content_regex["dns"],
+                yield url_match.group(), rgx_def
+                yield url_match.groupdict()["host"], self._content_regex["dns"]
+
+    def _scan_df(
+        self, data: pd.DataFrame, columns: List[str], ioc_types: List[str]
+    ) -> pd.DataFrame:
+        """
+        Return IoCs found in the `columns` of `data`.
+
+        Each column is scanned column-wise rather than row by row:
+        every distinct cell value is scanned only once and the
+        results are mapped back to the source rows in a single join.
+
+        """
+        col_results = []
+        for col_pos, col in enumerate(columns):
+            src_values = data[col].to_numpy()
+            value_ids, unique_values = pd.factorize(src_values)
+            col_matches = self._scan_values(unique_values, ioc_types)
+            if col_matches.empty:
+                continue
+            src_rows = pd.DataFrame(
+                {"ValueId": value_ids, "RowPos": np.arange(len(value_ids))}
+            )
+            col_matches = src_rows.merge(col_matches, on="ValueId", how="inner")
+            col_matches["ColPos"] = col_pos
+            col_matches["Input"] = src_values[col_matches["RowPos"].to_numpy()]
+            col_results.append(col_matches)
+
+        if not col_results:
+            return pd.DataFrame(columns=_RESULT_COLS)
+        result_df = pd.concat(col_results, ignore_index=True).sort_values(
+            ["RowPos", "ColPos"], kind="mergesort"
+        )
+        result_df["SourceIndex"] = data.index.take(result_df["RowPos"].to_numpy())
+        return result_df[_RESULT_COLS].reset_index(drop=True)
+
+    # pylint: disable=too-many-arguments
+    def _scan_df_chunked(
+        self,
+        data: pd.DataFrame,
+        columns: List[str],
+        ioc_types: List[str],
+        n_jobs: int = 1,
+        chunk_size: Optional[int] = None,
+        executor: Optional[Executor] = None,
+    ) -> pd.DataFrame:
+        """
+        Return IoCs found in `data`, scanning row chunks in worker processes.
+
+        If `executor` is supplied, it must have been created with
+        `_create_scan_executor`. Otherwise, a pool of `n_jobs` worker
+        processes is created for this call.
+
+        """
+        n_jobs = _get_n_jobs(n_jobs)
+        chunk_size = chunk_size or _DEF_CHUNK_SIZE
+        chunks = (
+            data.iloc[start : start + chunk_size][columns]
+            for start in range(0, len(data), chunk_size)
+        )
+        if n_jobs == 1 and executor is None:
+            chunk_results = [
+                self._scan_df(chunk, columns, ioc_types) for chunk in chunks
+            ]
+        else:
+            with ExitStack() as exit_stack:
+                if executor is None:
+                    executor = exit_stack.enter_context(
+                        self._create_scan_executor(n_jobs, self._ignore_tld)
+                    )
+                scan_chunk = partial(_scan_chunk, columns=columns, ioc_types=ioc_types)
+                # only a bounded number of chunks are submitted (and so
+                # copied to the workers) at a time, to bound memory use.
+                # Results are collected in submission order.
+                chunk_results = []
+                pending: Deque[Future] = deque()
+                for chunk in chunks:
+                    if len(pending) >= n_jobs * _MAX_PENDING_PER_JOB:
+                        chunk_results.append(pending.popleft().result())
+                    pending.append(executor.submit(scan_chunk, chunk))
+                chunk_results.extend(future.result() for future in pending)
+        # empty results have untyped columns, which would upcast the rest
+        chunk_results = [result for result in chunk_results if not result.empty]
+        if not chunk_results:
+            return pd.DataFrame(columns=_RESULT_COLS)
+        return pd.concat(chunk_results, ignore_index=True)
+
+    def _create_scan_executor(self, n_jobs: int, ignore_tld: bool) -> Executor:
+        """Return a process pool whose workers have this extractor's patterns."""
+        return ProcessPoolExecutor(
+            max_workers=n_jobs,
+            initializer=_init_scan_worker,
+            initargs=(self._content_regex, ignore_tld, self._tld_cache_size),
+        )
+
+    def _scan_values(
+        self, values: Iterable[Any], ioc_types: List[str] = None
+    ) -> pd.DataFrame:
+        """
+        Return IoCs found in a sequence of distinct values.
+
+        Each IoC pattern is run over all values in turn. Competing
+        matches of the same substring are then resolved in bulk,
+        keeping the highest priority match (the same rule as
+        `_add_highest_pri_match`).
+
+        """
+        values = [(val_id, val) for val_id, val in enumerate(values)
+                  if isinstance(val, str)]
+        found: List[Tuple[int, str, str, int]] = []
+        for (ioc_type, rgx_def) in list(self._content_regex.items()):
+            if ioc_types and ioc_type not in ioc_types:
+                continue
+            for val_id, src in values:
+                found.extend(
+                    (val_id, match_str, match_def.ioc_type, match_def.priority)
+                    for match_str, match_def in self._iter_matches(src, rgx_def)
                 )
+        matches = pd.DataFrame(
+            found, columns=["ValueId", "Observable", "IoCType", "Priority"]
+        )
+        # a stable sort keeps the first match found for equal priorities
+        return matches.sort_values("Priority", kind="mergesort").drop_duplicates(
+            ["ValueId", "Observable"]
+        )[["ValueId", "IoCType", "Observable"]]
 
     @staticmethod
     def _add_highest_pri_match(
@@ -631,8 +908,120 @@ class IoCExtract:
             current_def.ioc_type, current_def.priority)
 
 
+def _read_chunks(
+    source: Union[str, Path, Iterable[Any]], chunk_size: int, file_format: str = None
+) -> Iterator[Tuple[pd.DataFrame, bool]]:
+    """
+    Yield DataFrame chunks read from a file path or iterable.
+
+    Each chunk is paired with True if it was read from text input
+    (lines in a single `_TEXT_COL` column) or False if it is tabular.
+
+    """
+    if isinstance(source, (str, Path)):
+        src_path = Path(source)
+        if not src_path.is_file():
+            raise FileNotFoundError(f"File {source} not found.")
+        file_format = file_format or _STREAM_FORMATS.get(
+            src_path.suffix.casefold(), "text"
+        )
+        if file_format == "csv":
+            for chunk in pd.read_csv(src_path, chunksize=chunk_size):
+                yield chunk, False
+        elif file_format == "json":
+            data = pd.read_json(src_path, orient="records")
+            for start in range(0, len(data), chunk_size):
+                yield data.iloc[start : start + chunk_size], False
+        elif file_format == "jsonl":
+            for chunk in pd.read_json(src_path, lines=True, chunksize=chunk_size):
+                yield chunk, False
+        elif file_format == "text":
+            with open(src_path, "r", errors="replace") as src_file:
+                yield from _batch_items(
+                    (line.rstrip("\r\n") for line in src_file), chunk_size
+                )
+        else:
+            raise ValueError(
+                f"Unknown file_format {file_format}. Valid formats are "
+                + ", ".join(sorted({*_STREAM_FORMATS.values(), "text"}))
+            )
+        return
+    yield from _batch_items(source, chunk_size)
+
+
+def _get_n_jobs(n_jobs: Optional[int]) -> int:
+    """Return the number of worker processes (all CPUs if None or < 1)."""
+    if n_jobs is None or n_jobs < 1:
+        return os.cpu_count() or 1
+    return n_jobs
+
+
+def _batch_items(
+    items: Iterable[Any], chunk_size: int
+) -> Iterator[Tuple[pd.DataFrame, bool]]:
+    """
+    Group strings or records into DataFrames, passing DataFrames through.
+
+    All chunks (including DataFrames) are re-indexed with the
+    row number in the whole input.
+
+    """
+    row_offset = 0
+    batch: List[Any] = []
+    for item in items:
+        if isinstance(item, pd.DataFrame):
+            if batch:
+                yield _items_to_df(batch, row_offset)
+                row_offset += len(batch)
+                batch = []
+            index = pd.RangeIndex(row_offset, row_offset + len(item))
+            yield item.set_axis(index, axis=0), False
+            row_offset += len(item)
+            continue
+        batch.append(item)
+        if len(batch) >= chunk_size:
+            yield _items_to_df(batch, row_offset)
+            row_offset += len(batch)
+            batch = []
+    if batch:
+        yield _items_to_df(batch, row_offset)
+
+
+def _items_to_df(batch: List[Any], row_offset: int) -> Tuple[pd.DataFrame, bool]:
+    """Return a DataFrame of strings or records indexed from `row_offset`."""
+    index = pd.RangeIndex(row_offset, row_offset + len(batch))
+    if isinstance(batch[0], str):
+        return pd.DataFrame({_TEXT_COL: batch}, index=index), True
+    return pd.DataFrame.from_records(batch, index=index), False
+
+
+# Per-process extractor used by _scan_df_chunked worker processes
+_SCAN_WORKER: Optional[IoCExtract] = None
+
+
+def _init_scan_worker(
+    ioc_patterns: Dict[str, IoCPattern],
+    ignore_tld: bool,
+    tld_cache_size: Optional[int],
+):
+    """Build the worker extractor once, with the parent's patterns."""
+    global _SCAN_WORKER  # pylint: disable=global-statement
+    _SCAN_WORKER = IoCExtract(tld_cache_size=tld_cache_size)
+    # use an instance copy so that the class-level defaults are untouched
+    _SCAN_WORKER._content_regex = dict(ioc_patterns)
+    _SCAN_WORKER._ignore_tld = ignore_tld
+
+
+def _scan_chunk(
+    chunk: pd.DataFrame, columns: List[str], ioc_types: List[str]
+) -> pd.DataFrame:
+    """Return IoCs found in a chunk of rows (run in a worker process)."""
+    # pylint: disable=protected-access
+    return _SCAN_WORKER._scan_df(chunk, columns, ioc_types)  # type: ignore
+
+
 # pylint: disable=too-few-public-methods
-@pd.api.extensions.register_dataframe_accessor("mp_ioc")
+# registered as the "mp_ioc" DataFrame accessor in msticpy/__init__.py
 class IoCExtractAccessor:
     """Pandas api extension for IoC Extractor."""
 
@@ -660,6 +1049,13 @@ class IoCExtractAccessor:
             (the default is false - excludes 'windows_path'
             and 'linux_path'). If `ioc_types` is specified
             this parameter is ignored.
+        n_jobs : int, optional
+            The number of worker processes to use. If greater than 1
+            the input is split into row chunks that are scanned in
+            parallel. -1 uses all available CPUs. (the default is 1)
+        chunk_size : int, optional
+            The number of rows in each chunk (the default is 100,000
+            if `n_jobs` is greater than 1).
 
         Returns
         -------
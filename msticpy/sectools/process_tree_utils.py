@@ -4,9 +4,14 @@
 # license information.
 # --------------------------------------------------------------------------
 """Process Tree Visualization."""
-from typing import Any, Dict, Iterable, Optional, Union
+import heapq
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 import attr
+import numpy as np
 import pandas as pd
 
 from .._version import VERSION
@@ -140,6 +145,8 @@ def build_process_tree(
     schema: ProcSchema = None,
     show_progress: bool = False,
     debug: bool = False,
+    partition_by: Union[str, List[str], None] = None,
+    max_workers: Optional[int] = None,
 ) -> pd.DataFrame:
     """
     Build process trees from the process events.
@@ -157,49 +164,200 @@ def build_process_tree(
     debug : bool
         If True produces extra debugging output,
         by default False
+    partition_by : Union[str, List[str], None], optional
+        Column or columns (e.g. "Computer" or ["TenantId", "Computer"])
+        to partition the data by. Parent processes are only matched
+        within the same partition. The partitions are split into
+        chunks that are processed in parallel in a process pool.
+        By default, the data is not partitioned.
+    max_workers : Optional[int], optional
+        The maximum number of worker processes, by default the
+        number of CPUs. If 1, the data is processed in the
+        current process.
 
     Returns
     -------
     pd.DataFrame
         Process tree dataframe.
 
+    Notes
+    -----
+    If a process key is duplicated in more than one partition, the
+    keys in each of these partitions are prefixed with the partition
+    value(s) (e.g. "host1|cmd.exe0x1234...") so that all keys are unique.
+
     """
     # If schema is none, infer schema from columns
     if not schema:
         schema = infer_schema(procs)
 
     data_len = len(procs)
-    section_len = int(data_len / 4)
     progress_ui = Progress(completed_len=data_len * 2, visible=show_progress)
 
+    if partition_by:
+        merged_procs_keys = _build_partitioned_proc_keys(
+            procs, schema, partition_by, max_workers, progress_ui, debug
+        )
+    else:
+        merged_procs_keys = _build_proc_keys(procs, schema, debug, progress_ui)
+        if merged_procs_keys is None:
+            raise ValueError("No process events found in the data.")
+
+    # Build process paths
+    proc_tree = _build_proc_tree(merged_procs_keys, progress_ui)
+
+    if show_progress:
+        print((get_summary_info(proc_tree)))
+    return proc_tree
+
+
+def _build_proc_keys(
+    procs: pd.DataFrame,
+    schema: ProcSchema,
+    debug: bool = False,
+    progress_ui: Optional[Progress] = None,
+    partition_by: Optional[List[str]] = None,
+) -> Optional[pd.DataFrame]:
+    """Return processes with parent and process keys."""
+    section_len = int(len(procs) / 4)
+
     # Clean data
     procs_cln = _clean_proc_data(procs, schema)
-    progress_ui.update_progress(delta=section_len)
+    if progress_ui:
+        progress_ui.update_progress(delta=section_len)
+    if procs_cln.empty:
+        return None
 
     # Merge parent-child
-    merged_procs = _merge_parent_by_time(procs_cln, schema)
+    merged_procs = _merge_parent_by_time(procs_cln, schema, partition_by)
     if debug:
         _check_merge_status(procs_cln, merged_procs, schema)
-    progress_ui.update_progress(delta=section_len)
+    if progress_ui:
+        progress_ui.update_progress(delta=section_len)
 
     # extract inferred parents
-    merged_procs_par = _extract_inferred_parents(merged_procs, schema)
+    merged_procs_par = _extract_inferred_parents(merged_procs, schema, partition_by)
     if debug:
         _check_inferred_parents(merged_procs, merged_procs_par)
-    progress_ui.update_progress(delta=section_len)
+    if progress_ui:
+        progress_ui.update_progress(delta=section_len)
 
     # create parent-child keys
-    merged_procs_keys = _assign_proc_keys(merged_procs_par, schema)
+    merged_procs_keys = _assign_proc_keys(merged_procs_par, schema, partition_by)
     if debug:
         _check_proc_keys(merged_procs_keys, schema)
-    progress_ui.update_progress(delta=section_len)
+    if progress_ui:
+        progress_ui.update_progress(delta=section_len)
+    return merged_procs_keys
 
-    # Build process paths
-    proc_tree = _build_proc_tree(merged_procs_keys, progress_ui)
 
-    if show_progress:
-        print((get_summary_info(proc_tree)))
-    return proc_tree
+def _build_partitioned_proc_keys(
+    procs: pd.DataFrame,
+    schema: ProcSchema,
+    partition_by: Union[str, List[str]],
+    max_workers: Optional[int],
+    progress_ui: Progress,
+    debug: bool = False,
+) -> pd.DataFrame:
+    """Build process keys for partitions of the data in a process pool."""
+    if isinstance(partition_by, str):
+        partition_by = [partition_by]
+    n_workers = max_workers or os.cpu_count() or 1
+    if n_workers == 1:
+        chunks = [procs]
+    else:
+        # Split the partitions into chunks of similar size - several
+        # per worker. Each chunk may contain many (small) partitions.
+        part_ids = procs.groupby(partition_by, sort=False, dropna=False).ngroup()
+        chunk_ids = _assign_chunks(
+            np.bincount(part_ids.to_numpy()), n_chunks=n_workers * 4
+        )[part_ids.to_numpy()]
+        chunks = [chunk for _, chunk in procs.groupby(chunk_ids, sort=False)]
+
+    build_args = (repeat(schema), repeat(debug), repeat(None), repeat(partition_by))
+    if len(chunks) == 1:
+        chunk_results = map(_build_proc_keys, chunks, *build_args)
+        chunk_keys = _collect_chunks(chunk_results, chunks, progress_ui)
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            chunk_results = executor.map(_build_proc_keys, chunks, *build_args)
+            chunk_keys = _collect_chunks(chunk_results, chunks, progress_ui)
+
+    if not chunk_keys:
+        raise ValueError("No process events found in the data.")
+    return _concat_chunks(chunk_keys, partition_by)
+
+
+def _assign_chunks(part_sizes: np.ndarray, n_chunks: int) -> np.ndarray:
+    """Return the chunk number for each partition balancing chunk sizes."""
+    chunk_heap = [(0, chunk_id) for chunk_id in range(min(n_chunks, len(part_sizes)))]
+    part_chunks = np.zeros(len(part_sizes), dtype=np.int64)
+    # add the largest remaining partition to the smallest chunk
+    for part_id in np.argsort(part_sizes)[::-1]:
+        chunk_size, chunk_id = heapq.heappop(chunk_heap)
+        part_chunks[part_id] = chunk_id
+        heapq.heappush(chunk_heap, (chunk_size + part_sizes[part_id], chunk_id))
+    return part_chunks
+
+
+def _collect_chunks(
+    chunk_results: Iterable[Optional[pd.DataFrame]],
+    chunks: List[pd.DataFrame],
+    progress_ui: Progress,
+) -> List[pd.DataFrame]:
+    """Return the chunk results updating progress."""
+    chunk_keys = []
+    for chunk, result in zip(chunks, chunk_results):
+        if result is not None:
+            chunk_keys.append(result)
+        progress_ui.update_progress(delta=len(chunk))
+    return chunk_keys
+
+
+def _concat_chunks(
+    chunk_keys: List[pd.DataFrame], partition_by: List[str]
+) -> pd.DataFrame:
+    """Concatenate the chunks with unique process keys and source_index."""
+    index_offset = 0
+    for chunk in chunk_keys:
+        # offset the source_index so that it is unique across chunks
+        src_index = chunk["source_index"].astype(int)
+        chunk["source_index"] = (src_index + index_offset).astype(str)
+        index_offset += src_index.max() + 1
+    proc_keys = pd.concat(chunk_keys).reset_index()
+    # decide which keys need qualifying once, over all of the partitions,
+    # so that the keys do not depend on how the data was chunked
+    _qualify_dup_keys(proc_keys, partition_by)
+    return proc_keys.set_index("proc_key")
+
+
+def _partition_labels(procs: pd.DataFrame, partition_by: List[str]) -> pd.Series:
+    """Return the partition value(s) of each row - "value1|value2"."""
+    labels = procs[partition_by[0]].astype(str)
+    for col in partition_by[1:]:
+        labels = labels + "|" + procs[col].astype(str)
+    return labels
+
+
+def _qualify_dup_keys(procs: pd.DataFrame, partition_by: List[str]):
+    """
+    Make process keys unique across partitions.
+
+    Process keys that occur in more than one partition are prefixed
+    with the partition value(s) - "value1|value2|proc_key". The
+    "proc_key" and "parent_key" columns of `procs` are updated in place.
+    """
+    labels = _partition_labels(procs, partition_by)
+    key_labels = pd.DataFrame(
+        {"key": procs["proc_key"], "label": labels}
+    ).drop_duplicates()
+    dup_keys = key_labels.loc[key_labels["key"].duplicated(keep=False), "key"]
+    if dup_keys.empty:
+        return
+    # a parent is in the same partition as its children
+    for key_col in ("proc_key", "parent_key"):
+        is_dup = procs[key_col].isin(dup_keys)
+        procs.loc[is_dup, key_col] = labels[is_dup] + "|" + procs.loc[is_dup, key_col]
 
 
 def infer_schema(data: Union[pd.DataFrame, pd.Series]) -> ProcSchema:
@@ -266,8 +424,10 @@ def _clean_proc_data(procs: pd.DataFrame, schema: ProcSchema) -> pd.DataFrame:
 
 def _merge_parent_by_time(
         procs: pd.DataFrame,
-        schema: ProcSchema) -> pd.DataFrame:
+        schema: ProcSchema,
+        partition_by: Optional[List[str]] = None) -> pd.DataFrame:
     """Merge procs with parents using merge_asof."""
+    partition_by = partition_by or []
     parent_procs = (
         procs[
             [
@@ -278,6 +438,7 @@ def _merge_parent_by_time(
                 schema.parent_id,
                 schema.time_stamp,
                 schema.process_name,
+                *partition_by,
             ]
         ]
         .assign(TimeGenerated_orig_par=procs[schema.time_stamp])
@@ -291,6 +452,9 @@ def _merge_parent_by_time(
     else:
         par_join_cols = [schema.process_id]
         child_join_cols = [schema.parent_id]
+    # parents must be in the same partition (e.g. host)
+    par_join_cols += partition_by
+    child_join_cols += partition_by
     # merge_asof merges on the "by" fields and then the closest time
     # match in the time_stamp field. The default is to look backwards
     # for a match on the right of the join (parent) that is a time earlier
@@ -306,7 +470,9 @@ def _merge_parent_by_time(
 
 
 def _extract_inferred_parents(
-    merged_procs: pd.DataFrame, schema: ProcSchema
+    merged_procs: pd.DataFrame,
+    schema: ProcSchema,
+    partition_by: Optional[List[str]] = None,
 ) -> pd.DataFrame:
     """Find any inferred parents and creates rows for them."""
     tz_aware = merged_procs.iloc[0][schema.time_stamp].tz
@@ -335,6 +501,9 @@ def _extract_inferred_parents(
     merged_procs.loc[root_procs_crit, "TimeGenerated_orig_par"] = time_zero
 
     # Extract synthentic rows for the parents of root processes
+    extra_cols = [
+        col for col in partition_by or [] if col not in ("TenantId", "Computer")
+    ]
     inferred_parents = (merged_procs[root_procs_crit][["TenantId",
                                                        "EventID",
                                                        "Computer",
@@ -342,6 +511,7 @@ def _extract_inferred_parents(
                                                        "EffectiveLogonId_par",
                                                        "ParentProcessName",
                                                        "parent_proc_lc",
+                                                       *extra_cols,
                                                        ]] .rename(columns={schema.parent_id: schema.process_id,
                                                                            "ParentProcessName": schema.process_name,
                                                                            "parent_proc_lc": "new_process_lc",
@@ -355,7 +525,9 @@ def _extract_inferred_parents(
 
 
 def _assign_proc_keys(
-    merged_procs_par: pd.DataFrame, schema: ProcSchema
+    merged_procs_par: pd.DataFrame,
+    schema: ProcSchema,
+    partition_by: Optional[List[str]] = None,
 ) -> pd.DataFrame:
     """Create process and parent keys for unambiguous par-child relation."""
     # Create Process Key
@@ -375,12 +547,21 @@ def _assign_proc_keys(
         .dt.strftime(TS_FMT_STRING)
     )
     proc_tree = merged_procs_par.copy()
+    if partition_by:
+        # The same key may occur in several partitions. The keys are made
+        # unique when the partitions are combined (see _concat_chunks) - here
+        # the partition is included when comparing keys.
+        labels = _partition_labels(proc_tree, partition_by) + "|"
+        proc_ids = labels + proc_tree["proc_key"]
+        parent_ids = labels + proc_tree["parent_key"]
+    else:
+        proc_ids = proc_tree["proc_key"]
+        parent_ids = proc_tree["parent_key"]
     # Create labels based on node type
-    ppids = proc_tree[["parent_key"]].set_index("parent_key")
     proc_tree = proc_tree.assign(IsRoot=False, IsLeaf=False, IsBranch=False)
 
     is_root = proc_tree["parent_key"].isna()
-    has_child = proc_tree["proc_key"].isin(ppids.index)
+    has_child = proc_ids.isin(parent_ids.dropna())
     proc_tree.loc[is_root, "IsRoot"] = True
     proc_tree.loc[~has_child, "IsLeaf"] = True
     proc_tree.loc[~is_root & has_child, "IsBranch"] = True
@@ -390,58 +571,283 @@ def _assign_proc_keys(
     # Set the index of the output frame to be the proc_key
     proc_tree = proc_tree.set_index("proc_key")
 
-    first_unique = proc_tree.index.duplicated()
+    first_unique = proc_ids.duplicated().to_numpy()
     proc_tree = proc_tree[~first_unique]
     return proc_tree
 
 
 def _build_proc_tree(input_tree, progress: Progress, max_depth=-1):
     """Build process tree paths."""
+    parent_pos = _get_parent_pos(input_tree)
+    src_index = input_tree["source_index"].to_numpy(dtype=object)
     # set default path == current process ID
-    input_tree["path"] = input_tree["source_index"]
-
-    cur_level = input_tree[input_tree["IsRoot"]]
+    paths = src_index.copy()
+    parent_index = np.full(len(input_tree), np.nan, dtype=object)
 
     cur_level_num = 0
-    progress.update_progress(delta=len(cur_level))
-    while True:
-        sel_crit = input_tree["parent_key"].isin(cur_level.index)
-        next_level = input_tree[sel_crit].copy()
-
-        if next_level.empty:
-            progress.update_progress(new_total=progress.max)
-            break
-        if max_depth != -1 and cur_level_num >= max_depth:
-            print(f"max path depth reached: {cur_level_num}")
+    for level_procs, level_parents in _iter_tree_levels(
+        parent_pos, input_tree["IsRoot"].to_numpy()
+    ):
+        progress.update_progress(delta=len(level_procs))
+        if cur_level_num == 0:
+            cur_level_num += 1
+            continue
+        if max_depth != -1 and cur_level_num > max_depth:
+            print(f"max path depth reached: {cur_level_num - 1}")
             print(
                 f"processed {progress.value} of {progress.max} for specified depth of {max_depth}"
             )
-            progress.update_progress(new_total=progress.max)
             break
-
-        # merge next level with current level
-        tmp_df = next_level.merge(
-            cur_level[["source_index", "path"]],
-            how="inner",
-            left_on="parent_key",
-            right_index=True,
-        )
-
         # Build the path of these processes
         # = parent_path + child source_index
-        next_level.loc[tmp_df.index, "path"] = (
-            tmp_df["path_y"] + "/" + tmp_df["source_index_x"]
-        )
-        input_tree.loc[next_level.index, "path"] = next_level["path"]
-        input_tree.loc[tmp_df.index, "parent_index"] = tmp_df["source_index_y"]
-
-        cur_level = next_level
+        paths[level_procs] = paths[level_parents] + "/" + src_index[level_procs]
+        parent_index[level_procs] = src_index[level_parents]
         cur_level_num += 1
-        progress.update_progress(delta=len(cur_level))
 
+    progress.update_progress(new_total=progress.max)
+    input_tree["path"] = paths
+    if cur_level_num > 1:
+        input_tree["parent_index"] = parent_index
     return input_tree
 
 
+def _iter_tree_levels(
+    parent_pos: np.ndarray, is_root: np.ndarray
+) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Return the process row numbers of each level of the process trees.
+
+    Parameters
+    ----------
+    parent_pos : np.ndarray
+        The row number of the parent of each process (-1 for no parent)
+    is_root : np.ndarray
+        Boolean array - True for root processes.
+
+    Yields
+    ------
+    Tuple[np.ndarray, np.ndarray]
+        The row numbers of the processes at each level and of their
+        parents, starting with the root processes.
+        Processes that are not descended from a root process are
+        not returned.
+
+    """
+    children, child_offsets = _group_children(parent_pos)
+    child_counts = np.diff(child_offsets)
+
+    cur_level = np.flatnonzero(is_root)
+    level_parents = np.full(len(cur_level), -1)
+    while len(cur_level):
+        yield cur_level, level_parents
+        counts = child_counts[cur_level]
+        if not counts.sum():
+            break
+        # row numbers of the children of all processes in the current level
+        level_parents = np.repeat(cur_level, counts)
+        level_starts = np.cumsum(counts) - counts
+        child_pos = np.arange(counts.sum()) + np.repeat(
+            child_offsets[cur_level] - level_starts, counts
+        )
+        cur_level = children[child_pos]
+
+
+def _group_children(parent_pos: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Return child row numbers grouped by parent.
+
+    The children of the process at row `i` are
+    `children[child_offsets[i]:child_offsets[i + 1]]` (in row order).
+    """
+    has_parent = parent_pos >= 0
+    children = np.flatnonzero(has_parent)
+    children = children[np.argsort(parent_pos[children], kind="stable")]
+    child_counts = np.bincount(parent_pos[has_parent], minlength=len(parent_pos))
+    return children, np.concatenate([[0], np.cumsum(child_counts)])
+
+
+def _get_parent_pos(procs: pd.DataFrame) -> np.ndarray:
+    """Return the row number of the parent of each process (-1 for no parent)."""
+    parent_pos = procs.index.get_indexer(procs["parent_key"])
+    parent_pos[procs["parent_key"].isna().to_numpy()] = -1
+    return parent_pos
+
+
+class ProcessTreeIndex:
+    """
+    Index for navigating a process tree.
+
+    The index is built once from the output of `build_process_tree`.
+    It holds the child processes of each process and a pre-order
+    numbering of the process trees so that children, descendents,
+    ancestors and subtree sizes are found without scanning the
+    whole process DataFrame.
+
+    The index can be passed in place of the process DataFrame to
+    the process tree functions (`get_children`, `get_descendents`,
+    `get_ancestors`, `get_siblings`, `get_root`, etc.).
+
+    Notes
+    -----
+    The index is not updated if the process DataFrame is changed.
+
+    """
+
+    def __init__(self, procs: pd.DataFrame):
+        """
+        Build the index.
+
+        Parameters
+        ----------
+        procs : pd.DataFrame
+            Process tree DataFrame returned by `build_process_tree`.
+
+        Raises
+        ------
+        ValueError
+            If the process keys (the DataFrame index) are not unique.
+
+        """
+        if not procs.index.is_unique:
+            raise ValueError("Process keys (DataFrame index) must be unique.")
+        self.procs = procs
+        n_procs = len(procs)
+        parent_pos = _get_parent_pos(procs)
+
+        self.depth = np.full(n_procs, -1)
+        self.root = np.full(n_procs, -1)
+        self.subtree_size = np.ones(n_procs, dtype=np.int64)
+        # pre-order number of each process and the process at each number
+        self.preorder = np.full(n_procs, -1)
+        levels = list(_iter_tree_levels(parent_pos, parent_pos < 0))
+        n_visited = sum(len(level_procs) for level_procs, _ in levels)
+        if n_visited < n_procs:
+            # processes in a parent cycle are not descended from any
+            # root process - treat each of these as a root process
+            visited = np.zeros(n_procs, dtype=bool)
+            for level_procs, _ in levels:
+                visited[level_procs] = True
+            parent_pos[~visited] = -1
+            levels = list(_iter_tree_levels(parent_pos, parent_pos < 0))
+        self.parent = parent_pos
+        self.children, self.child_offsets = _group_children(parent_pos)
+
+        # sum the subtree sizes from the leaves up
+        for level_procs, level_parents in reversed(levels[1:]):
+            np.add.at(self.subtree_size, level_parents, self.subtree_size[level_procs])
+        # number the processes from the roots down - the descendents of
+        # a process follow it in sequence in the pre-order numbering.
+        for depth, (level_procs, level_parents) in enumerate(levels):
+            sizes = self.subtree_size[level_procs]
+            # offset of each process after its preceding siblings
+            sibling_offset = np.cumsum(sizes) - sizes
+            if depth == 0:
+                self.preorder[level_procs] = sibling_offset
+                self.root[level_procs] = level_procs
+            else:
+                group_start = np.r_[True, level_parents[1:] != level_parents[:-1]]
+                first_sibling = np.maximum.accumulate(
+                    np.where(group_start, np.arange(len(level_procs)), 0)
+                )
+                sibling_offset -= sibling_offset[first_sibling]
+                self.preorder[level_procs] = (
+                    self.preorder[level_parents] + 1 + sibling_offset
+                )
+                self.root[level_procs] = self.root[level_parents]
+            self.depth[level_procs] = depth
+        self.preorder_procs = np.empty(n_procs, dtype=np.int64)
+        self.preorder_procs[self.preorder] = np.arange(n_procs)
+
+    def __len__(self) -> int:
+        """Return the number of processes in the index."""
+        return len(self.procs)
+
+    def get_pos(self, source: Union[str, pd.Series]) -> int:
+        """
+        Return the row number of a process.
+
+        Parameters
+        ----------
+        source : Union[str, pd.Series]
+            process key of the process or the process row
+
+        Returns
+        -------
+        int
+            The row number of the process in `procs`.
+
+        """
+        if isinstance(source, pd.Series):
+            source = source.name
+        return self.procs.index.get_loc(source)
+
+    def children_pos(self, pos: int) -> np.ndarray:
+        """Return the row numbers of the children of the process at `pos`."""
+        return self.children[self.child_offsets[pos] : self.child_offsets[pos + 1]]
+
+    def descendents_pos(self, pos: int, max_levels: int = -1) -> np.ndarray:
+        """Return the row numbers of the descendents of the process at `pos`."""
+        first = self.preorder[pos] + 1
+        desc_pos = self.preorder_procs[first : first + self.subtree_size[pos] - 1]
+        if max_levels != -1:
+            desc_pos = desc_pos[self.depth[desc_pos] - self.depth[pos] <= max_levels]
+        return desc_pos
+
+    def ancestors_pos(self, pos: int) -> np.ndarray:
+        """Return the row numbers of the ancestors of the process at `pos`."""
+        ancestors = []
+        pos = self.parent[pos]
+        while pos >= 0:
+            ancestors.append(pos)
+            pos = self.parent[pos]
+        return np.array(ancestors[::-1], dtype=np.int64)
+
+    def get_subtree_size(self, source: Union[str, pd.Series]) -> int:
+        """
+        Return the number of processes in the tree below a process.
+
+        Parameters
+        ----------
+        source : Union[str, pd.Series]
+            process key of the process or the process row
+
+        Returns
+        -------
+        int
+            Number of processes in the subtree (including the process).
+
+        """
+        return int(self.subtree_size[self.get_pos(source)])
+
+    def is_descendent(
+        self, source: Union[str, pd.Series], ancestor: Union[str, pd.Series]
+    ) -> bool:
+        """
+        Return True if `source` is a descendent of `ancestor`.
+
+        Parameters
+        ----------
+        source : Union[str, pd.Series]
+            process key of the process or the process row
+        ancestor : Union[str, pd.Series]
+            process key of the ancestor process or the process row
+
+        Returns
+        -------
+        bool
+            True if `source` is in the subtree below `ancestor`.
+
+        """
+        src_order = self.preorder[self.get_pos(source)]
+        anc_pos = self.get_pos(ancestor)
+        anc_order = self.preorder[anc_pos]
+        return anc_order < src_order < anc_order + self.subtree_size[anc_pos]
+
+    def rows(self, positions: Iterable[int]) -> pd.DataFrame:
+        """Return the process rows at `positions`."""
+        return self.procs.iloc[np.asarray(positions, dtype=np.int64)]
+
+
 def get_process_key(procs: pd.DataFrame, source_index: int) -> str:
     """
     Return the process key of the process given its source_index.
@@ -491,14 +897,32 @@ def build_process_key(
     return f"{proc_path}{pid}{tstamp}"
 
 
-def get_roots(procs: pd.DataFrame) -> pd.DataFrame:
+ProcsOrIndex = Union[pd.DataFrame, ProcessTreeIndex]
+
+
+def _get_procs(procs: ProcsOrIndex) -> pd.DataFrame:
+    """Return the process DataFrame."""
+    return procs.procs if isinstance(procs, ProcessTreeIndex) else procs
+
+
+def _append_proc(procs: pd.DataFrame, proc: pd.Series, proc_tree: pd.DataFrame):
+    """Return `procs` with the `proc` row added."""
+    if proc.name in proc_tree.index:
+        proc_row = proc_tree.loc[[proc.name]]
+    else:
+        proc_row = proc.to_frame().T
+    return pd.concat([procs, proc_row])
+
+
+def get_roots(procs: ProcsOrIndex) -> pd.DataFrame:
     """
     Return the process tree roots for the current data set.
 
     Parameters
     ----------
-    procs : pd.DataFrame
+    procs : Union[pd.DataFrame, ProcessTreeIndex]
         Process events (with process tree metadata)
+        or ProcessTreeIndex
 
     Returns
     -------
@@ -506,10 +930,11 @@ def get_roots(procs: pd.DataFrame) -> pd.DataFrame:
         Process Tree root processes
 
     """
+    procs = _get_procs(procs)
     return procs[procs["IsRoot"]]
 
 
-def get_process(procs: pd.DataFrame,
+def get_process(procs: ProcsOrIndex,
                 source: Union[str,
                               pd.Series]) -> pd.Series:
     """
@@ -517,8 +942,9 @@ def get_process(procs: pd.DataFrame,
 
     Parameters
     ----------
-    procs : pd.DataFrame
+    procs : Union[pd.DataFrame, ProcessTreeIndex]
         Process events (with process tree metadata)
+        or ProcessTreeIndex
     source : Union[str, pd.Series]
         source_index of process or the process row
 
@@ -534,22 +960,23 @@ def get_process(procs: pd.DataFrame,
 
     """
     if isinstance(source, str):
-        return procs.loc[source]
+        return _get_procs(procs).loc[source]
     if isinstance(source, pd.Series):
         return source
     raise ValueError("Unknown type for source parameter.")
 
 
 def get_parent(
-    procs: pd.DataFrame, source: Union[str, pd.Series]
+    procs: ProcsOrIndex, source: Union[str, pd.Series]
 ) -> Optional[pd.Series]:
     """
     Return the parent of the source process.
 
     Parameters
     ----------
-    procs : pd.DataFrame
+    procs : Union[pd.DataFrame, ProcessTreeIndex]
         Process events (with process tree metadata)
+        or ProcessTreeIndex
     source : Union[str, pd.Series]
         source_index of process or the process row
 
@@ -559,20 +986,24 @@ def get_parent(
         Parent Process row or None if no parent was found.
 
     """
+    if isinstance(procs, ProcessTreeIndex):
+        parent_pos = procs.parent[procs.get_pos(source)]
+        return procs.procs.iloc[parent_pos] if parent_pos >= 0 else None
     proc = get_process(procs, source)
     if proc.parent_key in procs.index:
         return procs.loc[proc.parent_key]
     return None
 
 
-def get_root(procs: pd.DataFrame, source: Union[str, pd.Series]) -> pd.Series:
+def get_root(procs: ProcsOrIndex, source: Union[str, pd.Series]) -> pd.Series:
     """
     Return the root process for the source process.
 
     Parameters
     ----------
-    procs : pd.DataFrame
+    procs : Union[pd.DataFrame, ProcessTreeIndex]
         Process events (with process tree metadata)
+        or ProcessTreeIndex
     source : Union[str, pd.Series]
         source_index of process or the process row
 
@@ -582,13 +1013,15 @@ def get_root(procs: pd.DataFrame, source: Union[str, pd.Series]) -> pd.Series:
         Root process
 
     """
+    if isinstance(procs, ProcessTreeIndex):
+        return procs.procs.iloc[procs.root[procs.get_pos(source)]]
     proc = get_process(procs, source)
     p_path = proc.path.split("/")
     root_proc = procs[procs["source_index"] == p_path[0]]
     return root_proc.iloc[0]
 
 
-def get_root_tree(procs: pd.DataFrame,
+def get_root_tree(procs: ProcsOrIndex,
                   source: Union[str,
                                 pd.Series]) -> pd.DataFrame:
     """
@@ -596,8 +1029,9 @@ def get_root_tree(procs: pd.DataFrame,
 
     Parameters
     ----------
-    procs : pd.DataFrame
+    procs : Union[pd.DataFrame, ProcessTreeIndex]
         Process events (with process tree metadata)
+        or ProcessTreeIndex
     source : Union[str, pd.Series]
         source_index of process or the process row
 
@@ -607,19 +1041,25 @@ def get_root_tree(procs: pd.DataFrame,
         Process Tree
 
     """
+    if isinstance(procs, ProcessTreeIndex):
+        root_pos = procs.root[procs.get_pos(source)]
+        return procs.rows(
+            np.sort(np.append(procs.descendents_pos(root_pos), root_pos))
+        )
     proc = get_process(procs, source)
     p_path = proc.path.split("/")
     return procs[procs["path"].str.startswith(p_path[0])]
 
 
-def get_tree_depth(procs: pd.DataFrame) -> int:
+def get_tree_depth(procs: ProcsOrIndex) -> int:
     """
     Return the depth of the process tree.
 
     Parameters
     ----------
-    procs : pd.DataFrame
+    procs : Union[pd.DataFrame, ProcessTreeIndex]
         Process events (with process tree metadata)
+        or ProcessTreeIndex
 
     Returns
     -------
@@ -627,19 +1067,20 @@ def get_tree_depth(procs: pd.DataFrame) -> int:
         Tree depth
 
     """
-    return procs["path"].str.count("/").max() + 1
+    return _get_procs(procs)["path"].str.count("/").max() + 1
 
 
 def get_children(
-    procs: pd.DataFrame, source: Union[str, pd.Series], include_source: bool = True
+    procs: ProcsOrIndex, source: Union[str, pd.Series], include_source: bool = True
 ) -> pd.DataFrame:
     """
     Return the child processes for the source process.
 
     Parameters
     ----------
-    procs : pd.DataFrame
+    procs : Union[pd.DataFrame, ProcessTreeIndex]
         Process events (with process tree metadata)
+        or ProcessTreeIndex
     source : Union[str, pd.Series]
         source_index of process or the process row
     include_source : bool, optional
@@ -652,14 +1093,17 @@ def get_children(
 
     """
     proc = get_process(procs, source)
-    children = procs[procs["parent_key"] == proc.name]
+    if isinstance(procs, ProcessTreeIndex):
+        children = procs.rows(procs.children_pos(procs.get_pos(proc)))
+    else:
+        children = procs[procs["parent_key"] == proc.name]
     if include_source:
-        return children.append(proc)
+        return _append_proc(children, proc, _get_procs(procs))
     return children
 
 
 def get_descendents(
-    procs: pd.DataFrame,
+    procs: ProcsOrIndex,
     source: Union[str, pd.Series],
     include_source: bool = True,
     max_levels: int = -1,
@@ -669,8 +1113,9 @@ def get_descendents(
 
     Parameters
     ----------
-    procs : pd.DataFrame
+    procs : Union[pd.DataFrame, ProcessTreeIndex]
         Process events (with process tree metadata)
+        or ProcessTreeIndex
     source : Union[str, pd.Series]
         source_index of process or the process row
     include_source : bool, optional
@@ -685,29 +1130,34 @@ def get_descendents(
 
     """
     proc = get_process(procs, source)
-    descendents = []
-    parent_keys = [proc.name]
-    level = 0
-    while max_levels == -1 or level < max_levels:
-        children = procs[procs["parent_key"].isin(parent_keys)]
-        if children.empty:
-            break
-        descendents.append(children)
-        parent_keys = children.index
-        level += 1
-
-    if descendents:
-        desc_procs = pd.concat(descendents)
+    if isinstance(procs, ProcessTreeIndex):
+        desc_procs = procs.rows(
+            procs.descendents_pos(procs.get_pos(proc), max_levels=max_levels)
+        )
     else:
-        desc_procs = pd.DataFrame(columns=proc.index, index=None)
-        desc_procs.index.name = "proc_key"
+        descendents = []
+        parent_keys = [proc.name]
+        level = 0
+        while max_levels == -1 or level < max_levels:
+            children = procs[procs["parent_key"].isin(parent_keys)]
+            if children.empty:
+                break
+            descendents.append(children)
+            parent_keys = children.index
+            level += 1
+
+        if descendents:
+            desc_procs = pd.concat(descendents)
+        else:
+            desc_procs = pd.DataFrame(columns=proc.index, index=None)
+            desc_procs.index.name = "proc_key"
     if include_source:
-        return desc_procs.append(proc).sort_values("path")
+        desc_procs = _append_proc(desc_procs, proc, _get_procs(procs))
     return desc_procs.sort_values("path")
 
 
 def get_ancestors(
-        procs: pd.DataFrame,
+        procs: ProcsOrIndex,
         source,
         include_source=True) -> pd.DataFrame:
     """
@@ -715,8 +1165,9 @@ def get_ancestors(
 
     Parameters
     ----------
-    procs : pd.DataFrame
+    procs : Union[pd.DataFrame, ProcessTreeIndex]
         Process events (with process tree metadata)
+        or ProcessTreeIndex
     source : Union[str, pd.Series]
         source_index of process or the process row
     include_source : bool, optional
@@ -728,6 +1179,12 @@ def get_ancestors(
         Ancestor processes
 
     """
+    if isinstance(procs, ProcessTreeIndex):
+        src_pos = procs.get_pos(source)
+        anc_pos = procs.ancestors_pos(src_pos)
+        if include_source:
+            anc_pos = np.append(anc_pos, src_pos)
+        return procs.rows(anc_pos)
     proc = get_process(procs, source)
     p_path = proc.path.split("/")
     if not include_source:
@@ -736,15 +1193,16 @@ def get_ancestors(
 
 
 def get_siblings(
-    procs: pd.DataFrame, source: Union[str, pd.Series], include_source: bool = True
+    procs: ProcsOrIndex, source: Union[str, pd.Series], include_source: bool = True
 ) -> pd.DataFrame:
     """
     Return the processes that share the parent of the source process.
 
     Parameters
     ----------
-    procs : pd.DataFrame
+    procs : Union[pd.DataFrame, ProcessTreeIndex]
         Process events (with process tree metadata)
+        or ProcessTreeIndex
     source : Union[str, pd.Series]
         source_index of process or the process row
     include_source : bool, optional
@@ -15,6 +15,8 @@ requests per minute for the account type that you have.
 import sys  # noqa
 import warnings
 from collections import ChainMap
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
 from inspect import isclass
 from typing import Dict, Iterable, List, Mapping, Optional, Tuple, Union
 
@@ -31,6 +33,7 @@ from . import tiproviders
 # used in dynamic instantiation of providers
 # pylint: disable=unused-wildcard-import, wildcard-import
 from .tiproviders import *  # noqa:F401, F403
+from .tiproviders.result_cache import create_result_cache
 from .tiproviders.ti_provider_base import LookupResult, TILookupStatus, TIProvider
 
 __version__ = VERSION
@@ -281,6 +284,11 @@ class TILookup:
             provider_instance.description = (
                 settings.description or provider_instance.__doc__
             )
+            # use a persistent result cache if one is configured - otherwise
+            # (or if it is not enabled) keep the provider's default cache
+            result_cache = create_result_cache(settings.cache)
+            if result_cache is not None:
+                provider_instance.result_cache = result_cache
 
             self.add_provider(
                 provider=provider_instance,
@@ -401,6 +409,15 @@ class TILookup:
         kwargs :
             Additional arguments passed to the underlying provider(s)
 
+        Other Parameters
+        ----------------
+        concurrent : bool, optional
+            If True, query the providers in parallel and, for each
+            provider, look up observables concurrently up to the
+            provider's `MaxConcurrency` and `RateLimit` settings
+            (the default is False). The results are the same as
+            for sequential lookups.
+
         Returns
         -------
         pd.DataFrame
@@ -412,14 +429,31 @@ class TILookup:
         if not selected_providers:
             raise RuntimeError(_NO_PROVIDERS_MSSG)
 
-        for prov_name, provider in list(selected_providers.items()):
-            provider_result = provider.lookup_iocs(
+        concurrent = kwargs.get("concurrent", False)
+        if concurrent and isinstance(data, Iterator):
+            # each provider thread needs to read all of the items
+            data = list(data)
+
+        def _lookup_provider(provider: TIProvider) -> pd.DataFrame:
+            return provider.lookup_iocs(
                 data=data,
                 obs_col=obs_col,
                 ioc_type_col=ioc_type_col,
                 query_type=ioc_query_type,
                 **kwargs,
             )
+
+        if concurrent:
+            with ThreadPoolExecutor(max_workers=len(selected_providers)) as executor:
+                prov_results = list(
+                    executor.map(_lookup_provider, selected_providers.values())
+                )
+        else:
+            prov_results = [
+                _lookup_provider(provider) for provider in selected_providers.values()
+            ]
+
+        for prov_name, provider_result in zip(selected_providers, prov_results):
             if provider_result is None or provider_result.empty:
                 continue
             if not kwargs.get("show_not_supported", False):
@@ -13,11 +13,11 @@ requests per minute for the account type that you have.
 
 """
 import abc
+import asyncio
 import traceback
-from functools import lru_cache
 from http import client
 from json import JSONDecodeError
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 import attr
 import requests
@@ -26,11 +26,26 @@ from attr import Factory
 from ..._version import VERSION
 from ...common.exceptions import MsticpyConfigException
 from ...common.utility import export
-from .ti_provider_base import LookupResult, TILookupStatus, TIProvider, TISeverity
+from .http_transport import AsyncHttpTransport
+from .result_cache import MemoryResultCache
+from .ti_provider_base import (
+    _RETRY_STATUS,
+    LookupResult,
+    TILookupStatus,
+    TIProvider,
+    TISeverity,
+)
 
 __version__ = VERSION
 __author__ = "Ian Hellen"
 
+_DEF_MEMORY_CACHE_SIZE = 256
+# Results with these statuses are valid responses and can be cached
+_CACHEABLE_STATUS = {TILookupStatus.ok.value, 404}
+_DEF_MAX_CONNECTIONS = 100
+_DEF_REQUEST_TIMEOUT = 30.0
+_DEF_KEEPALIVE_TIMEOUT = 15.0
+
 
 # pylint: disable=too-few-public-methods
 @attr.s(auto_attribs=True)
@@ -58,11 +73,27 @@ class HttpProvider(TIProvider):
 
     _REQUIRED_PARAMS: List[str] = []
 
+    # Delimiter used to join observables in batch requests
+    _BATCH_DELIMITER = ","
+
     def __init__(self, **kwargs):
         """Initialize a new instance of the class."""
         super().__init__(**kwargs)
 
         self._requests_session = requests.Session()
+        # Settings for the async transport used by lookup_iocs
+        self.max_connections = int(
+            kwargs.get("MaxConnections", _DEF_MAX_CONNECTIONS))
+        self.max_connections_per_host = int(
+            kwargs.get("MaxConnectionsPerHost", self.max_concurrency))
+        self.request_timeout = float(
+            kwargs.get("RequestTimeout", _DEF_REQUEST_TIMEOUT))
+        self.keepalive_timeout = float(
+            kwargs.get("KeepAliveTimeout", _DEF_KEEPALIVE_TIMEOUT))
+        self._async_transport: Optional[AsyncHttpTransport] = None
+        # in-memory cache by default - replaced by TILookup if a
+        # persistent cache is configured for the provider.
+        self.result_cache = MemoryResultCache(max_items=_DEF_MEMORY_CACHE_SIZE)
         self._request_params = {}
         if "ApiID" in kwargs:
             self._request_params["API_ID"] = kwargs.pop("ApiID")
@@ -82,7 +113,6 @@ class HttpProvider(TIProvider):
             )
 
     # pylint: disable=too-many-branches, duplicate-code
-    @lru_cache(maxsize=256)
     def lookup_ioc(  # type: ignore
         self, ioc: str, ioc_type: str = None, query_type: str = None, **kwargs
     ) -> LookupResult:
@@ -117,9 +147,10 @@ class HttpProvider(TIProvider):
 
         Notes
         -----
-        Note: this method uses memoization (lru_cache) to cache results
-        for a particular observable to try avoid repeated network calls for
-        the same item.
+        Note: results are cached in the provider's `result_cache` to
+        try avoid repeated network calls for the same item. By default
+        this is an in-memory cache, a persistent cache can be configured
+        using the provider's `Cache` settings in msticpyconfig.yaml.
 
         """
         result = self._check_ioc_type(
@@ -129,6 +160,9 @@ class HttpProvider(TIProvider):
         result.provider = kwargs.get("provider_name", self.__class__.__name__)
         if result.status:
             return result
+        cached_result = self._get_cached_result(result)
+        if cached_result is not None:
+            return cached_result
 
         req_params: Dict[str, Any] = {}
         try:
@@ -139,37 +173,245 @@ class HttpProvider(TIProvider):
                 response = self._requests_session.get(**req_params)
             else:
                 raise NotImplementedError(f"Unsupported verb {verb}")
-            result.status = response.status_code
             result.reference = req_params["url"]
-            if result.status == 200:
-                try:
-                    result.raw_result = response.json()
-                    result.result, severity, result.details = self.parse_results(
-                        result)
-                except JSONDecodeError:
-                    result.raw_result = f"""There was a problem parsing results from this lookup:
-                                        {response.text}"""
-                    result.result = False
-                    severity = TISeverity.information
-                    result.details = {}
-                result.set_severity(severity)
-                result.status = TILookupStatus.ok.value
-            else:
-                result.raw_result = str(response)
-                result.result = False
-                result.details = self._response_message(result.status)
-            return result
+            self._set_response_result(result, response)
+        except (  # pylint: disable=duplicate-code
+            LookupError,
+            JSONDecodeError,
+            NotImplementedError,
+            ConnectionError,
+        ) as err:
+            self._set_error_result(result, err, req_params)
+        return result
+
+    def _lookup_items(
+        self,
+        items: Iterable[Tuple[str, Optional[str]]],
+        query_type: str = None,
+        **kwargs,
+    ) -> Iterable[LookupResult]:
+        """
+        Lookup (observable, ioc_type) items one at a time.
+
+        Other Parameters
+        ----------------
+        async_requests : bool, optional
+            If True, send the requests from an asyncio event loop
+            using a pool of keep-alive connections (the default is False).
+            Up to `MaxConnections` requests are in flight at once,
+            with at most `MaxConnectionsPerHost` connections to the
+            provider host. `RateLimit`, `MaxRetries` and `RetryBackoff`
+            are applied as for `concurrent` lookups.
+            Requires the aiohttp package.
+
+        """
+        if not kwargs.get("async_requests", False):
+            return super()._lookup_items(items, query_type, **kwargs)
+        transport = self._get_async_transport()
+        return transport.run(
+            self._lookup_items_async(list(items), query_type, **kwargs)
+        )
+
+    def _lookup_batch(
+        self, batch: List[LookupResult], query_type: str = None
+    ) -> List[LookupResult]:
+        """Lookup a batch of observables of the same type in one request."""
+        req_params: Dict[str, Any] = {}
+        try:
+            verb, req_params = self._substitute_batch_parms(
+                [result.safe_ioc for result in batch],
+                batch[0].ioc_type,
+                query_type,
+            )
+            if verb != "GET":
+                raise NotImplementedError(f"Unsupported verb {verb}")
+            response = self._requests_session.get(**req_params)
+            if response.status_code == 200:
+                raw_results = dict(self._split_batch_response(response.json()))
         except (  # pylint: disable=duplicate-code
             LookupError,
             JSONDecodeError,
             NotImplementedError,
             ConnectionError,
         ) as err:
-            self._err_to_results(result, err)
-            if not isinstance(err, LookupError):
-                url = req_params.get("url", None) if req_params else None
-                result.reference = url
+            for result in batch:
+                self._set_error_result(result, err, req_params)
+            return batch
+
+        for result in batch:
+            result.reference = req_params["url"]
+            if response.status_code != 200:
+                self._set_response_result(result, response)
+                continue
+            # items missing from the response are parsed as "Not found"
+            result.status = response.status_code
+            result.raw_result = raw_results.get(result.safe_ioc)
+            result.result, severity, result.details = self.parse_results(result)
+            result.set_severity(severity)
+            result.status = TILookupStatus.ok.value
+        return batch
+
+    def _substitute_batch_parms(
+        self, iocs: List[str], ioc_type: str, query_type: str = None
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        Create requests parameters for a batch request.
+
+        Parameters
+        ----------
+        iocs : List[str]
+            IoC observables
+        ioc_type : str
+            IocType of the observables
+        query_type : str, optional
+            Specify the data subtype to be queried, by default None.
+
+        Returns
+        -------
+        Tuple[str, Dict[str, Any]]
+            HTTP method, dictionary of parameter keys/values
+
+        Notes
+        -----
+        The default implementation joins the observables with
+        `_BATCH_DELIMITER` and substitutes them as a single observable.
+
+        """
+        return self._substitute_parms(
+            self._BATCH_DELIMITER.join(iocs), ioc_type, query_type
+        )
+
+    def _split_batch_response(self, response: Any) -> Iterable[Tuple[str, Any]]:
+        """
+        Split a batch response into per-observable results.
+
+        Parameters
+        ----------
+        response : Any
+            The decoded JSON response to a batch request
+
+        Returns
+        -------
+        Iterable[Tuple[str, Any]]
+            Observable and raw result for each item. Raw results
+            must be in the format expected by `parse_results`.
+
+        """
+        raise NotImplementedError(
+            f"{self.__class__.__name__} does not support batch lookups."
+        )
+
+    def close(self):
+        """Close the provider's HTTP sessions and connections."""
+        self._requests_session.close()
+        if self._async_transport is not None:
+            self._async_transport.close()
+            self._async_transport = None
+
+    def _get_async_transport(self) -> AsyncHttpTransport:
+        """Return the async transport, creating it on first use."""
+        if self._async_transport is None or self._async_transport.closed:
+            self._async_transport = AsyncHttpTransport(
+                max_connections=self.max_connections,
+                max_per_host=self.max_connections_per_host,
+                timeout=self.request_timeout,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+        return self._async_transport
+
+    async def _lookup_items_async(
+        self,
+        items: List[Tuple[str, Optional[str]]],
+        query_type: str = None,
+        **kwargs,
+    ) -> List[LookupResult]:
+        """Lookup multiple IoCs concurrently, returning results in input order."""
+        # limit the number of waiting tasks as well as open connections
+        semaphore = asyncio.Semaphore(self.max_connections)
+
+        async def _lookup_item(ioc, ioc_type):
+            async with semaphore:
+                return await self._lookup_ioc_async(
+                    ioc, ioc_type, query_type, **kwargs
+                )
+
+        return await asyncio.gather(
+            *(_lookup_item(ioc, ioc_type) for ioc, ioc_type in items)
+        )
+
+    async def _lookup_ioc_async(
+        self, ioc: str, ioc_type: str = None, query_type: str = None, **kwargs
+    ) -> LookupResult:
+        """Lookup a single IoC observable using the async transport."""
+        result = self._check_ioc_type(
+            ioc=ioc, ioc_type=ioc_type, query_subtype=query_type
+        )
+        result.provider = kwargs.get("provider_name", self.__class__.__name__)
+        if result.status:
             return result
+        cached_result = self._get_cached_result(result)
+        if cached_result is not None:
+            return cached_result
+
+        transport = self._get_async_transport()
+        req_params: Dict[str, Any] = {}
+        try:
+            verb, req_params = self._substitute_parms(
+                result.safe_ioc, result.ioc_type, query_type
+            )
+            if verb != "GET":
+                raise NotImplementedError(f"Unsupported verb {verb}")
+            for attempt in range(self.max_retries + 1):
+                await asyncio.sleep(self._throttle.reserve())
+                response = await transport.get(**req_params)
+                if (
+                    response.status_code not in _RETRY_STATUS
+                    or attempt == self.max_retries
+                ):
+                    break
+                await asyncio.sleep(self.retry_backoff * 2 ** attempt)
+            result.reference = req_params["url"]
+            self._set_response_result(result, response)
+        except (  # pylint: disable=duplicate-code
+            LookupError,
+            JSONDecodeError,
+            NotImplementedError,
+            ConnectionError,
+        ) as err:
+            self._set_error_result(result, err, req_params)
+        return result
+
+    def _set_response_result(self, result: LookupResult, response: Any):
+        """Update `result` from an HTTP response and cache it."""
+        result.status = response.status_code
+        if result.status == 200:
+            try:
+                result.raw_result = response.json()
+                result.result, severity, result.details = self.parse_results(
+                    result)
+            except JSONDecodeError:
+                result.raw_result = f"""There was a problem parsing results from this lookup:
+                                    {response.text}"""
+                result.result = False
+                severity = TISeverity.information
+                result.details = {}
+            result.set_severity(severity)
+            result.status = TILookupStatus.ok.value
+        else:
+            result.raw_result = str(response)
+            result.result = False
+            result.details = self._response_message(result.status)
+        if result.status in _CACHEABLE_STATUS:
+            self._cache_result(result)
+
+    def _set_error_result(
+        self, result: LookupResult, err: Exception, req_params: Dict[str, Any]
+    ):
+        """Update `result` with the details of a failed lookup."""
+        self._err_to_results(result, err)
+        if not isinstance(err, LookupError):
+            url = req_params.get("url", None) if req_params else None
+            result.reference = url
 
     # pylint: enable=duplicate-code
     # pylint: disable=too-many-branches
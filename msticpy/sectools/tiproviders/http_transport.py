@@ -0,0 +1,222 @@
+# -------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# --------------------------------------------------------------------------
+"""
+Async HTTP transport for HTTP TI providers.
+
+The transport runs an asyncio event loop in a background thread
+and sends requests through a single aiohttp session. The session
+keeps a pool of keep-alive connections, so many requests can be
+in flight at once over a limited number of connections to each host.
+Running the loop in its own thread means that it can be used from
+synchronous code and from Jupyter notebooks (which already run
+an event loop) without any loop patching.
+
+"""
+import asyncio
+import json
+from threading import Lock, Thread
+from typing import Any, Awaitable, Dict, Optional, Tuple
+
+import attr
+
+from ..._version import VERSION
+from ...common.exceptions import MsticpyImportExtraError
+
+try:
+    import aiohttp
+
+    _AIOHTTP_AVAILABLE = True
+except ImportError:
+    _AIOHTTP_AVAILABLE = False
+
+__version__ = VERSION
+__author__ = "Ian Hellen"
+
+_DEF_MAX_CONNECTIONS = 100
+_DEF_MAX_PER_HOST = 10
+_DEF_TIMEOUT = 30.0
+_DEF_KEEPALIVE_TIMEOUT = 15.0
+
+
+@attr.s(auto_attribs=True)
+class HttpResponse:
+    """
+    Response returned by AsyncHttpTransport.
+
+    The interface is the subset of `requests.Response` used by
+    HttpProvider so that both transports are handled in the same way.
+
+    """
+
+    status_code: int
+    text: str = ""
+    url: str = ""
+
+    def json(self) -> Any:
+        """Return the response body decoded from JSON."""
+        return json.loads(self.text)
+
+    def __str__(self) -> str:
+        """Return the same string representation as requests."""
+        return f"<Response [{self.status_code}]>"
+
+
+class AsyncHttpTransport:
+    """Pooled, keep-alive asyncio HTTP transport."""
+
+    def __init__(
+        self,
+        max_connections: int = _DEF_MAX_CONNECTIONS,
+        max_per_host: int = _DEF_MAX_PER_HOST,
+        timeout: float = _DEF_TIMEOUT,
+        keepalive_timeout: float = _DEF_KEEPALIVE_TIMEOUT,
+    ):
+        """
+        Create the transport and start its event loop thread.
+
+        Parameters
+        ----------
+        max_connections : int, optional
+            Maximum number of open connections, by default 100
+        max_per_host : int, optional
+            Maximum number of simultaneous connections to each host,
+            by default 10
+        timeout : float, optional
+            Total timeout in seconds for each request, by default 30
+        keepalive_timeout : float, optional
+            Time in seconds to keep idle connections open for
+            reuse, by default 15
+
+        Raises
+        ------
+        MsticpyImportExtraError
+            If the aiohttp package is not installed.
+
+        """
+        if not _AIOHTTP_AVAILABLE:
+            raise MsticpyImportExtraError(
+                "Cannot use async HTTP requests without aiohttp installed.",
+                title="Error importing aiohttp.",
+                extra="aiohttp",
+            )
+        self.max_connections = max_connections
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self.keepalive_timeout = keepalive_timeout
+        self._session: Optional["aiohttp.ClientSession"] = None
+        self._lock = Lock()
+        self._loop = asyncio.new_event_loop()
+        self._thread = Thread(
+            target=self._loop.run_forever, name="msticpy-http", daemon=True
+        )
+        self._thread.start()
+
+    @property
+    def closed(self) -> bool:
+        """Return True if the transport has been closed."""
+        return self._loop.is_closed()
+
+    def run(self, coro: Awaitable) -> Any:
+        """
+        Run a coroutine on the transport loop and wait for the result.
+
+        Parameters
+        ----------
+        coro : Awaitable
+            The coroutine to run.
+
+        Returns
+        -------
+        Any
+            The return value of the coroutine.
+
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    async def get(
+        self,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        params: Optional[Dict[str, str]] = None,
+        data: Optional[Dict[str, str]] = None,
+        auth: Optional[Tuple[str, str]] = None,
+    ) -> HttpResponse:
+        """
+        Send a GET request.
+
+        The parameters are the same as those used by
+        `requests.Session.get`, so the request parameters
+        created by HttpProvider can be used unchanged.
+
+        Parameters
+        ----------
+        url : str
+            The request URL
+        headers : Optional[Dict[str, str]], optional
+            Request headers, by default None
+        params : Optional[Dict[str, str]], optional
+            Query string parameters, by default None
+        data : Optional[Dict[str, str]], optional
+            Form data for the request body, by default None
+        auth : Optional[Tuple[str, str]], optional
+            User name and password for HTTP Basic auth, by default None
+
+        Returns
+        -------
+        HttpResponse
+            The response status and body.
+
+        Raises
+        ------
+        ConnectionError
+            If the request fails or times out.
+
+        """
+        session = self._get_session()
+        try:
+            async with session.get(
+                url,
+                headers=headers,
+                params=params,
+                data=data,
+                auth=aiohttp.BasicAuth(*auth) if auth else None,
+            ) as response:
+                return HttpResponse(
+                    status_code=response.status,
+                    text=await response.text(errors="replace"),
+                    url=str(response.url),
+                )
+        except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+            raise ConnectionError(
+                f"Request to {url} failed: {type(err).__name__} {err}"
+            ) from err
+
+    def close(self):
+        """Close open connections and stop the event loop thread."""
+        with self._lock:
+            if self._loop.is_closed():
+                return
+            if self._session is not None:
+                self.run(self._session.close())
+                self._session = None
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+
+    def _get_session(self) -> "aiohttp.ClientSession":
+        """Return the session, creating it on first use."""
+        # only called from the transport loop, so no locking is needed
+        if self._session is None:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                limit_per_host=self.max_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
@@ -14,10 +14,23 @@ requests per minute for the account type that you have.
 """
 import abc
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
-from typing import Any, Dict, Tuple, Union, Iterable, DefaultDict, Set, List, Callable
+from typing import (
+    Any,
+    Dict,
+    Tuple,
+    Union,
+    Iterable,
+    DefaultDict,
+    Set,
+    List,
+    Callable,
+    Optional,
+)
 import warnings
 
+import attr
 import pandas as pd
 
 from ..._version import VERSION
@@ -36,6 +49,24 @@ from .ti_provider_base import (
 __version__ = VERSION
 __author__ = "Ian Hellen"
 
+# Default maximum length of a generated query (characters)
+_DEF_MAX_QUERY_LENGTH = 30000
+# Characters added to the query for each observable in a list - "'ioc', "
+_OBS_LIST_OVERHEAD = 4
+
+
+# pylint: disable=too-few-public-methods
+@attr.s(auto_attribs=True)
+class _KqlBatchQuery:
+    """Query for a batch of observables of one IoC type."""
+
+    ioc_type: str
+    query_type: Optional[str]
+    observables: List[str]
+    query_obj: Callable
+    query_params: Dict[str, Any]
+    query_text: str
+
 
 @export
 class KqlTIProvider(TIProvider):
@@ -61,6 +92,9 @@ class KqlTIProvider(TIProvider):
         if not self._query_provider or not self._query_provider.connected:
             raise MsticpyConfigException(
                 "Query provider for KQL could not be created.")
+        self.max_query_length = int(
+            kwargs.get("MaxQueryLength", _DEF_MAX_QUERY_LENGTH)
+        )
 
     # pylint: disable=duplicate-code
     @lru_cache(maxsize=256)
@@ -137,7 +171,6 @@ class KqlTIProvider(TIProvider):
         result.reference = query_obj("print_query", **query_params)
         return result
 
-    # pylint: disable=too-many-locals, too-many-branches
     def lookup_iocs(  # noqa: C901, MC0001
         self,
         data: Union[pd.DataFrame, Dict[str, str], Iterable[str]],
@@ -166,11 +199,25 @@ class KqlTIProvider(TIProvider):
             If not specified the default record type for the IoC type
             will be returned.
 
+        Other Parameters
+        ----------------
+        concurrent : bool, optional
+            If True, run the queries in up to `max_concurrency`
+            threads (the default is False). This can be set with
+            the `MaxConcurrency` provider Arg.
+
         Returns
         -------
         pd.DataFrame
             DataFrame of results.
 
+        Notes
+        -----
+        Observables of each IoC type are looked up with a single query,
+        unless the query text would be longer than `max_query_length`
+        (the `MaxQueryLength` provider Arg, default 30000 characters).
+        In this case the observables are split across several queries.
+
         """
         # We need to partition the IoC types to invoke separate queries
         ioc_groups: DefaultDict[str, Set[str]] = defaultdict(set)
@@ -184,79 +231,202 @@ class KqlTIProvider(TIProvider):
             if result.status != TILookupStatus.not_supported.value:
                 ioc_groups[result.ioc_type].add(result.ioc)
 
-        all_results = []
-        for ioc_type, obs_set in list(ioc_groups.items()):
-            try:
-                query_obj, query_params = self._get_query_and_params(
-                    ioc=list(obs_set),
-                    ioc_type=ioc_type,
-                    query_type=query_type,
-                    **kwargs,
-                )
-            except LookupError:
-                pass
-            if not query_obj:
-                warnings.warn(
-                    f"Could not find query for {ioc_type}, {query_type}")
+        batch_queries = self._create_batch_queries(ioc_groups, query_type, **kwargs)
+        if kwargs.get("concurrent", False) and self.max_concurrency > 1:
+            with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+                all_results = [
+                    self._batch_results_to_df(batch_query, data_result)
+                    for batch_query, data_result in executor.map(
+                        self._run_batch_query, batch_queries
+                    )
+                ]
+        else:
+            all_results = [
+                self._batch_results_to_df(*self._run_batch_query(batch_query))
+                for batch_query in batch_queries
+            ]
+        if not all_results:
+            return pd.DataFrame()
+        return pd.concat(all_results, ignore_index=True, sort=False, axis=0)
+
+    def _create_batch_queries(
+        self, ioc_groups: Dict[str, Set[str]], query_type: str = None, **kwargs
+    ) -> List[_KqlBatchQuery]:
+        """Return queries for the observables, split to keep queries within size."""
+        batch_queries: List[_KqlBatchQuery] = []
+        for ioc_type, obs_set in ioc_groups.items():
+            obs_list = sorted(obs_set)
+            # Use the query for the first item to get the length of the
+            # query text without the observables.
+            batch_query = self._create_batch_query(
+                ioc_type, obs_list[:1], query_type, **kwargs
+            )
+            if batch_query is None:
+                warnings.warn(f"Could not find query for {ioc_type}, {query_type}")
                 continue
+            query_overhead = (
+                len(batch_query.query_text) - len(obs_list[0]) - _OBS_LIST_OVERHEAD
+            )
+            pending = list(
+                self._partition_observables(
+                    obs_list,
+                    max_items=self.get_batch_size(ioc_type),
+                    max_chars=self.max_query_length - query_overhead,
+                )
+            )
+            pending.reverse()
+            while pending:
+                obs_batch = pending.pop()
+                batch_query = self._create_batch_query(  # type: ignore
+                    ioc_type, obs_batch, query_type, **kwargs
+                )
+                if len(batch_query.query_text) > self.max_query_length and (
+                    len(obs_batch) > 1
+                ):
+                    # still too long - split it in two
+                    split_idx = len(obs_batch) // 2
+                    pending.extend([obs_batch[split_idx:], obs_batch[:split_idx]])
+                    continue
+                batch_queries.append(batch_query)
+        return batch_queries
+
+    @staticmethod
+    def _partition_observables(
+        obs_list: List[str], max_items: int, max_chars: int
+    ) -> Iterable[List[str]]:
+        """Split observables into batches of limited count and total length."""
+        obs_batch: List[str] = []
+        batch_chars = 0
+        for obs in obs_list:
+            obs_chars = len(obs) + _OBS_LIST_OVERHEAD
+            if obs_batch and (
+                (max_items and len(obs_batch) >= max_items)
+                or batch_chars + obs_chars > max_chars
+            ):
+                yield obs_batch
+                obs_batch, batch_chars = [], 0
+            obs_batch.append(obs)
+            batch_chars += obs_chars
+        if obs_batch:
+            yield obs_batch
+
+    def _create_batch_query(
+        self, ioc_type: str, obs_batch: List[str], query_type: str = None, **kwargs
+    ) -> Optional[_KqlBatchQuery]:
+        """Return the query for a batch or None if there is no query for the type."""
+        try:
+            query_obj, query_params = self._get_query_and_params(
+                ioc=obs_batch,
+                ioc_type=ioc_type,
+                query_type=query_type,
+                **kwargs,
+            )
+        except LookupError:
+            return None
+        if not query_obj:
+            return None
+        # The query text is saved as the Reference for the results
+        return _KqlBatchQuery(
+            ioc_type=ioc_type,
+            query_type=query_type,
+            observables=obs_batch,
+            query_obj=query_obj,
+            query_params=query_params,
+            query_text=query_obj("print_query", **query_params),
+        )
+
+    @staticmethod
+    def _run_batch_query(batch_query: _KqlBatchQuery) -> Tuple[_KqlBatchQuery, Any]:
+        """Run the query for a batch, returning the batch and the query result."""
+        return batch_query, batch_query.query_obj(**batch_query.query_params)
 
-            # run the query
-            data_result = query_obj(**query_params)
-            if isinstance(data_result, pd.DataFrame):
-                data_result = data_result.copy()
+    def _batch_results_to_df(
+        self, batch_query: _KqlBatchQuery, data_result: Any
+    ) -> pd.DataFrame:
+        """Return the lookup results for a batch query as a DataFrame."""
+        if isinstance(data_result, pd.DataFrame):
+            data_result = data_result.copy()
+        else:
+            if (
+                hasattr(data_result, "completion_query_info")
+                and data_result.completion_query_info["StatusCode"] == 0
+                and data_result.records_count == 0
+            ):
+                print("No results return from data provider.")
+            elif data_result and hasattr(data_result, "completion_query_info"):
+                print((
+                    "No results returned from data provider. "
+                    + str(data_result.completion_query_info)
+                ))
             else:
-                if (
-                    hasattr(data_result, "completion_query_info")
-                    and data_result.completion_query_info["StatusCode"] == 0
-                    and data_result.records_count == 0
-                ):
-                    print("No results return from data provider.")
-                elif data_result and hasattr(data_result, "completion_query_info"):
-                    print((
-                        "No results returned from data provider. "
-                        + str(data_result.completion_query_info)
-                    ))
-                else:
-                    print((
-                        "Unknown response from provider: " +
-                        str(data_result)))
-
-            src_ioc_frame = pd.DataFrame(obs_set, columns=["Ioc"])
-            src_ioc_frame["IocType"] = ioc_type
-            src_ioc_frame["QuerySubtype"] = query_type
-            src_ioc_frame["Reference"] = query_obj(
-                "print_query", **query_params)
-
-            # If no results, add the empty dataframe to the combined results
-            # and continue
-            if not isinstance(data_result, pd.DataFrame):
-                src_ioc_frame["Result"] = False
-                src_ioc_frame["Details"] = "Query failure"
-                src_ioc_frame["Status"] = TILookupStatus.query_failed.value
-                src_ioc_frame["Severity"] = TISeverity.information.value
-                all_results.append(src_ioc_frame)
-                continue
-            if data_result.empty:
-                src_ioc_frame["Result"] = False
-                src_ioc_frame["Details"] = "Not found."
-                src_ioc_frame["Status"] = TILookupStatus.ok.value
-                src_ioc_frame["Severity"] = TISeverity.information.value
-                all_results.append(src_ioc_frame)
-                continue
+                print((
+                    "Unknown response from provider: " +
+                    str(data_result)))
 
-            # Create our results columns
-            data_result["Result"] = True
-            data_result["Status"] = TILookupStatus.ok.value
-            data_result["Severity"] = self._get_severity(data_result)
-            data_result["Details"] = self._get_detail_summary(data_result)
-            data_result["RawResult"] = data_result.apply(
-                lambda x: x.to_dict(), axis=1)
+        src_ioc_frame = pd.DataFrame(batch_query.observables, columns=["Ioc"])
+        src_ioc_frame["IocType"] = batch_query.ioc_type
+        src_ioc_frame["QuerySubtype"] = batch_query.query_type
+        src_ioc_frame["Reference"] = batch_query.query_text
 
-            combined_results_df = self._combine_results(
-                input_df=src_ioc_frame, results_df=data_result, reslt_ioc_key="IoC")
-            all_results.append(combined_results_df)
+        # If no results, return the source frame with the failure details
+        if not isinstance(data_result, pd.DataFrame):
+            src_ioc_frame["Result"] = False
+            src_ioc_frame["Details"] = "Query failure"
+            src_ioc_frame["Status"] = TILookupStatus.query_failed.value
+            src_ioc_frame["Severity"] = TISeverity.information.value
+            return src_ioc_frame
+        if data_result.empty:
+            src_ioc_frame["Result"] = False
+            src_ioc_frame["Details"] = "Not found."
+            src_ioc_frame["Status"] = TILookupStatus.ok.value
+            src_ioc_frame["Severity"] = TISeverity.information.value
+            return src_ioc_frame
+
+        # Create our results columns
+        data_result["Result"] = True
+        data_result["Status"] = TILookupStatus.ok.value
+        data_result["Severity"] = self._get_severity(data_result)
+        data_result["Details"] = self._get_detail_summary(data_result)
+        data_result["RawResult"] = data_result.apply(
+            lambda x: x.to_dict(), axis=1)
+
+        return self._combine_results(
+            input_df=src_ioc_frame, results_df=data_result, reslt_ioc_key="IoC")
+
+    @property
+    def supports_batch(self) -> bool:
+        """
+        Return True if the provider supports batch lookups.
 
-        return pd.concat(all_results, ignore_index=True, sort=False, axis=0)
+        Returns
+        -------
+        bool
+            Always True - observables of each IoC type are looked
+            up with a single query. The observables are split into
+            several queries if the query would be longer than
+            `max_query_length` characters (or contain more than
+            `BatchSize` observables, if the `BatchSize` Arg is set).
+
+        """
+        return True
+
+    def get_batch_size(self, ioc_type: str) -> int:
+        """
+        Return the maximum batch size for an IoC type.
+
+        Parameters
+        ----------
+        ioc_type : str
+            The IoC type
+
+        Returns
+        -------
+        int
+            The maximum number of observables in a query.
+            0 if there is no limit.
+
+        """
+        return self.batch_size
 
     @abc.abstractmethod
     def parse_results(
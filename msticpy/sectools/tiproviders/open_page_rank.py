@@ -12,13 +12,9 @@ processing performance may be limited to a specific number of
 requests per minute for the account type that you have.
 
 """
-from json import JSONDecodeError
-from typing import Any, Tuple, Union, Iterable, Dict, List
+from typing import Any, Tuple, Iterable, Dict, List
 
-import attr
-import pandas as pd
-
-from .ti_provider_base import LookupResult, TISeverity, generate_items, TILookupStatus
+from .ti_provider_base import LookupResult, TISeverity, TILookupStatus
 from .http_base import HttpProvider, IoCLookupParams
 from ...common.utility import export
 from ..._version import VERSION
@@ -43,6 +39,8 @@ class OPR(HttpProvider):
 
     _REQUIRED_PARAMS = ["API_KEY"]
 
+    _BATCH_SIZES = {"dns": 100}
+
     def __init__(self, **kwargs):
         """Initialize a new instance of the class."""
         super().__init__(**kwargs)
@@ -53,69 +51,6 @@ class OPR(HttpProvider):
             "See https://www.domcop.com/openpagerank/what-is-openpagerank",
         ))
 
-    # pylint: disable=duplicate-code
-    def lookup_iocs(
-        self,
-        data: Union[pd.DataFrame, Dict[str, str], Iterable[str]],
-        obs_col: str = None,
-        ioc_type_col: str = None,
-        query_type: str = None,
-        **kwargs,
-    ) -> pd.DataFrame:
-        """
-        Lookup collection of IoC observables.
-
-        Parameters
-        ----------
-        data : Union[pd.DataFrame, Dict[str, str], Iterable[str]]
-            Data input in one of three formats:
-            1. Pandas dataframe (you must supply the column name in
-            `obs_col` parameter)
-            2. Dict of observable, IoCType
-            3. Iterable of observables - IoCTypes will be inferred
-        obs_col : str, optional
-            DataFrame column to use for observables, by default None
-        ioc_type_col : str, optional
-            DataFrame column to use for IoCTypes, by default None
-        query_type : str, optional
-            Specify the data subtype to be queried, by default None.
-            If not specified the default record type for the IoC type
-            will be returned.
-
-        Returns
-        -------
-        pd.DataFrame
-            DataFrame of results.
-
-        """
-        kwargs.get("provider_name", self.__class__.__name__)
-
-        domain_list = set()
-        bad_requests: List[pd.Series] = []
-        for ioc, ioc_type in generate_items(data, obs_col, ioc_type_col):
-            if not ioc:
-                continue
-            result = self._check_ioc_type(
-                ioc=ioc, ioc_type=ioc_type, query_subtype=query_type
-            )
-
-            if result.status == TILookupStatus.ok.value:
-                domain_list.add(result.ioc)
-            else:
-                bad_requests.append(pd.Series(attr.asdict(result)))
-
-        results: List[pd.Series] = []
-        if not domain_list:
-            return pd.DataFrame(columns=LookupResult.column_map())
-        for item_result in self._lookup_bulk_request(
-                domain_list):  # type: ignore
-            results.append(pd.Series(attr.asdict(item_result)))
-
-        all_results = results + bad_requests
-        return pd.DataFrame(
-            data=all_results).rename(
-            columns=LookupResult.column_map())
-
     def parse_results(
             self, response: LookupResult) -> Tuple[bool, TISeverity, Any]:
         """
@@ -145,31 +80,6 @@ class OPR(HttpProvider):
             return self._parse_one_record(dom_record)
         return True, severity, {}
 
-    def _parse_multi_results(
-            self,
-            response: LookupResult) -> Iterable[LookupResult]:
-        """Parse details of batch response."""
-        if not isinstance(response.raw_result, dict):
-            new_result = LookupResult(**attr.asdict(response))
-            new_result.result = False
-            new_result.set_severity(TISeverity.information)
-            new_result.details = "Not found."
-            yield new_result
-        elif "response" in response.raw_result:
-            dom_records = response.raw_result["response"]
-            for dom_record in dom_records:
-                result, sev, details = self._parse_one_record(dom_record)
-                domain_name = dom_record["domain"]
-                new_result = LookupResult(ioc=domain_name, ioc_type="dns")
-                new_result.ioc = domain_name
-                new_result.provider = self._provider_name
-                new_result.result = result
-                new_result.set_severity(sev)
-                new_result.details = details
-                new_result.raw_result = dom_record
-                new_result.reference = f"{response.reference}?domains[0]={domain_name}"
-                yield new_result
-
     @staticmethod
     def _parse_one_record(dom_record: dict):
         record_status = dom_record.get("status_code", 404)
@@ -195,57 +105,41 @@ class OPR(HttpProvider):
             )
         return False, TISeverity.information, {}
 
-    def _lookup_bulk_request(
-            self,
-            ioc_list: Iterable[str]) -> Iterable[LookupResult]:
-        ioc_list = list(ioc_list)
-        batch_size = 100
-
-        l_len = len(ioc_list)
-        for step in range(0, l_len, batch_size):
-            batch_list = ioc_list[step: (step + batch_size)]  # noqa: E203
-            for result in self._lookup_batch(batch_list):
-                yield result
-
-    # pylint: disable=duplicate-code
-    def _lookup_batch(self, ioc_list: list) -> Iterable[LookupResult]:
+    def _substitute_batch_parms(
+        self, iocs: List[str], ioc_type: str, query_type: str = None
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Create requests parameters for a batch of domains."""
         # build the query string manually - of the form
         # domains[N]=domN&domains[N+1]...
-        qry_elements = []
-        for idx, dom in zip(list(range(0, len(ioc_list))), ioc_list):
-            qry_elements.append(f"domains[{idx}]={dom}")
-        qry_str = "&".join(qry_elements)
+        qry_str = "&".join(
+            f"domains[{idx}]={dom}" for idx, dom in enumerate(iocs)
+        )
+        verb, req_params = self._substitute_parms("dummy", ioc_type, query_type)
+        path = self._IOC_QUERIES[ioc_type].path
+        return verb, {
+            "url": f"{self._BASE_URL}{path}?{qry_str}",
+            "headers": req_params["headers"],
+        }
+
+    def _split_batch_response(self, response: Any) -> Iterable[Tuple[str, Any]]:
+        """Split a batch response into single domain responses."""
+        if not isinstance(response, dict):
+            return
+        for dom_record in response.get("response", []):
+            yield dom_record["domain"], {
+                "status_code": response.get("status_code"),
+                "response": [dom_record],
+            }
+
+    def _lookup_batch(
+        self, batch: List[LookupResult], query_type: str = None
+    ) -> List[LookupResult]:
+        """Lookup a batch of domains, setting a reference URL for each."""
+        super()._lookup_batch(batch, query_type)
         path = self._IOC_QUERIES["dns"].path
-        req_url = f"{self._BASE_URL}{path}?{qry_str}"
-
-        try:
-            _, req_params = self._substitute_parms("dummy", "dns", None)
-            response = self._requests_session.get(
-                url=req_url, headers=req_params["headers"]
-            )
-            result = LookupResult(ioc=",".join(ioc_list), ioc_type="dns")
-            if response.status_code == 200:
-                result.status = TILookupStatus.ok.value
-                result.reference = self._BASE_URL + path
-                result.raw_result = response.json()
-                for single_result in self._parse_multi_results(result):
-                    yield single_result
-            else:
-                result.raw_result = str(response)
-                result.result = False
-                result.reference = req_url
-                result.status = response.status_code
-                result.details = "No response from provider."
-                yield result
-        except (
-            LookupError,
-            JSONDecodeError,
-            NotImplementedError,
-            ConnectionError,
-        ) as err:
-            self._err_to_results(result, err)
-            if not isinstance(err, LookupError):
-                result.reference = req_url
-            yield result
-
-    # pylint: enable=duplicate-code
+        for result in batch:
+            if result.status == TILookupStatus.ok.value:
+                result.reference = (
+                    f"{self._BASE_URL}{path}?domains[0]={result.safe_ioc}"
+                )
+        return batch
@@ -0,0 +1,373 @@
+# -------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# --------------------------------------------------------------------------
+"""
+TI Provider result caches.
+
+Caches store LookupResults keyed by provider, observable,
+IoC type and query type so that repeated lookups of the same
+items do not consume provider API quota.
+
+The default cache for HTTP providers is an in-memory LRU cache.
+A persistent SQLite cache, shared between sessions and processes,
+can be enabled with a `Cache` entry for the provider in the
+`TIProviders` section of msticpyconfig.yaml.
+
+"""
+import abc
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, Optional, Tuple
+
+import attr
+
+from ..._version import VERSION
+from ...common.utility import export
+from .ti_provider_base import LookupResult
+
+__version__ = VERSION
+__author__ = "Ian Hellen"
+
+_DEF_CACHE_PATH = "~/.msticpy/ti_cache.db"
+_DEF_TTL = 60 * 60 * 24
+_DEF_MAX_ITEMS = 100_000
+# fraction of max_items kept when the SQLite cache is trimmed
+_LOW_WATER = 0.9
+
+CacheKey = Tuple[str, str, str, str]
+
+
+def _cache_key(
+    provider: str, ioc: str, ioc_type: str, query_type: Optional[str]
+) -> CacheKey:
+    return provider, ioc, ioc_type or "", query_type or ""
+
+
+@export
+class TIResultCache(abc.ABC):
+    """Abstract base class for TI result caches."""
+
+    @abc.abstractmethod
+    def get(
+        self, provider: str, ioc: str, ioc_type: str, query_type: str = None
+    ) -> Optional[LookupResult]:
+        """
+        Return cached result or None if not found or expired.
+
+        Parameters
+        ----------
+        provider : str
+            The provider name
+        ioc : str
+            IoC observable
+        ioc_type : str
+            IoC type
+        query_type : str, optional
+            Query sub-type, by default None
+
+        Returns
+        -------
+        Optional[LookupResult]
+            The cached result.
+
+        """
+
+    @abc.abstractmethod
+    def put(self, provider: str, result: LookupResult):
+        """
+        Add a result to the cache.
+
+        Parameters
+        ----------
+        provider : str
+            The provider name
+        result : LookupResult
+            The result to cache.
+
+        """
+
+    @abc.abstractmethod
+    def clear(self, provider: str = None):
+        """
+        Remove items from the cache.
+
+        Parameters
+        ----------
+        provider : str, optional
+            Clear only items for this provider, by default None (all items)
+
+        """
+
+
+@export
+class MemoryResultCache(TIResultCache):
+    """In-memory LRU cache of TI results."""
+
+    def __init__(self, max_items: int = 256):
+        """
+        Create the cache.
+
+        Parameters
+        ----------
+        max_items : int, optional
+            The maximum number of results to keep, by default 256
+
+        """
+        self.max_items = max_items
+        self._items: "OrderedDict[CacheKey, LookupResult]" = OrderedDict()
+        self._lock = Lock()
+
+    def get(
+        self, provider: str, ioc: str, ioc_type: str, query_type: str = None
+    ) -> Optional[LookupResult]:
+        """Return cached result or None if not found."""
+        key = _cache_key(provider, ioc, ioc_type, query_type)
+        with self._lock:
+            result = self._items.get(key)
+            if result is not None:
+                self._items.move_to_end(key)
+        return result
+
+    def put(self, provider: str, result: LookupResult):
+        """Add a result to the cache."""
+        key = _cache_key(provider, result.ioc, result.ioc_type, result.query_subtype)
+        with self._lock:
+            self._items[key] = result
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def clear(self, provider: str = None):
+        """Remove items from the cache."""
+        with self._lock:
+            if provider is None:
+                self._items.clear()
+                return
+            for key in [key for key in self._items if key[0] == provider]:
+                del self._items[key]
+
+
+@export
+class SQLiteResultCache(TIResultCache):
+    """
+    Persistent TI result cache stored in a SQLite database.
+
+    The database file can be shared by multiple sessions and
+    processes. Items expire after a time-to-live (TTL) that can
+    be set per IoC type. The number of items stored for each
+    provider is limited to `max_items`. When this is exceeded, the
+    least recently used items are removed, down to 90% of `max_items`.
+    Items added by other processes are only counted when the
+    cache is next trimmed, so the limit is approximate if the
+    database is shared.
+
+    Results are stored as JSON. Results which cannot be serialized
+    to JSON (e.g. a `raw_result` containing datetimes) are not
+    cached, so a cached result always has the same types as the
+    original.
+
+    """
+
+    _CREATE_SQL = """
+        CREATE TABLE IF NOT EXISTS ti_results (
+            provider TEXT NOT NULL,
+            ioc TEXT NOT NULL,
+            ioc_type TEXT NOT NULL,
+            query_type TEXT NOT NULL,
+            result TEXT NOT NULL,
+            created REAL NOT NULL,
+            accessed REAL NOT NULL,
+            PRIMARY KEY (provider, ioc, ioc_type, query_type)
+        )
+    """
+    _INDEX_SQL = """
+        CREATE INDEX IF NOT EXISTS ti_results_accessed
+        ON ti_results (provider, accessed)
+    """
+
+    def __init__(
+        self,
+        path: str = _DEF_CACHE_PATH,
+        ttl: float = _DEF_TTL,
+        ttl_by_type: Optional[Dict[str, float]] = None,
+        max_items: int = _DEF_MAX_ITEMS,
+    ):
+        """
+        Create or open the cache database.
+
+        Parameters
+        ----------
+        path : str, optional
+            Path to the database file, by default "~/.msticpy/ti_cache.db"
+        ttl : float, optional
+            Time in seconds for which results are valid, by default 1 day
+        ttl_by_type : Optional[Dict[str, float]], optional
+            TTL overrides for specific IoC types, e.g. {"url": 3600}
+        max_items : int, optional
+            The maximum number of items stored for each provider,
+            by default 100,000
+
+        """
+        self.path = Path(path).expanduser()
+        self.ttl = ttl
+        self.ttl_by_type = ttl_by_type or {}
+        self.max_items = max_items
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = Lock()
+        # number of items stored for each provider (counted on first put)
+        self._item_counts: Dict[str, int] = {}
+        self._conn = sqlite3.connect(
+            str(self.path), timeout=30, check_same_thread=False
+        )
+        with self._lock, self._conn:
+            # WAL mode allows readers in other processes during writes
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(self._CREATE_SQL)
+            self._conn.execute(self._INDEX_SQL)
+
+    def get(
+        self, provider: str, ioc: str, ioc_type: str, query_type: str = None
+    ) -> Optional[LookupResult]:
+        """Return cached result or None if not found or expired."""
+        key = _cache_key(provider, ioc, ioc_type, query_type)
+        now = time.time()
+        min_created = now - self.ttl_by_type.get(ioc_type, self.ttl)
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT result FROM ti_results WHERE provider = ? AND ioc = ?"
+                " AND ioc_type = ? AND query_type = ? AND created >= ?",
+                (*key, min_created),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE ti_results SET accessed = ? WHERE provider = ?"
+                " AND ioc = ? AND ioc_type = ? AND query_type = ?",
+                (now, *key),
+            )
+        return LookupResult(**json.loads(row[0]))
+
+    def put(self, provider: str, result: LookupResult):
+        """
+        Add a result to the cache, evicting old items if needed.
+
+        Results which cannot be serialized to JSON are not cached.
+
+        """
+        key = _cache_key(provider, result.ioc, result.ioc_type, result.query_subtype)
+        now = time.time()
+        try:
+            result_str = json.dumps(attr.asdict(result))
+        except (TypeError, ValueError):
+            return
+        with self._lock, self._conn:
+            if provider not in self._item_counts:
+                self._item_counts[provider] = self._count_items(provider)
+            exists = self._conn.execute(
+                "SELECT 1 FROM ti_results WHERE provider = ? AND ioc = ?"
+                " AND ioc_type = ? AND query_type = ?",
+                key,
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ti_results VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (*key, result_str, now, now),
+            )
+            if not exists:
+                self._item_counts[provider] += 1
+            if self._item_counts[provider] > self.max_items:
+                self._evict(provider)
+
+    def _count_items(self, provider: str) -> int:
+        """Return the number of items stored for `provider`."""
+        return self._conn.execute(
+            "SELECT COUNT(*) FROM ti_results WHERE provider = ?", (provider,)
+        ).fetchone()[0]
+
+    def _evict(self, provider: str):
+        """Remove the least recently used items down to the low-water mark."""
+        # other processes may have added or removed items
+        item_count = self._count_items(provider)
+        if item_count > self.max_items:
+            # uses the (provider, accessed) index - no sort of the whole table
+            self._conn.execute(
+                "DELETE FROM ti_results WHERE rowid IN"
+                " (SELECT rowid FROM ti_results WHERE provider = ?"
+                " ORDER BY accessed LIMIT ?)",
+                (provider, item_count - int(self.max_items * _LOW_WATER)),
+            )
+            item_count = self._count_items(provider)
+        self._item_counts[provider] = item_count
+
+    def clear(self, provider: str = None):
+        """Remove items from the cache."""
+        with self._lock, self._conn:
+            if provider is None:
+                self._conn.execute("DELETE FROM ti_results")
+                self._item_counts.clear()
+            else:
+                self._conn.execute(
+                    "DELETE FROM ti_results WHERE provider = ?", (provider,)
+                )
+                self._item_counts.pop(provider, None)
+
+    def __len__(self) -> int:
+        """Return the number of items in the cache."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM ti_results").fetchone()[0]
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+def create_result_cache(cache_settings: Dict[str, Any]) -> Optional[TIResultCache]:
+    """
+    Return a result cache from `Cache` configuration settings.
+
+    Parameters
+    ----------
+    cache_settings : Dict[str, Any]
+        Settings from the provider's `Cache` entry in msticpyconfig.yaml.
+        Keys are `Type` ("sqlite" or "memory"), `Path`,
+        `TTL` (seconds), `TTLByIoCType` (dict of IoC type: seconds)
+        and `MaxItems`.
+
+    Returns
+    -------
+    Optional[TIResultCache]
+        The result cache or None if no cache is configured or
+        `Enabled` is False (the provider's default cache is used).
+
+    Raises
+    ------
+    ValueError
+        If the cache `Type` is not recognized.
+
+    """
+    if not cache_settings or not cache_settings.get("Enabled", True):
+        return None
+    cache_type = cache_settings.get("Type", "sqlite").casefold()
+    if cache_type == "memory":
+        return MemoryResultCache(
+            max_items=int(cache_settings.get("MaxItems", _DEF_MAX_ITEMS))
+        )
+    if cache_type == "sqlite":
+        return SQLiteResultCache(
+            path=cache_settings.get("Path", _DEF_CACHE_PATH),
+            ttl=float(cache_settings.get("TTL", _DEF_TTL)),
+            ttl_by_type={
+                ioc_type: float(ttl)
+                for ioc_type, ttl in cache_settings.get("TTLByIoCType", {}).items()
+            },
+            max_items=int(cache_settings.get("MaxItems", _DEF_MAX_ITEMS)),
+        )
+    raise ValueError(
+        f"Unknown cache Type '{cache_type}'. Valid types are 'sqlite' and 'memory'"
+    )
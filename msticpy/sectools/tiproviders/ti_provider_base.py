@@ -18,11 +18,25 @@ import collections
 import math  # noqa
 import pprint
 import re
-from collections import Counter, namedtuple
+import time
+from collections import Counter, defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
-from functools import lru_cache, singledispatch, total_ordering
+from functools import lru_cache, partial, singledispatch, total_ordering
 from ipaddress import IPv4Address, IPv6Address, ip_address
-from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Union
+from threading import Lock
+from typing import (
+    Any,
+    Callable,
+    DefaultDict,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
 from urllib.parse import quote_plus
 
 import attr
@@ -218,6 +232,47 @@ class TILookupStatus(Enum):
 
 _IOC_EXTRACT = IoCExtract()
 
+# Defaults for concurrent lookups - can be overridden by provider Args
+_DEF_MAX_CONCURRENCY = 4
+_DEF_MAX_RETRIES = 2
+_DEF_RETRY_BACKOFF = 1.0
+# HTTP status codes indicating that a request can be retried
+_RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class _RequestThrottle:
+    """Thread-safe limiter of the request rate to a provider."""
+
+    def __init__(self, rate_limit: float = 0):
+        """
+        Create the throttle.
+
+        Parameters
+        ----------
+        rate_limit : float, optional
+            Maximum requests per second, by default 0 (no limit)
+
+        """
+        self._interval = 1 / rate_limit if rate_limit else 0
+        self._next_time = 0.0
+        self._lock = Lock()
+
+    def reserve(self) -> float:
+        """Reserve the next request slot and return the time to wait for it."""
+        if not self._interval:
+            return 0
+        with self._lock:
+            now = time.monotonic()
+            wait_time = self._next_time - now
+            self._next_time = max(now, self._next_time) + self._interval
+        return max(wait_time, 0)
+
+    def wait(self):
+        """Block until the next request is allowed."""
+        wait_time = self.reserve()
+        if wait_time > 0:
+            time.sleep(wait_time)
+
 
 @export
 class TIProvider(ABC):
@@ -225,6 +280,14 @@ class TIProvider(ABC):
 
     _IOC_QUERIES: Dict[str, Any] = {}
 
+    # Default number of observables per batch request for each IoC type.
+    # Providers with bulk lookup endpoints set this and implement
+    # _lookup_batch. Types that are not listed are looked up one at a time.
+    _BATCH_SIZES: Dict[str, int] = {}
+    # Largest batch size that the BatchSize Arg can select, for types
+    # where this is more than the default (e.g. for paid API keys).
+    _MAX_BATCH_SIZES: Dict[str, int] = {}
+
     # pylint: disable=unused-argument
     def __init__(self, **kwargs):
         """Initialize the provider."""
@@ -239,6 +302,20 @@ class TIProvider(ABC):
 
         self.require_url_encoding = False
 
+        # Concurrency and throttling settings used by concurrent lookups
+        self.max_concurrency = int(
+            kwargs.get("MaxConcurrency", _DEF_MAX_CONCURRENCY))
+        self.rate_limit = float(kwargs.get("RateLimit", 0))
+        self.max_retries = int(kwargs.get("MaxRetries", _DEF_MAX_RETRIES))
+        self.retry_backoff = float(
+            kwargs.get("RetryBackoff", _DEF_RETRY_BACKOFF))
+        self._throttle = _RequestThrottle(self.rate_limit)
+        # Optional batch size (0 uses the provider default)
+        self.batch_size = int(kwargs.get("BatchSize", 0))
+
+        # Optional result cache (a result_cache.TIResultCache instance)
+        self.result_cache: Any = None
+
     # pylint: disable=duplicate-code
     @abc.abstractmethod
     def lookup_ioc(
@@ -293,26 +370,254 @@ class TIProvider(ABC):
             If not specified the default record type for the IoC type
             will be returned.
 
+        Other Parameters
+        ----------------
+        concurrent : bool, optional
+            If True, run lookups in up to `max_concurrency` threads,
+            limited to `rate_limit` requests per second, and retry
+            throttled or failed requests (the default is False).
+            These settings can be set with the `MaxConcurrency`,
+            `RateLimit`, `MaxRetries` and `RetryBackoff` provider Args.
+        async_requests : bool, optional
+            HTTP providers only. If True, send the requests from an
+            asyncio event loop using a pool of keep-alive connections
+            (the default is False). See `HttpProvider`.
+
         Returns
         -------
         pd.DataFrame
             DataFrame of results.
 
+        Notes
+        -----
+        Providers that support batch lookups (see `supports_batch`)
+        look up observables of the same type in batches of up to
+        `get_batch_size` items. Duplicate observables are only
+        looked up once.
+
         """
-        results = []
-        for observable, ioc_type in generate_items(
-                data, obs_col, ioc_type_col):
-            if not observable:
-                continue
-            item_result = self.lookup_ioc(
-                ioc=observable, ioc_type=ioc_type, query_type=query_type
+        items = (
+            (observable, ioc_type)
+            for observable, ioc_type in generate_items(data, obs_col, ioc_type_col)
+            if observable
+        )
+        if self.supports_batch:
+            lookup_results = self._lookup_iocs_batched(items, query_type, **kwargs)
+        else:
+            lookup_results = self._lookup_items(items, query_type, **kwargs)
+        return self._results_to_df(lookup_results)
+
+    @property
+    def supports_batch(self) -> bool:
+        """
+        Return True if the provider supports batch lookups.
+
+        Returns
+        -------
+        bool
+            True if the provider can look up multiple observables
+            in a single request for one or more IoC types.
+
+        """
+        return bool(self._BATCH_SIZES)
+
+    def get_batch_size(self, ioc_type: str) -> int:
+        """
+        Return the batch size for an IoC type.
+
+        Parameters
+        ----------
+        ioc_type : str
+            The IoC type
+
+        Returns
+        -------
+        int
+            The maximum number of observables in a batch request.
+            1 if the IoC type does not support batch lookups.
+
+        Notes
+        -----
+        The provider default can be changed with the `BatchSize`
+        provider Arg. This can reduce the batch size or, for some
+        providers, increase it up to the largest size that the
+        service allows.
+
+        """
+        def_size = self._BATCH_SIZES.get(ioc_type, 1)
+        if self.batch_size <= 0 or def_size == 1:
+            return def_size
+        max_size = self._MAX_BATCH_SIZES.get(ioc_type, def_size)
+        return min(max_size, self.batch_size)
+
+    def _lookup_items(
+        self,
+        items: Iterable[Tuple[str, Optional[str]]],
+        query_type: str = None,
+        **kwargs,
+    ) -> Iterable[LookupResult]:
+        """Lookup (observable, ioc_type) items one at a time."""
+        if kwargs.get("concurrent", False) and self.max_concurrency > 1:
+            with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+                return list(
+                    executor.map(
+                        lambda item: self._lookup_ioc_throttled(
+                            ioc=item[0], ioc_type=item[1], query_type=query_type
+                        ),
+                        items,
+                    )
+                )
+        return (
+            self.lookup_ioc(ioc=observable, ioc_type=ioc_type, query_type=query_type)
+            for observable, ioc_type in items
+        )
+
+    # pylint: disable=too-many-locals
+    def _lookup_iocs_batched(
+        self,
+        items: Iterable[Tuple[str, Optional[str]]],
+        query_type: str = None,
+        **kwargs,
+    ) -> List[LookupResult]:
+        """Lookup items in batches by IoC type, returning results in input order."""
+        results: List[Optional[LookupResult]] = []
+        # unique observables to look up, with the positions of each in the input
+        pending: Dict[Tuple[str, str], LookupResult] = {}
+        positions: DefaultDict[Tuple[str, str], List[int]] = defaultdict(list)
+        for ioc, ioc_type in items:
+            result = self._check_ioc_type(
+                ioc=ioc, ioc_type=ioc_type, query_subtype=query_type
             )
-            results.append(pd.Series(attr.asdict(item_result)))
+            result.provider = self.__class__.__name__
+            cached_result = None if result.status else self._get_cached_result(result)
+            if result.status or cached_result is not None:
+                results.append(cached_result or result)
+                continue
+            item_key = (result.ioc_type, result.safe_ioc)
+            pending.setdefault(item_key, result)
+            positions[item_key].append(len(results))
+            results.append(result)
+
+        by_type: DefaultDict[str, List[LookupResult]] = defaultdict(list)
+        for result in pending.values():
+            by_type[result.ioc_type].append(result)
+        batches: List[List[LookupResult]] = []
+        single_items: List[LookupResult] = []
+        for ioc_type, type_results in by_type.items():
+            batch_size = self.get_batch_size(ioc_type)
+            if batch_size > 1:
+                batches.extend(
+                    type_results[idx : idx + batch_size]  # noqa: E203
+                    for idx in range(0, len(type_results), batch_size)
+                )
+            else:
+                single_items.extend(type_results)
+
+        lookup_batch: Callable[[List[LookupResult]], List[LookupResult]] = partial(
+            self._lookup_batch_throttled, query_type=query_type
+        )
+        if kwargs.get("concurrent", False) and self.max_concurrency > 1:
+            with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+                batch_results = list(executor.map(lookup_batch, batches))
+        else:
+            batch_results = [lookup_batch(batch) for batch in batches]
+        single_results = self._lookup_items(
+            ((result.ioc, result.ioc_type) for result in single_items),
+            query_type,
+            **kwargs,
+        )
+
+        looked_up = zip(
+            [result for batch in batches for result in batch] + single_items,
+            [result for batch in batch_results for result in batch]
+            + list(single_results),
+        )
+        for src_result, lookup_result in looked_up:
+            for pos in positions[(src_result.ioc_type, src_result.safe_ioc)]:
+                results[pos] = attr.evolve(lookup_result, ioc=results[pos].ioc)
+        return results  # type: ignore
+
+    # pylint: enable=too-many-locals
+    def _lookup_batch_throttled(
+        self, batch: List[LookupResult], query_type: str = None
+    ) -> List[LookupResult]:
+        """Lookup a batch respecting the rate limit and cache the results."""
+        self._throttle.wait()
+        batch_results = self._lookup_batch(batch, query_type=query_type)
+        for result in batch_results:
+            if result.status == TILookupStatus.ok.value:
+                self._cache_result(result)
+        return batch_results
+
+    def _lookup_batch(
+        self, batch: List[LookupResult], query_type: str = None
+    ) -> List[LookupResult]:
+        """
+        Lookup a batch of observables of the same IoC type.
+
+        Parameters
+        ----------
+        batch : List[LookupResult]
+            Results for the observables to look up, as returned
+            by `_check_ioc_type`.
+        query_type : str, optional
+            Specify the data subtype to be queried, by default None.
+
+        Returns
+        -------
+        List[LookupResult]
+            The lookup results, in the same order as `batch`.
+
+        Raises
+        ------
+        NotImplementedError
+            If the provider does not support batch lookups.
+
+        """
+        raise NotImplementedError(
+            f"{self.__class__.__name__} does not support batch lookups."
+        )
+
+    @staticmethod
+    def _results_to_df(lookup_results: Iterable[LookupResult]) -> pd.DataFrame:
+        """Return a DataFrame of lookup results."""
+        results = [attr.asdict(item_result) for item_result in lookup_results]
 
         return pd.DataFrame(
             data=results).rename(
             columns=LookupResult.column_map())
 
+    def _lookup_ioc_throttled(
+        self, ioc: str, ioc_type: str = None, query_type: str = None, **kwargs
+    ) -> LookupResult:
+        """Lookup an IoC respecting the rate limit and retrying failures."""
+        for attempt in range(self.max_retries + 1):
+            self._throttle.wait()
+            result = self.lookup_ioc(
+                ioc=ioc, ioc_type=ioc_type, query_type=query_type, **kwargs
+            )
+            if result.status not in _RETRY_STATUS or attempt == self.max_retries:
+                break
+            time.sleep(self.retry_backoff * 2 ** attempt)
+        return result
+
+    def _get_cached_result(self, result: LookupResult) -> Optional[LookupResult]:
+        """Return a cached copy of `result` or None if not cached."""
+        if self.result_cache is None:
+            return None
+        cached_result = self.result_cache.get(
+            self.__class__.__name__, result.ioc, result.ioc_type, result.query_subtype
+        )
+        if cached_result is None:
+            return None
+        # the cached object may be shared, so return a relabelled copy
+        return attr.evolve(cached_result, provider=result.provider)
+
+    def _cache_result(self, result: LookupResult):
+        """Add `result` to the result cache, if there is one."""
+        if self.result_cache is not None:
+            self.result_cache.put(self.__class__.__name__, result)
+
     @abc.abstractmethod
     def parse_results(
             self, response: LookupResult) -> Tuple[bool, TISeverity, Any]:
@@ -12,19 +12,60 @@ processing performance may be limited to a specific number of
 requests per minute for the account type that you have.
 
 """
-from datetime import datetime
-from threading import Lock
-from typing import Tuple, Iterable, Dict, Any
+from datetime import datetime, timedelta
+from ipaddress import IPv4Address
+from pathlib import Path
+from threading import Event, Lock, Thread
+from typing import Any, Dict, Iterable, Optional, Tuple, Union
 
+import attr
+import numpy as np
+import pandas as pd
 import requests
+from attr import Factory
 
-from .ti_provider_base import TIProvider, LookupResult, TISeverity, TILookupStatus
+from .ti_provider_base import (
+    LookupResult,
+    TILookupStatus,
+    TIProvider,
+    TISeverity,
+    generate_items,
+)
 from ...common.utility import export
 from ..._version import VERSION
 
 __version__ = VERSION
 __author__ = "Ian Hellen"
 
+_DEF_REFRESH_INTERVAL = 24  # hours
+_DEF_SNAPSHOT_PATH = "~/.msticpy/tor_exit_nodes.txt"
+_RETRY_INTERVAL = timedelta(minutes=10)
+_REQUEST_TIMEOUT = 30
+_OCTET_WEIGHTS = np.array([1 << 24, 1 << 16, 1 << 8, 1], dtype=np.uint32)
+
+
+# pylint: disable=too-few-public-methods
+@attr.s(auto_attribs=True, frozen=True)
+class _TorNodeList:
+    """Immutable snapshot of the Tor exit node list."""
+
+    nodes: Dict[str, Dict[str, str]] = Factory(dict)
+    # sorted IPv4 exit addresses as integers
+    node_ips: np.ndarray = Factory(lambda: np.array([], dtype=np.uint32))
+    last_updated: datetime = datetime.min
+
+
+def _ipv4_to_int(ip_addr: str) -> Optional[int]:
+    try:
+        return int(IPv4Address(ip_addr))
+    except ValueError:
+        return None
+
+
+def _int_to_ipv4(ip_int: int) -> str:
+    """Return the address for an integer, in the form used by the node list."""
+    return str(IPv4Address(int(ip_int)))
+
 
 @export
 class Tor(TIProvider):
@@ -33,30 +74,161 @@ class Tor(TIProvider):
     _BASE_URL = "https://check.torproject.org/exit-addresses"
 
     _IOC_QUERIES: dict = {"ipv4": None}
-    _nodelist: Dict[str, Dict[str, str]] = {}
-    _last_cached = datetime.min
+    # The node list is shared by all instances. It is replaced, never
+    # modified, so readers always see a consistent snapshot.
+    _node_data = _TorNodeList()
     _cache_lock = Lock()
+    _last_attempt = datetime.min
+    _refresh_thread: Optional[Thread] = None
+    _stop_refresh = Event()
 
     def __init__(self, **kwargs):
-        """Instantiate Tor class."""
+        """
+        Instantiate Tor class.
+
+        Other Parameters
+        ----------------
+        RefreshInterval : float, optional
+            Hours after which the node list is refreshed, by default 24
+        BackgroundRefresh : bool, optional
+            Refresh the node list in a background thread, by default False.
+            The thread is started on the first lookup.
+        SnapshotPath : Union[str, bool], optional
+            File used to save the node list between sessions. If True,
+            "~/.msticpy/tor_exit_nodes.txt" is used. By default, no
+            snapshot is saved.
+
+        """
         super().__init__(**kwargs)
+        self.refresh_interval = timedelta(
+            hours=float(kwargs.get("RefreshInterval", _DEF_REFRESH_INTERVAL))
+        )
+        self.background_refresh = kwargs.get("BackgroundRefresh", False)
+        snapshot_path = kwargs.get("SnapshotPath")
+        if snapshot_path is True:
+            snapshot_path = _DEF_SNAPSHOT_PATH
+        self.snapshot_path: Optional[Path] = (
+            Path(snapshot_path).expanduser() if snapshot_path else None
+        )
         self._check_and_get_nodelist()
 
+    @property
+    def _nodelist(self) -> Dict[str, Dict[str, str]]:
+        """Return the current node list, keyed by exit address."""
+        return self._node_data.nodes
+
+    @property
+    def last_updated(self) -> datetime:
+        """Return the time (UTC) that the node list was downloaded."""
+        return self._node_data.last_updated
+
+    def _check_and_get_nodelist(self):
+        """Load the Tor exit node list, refreshing it if it is out of date."""
+        if not self._node_data.nodes and self.snapshot_path:
+            self._load_snapshot()
+        # We only wait for the download if we have no data
+        # or if background refresh is disabled.
+        if not self._node_data.nodes or (
+            self._is_stale() and not self.background_refresh
+        ):
+            self._refresh_nodelist()
+
+    def _is_stale(self) -> bool:
+        return datetime.utcnow() - self._node_data.last_updated > self.refresh_interval
+
+    def _refresh_nodelist(self) -> bool:
+        """Download the node list, returning True if successful."""
+        cls = self.__class__
+        if not cls._cache_lock.acquire(blocking=False):
+            # another thread is already downloading the list
+            if self._node_data.nodes:
+                return False
+            # with no list to fall back on, wait for that download
+            with cls._cache_lock:
+                return bool(self._node_data.nodes)
+        try:
+            cls._last_attempt = datetime.utcnow()
+            resp = requests.get(self._BASE_URL, timeout=_REQUEST_TIMEOUT)
+            resp.raise_for_status()
+            tor_raw_list = resp.content.decode()
+            self._set_nodelist(tor_raw_list, datetime.utcnow())
+        except (requests.RequestException, ConnectionError):
+            return False
+        finally:
+            cls._cache_lock.release()
+        if self.snapshot_path:
+            self._save_snapshot(tor_raw_list)
+        return True
+
     @classmethod
-    def _check_and_get_nodelist(cls):
-        """Pull down Tor exit node list and save to internal attribute."""
-        if cls._cache_lock.locked():
+    def _set_nodelist(cls, tor_raw_list: str, last_updated: datetime):
+        """Parse and index the node list, replacing the current list."""
+        nodes = dict(cls._tor_splitter(tor_raw_list))
+        ip_ints = (_ipv4_to_int(ip_addr) for ip_addr in nodes)
+        node_ips = np.unique(
+            np.array([ip for ip in ip_ints if ip is not None], dtype=np.uint32)
+        )
+        cls._node_data = _TorNodeList(
+            nodes=nodes, node_ips=node_ips, last_updated=last_updated
+        )
+
+    def _load_snapshot(self):
+        """Load the node list saved by a previous session."""
+        if not self.snapshot_path or not self.snapshot_path.is_file():
+            return
+        try:
+            tor_raw_list = self.snapshot_path.read_text(encoding="utf-8")
+            last_updated = datetime.utcfromtimestamp(
+                self.snapshot_path.stat().st_mtime
+            )
+        except OSError:
+            return
+        self._set_nodelist(tor_raw_list, last_updated)
+
+    def _save_snapshot(self, tor_raw_list: str):
+        """Save the node list for use by later sessions."""
+        if not self.snapshot_path:
             return
-        now = datetime.utcnow()
-        if not cls._nodelist or (now - cls._last_cached).days > 1:
-            try:
-                resp = requests.get(cls._BASE_URL)
-                tor_raw_list = resp.content.decode()
-                with cls._cache_lock:
-                    cls._nodelist = dict(cls._tor_splitter(tor_raw_list))
-                    cls._last_cached = datetime.utcnow()
-            except ConnectionError:
-                pass
+        try:
+            self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+            # write to a temporary file so readers never see a partial file
+            tmp_path = self.snapshot_path.with_suffix(".tmp")
+            tmp_path.write_text(tor_raw_list, encoding="utf-8")
+            tmp_path.replace(self.snapshot_path)
+        except OSError:
+            pass
+
+    def _start_background_refresh(self):
+        """Start the refresh thread, if enabled and not already running."""
+        cls = self.__class__
+        if not self.background_refresh or (
+            cls._refresh_thread is not None and cls._refresh_thread.is_alive()
+        ):
+            return
+        cls._stop_refresh.clear()
+        cls._refresh_thread = Thread(
+            target=self._refresh_loop, name="msticpy-tor-refresh", daemon=True
+        )
+        cls._refresh_thread.start()
+
+    def _refresh_loop(self):
+        while True:
+            next_refresh = max(
+                self._node_data.last_updated + self.refresh_interval,
+                self._last_attempt + _RETRY_INTERVAL,
+            )
+            wait_time = (next_refresh - datetime.utcnow()).total_seconds()
+            if self._stop_refresh.wait(timeout=max(wait_time, 0)):
+                return
+            self._refresh_nodelist()
+
+    @classmethod
+    def stop_background_refresh(cls):
+        """Stop the background refresh thread."""
+        cls._stop_refresh.set()
+        if cls._refresh_thread is not None:
+            cls._refresh_thread.join()
+            cls._refresh_thread = None
 
     @staticmethod
     def _tor_splitter(node_list) -> Iterable[Tuple[str, Dict[str, str]]]:
@@ -96,33 +268,141 @@ class Tor(TIProvider):
             The returned results.
 
         """
+        self._start_background_refresh()
+        node_data = self._node_data
         result = self._check_ioc_type(
             ioc=ioc, ioc_type=ioc_type, query_subtype=query_type
         )
 
         result.provider = kwargs.get("provider_name", self.__class__.__name__)
-        result.result = bool(self._nodelist)
+        result.result = bool(node_data.nodes)
         result.reference = self._BASE_URL
 
-        if result.status and not bool(self._nodelist):
+        if result.status and not bool(node_data.nodes):
             result.status = TILookupStatus.query_failed.value
 
         if result.status:
             return result
 
-        tor_node = self._nodelist.get(ioc)
+        # match on the address value, so that leading zeros are ignored
+        ip_int = np.array(ioc.split("."), dtype=np.uint32) @ _OCTET_WEIGHTS
+        tor_node = node_data.nodes.get(_int_to_ipv4(ip_int))
 
         if tor_node:
             result.set_severity(TISeverity.warning)
-            result.details = {
-                "NodeID": tor_node["ExitNode"],
-                "LastStatus": tor_node["LastStatus"],
-            }
+            result.details = self._node_details(tor_node)
             result.raw_result = tor_node
         else:
             result.details = "Not found."
         return result
 
+    def lookup_iocs(
+        self,
+        data: Union[pd.DataFrame, Dict[str, str], Iterable[str]],
+        obs_col: str = None,
+        ioc_type_col: str = None,
+        query_type: str = None,
+        **kwargs,
+    ) -> pd.DataFrame:
+        """
+        Lookup collection of IoC observables.
+
+        Parameters
+        ----------
+        data : Union[pd.DataFrame, Dict[str, str], Iterable[str]]
+            Data input in one of three formats:
+            1. Pandas dataframe (you must supply the column name in
+            `obs_col` parameter)
+            2. Dict of observable, IoCType
+            3. Iterable of observables - IoCTypes will be inferred
+        obs_col : str, optional
+            DataFrame column to use for observables, by default None
+        ioc_type_col : str, optional
+            DataFrame column to use for IoCTypes, by default None
+        query_type : str, optional
+            Specify the data subtype to be queried, by default None.
+            If not specified the default record type for the IoC type
+            will be returned.
+
+        Returns
+        -------
+        pd.DataFrame
+            DataFrame of results.
+
+        Notes
+        -----
+        Each distinct observable is checked once and all of the
+        addresses are matched against the node list in a single
+        vectorized operation.
+
+        """
+        self._start_background_refresh()
+        node_data = self._node_data
+        if isinstance(data, pd.DataFrame) and obs_col:
+            items = pd.DataFrame(
+                {
+                    "Ioc": data[obs_col].values,
+                    "_IocTypeIn": data[ioc_type_col].values if ioc_type_col else None,
+                }
+            )
+        else:
+            items = pd.DataFrame(
+                list(generate_items(data, obs_col, ioc_type_col)),
+                columns=["Ioc", "_IocTypeIn"],
+            )
+        items = items[items["Ioc"].notna() & items["Ioc"].astype(bool)]
+        if items.empty:
+            return pd.DataFrame(columns=LookupResult.column_map().values())
+
+        unique_items = items.drop_duplicates().reset_index(drop=True)
+        results = self._results_to_df(
+            self._check_ioc_type(ioc=ioc, ioc_type=ioc_type, query_subtype=query_type)
+            for ioc, ioc_type in unique_items.itertuples(index=False)
+        )
+        results["Provider"] = kwargs.get("provider_name", self.__class__.__name__)
+        results["Result"] = bool(node_data.nodes)
+        results["Reference"] = self._BASE_URL
+        if not node_data.nodes:
+            results.loc[results["Status"] != 0, "Status"] = (
+                TILookupStatus.query_failed.value
+            )
+
+        valid = (results["Status"] == 0) & (results["IocType"] == "ipv4")
+        is_node = pd.Series(False, index=results.index)
+        ip_ints = pd.Series(0, index=results.index, dtype=np.uint32)
+        if valid.any():
+            ip_octets = (
+                results.loc[valid, "Ioc"]
+                .str.split(".", expand=True)
+                .to_numpy(dtype=np.uint32)
+            )
+            ip_ints[valid] = ip_octets @ _OCTET_WEIGHTS
+            is_node[valid] = np.isin(ip_ints[valid], node_data.node_ips)
+
+        results["Details"] = results["Details"].astype(object)
+        results.loc[(results["Status"] == 0) & ~is_node, "Details"] = "Not found."
+        if is_node.any():
+            # observables may differ from the node list addresses
+            # (e.g. leading zeros), so look up by the matched value
+            tor_nodes = ip_ints[is_node].map(_int_to_ipv4).map(node_data.nodes)
+            results.loc[is_node, "Severity"] = TISeverity.warning.name
+            results.loc[is_node, "RawResult"] = tor_nodes
+            results.loc[is_node, "Details"] = tor_nodes.map(self._node_details)
+
+        results["_IocTypeIn"] = unique_items["_IocTypeIn"]
+        return (
+            items.merge(results, on=["Ioc", "_IocTypeIn"], how="left")
+            .drop(columns="_IocTypeIn")
+            .reset_index(drop=True)
+        )
+
+    @staticmethod
+    def _node_details(tor_node: Dict[str, str]) -> Dict[str, str]:
+        return {
+            "NodeID": tor_node["ExitNode"],
+            "LastStatus": tor_node["LastStatus"],
+        }
+
     def parse_results(
             self, response: LookupResult) -> Tuple[bool, TISeverity, Any]:
         """
@@ -13,7 +13,7 @@ requests per minute for the account type that you have.
 
 """
 import datetime as dt
-from typing import Any, Tuple, Dict
+from typing import Any, Dict, Iterable, Tuple
 
 from .ti_provider_base import LookupResult, TISeverity
 from .http_base import HttpProvider, IoCLookupParams
@@ -66,6 +66,21 @@ class VirusTotal(HttpProvider):
 
     _REQUIRED_PARAMS = ["API_KEY"]
 
+    # file/report accepts a comma-separated list of up to 4 hashes
+    # with a public API key and up to 25 with a private key.
+    _BATCH_SIZES = {
+        "file_hash": 4,
+        "md5_hash": 4,
+        "sha1_hash": 4,
+        "sha256_hash": 4,
+    }
+    _MAX_BATCH_SIZES = {
+        "file_hash": 25,
+        "md5_hash": 25,
+        "sha1_hash": 25,
+        "sha256_hash": 25,
+    }
+
     def parse_results(
             self, response: LookupResult) -> Tuple[bool, TISeverity, Any]:
         """
@@ -139,6 +154,14 @@ class VirusTotal(HttpProvider):
 
     # pylint: enable=duplicate-code, too-many-branches
 
+    def _split_batch_response(self, response: Any) -> Iterable[Tuple[str, Any]]:
+        """Split a batch file report response into single reports."""
+        # a batch containing a single item returns a dict, not a list
+        reports = response if isinstance(response, list) else [response]
+        for report in reports:
+            if isinstance(report, dict) and "resource" in report:
+                yield report["resource"], report
+
     @staticmethod
     def _extract_url_results(
         response: LookupResult,
@@ -73,6 +73,8 @@ EXTRAS = {
     ],
     "ml": ["scikit-learn>=0.20.2", "scipy>=1.1.0", "statsmodels>=0.11.1"],
     "sql2kql": ["moz_sql_parser>=4.5.0,<=4.11.21016"],
+    "aiohttp": ["aiohttp>=3.6.0"],
+    "parquet": ["pyarrow>=1.0.0"],
 }
 extras_all = [
     extra for name, extras in list(EXTRAS.items()) for extra in extras if name != "dev"
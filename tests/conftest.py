@@ -0,0 +1,18 @@
+# -------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# --------------------------------------------------------------------------
+"""Shared test fixtures."""
+import pytest
+
+from msticpy.data import data_providers
+
+
+@pytest.fixture(autouse=True, scope="session")
+def query_index_path(tmp_path_factory):
+    """Keep the query file index out of the user's home folder."""
+    index_path = tmp_path_factory.mktemp("query_index").joinpath("query_index.pkl")
+    with pytest.MonkeyPatch.context() as mpatch:
+        mpatch.setattr(data_providers, "_QUERY_INDEX_PATH", str(index_path))
+        yield index_path
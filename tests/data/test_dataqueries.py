@@ -4,16 +4,21 @@
 # license information.
 # --------------------------------------------------------------------------
 """datq query test class."""
+import os
+import tempfile
 import unittest
 import warnings
 from datetime import datetime
 from functools import partial
 from pathlib import Path
 from typing import Any, Dict, Iterable, Optional, Tuple, Union
+from unittest import mock
 
 import pandas as pd
+from msticpy.data.data_query_reader import read_query_def_file
 from msticpy.data.data_providers import DriverBase, QueryContainer, QueryProvider
 from msticpy.data.query_source import QuerySource
+from msticpy.data.query_store import QueryStore
 
 from ..unit_test_lib import get_test_data_path
 
@@ -148,6 +153,69 @@ class TestDataQuery(unittest.TestCase):
             self.assertTrue(len(func.__doc__))
             self.assertIn("Parameters", func.__doc__)
 
+    def test_query_index(self):
+        """Test query files are read from the index if unchanged."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            query_dir = Path(tmp_dir, "queries")
+            query_dir.mkdir()
+            la_file = query_dir.joinpath("la_queries.yaml")
+            la_file.write_text(Path(_TEST_DATA, "data_q_success.yaml").read_text())
+            splunk_file = query_dir.joinpath("splunk_queries.yaml")
+            splunk_file.write_text(
+                la_file.read_text().replace("[LogAnalytics]", "[Splunk]")
+            )
+            index_path = str(Path(tmp_dir, "query_index.pkl"))
+
+            with mock.patch(
+                "msticpy.data.query_store.read_query_def_file",
+                wraps=read_query_def_file,
+            ) as read_file:
+                env_stores = QueryStore.import_files(
+                    [str(query_dir)], index_path=index_path
+                )
+                self.assertEqual(set(env_stores), {"AzureSentinel", "Splunk"})
+                self.assertEqual(read_file.call_count, 2)
+
+                env_stores = QueryStore.import_files(
+                    [str(query_dir)], environment="Splunk", index_path=index_path
+                )
+                self.assertEqual(list(env_stores), ["Splunk"])
+                self.assertEqual(read_file.call_count, 2)
+                expected = QueryStore.import_files([str(query_dir)])["Splunk"]
+                self.assertEqual(
+                    set(env_stores["Splunk"].query_names), set(expected.query_names)
+                )
+
+                # changed files are read again
+                splunk_file.write_text(
+                    splunk_file.read_text().replace("query1:", "query4:")
+                )
+                stat = splunk_file.stat()
+                os.utime(splunk_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+                read_file.reset_mock()
+                env_stores = QueryStore.import_files(
+                    [str(query_dir)], environment="Splunk", index_path=index_path
+                )
+                self.assertEqual(read_file.call_count, 1)
+                self.assertIn(
+                    "SecurityAlert.query4", list(env_stores["Splunk"].query_names)
+                )
+
+    def test_query_lazy_doc(self):
+        """Test query doc strings are created when first accessed."""
+        with mock.patch.object(
+            QuerySource, "create_doc_string", autospec=True, return_value="Docs"
+        ) as create_doc:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", category=UserWarning)
+                la_provider = QueryProvider(
+                    data_environment="LogAnalytics", driver=self.provider
+                )
+            create_doc.assert_not_called()
+            self.assertEqual(la_provider.SecurityAlert.list_alerts.__doc__, "Docs")
+            self.assertEqual(la_provider.SecurityAlert.list_alerts.__doc__, "Docs")
+            self.assertEqual(create_doc.call_count, 1)
+
     def test_load_query_exec(self):
         """Test run query."""
         la_provider = self.la_provider
@@ -399,3 +467,54 @@ class TestDataQuery(unittest.TestCase):
             self.assertIn(e_time.isoformat(sep="T") + "Z", queries[idx])
         self.assertIn(start.isoformat(sep="T") + "Z", queries[0])
         self.assertIn(end.isoformat(sep="T") + "Z", queries[-1])
+
+    def test_split_queries_concurrent(self):
+        """Test split queries run concurrently, streamed and retried."""
+        la_provider = self.la_provider
+
+        start = datetime.utcnow() - pd.Timedelta("5H")
+        end = datetime.utcnow() + pd.Timedelta("5min")
+        queries = la_provider.all_queries.list_alerts(
+            "print", start=start, end=end, split_query_by="1H"
+        ).split("\n\n")
+
+        for max_workers in (1, 3):
+            result_df = la_provider.all_queries.list_alerts(
+                start=start, end=end, split_query_by="1H", max_workers=max_workers
+            )
+            # results are in time order
+            self.assertEqual(list(result_df["query"]), queries)
+
+        results = la_provider.all_queries.list_alerts(
+            start=start,
+            end=end,
+            split_query_by="1H",
+            max_workers=2,
+            split_query_stream=True,
+        )
+        self.assertNotIsInstance(results, pd.DataFrame)
+        self.assertEqual([res_df.iloc[0]["query"] for res_df in results], queries)
+
+        # each failed slice is retried
+        calls = []
+        driver_query = self.provider.query
+
+        def _flaky_query(query, query_source=None, **kwargs):
+            calls.append(query)
+            if query == queries[2] and calls.count(query) == 1:
+                raise ConnectionError("Query failed")
+            if query == queries[3]:
+                return "Query error"
+            return driver_query(query, query_source, **kwargs)
+
+        with mock.patch.object(self.provider, "query", side_effect=_flaky_query):
+            with mock.patch("msticpy.data.data_providers._SPLIT_RETRY_BACKOFF", 0):
+                with self.assertWarns(UserWarning):
+                    result_df = la_provider.all_queries.list_alerts(
+                        start=start, end=end, split_query_by="1H", max_workers=3
+                    )
+        self.assertEqual(calls.count(queries[2]), 2)
+        self.assertEqual(calls.count(queries[3]), 3)
+        self.assertEqual(calls.count(queries[0]), 1)
+        expected = [query for query in queries if query != queries[3]]
+        self.assertEqual(list(result_df["query"]), expected)
@@ -0,0 +1,146 @@
+# -------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# --------------------------------------------------------------------------
+"""Query result cache tests."""
+import warnings
+from datetime import datetime
+from typing import Any, Optional, Union
+
+import pandas as pd
+import pytest
+import pytest_check as check
+
+from msticpy.data.data_providers import DriverBase, QueryProvider
+from msticpy.data.query_cache import QueryResultCache
+from msticpy.data.query_source import QuerySource
+
+pytest.importorskip("pyarrow")
+
+# pylint: disable=protected-access, redefined-outer-name
+
+
+class _CountingDriver(DriverBase):
+    """Test driver that counts the queries run."""
+
+    def __init__(self, **kwargs):
+        """Initialize new instance."""
+        super().__init__(**kwargs)
+        self._loaded = True
+        self.queries = []
+
+    def connect(self, connection_str: Optional[str] = None, **kwargs):
+        """Test method."""
+        self.current_connection = connection_str
+        self._connected = True
+
+    def query(
+        self, query: str, query_source: QuerySource = None, **kwargs
+    ) -> Union[pd.DataFrame, Any]:
+        """Test method."""
+        del query_source, kwargs
+        self.queries.append(query)
+        return pd.DataFrame({"query": [query], "count": [len(self.queries)]})
+
+    def query_with_results(self, query: str, **kwargs):
+        """Test method."""
+
+
+@pytest.fixture
+def query_cache(tmp_path):
+    """Return a query result cache in a temporary folder."""
+    cache = QueryResultCache(path=str(tmp_path))
+    yield cache
+    cache.close()
+
+
+def test_query_cache_get_put(query_cache):
+    """Test results are cached by query and connection."""
+    data = pd.DataFrame(
+        {
+            "TimeGenerated": pd.date_range("2021-01-01", periods=3, freq="H"),
+            "Account": ["a", "b", None],
+            "Count": [1, 2, 3],
+        }
+    )
+    check.is_none(query_cache.get("query1", "conn1"))
+    check.is_true(query_cache.put("query1", "conn1", data))
+    pd.testing.assert_frame_equal(query_cache.get("query1", "conn1"), data)
+    check.is_none(query_cache.get("query1", "conn2"))
+    check.is_none(query_cache.get("query2", "conn1"))
+    check.equal(len(query_cache), 1)
+
+    # results that cannot be stored as parquet are not cached
+    bad_data = pd.DataFrame({"Mixed": [1, "a", {"b": 1}]})
+    check.is_false(query_cache.put("query3", "conn1", bad_data))
+    check.is_none(query_cache.get("query3", "conn1"))
+
+    query_cache.clear()
+    check.equal(len(query_cache), 0)
+    check.equal(list(query_cache.path.glob("*.parquet")), [])
+
+
+def test_query_cache_expiry(tmp_path):
+    """Test TTL expiry and closed time windows."""
+    query_cache = QueryResultCache(path=str(tmp_path), ttl=-1)
+    data = pd.DataFrame({"Count": [1, 2, 3]})
+    query_cache.put("query1", "conn1", data, end=datetime.utcnow())
+    check.is_none(query_cache.get("query1", "conn1"))
+    query_cache.put("query2", "conn1", data, end="2021-01-01T00:00:00Z")
+    check.is_not_none(query_cache.get("query2", "conn1"))
+    query_cache.put("query3", "conn1", data, end=pd.Timestamp("2021-01-01"))
+    check.is_not_none(query_cache.get("query3", "conn1"))
+    check.equal(len(query_cache), 2)
+    query_cache.close()
+
+
+def test_query_cache_lru(query_cache):
+    """Test least recently used items are removed when over size."""
+    data = pd.DataFrame({"Count": range(1000)})
+    query_cache.put("query1", "conn1", data)
+    item_size = query_cache.size
+    query_cache.max_size = item_size * 2
+    query_cache.put("query2", "conn1", data)
+    query_cache.get("query1", "conn1")
+    query_cache.put("query3", "conn1", data)
+    check.equal(len(query_cache), 2)
+    check.is_not_none(query_cache.get("query1", "conn1"))
+    check.is_none(query_cache.get("query2", "conn1"))
+    check.is_not_none(query_cache.get("query3", "conn1"))
+    check.equal(len(list(query_cache.path.glob("*.parquet"))), 2)
+
+
+def test_query_provider_cache(query_cache):
+    """Test QueryProvider uses the cache."""
+    driver = _CountingDriver()
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=UserWarning)
+        qry_prov = QueryProvider(
+            "LogAnalytics", driver=driver, query_cache=query_cache
+        )
+    qry_prov.connect("workspace1")
+    start = datetime(2021, 1, 1)
+    end = datetime(2021, 1, 2)
+
+    result1 = qry_prov.SecurityAlert.list_alerts(start=start, end=end)
+    result2 = qry_prov.SecurityAlert.list_alerts(start=start, end=end)
+    check.equal(len(driver.queries), 1)
+    pd.testing.assert_frame_equal(result1, result2)
+
+    qry_prov.SecurityAlert.list_alerts(start=start, end=end, use_cache=False)
+    check.equal(len(driver.queries), 2)
+
+    # different connection
+    qry_prov.connect("workspace2")
+    qry_prov.SecurityAlert.list_alerts(start=start, end=end)
+    check.equal(len(driver.queries), 3)
+
+    # split query slices are cached individually
+    qry_prov.SecurityAlert.list_alerts(start=start, end=end, split_query_by="6H")
+    check.equal(len(driver.queries), 7)
+    result = qry_prov.SecurityAlert.list_alerts(
+        start=start, end=end, split_query_by="6H"
+    )
+    check.equal(len(driver.queries), 7)
+    check.equal(len(result), 4)
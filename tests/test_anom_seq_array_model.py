@@ -0,0 +1,216 @@
+import random
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from msticpy.analysis.anomalous_sequence.model import Model
+from msticpy.analysis.anomalous_sequence.utils import (
+    cmds_only,
+    cmds_params_only,
+    cmds_params_values,
+    log_likelihoods,
+    parallel,
+    probabilities,
+)
+from msticpy.analysis.anomalous_sequence.utils.array_model import ArrayModel
+from msticpy.analysis.anomalous_sequence.utils.data_structures import Cmd
+
+START_TOKEN = "##START##"
+END_TOKEN = "##END##"
+UNK_TOKEN = "##UNK##"
+
+
+def _make_sessions(session_type, seed, n_sessions=50):
+    rnd = random.Random(seed)
+    cmds = ["Set-User", "Set-Mailbox", "New-Item", "Get-Item"]
+    params = ["Identity", "City", "Name", "Force"]
+    values = ["blah", "haha", "york"]
+    sessions = []
+    for _ in range(n_sessions):
+        session = []
+        for _ in range(rnd.randint(1, 6)):
+            name = rnd.choice(cmds)
+            pars = rnd.sample(params, rnd.randint(0, 3))
+            if session_type == 0:
+                session.append(name)
+            elif session_type == 1:
+                session.append(Cmd(name, set(pars)))
+            else:
+                session.append(Cmd(name, {par: rnd.choice(values) for par in pars}))
+        sessions.append(session)
+    return sessions
+
+
+class TestArrayModel(unittest.TestCase):
+    def assertStatesAlmostEqual(self, actual, expected):
+        self.assertEqual(set(actual.keys()), set(expected.keys()))
+        for key, val in expected.items():
+            if isinstance(val, dict):
+                self.assertStatesAlmostEqual(actual[key], val)
+            else:
+                self.assertAlmostEqual(actual[key], val)
+
+    def test_encode(self):
+        array_model = ArrayModel(START_TOKEN, END_TOKEN, UNK_TOKEN, use_values=True)
+        sessions = [
+            [Cmd("Set-User", {"Identity": "blah"}), Cmd("Set-User", {})],
+            [Cmd("Set-Mailbox", {"Identity": "haha", "City": "york"})],
+        ]
+        encoded = array_model.encode(sessions, add_tokens=True)
+        self.assertEqual(list(encoded.cmds), [3, 3, 4])
+        self.assertEqual(list(encoded.offsets), [0, 2, 3])
+        self.assertEqual(list(encoded.params), [1, 1, 2])
+        self.assertEqual(list(encoded.values), [1, 2, 3])
+        self.assertEqual(list(encoded.param_offsets), [0, 1, 1, 3])
+
+        encoded = array_model.encode(
+            [[Cmd("Set-Group", {"Identity": "bob", "Owner": "blah"})]]
+        )
+        self.assertEqual(list(encoded.cmds), [array_model.unk_id])
+        self.assertEqual(list(encoded.params), [1, -1])
+        self.assertEqual(list(encoded.values), [-1, 1])
+
+    def test_cmds_only_views(self):
+        sessions = _make_sessions(0, seed=1)
+        model = Model(sessions=sessions)
+        model.train()
+        seq1_counts, seq2_counts = cmds_only.compute_counts(
+            sessions, START_TOKEN, END_TOKEN, UNK_TOKEN
+        )
+        self.assertStatesAlmostEqual(model._seq1_counts, seq1_counts)
+        self.assertStatesAlmostEqual(model._seq2_counts, seq2_counts)
+        seq1_counts_ls, seq2_counts_ls = cmds_only.laplace_smooth_counts(
+            seq1_counts, seq2_counts, START_TOKEN, END_TOKEN, UNK_TOKEN
+        )
+        self.assertStatesAlmostEqual(model.seq1_counts, seq1_counts_ls)
+        self.assertStatesAlmostEqual(model.seq2_counts, seq2_counts_ls)
+        prior_probs, trans_probs = probabilities.compute_cmds_probs(
+            seq1_counts_ls, seq2_counts_ls, UNK_TOKEN
+        )
+        self.assertStatesAlmostEqual(model.prior_probs, prior_probs)
+        self.assertStatesAlmostEqual(model.trans_probs, trans_probs)
+        self.assertEqual(
+            model.trans_probs["Set-Group"][START_TOKEN],
+            trans_probs[UNK_TOKEN][UNK_TOKEN],
+        )
+
+    def test_cmds_params_only_views(self):
+        sessions = _make_sessions(1, seed=2)
+        model = Model(sessions=sessions)
+        model.train()
+        counts = cmds_params_only.compute_counts(sessions, START_TOKEN, END_TOKEN)
+        counts_ls = cmds_params_only.laplace_smooth_counts(
+            *counts, START_TOKEN, END_TOKEN, UNK_TOKEN
+        )
+        self.assertStatesAlmostEqual(model._cmd_param_counts, counts[3])
+        self.assertStatesAlmostEqual(model.param_counts, counts_ls[2])
+        self.assertStatesAlmostEqual(model.cmd_param_counts, counts_ls[3])
+        param_probs, param_cond_cmd_probs = probabilities.compute_params_probs(
+            counts_ls[2], counts_ls[3], counts_ls[0], UNK_TOKEN
+        )
+        self.assertStatesAlmostEqual(model.param_probs, param_probs)
+        self.assertStatesAlmostEqual(model.param_cond_cmd_probs, param_cond_cmd_probs)
+
+    def test_cmds_params_values_views(self):
+        sessions = _make_sessions(2, seed=3, n_sessions=200)
+        model = Model(sessions=sessions)
+        model.train()
+        counts = cmds_params_values.compute_counts(sessions, START_TOKEN, END_TOKEN)
+        self.assertEqual(
+            model.modellable_params,
+            cmds_params_values.get_params_to_model_values(counts[2], counts[5]),
+        )
+        counts_ls = cmds_params_values.laplace_smooth_counts(
+            *counts, START_TOKEN, END_TOKEN, UNK_TOKEN
+        )
+        self.assertStatesAlmostEqual(model._param_value_counts, counts[5])
+        self.assertStatesAlmostEqual(model.value_counts, counts_ls[4])
+        self.assertStatesAlmostEqual(model.param_value_counts, counts_ls[5])
+        value_probs, value_cond_param_probs = probabilities.compute_values_probs(
+            counts_ls[4], counts_ls[5], UNK_TOKEN
+        )
+        self.assertStatesAlmostEqual(model.value_probs, value_probs)
+        self.assertStatesAlmostEqual(
+            model.value_cond_param_probs, value_cond_param_probs
+        )
+
+    def test_scores_match_dict_views(self):
+        for session_type in range(3):
+            model = Model(sessions=_make_sessions(session_type, seed=4))
+            model.train()
+            # score sessions with unseen commands, params and values
+            model.sessions = _make_sessions(session_type, seed=5)
+            if session_type == 0:
+                model.sessions[0] = ["Set-Group", "Set-User"]
+            elif session_type == 1:
+                model.sessions[0] = [Cmd("Set-Group", {"Owner", "Identity"})]
+            else:
+                model.sessions[0] = [Cmd("Set-User", {"Owner": "a", "City": "b"})]
+            for use_tokens in (True, False):
+                encoded = model._array_model.encode(model.sessions)
+                step_log_probs, offsets = model._array_model.compute_step_log_probs(
+                    encoded, use_tokens
+                )
+                for i, session in enumerate(model.sessions):
+                    np.testing.assert_allclose(
+                        step_log_probs[:, offsets[i] : offsets[i + 1]],  # noqa: E203
+                        model._compute_step_log_probs(session, use_tokens),
+                    )
+                np.testing.assert_allclose(
+                    model._array_scores(use_tokens),
+                    [
+                        log_likelihoods.session_log_likelihood(
+                            model._compute_step_log_probs(session, use_tokens)
+                        )
+                        for session in model.sessions
+                    ],
+                )
+
+    def test_parallel_matches_serial(self):
+        for session_type in range(3):
+            sessions = _make_sessions(session_type, seed=7, n_sessions=200)
+            serial = Model(sessions=sessions)
+            serial.train()
+            serial.compute_scores(use_start_end_tokens=True)
+            model = Model(sessions=sessions, n_jobs=2)
+            with mock.patch.object(parallel, "_MAX_CHUNK_CMDS", 50):
+                model.train()
+                model.compute_scores(use_start_end_tokens=True)
+            self.assertEqual(
+                model._array_model.cmds.tokens, serial._array_model.cmds.tokens
+            )
+            self.assertEqual(model.trans_probs, serial.trans_probs)
+            self.assertEqual(model.param_cond_cmd_probs, serial.param_cond_cmd_probs)
+            self.assertEqual(
+                model.value_cond_param_probs, serial.value_cond_param_probs
+            )
+            # the likelihoods are summed per chunk, so may differ by rounding
+            np.testing.assert_allclose(
+                model.session_log_likelihoods,
+                serial.session_log_likelihoods,
+                rtol=1e-9,
+            )
+            np.testing.assert_allclose(
+                model.rare_window_likelihoods[3],
+                serial.rare_window_likelihoods[3],
+                rtol=1e-9,
+            )
+
+    def test_replaced_probs_use_dict_views(self):
+        model = Model(sessions=_make_sessions(0, seed=6))
+        model.train()
+        self.assertIsNotNone(model._array_scores(True))
+        model.prior_probs = dict(model.prior_probs, **{"Set-User": 0.5})
+        self.assertIsNone(model._array_scores(True))
+        model.compute_likelihoods_of_sessions(use_start_end_tokens=False)
+        self.assertAlmostEqual(
+            model.session_log_likelihoods[0],
+            log_likelihoods.session_log_likelihood(
+                model._compute_step_log_probs(model.sessions[0], False)
+            ),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
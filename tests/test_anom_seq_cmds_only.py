@@ -153,7 +153,7 @@ class TestCmdsOnly(unittest.TestCase):
             end_token=END_TOKEN,
         )
         expected = (1 / 3) * 0.5
-        self.assertEqual(actual, expected)
+        self.assertAlmostEqual(actual, expected)
 
         actual = cmds_only.compute_likelihood_window(
             window=["Set-User"],
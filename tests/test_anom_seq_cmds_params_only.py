@@ -357,7 +357,7 @@ class TestCmdsParamsOnly(unittest.TestCase):
             start_token=START_TOKEN,
             end_token=END_TOKEN,
         )
-        self.assertEqual(actual, 0.22787717886202657)
+        self.assertAlmostEqual(actual, 0.22787717886202657)
 
         actual = cmds_params_only.compute_likelihood_window(
             window=[Cmd("Set-User", {"Identity"})],
@@ -421,7 +421,8 @@ class TestCmdsParamsOnly(unittest.TestCase):
             end_token=END_TOKEN,
             use_geo_mean=False,
         )
-        self.assertListEqual(actual, [0.22787717886202657])
+        self.assertEqual(len(actual), 1)
+        self.assertAlmostEqual(actual[0], 0.22787717886202657)
 
     def test_rarest_window_session(self):
         actual = cmds_params_only.rarest_window_session(
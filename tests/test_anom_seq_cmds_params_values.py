@@ -475,7 +475,7 @@ class TestCmdsParamsValues(unittest.TestCase):
             start_token=START_TOKEN,
             end_token=END_TOKEN,
         )
-        self.assertEqual(actual, 0.22787717886202657)
+        self.assertAlmostEqual(actual, 0.22787717886202657)
 
         actual = cmds_params_values.compute_likelihood_window(
             window=[Cmd("Set-User", {"Identity": "blah"})],
@@ -563,7 +563,8 @@ class TestCmdsParamsValues(unittest.TestCase):
             end_token=END_TOKEN,
             use_geo_mean=False,
         )
-        self.assertListEqual(actual, [0.22787717886202657])
+        self.assertEqual(len(actual), 1)
+        self.assertAlmostEqual(actual[0], 0.22787717886202657)
 
     def test_rarest_window_session(self):
         actual = cmds_params_values.rarest_window_session(
@@ -1,6 +1,9 @@
 import unittest
 
-from msticpy.analysis.anomalous_sequence.utils.data_structures import StateMatrix
+from msticpy.analysis.anomalous_sequence.utils.data_structures import (
+    StateMatrix,
+    TokenIndex,
+)
 from msticpy.common.exceptions import MsticpyException
 
 START_TOKEN = "##START##"
@@ -41,6 +44,21 @@ class TestDataStructures(unittest.TestCase):
         )
         self.assertEqual(states_matrix["haha"]["hehe"], 1)
 
+    def test_token_index(self):
+        index = TokenIndex([START_TOKEN, END_TOKEN, UNK_TOKEN])
+        self.assertEqual(len(index), 3)
+        self.assertEqual(index.add("Set-User"), 3)
+        self.assertEqual(index.add(END_TOKEN), 1)
+        self.assertTrue("Set-User" in index)
+        self.assertEqual(
+            list(index.encode(["Set-User", "Set-Mailbox"], default=2)), [3, 2]
+        )
+        self.assertEqual(len(index), 4)
+        self.assertEqual(
+            list(index.encode(["Set-Mailbox", "Set-User"], add_tokens=True)), [4, 3]
+        )
+        self.assertEqual(index.tokens[4], "Set-Mailbox")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,139 @@
+import random
+import unittest
+
+import numpy as np
+
+from msticpy.analysis.anomalous_sequence.model import Model
+from msticpy.analysis.anomalous_sequence.utils import log_likelihoods
+
+START_TOKEN = "##START##"
+END_TOKEN = "##END##"
+
+
+class TestLogLikelihoods(unittest.TestCase):
+    def setUp(self):
+        self.prior_probs = {"A": 0.5, "B": 0.3, "C": 0.2, END_TOKEN: 0.1}
+        self.trans_probs = {
+            START_TOKEN: {"A": 0.6, "B": 0.3, "C": 0.1},
+            "A": {"A": 0.1, "B": 0.6, "C": 0.2, END_TOKEN: 0.1},
+            "B": {"A": 0.3, "B": 0.1, "C": 0.4, END_TOKEN: 0.2},
+            "C": {"A": 0.5, "B": 0.2, "C": 0.0, END_TOKEN: 0.3},
+        }
+        self.session = ["A", "B", "C", "A", "A", "B", "C", "B"]
+
+    def _window_lik(self, steps, start, window_len, use_start_token):
+        window = steps[start : start + window_len]  # noqa: E203
+        if start == 0 and use_start_token:
+            prob = self.trans_probs[START_TOKEN][window[0]]
+        else:
+            prob = self.prior_probs[window[0]]
+        for prev, cur in zip(window, window[1:]):
+            prob *= self.trans_probs[prev][cur]
+        return prob
+
+    def test_window_log_likelihoods(self):
+        for use_tokens in (False, True):
+            steps = self.session + [END_TOKEN] if use_tokens else self.session
+            step_log_probs = log_likelihoods.compute_step_log_probs(
+                cmds=self.session,
+                prior_probs=self.prior_probs,
+                trans_probs=self.trans_probs,
+                use_start_token=use_tokens,
+                use_end_token=use_tokens,
+                start_token=START_TOKEN,
+                end_token=END_TOKEN,
+            )
+            for window_len in range(1, len(steps) + 2):
+                actual = log_likelihoods.window_log_likelihoods(
+                    step_log_probs, window_len
+                )
+                expected = [
+                    self._window_lik(steps, i, window_len, use_tokens)
+                    for i in range(len(steps) - window_len + 1)
+                ]
+                self.assertEqual(len(actual), len(expected))
+                np.testing.assert_allclose(np.exp(actual), expected, rtol=1e-12)
+
+            self.assertAlmostEqual(
+                np.exp(log_likelihoods.session_log_likelihood(step_log_probs)),
+                self._window_lik(steps, 0, len(steps), use_tokens),
+            )
+
+    def test_zero_probabilities(self):
+        # trans_probs["C"]["C"] is 0
+        session = ["A", "C", "C", "A", "B"]
+        step_log_probs = log_likelihoods.compute_step_log_probs(
+            cmds=session,
+            prior_probs=self.prior_probs,
+            trans_probs=self.trans_probs,
+            use_start_token=False,
+            use_end_token=False,
+        )
+        actual = log_likelihoods.window_log_likelihoods(step_log_probs, 2)
+        self.assertFalse(np.isnan(actual).any())
+        np.testing.assert_allclose(
+            np.exp(actual),
+            [self._window_lik(session, i, 2, False) for i in range(4)],
+        )
+        self.assertEqual(log_likelihoods.rarest_window_index(actual), 1)
+
+    def test_rarest_window_index(self):
+        self.assertEqual(log_likelihoods.rarest_window_index(np.empty(0)), -1)
+        # windows which only differ by rounding error are treated as equal
+        log_liks = np.array([-2.0, -3.0 + 1e-14, -3.0, -1.0])
+        self.assertEqual(log_likelihoods.rarest_window_index(log_liks), 1)
+
+    def test_sessions_rarest_windows(self):
+        rnd = random.Random(1)
+        sessions = [
+            rnd.choices(["A", "B", "C"], k=rnd.randint(1, 8)) for _ in range(20)
+        ]
+        steps = [
+            log_likelihoods.compute_step_log_probs(
+                cmds=session,
+                prior_probs=self.prior_probs,
+                trans_probs=self.trans_probs,
+                use_start_token=True,
+                use_end_token=True,
+                start_token=START_TOKEN,
+                end_token=END_TOKEN,
+            )
+            for session in sessions
+        ]
+        offsets = np.cumsum([0] + [step.shape[1] for step in steps])
+        step_log_probs = np.concatenate(steps, axis=1)
+        for window_len in range(0, 6):
+            inds, min_log_liks = log_likelihoods.sessions_rarest_windows(
+                step_log_probs, offsets, window_len
+            )
+            for i, step in enumerate(steps):
+                log_liks = log_likelihoods.window_log_likelihoods(step, window_len)
+                ind = log_likelihoods.rarest_window_index(log_liks)
+                self.assertEqual(inds[i], ind)
+                if ind >= 0:
+                    self.assertAlmostEqual(min_log_liks[i], log_liks[ind])
+                else:
+                    self.assertTrue(np.isnan(min_log_liks[i]))
+        np.testing.assert_allclose(
+            log_likelihoods.sessions_log_likelihoods(step_log_probs, offsets),
+            [log_likelihoods.session_log_likelihood(step) for step in steps],
+        )
+
+    def test_long_session_geomean(self):
+        rnd = random.Random(0)
+        sessions = [rnd.choices(["A", "B", "C", "D"], k=1000) for _ in range(2)]
+        model = Model(sessions=sessions)
+        model.train()
+        model.compute_scores(use_start_end_tokens=True)
+        # the likelihood of the long session underflows to 0
+        self.assertEqual(model.session_likelihoods[0], 0)
+        self.assertGreater(model.session_geomean_likelihoods[0], 0.01)
+        self.assertAlmostEqual(
+            np.log(model.session_geomean_likelihoods[0]),
+            model.session_log_likelihoods[0] / len(sessions[0]),
+        )
+        self.assertGreater(model.rare_window_likelihoods[3][0], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,4 @@
+import io
 import unittest
 
 from msticpy.analysis.anomalous_sequence.utils.data_structures import Cmd
@@ -185,6 +186,58 @@ class TestModel(unittest.TestCase):
         self.assertTrue(3 in model.rare_window_likelihoods_geo)
         self.assertTrue(3 in model.rare_windows_geo)
 
+    def test_partial_fit(self):
+        for sessions in (self.sessions1, self.sessions2, self.sessions3):
+            model = Model(sessions=sessions[:1])
+            self.assertRaises(MsticpyException, lambda: model.partial_fit(sessions))
+            model.train()
+            model.compute_scores(use_start_end_tokens=True)
+            model.partial_fit(sessions[1:])
+            self.assertEqual(model.sessions, sessions[1:])
+            self.assertEqual(model.rare_windows, {})
+
+            expected = Model(sessions=sessions)
+            expected.train()
+            self.assertEqual(model.seq1_counts, expected.seq1_counts)
+            self.assertEqual(model.trans_probs, expected.trans_probs)
+            self.assertEqual(model.param_cond_cmd_probs, expected.param_cond_cmd_probs)
+            self.assertEqual(
+                model.value_cond_param_probs, expected.value_cond_param_probs
+            )
+            self.assertEqual(model.modellable_params, expected.modellable_params)
+        self.assertRaises(MsticpyException, lambda: model.partial_fit(self.sessions1))
+
+    def test_save_load(self):
+        for sessions in (self.sessions1, self.sessions2, self.sessions3):
+            model = Model(sessions=sessions)
+            self.assertRaises(MsticpyException, lambda: model.save(io.BytesIO()))
+            model.train()
+            model.compute_likelihoods_of_sessions(use_start_end_tokens=True)
+            file = io.BytesIO()
+            model.save(file)
+            file.seek(0)
+            loaded = Model.load(file, sessions=sessions)
+            self.assertEqual(loaded.seq2_counts, model.seq2_counts)
+            self.assertEqual(loaded.trans_probs, model.trans_probs)
+            self.assertEqual(loaded.value_probs, model.value_probs)
+            self.assertEqual(loaded.modellable_params, model.modellable_params)
+            loaded.compute_likelihoods_of_sessions(use_start_end_tokens=True)
+            self.assertEqual(loaded.session_likelihoods, model.session_likelihoods)
+        file.seek(0)
+        self.assertRaises(
+            MsticpyException, lambda: Model.load(file, sessions=self.sessions1)
+        )
+
+        model = Model(sessions=self.sessions3, modellable_params={"City"})
+        model.train()
+        file = io.BytesIO()
+        model.save(file)
+        file.seek(0)
+        loaded = Model.load(file, sessions=self.sessions3)
+        loaded.partial_fit(self.sessions3)
+        self.assertEqual(loaded.modellable_params, {"City"})
+        self.assertEqual(loaded._value_counts["london"], 2)
+
 
 if __name__ == "__main__":
     unittest.main()
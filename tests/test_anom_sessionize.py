@@ -214,6 +214,30 @@ class TestSessionize(unittest.TestCase):
 
         assert_frame_equal(actual, self.df3_with_ses_col, check_dtype=False)
 
+    def test_create_session_col_max_session_time(self):
+        times = pd.date_range("2020-01-03", periods=50, freq="min", tz="UTC")
+        data = pd.DataFrame(
+            {
+                "UserId": [1] * 50 + [2] * 50,
+                "time": times.append(times),
+                "operation": ["A"] * 100,
+            }
+        ).sample(frac=1, random_state=0)
+
+        actual = sessionize.create_session_col(
+            data=data,
+            user_identifier_cols=["UserId"],
+            time_col="time",
+            max_session_time_mins=20,
+            max_event_separation_mins=2,
+        )
+
+        # a session ends at the last event within 20 mins of its start
+        expected_ses = [0] * 21 + [1] * 21 + [2] * 8
+        expected_ses += [ses + 3 for ses in expected_ses]
+        assert list(actual["session_ind"]) == expected_ses
+        assert list(actual["UserId"]) == [1] * 50 + [2] * 50
+
     def test_sessionize_data(self):
         actual = sessionize.sessionize_data(
             data=self.df1,
@@ -4,15 +4,28 @@
 # license information.
 # --------------------------------------------------------------------------
 import os
+import shutil
+import tarfile
 from pathlib import Path
 
 import nbformat
 import notebook
+import numpy as np
+import pandas as pd
 import pytest
 import pytest_check as check
 
 from nbconvert.preprocessors import CellExecutionError, ExecutePreprocessor
-from msticpy.sectools.geoip import GeoLiteLookup, IPStackLookup
+from msticpy.sectools.geoip import (
+    GeoLiteLookup,
+    IPStackLookup,
+    geo_distance,
+    geo_distance_array,
+    geo_distance_df,
+    geo_travel_speed,
+)
+
+from .unit_test_lib import get_test_data_path
 
 _NB_FOLDER = "docs/notebooks"
 _NB_NAME = "GeoIPLookups.ipynb"
@@ -60,3 +73,197 @@ def test_geoiplite_download():
             for file in tgt_folder.glob("*"):
                 file.unlink()
             tgt_folder.rmdir()
+
+
+# GeoLite2-City-Test.mmdb is MaxMind's test database
+# (https://github.com/maxmind/MaxMind-DB, CC BY-SA 4.0)
+_GEO_TEST_DB = str(Path(get_test_data_path()).joinpath("geoip"))
+
+
+@pytest.fixture(params=["auto", "memory"])
+def geolite_test_db(request):
+    """Return GeoLiteLookup using the MaxMind test database."""
+    iplocation = GeoLiteLookup(
+        db_folder=_GEO_TEST_DB, auto_update=False, db_mode=request.param
+    )
+    yield iplocation
+    iplocation.close()
+
+
+def test_geolite_lookup_ip(geolite_test_db):
+    """Test single IP lookup."""
+    raw, entities = geolite_test_db.lookup_ip(ip_address="81.2.69.142")
+    check.equal(len(raw), 1)
+    check.equal(raw[0]["traits"]["ip_address"], "81.2.69.142")
+    check.is_in("prefix_len", raw[0]["traits"])
+    check.equal(entities[0].Location.City, "London")
+    check.equal(entities[0].Location.CountryCode, "GB")
+    raw, entities = geolite_test_db.lookup_ip(ip_addr_list=["10.1.1.1", "not_an_ip"])
+    check.equal(len(entities), 0)
+
+
+def test_geolite_lookup_ips(geolite_test_db):
+    """Test bulk DataFrame lookup."""
+    ip_addrs = ["81.2.69.142", "89.160.20.112", "81.2.69.142", "10.1.1.1", "bad", None]
+    data = pd.DataFrame({"IP": ip_addrs * 100})
+    results = geolite_test_db.lookup_ips(data, column="IP")
+    check.equal(len(results), 300)
+    check.equal(
+        list(results["IpAddress"][:4]),
+        ["81.2.69.142", "89.160.20.112", "81.2.69.142", "81.2.69.142"],
+    )
+
+    # results have the same rows and columns as the entity-based lookup
+    _, entities = geolite_test_db.lookup_ip(ip_addr_list=ip_addrs[:5] * 100)
+    expected = pd.DataFrame(
+        [{**ent.Location.properties, "IpAddress": ent.Address} for ent in entities]
+    )
+    pd.testing.assert_frame_equal(results, expected)
+
+    # distinct addresses looked up once, repeated lookups use the cache
+    geolite_test_db.lookup_ips(data, column="IP")
+    cache_info = geolite_test_db.cache_info()
+    check.equal(cache_info.misses, 4)
+    check.equal(cache_info.hits, 4)
+
+    results = geolite_test_db.df_lookup_ip(data, column="IP")
+    check.equal(len(results), len(data))
+    check.equal(results["City"].notna().sum(), 300)
+
+
+def test_geolite_db_mode():
+    """Test invalid DB mode."""
+    with pytest.raises(ValueError):
+        GeoLiteLookup(db_folder=_GEO_TEST_DB, auto_update=False, db_mode="fast")
+
+
+def test_geolite_shared_reader(tmp_path, monkeypatch):
+    """Test instances share a reader that is swapped after an update."""
+    shutil.copy(Path(_GEO_TEST_DB).joinpath("GeoLite2-City-Test.mmdb"), tmp_path)
+    geo_lookup1 = GeoLiteLookup(db_folder=str(tmp_path), auto_update=False)
+    geo_lookup2 = GeoLiteLookup(db_folder=str(tmp_path), auto_update=False)
+    try:
+        check.is_(geo_lookup1._reader, geo_lookup2._reader)
+        old_reader = geo_lookup1._reader
+        data = pd.DataFrame({"IP": ["81.2.69.142"]})
+        geo_lookup1.lookup_ips(data, column="IP")
+
+        def _fake_download(self, url=None, db_folder=None, db_file=None):
+            src_file = Path(_GEO_TEST_DB).joinpath("GeoLite2-City-Test.mmdb")
+            shutil.copy(src_file, Path(db_folder).joinpath(db_file))
+            return True
+
+        monkeypatch.setattr(
+            GeoLiteLookup, "_download_and_extract_archive", _fake_download
+        )
+        old_path = geo_lookup1._dbpath
+        geo_lookup3 = GeoLiteLookup(db_folder=str(tmp_path), force_update=True)
+        check.is_true(geo_lookup3.wait_for_update(timeout=10))
+        check.is_not(geo_lookup1._reader, old_reader)
+        check.is_(geo_lookup1._reader, geo_lookup3._reader)
+        # the update is extracted to a new file and the old one removed
+        check.not_equal(geo_lookup1._dbpath, old_path)
+        check.is_false(Path(old_path).exists())
+        db_files = [file.name for file in tmp_path.glob("*.mmdb")]
+        check.equal(db_files, [Path(geo_lookup1._dbpath).name])
+        with pytest.raises(ValueError):
+            old_reader.get("81.2.69.142")
+
+        # cached results are discarded after an update
+        results = geo_lookup1.lookup_ips(data, column="IP")
+        check.equal(results.iloc[0]["City"], "London")
+        check.equal(geo_lookup1.cache_info().misses, 1)
+        check.equal(geo_lookup1.cache_info().hits, 0)
+
+        # closing one instance does not affect the others
+        geo_lookup3.close()
+        geo_lookup2.close()
+        _, entities = geo_lookup1.lookup_ip(ip_address="81.2.69.142")
+        check.equal(entities[0].Location.City, "London")
+    finally:
+        geo_lookup1.close()
+    check.equal(len(GeoLiteLookup._shared_dbs), 0)
+
+
+def test_geolite_extract_db_file(tmp_path):
+    """Test the DB in an archive is extracted with the requested name."""
+    archive = tmp_path.joinpath("GeoLite2-City.mmdb.12345.tar.gz")
+    with tarfile.open(archive, "w:gz") as tar_archive:
+        tar_archive.add(
+            Path(_GEO_TEST_DB).joinpath("GeoLite2-City-Test.mmdb"),
+            arcname="GeoLite2-City_20201013/GeoLite2-City.mmdb",
+        )
+    db_folder = tmp_path.joinpath("db")
+    db_folder.mkdir()
+    db_folder.joinpath("GeoLite2-City.mmdb").write_bytes(b"current")
+
+    GeoLiteLookup._extract_to_folder(archive, str(db_folder), "GeoLite2-City.1.mmdb")
+    check.equal(db_folder.joinpath("GeoLite2-City.mmdb").read_bytes(), b"current")
+    check.is_true(db_folder.joinpath("GeoLite2-City.1.mmdb").is_file())
+    check.is_false(db_folder.joinpath("GeoLite2-City_20201013").exists())
+
+
+_LOCATIONS = [
+    (48.1372, 11.5756),  # Munich
+    (52.5186, 13.4083),  # Berlin
+    (55.7386, 37.6068),
+    (37.751, -97.822),
+    (-33.8688, 151.2093),
+]
+
+
+def test_geo_distance_array():
+    """Test vectorized distance matches geo_distance."""
+    origins = np.array(_LOCATIONS)
+    destinations = np.roll(origins, 1, axis=0)
+    distances = geo_distance_array(origins, destinations)
+    for dist, orig, dest in zip(distances, origins, destinations):
+        check.almost_equal(dist, geo_distance(tuple(orig), tuple(dest)))
+
+    # single origin is broadcast
+    distances = geo_distance_array(_LOCATIONS[0], destinations)
+    check.almost_equal(distances[2], geo_distance(_LOCATIONS[0], _LOCATIONS[1]))
+    check.is_true(np.isnan(geo_distance_array([(np.nan, 1.0)], [(1.0, 1.0)])[0]))
+
+    data = pd.DataFrame(
+        np.hstack([origins, destinations]),
+        columns=["SrcLat", "SrcLong", "DestLat", "DestLong"],
+        index=range(10, 15),
+    )
+    dist_col = geo_distance_df(data, "SrcLat", "SrcLong", "DestLat", "DestLong")
+    check.equal(list(dist_col.index), list(data.index))
+    expected = geo_distance_array(origins, destinations)
+    check.is_true(np.allclose(dist_col.to_numpy(), expected))
+
+
+def test_geo_travel_speed():
+    """Test consecutive hop distance and speed per account."""
+    data = pd.DataFrame(
+        {
+            "Account": ["a", "b", "a", "a", "b"],
+            "TimeGenerated": pd.to_datetime(
+                [
+                    "2021-01-01 02:00",
+                    "2021-01-01 00:00",
+                    "2021-01-01 00:00",
+                    "2021-01-01 02:00",
+                    "2021-01-01 05:00",
+                ]
+            ),
+            "Latitude": [52.5186, 1.0, 48.1372, 48.1372, 1.0],
+            "Longitude": [13.4083, 2.0, 11.5756, 11.5756, 2.0],
+        }
+    )
+    results = geo_travel_speed(data, "Account", "TimeGenerated")
+    check.equal(list(results.index), [2, 0, 3, 1, 4])
+    munich_berlin = geo_distance(_LOCATIONS[0], _LOCATIONS[1])
+    check.is_true(np.isnan(results.loc[2, "Distance"]))
+    check.is_true(pd.isna(results.loc[2, "TimeDelta"]))
+    check.almost_equal(results.loc[0, "Distance"], munich_berlin)
+    check.almost_equal(results.loc[0, "Speed"], munich_berlin / 2)
+    check.equal(results.loc[3, "Speed"], np.inf)
+    # first event for account "b"
+    check.is_true(np.isnan(results.loc[1, "Speed"]))
+    check.equal(results.loc[4, "Distance"], 0)
+    check.equal(results.loc[4, "Speed"], 0)
+    check.equal(results.loc[4, "TimeDelta"], pd.Timedelta(hours=5))
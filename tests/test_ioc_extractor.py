@@ -1,4 +1,7 @@
+import tempfile
 import unittest
+from pathlib import Path
+from unittest import mock
 
 import pandas as pd
 
@@ -237,6 +240,210 @@ class TestIoCExtractor(unittest.TestCase):
         self.assertEqual(
             output_df[output_df["IoCType"] == "sha256_hash"].shape[0], 0)
 
+    def test_dataframe_matches_string_scan(self):
+        input_df = pd.DataFrame.from_dict(
+            data=TEST_CASES, orient="index", columns=["input"]
+        )
+        # repeated values and a second column exercise value de-duplication
+        input_df = pd.concat([input_df, input_df])
+        input_df["reversed"] = input_df["input"].str[::-1]
+        columns = ["input", "reversed"]
+        output_df = self.extractor.extract_df(
+            data=input_df, columns=columns, include_paths=True
+        )
+
+        ioc_types = self.extractor._get_ioc_types_to_use(None, True)
+        expected = []
+        for idx, row in input_df.iterrows():
+            for col in columns:
+                results = self.extractor.extract(row[col], ioc_types=ioc_types)
+                for ioc_type, observables in results.items():
+                    expected.extend(
+                        (ioc_type, obs, idx, row[col]) for obs in observables
+                    )
+        expected_df = pd.DataFrame(expected, columns=output_df.columns)
+
+        def _sorted(df):
+            return df.sort_values(list(df.columns)).reset_index(drop=True)
+
+        pd.testing.assert_frame_equal(_sorted(output_df), _sorted(expected_df))
+
+    def test_dataframe_non_string_values(self):
+        input_df = pd.DataFrame(
+            {"input": [TEST_CASES["ipv4_test"], None, 42, TEST_CASES["ipv4_test"]]}
+        )
+        output_df = self.extractor.extract_df(data=input_df, columns="input")
+
+        ipv4_df = output_df[output_df["IoCType"] == "ipv4"]
+        self.assertEqual(ipv4_df.shape[0], 2)
+        self.assertListEqual(list(ipv4_df["SourceIndex"]), [0, 3])
+        empty_df = self.extractor.extract_df(
+            data=input_df.iloc[1:3], columns="input"
+        )
+        self.assertTrue(empty_df.empty)
+        self.assertListEqual(list(empty_df.columns), list(output_df.columns))
+
+    def test_dataframe_chunked(self):
+        input_df = pd.DataFrame.from_dict(
+            data=TEST_CASES, orient="index", columns=["input"]
+        )
+        input_df = pd.concat([input_df] * 3)
+        expected_df = self.extractor.extract_df(
+            data=input_df, columns=["input"], include_paths=True
+        )
+        for n_jobs, chunk_size in ((1, 5), (2, 7), (2, None)):
+            output_df = input_df.mp_ioc.extract(
+                columns=["input"],
+                include_paths=True,
+                n_jobs=n_jobs,
+                chunk_size=chunk_size,
+            )
+            pd.testing.assert_frame_equal(output_df, expected_df)
+
+    def test_tld_cache(self):
+        extractor = IoCExtract(tld_cache_size=2)
+        for _ in range(3):
+            extractor.extract(TEST_CASES["domain1_test"])
+        cache_info = extractor.tld_cache_info
+        self.assertEqual(cache_info.misses, 1)
+        self.assertEqual(cache_info.hits, 2)
+        self.assertEqual(cache_info.maxsize, 2)
+
+        extractor.extract(TEST_CASES["domain_neg_test"])
+        extractor.extract(TEST_CASES["domain_short_test"])
+        self.assertEqual(extractor.tld_cache_info.currsize, 2)
+        extractor.clear_tld_cache()
+        self.assertEqual(extractor.tld_cache_info.currsize, 0)
+        self.assertEqual(extractor.tld_cache_info.hits, 0)
+
+        # results are unaffected by caching
+        self.assertEqual(
+            IoCExtract(tld_cache_size=0).extract(TEST_CASES["domain1_test"]),
+            extractor.extract(TEST_CASES["domain1_test"]),
+        )
+
+    def test_extract_stream(self):
+        input_df = pd.DataFrame({"input": list(TEST_CASES.values()) * 3})
+        expected_df = self.extractor.extract_df(data=input_df, columns="input")
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            input_df.to_csv(Path(tmp_dir).joinpath("iocs.csv"), index=False)
+            input_df.to_json(
+                Path(tmp_dir).joinpath("iocs.jsonl"), orient="records", lines=True
+            )
+            input_df.to_json(Path(tmp_dir).joinpath("iocs.json"), orient="records")
+            for file_name in ("iocs.csv", "iocs.jsonl", "iocs.json"):
+                batches = list(
+                    self.extractor.extract_stream(
+                        Path(tmp_dir).joinpath(file_name),
+                        columns="input",
+                        chunk_size=5,
+                    )
+                )
+                self.assertGreater(len(batches), 1)
+                pd.testing.assert_frame_equal(
+                    pd.concat(batches, ignore_index=True), expected_df
+                )
+
+            text_path = Path(tmp_dir).joinpath("iocs.txt")
+            text_path.write_text("\n".join(TEST_CASES.values()))
+            text_df = pd.concat(self.extractor.extract_stream(text_path))
+            self.assertListEqual(
+                list(text_df.columns), ["IoCType", "Observable", "SourceIndex", "Input"]
+            )
+            self.assertEqual(text_df[text_df["IoCType"] == "ipv4"].shape[0], 3)
+
+            # a CSV file is tabular, whatever its column is called
+            text_csv_path = Path(tmp_dir).joinpath("text.csv")
+            input_df.rename(columns={"input": "Text"}).to_csv(
+                text_csv_path, index=False
+            )
+            with self.assertRaises(ValueError):
+                list(self.extractor.extract_stream(text_csv_path))
+            with self.assertRaisesRegex(Exception, "input not found"):
+                list(self.extractor.extract_stream(text_csv_path, columns="input"))
+            pd.testing.assert_frame_equal(
+                pd.concat(
+                    self.extractor.extract_stream(text_csv_path, columns="Text"),
+                    ignore_index=True,
+                ),
+                expected_df,
+            )
+            with self.assertRaisesRegex(ValueError, "Unknown file_format xml"):
+                list(self.extractor.extract_stream(text_path, file_format="xml"))
+
+        # iterables of strings, records and DataFrames
+        stream_df = pd.concat(
+            self.extractor.extract_stream(list(input_df["input"]), chunk_size=4),
+            ignore_index=True,
+        )
+        pd.testing.assert_frame_equal(
+            stream_df.drop(columns="SourceIndex"),
+            expected_df.drop(columns="SourceIndex"),
+        )
+        self.assertListEqual(
+            list(stream_df["SourceIndex"]), list(expected_df["SourceIndex"])
+        )
+        records = input_df.to_dict(orient="records")
+        stream_df = pd.concat(
+            self.extractor.extract_stream(records, columns="input", chunk_size=4),
+            ignore_index=True,
+        )
+        pd.testing.assert_frame_equal(stream_df, expected_df)
+        stream_df = pd.concat(
+            self.extractor.extract_stream(
+                (input_df.iloc[idx : idx + 3] for idx in range(0, len(input_df), 3)),
+                columns="input",
+            ),
+            ignore_index=True,
+        )
+        pd.testing.assert_frame_equal(stream_df, expected_df)
+        # DataFrame chunks are indexed by their row in the whole input
+        df_chunks = [
+            input_df.iloc[idx : idx + 3].reset_index(drop=True)
+            for idx in range(0, len(input_df), 3)
+        ]
+        stream_df = pd.concat(
+            self.extractor.extract_stream(df_chunks, columns="input"),
+            ignore_index=True,
+        )
+        pd.testing.assert_frame_equal(stream_df, expected_df)
+        mixed_input = [
+            *input_df["input"].iloc[:4],
+            input_df.iloc[4:9].reset_index(drop=True),
+            *input_df["input"].iloc[9:],
+        ]
+        stream_df = pd.concat(
+            self.extractor.extract_stream(mixed_input, columns="input", chunk_size=4),
+            ignore_index=True,
+        )
+        pd.testing.assert_frame_equal(stream_df, expected_df)
+        with self.assertRaises(ValueError):
+            list(self.extractor.extract_stream(records))
+
+    def test_extract_stream_parallel(self):
+        input_df = pd.DataFrame({"input": list(TEST_CASES.values()) * 3})
+        expected_df = self.extractor.extract_df(data=input_df, columns="input")
+
+        # one worker pool is shared by all chunks of the stream
+        with mock.patch.object(
+            IoCExtract,
+            "_create_scan_executor",
+            autospec=True,
+            side_effect=IoCExtract._create_scan_executor,
+        ) as create_executor:
+            stream_df = pd.concat(
+                self.extractor.extract_stream(
+                    input_df.to_dict(orient="records"),
+                    columns="input",
+                    chunk_size=5,
+                    n_jobs=2,
+                ),
+                ignore_index=True,
+            )
+        create_executor.assert_called_once()
+        pd.testing.assert_frame_equal(stream_df, expected_df)
+
 
 if __name__ == "__main__":
     unittest.main()
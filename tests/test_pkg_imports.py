@@ -5,13 +5,19 @@
 # --------------------------------------------------------------------------
 """test package imports."""
 import importlib
+import json
+import os
 import re
+import subprocess  # nosec
 import sys
 from pathlib import Path
 
+import pandas as pd
 import pytest
 import pytest_check as check
 
+from msticpy.sectools.base64unpack import B64ExtractAccessor
+from msticpy.sectools.iocextract import IoCExtractAccessor
 from tools.toollib.import_analyzer import analyze_imports, get_extras_from_setup
 
 PKG_ROOT = "."
@@ -19,6 +25,26 @@ PKG_NAME = "msticpy"
 REQS_FILE = "requirements.txt"
 REQS_OP_RGX = r"[=<>~!\s]+"
 
+# Cold "import msticpy" time limit (seconds) - this includes importing pandas
+IMPORT_TIME_LIMIT = float(os.environ.get("MSTICPY_IMPORT_TIME_LIMIT", "2.0"))
+_IMPORT_TIME_SCRIPT = """
+import json, time
+start = time.perf_counter()
+import msticpy
+print(json.dumps({"time": time.perf_counter() - start}))
+"""
+# Packages that should not be loaded by "import msticpy"
+LAZY_PKGS = ["bokeh", "ipywidgets", "networkx", "geoip2", "tldextract"]
+_IMPORT_SCRIPT = """
+import json, sys
+import msticpy
+import pandas as pd
+print(json.dumps({
+    "loaded": [p for p in %r if p in sys.modules],
+    "accessors": sorted(pd.DataFrame._accessors),
+}))
+"""
+
 EXTRAS_EXCEPTIONS = {"vt", "vt_graph_api", "bs4", "seaborn", "pyperclip"}
 CONDA_PKG_EXCEPTIONS = {"vt-py", "vt-graph-api", "nest_asyncio"}
 
@@ -117,6 +143,72 @@ def test_conda_reqs(extras_from_setup):
     check.is_false(conda_reqs_pip_dict, "no extra items in conda-reqs-pip.txt")
 
 
+def _run_import_script(script: str) -> dict:
+    """Run `script` in a new Python process and return its JSON output."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [str(Path(PKG_ROOT).resolve()), env.get("PYTHONPATH", "")]
+    )
+    proc = subprocess.run(  # nosec
+        [sys.executable, "-c", script],
+        capture_output=True,
+        check=True,
+        env=env,
+        text=True,
+    )
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+@pytest.mark.skipif(
+    bool(os.environ.get("MSTICPY_SKIP_IMPORT_TIME")),
+    reason="Import time test disabled.",
+)
+def test_import_time():
+    """Test that a cold import of msticpy is within the time limit."""
+    # best of 3 to reduce the effect of other activity on the machine
+    import_time = min(
+        _run_import_script(_IMPORT_TIME_SCRIPT)["time"] for _ in range(3)
+    )
+    print(f"import msticpy: {import_time:.3f} sec")
+    check.less(import_time, IMPORT_TIME_LIMIT)
+
+
+def test_import_msticpy():
+    """Test that importing msticpy does not import sub-packages."""
+    result = _run_import_script(_IMPORT_SCRIPT % LAZY_PKGS)
+    check.equal(result["loaded"], [])
+    # pandas accessors are available without importing their modules
+    for accessor in ("mp_b64", "mp_ioc", "mp_process_tree", "mp_timeline"):
+        check.is_in(accessor, result["accessors"])
+
+
+def test_lazy_imports():
+    """Test that the public package attributes are available."""
+    msticpy = importlib.import_module(PKG_NAME)
+    for pkg_name in ("sectools", "nbtools", "data"):
+        pkg = getattr(msticpy, pkg_name)
+        for attrib in pkg.__all__:
+            check.is_not_none(getattr(pkg, attrib, None), f"{pkg_name}.{attrib}")
+            check.is_in(attrib, dir(pkg))
+    check.is_true(callable(msticpy.init_notebook))
+    check.is_not_none(msticpy.settings.settings)
+    # sub-modules are imported on access
+    check.equal(msticpy.sectools.geoip.__name__, "msticpy.sectools.geoip")
+    nbtools_all = set(msticpy.nbtools.__all__)
+    check.is_true(set(msticpy.nbtools.security_alert_graph.__all__) <= nbtools_all)
+    with pytest.raises(AttributeError):
+        getattr(msticpy.sectools, "not_a_module")
+
+
+def test_lazy_accessors():
+    """Test that the lazily-registered accessors return the accessor class."""
+    data = pd.DataFrame({"Input": ["http://www.microsoft.com 1.2.3.4"]})
+    check.is_instance(data.mp_ioc, IoCExtractAccessor)
+    check.is_instance(data.mp_b64, B64ExtractAccessor)
+    results = data.mp_ioc.extract(columns=["Input"], ioc_types=["ipv4"])
+    check.equal(list(results["Observable"]), ["1.2.3.4"])
+
+
 def _get_reqs_from_file(reqs_file):
     conda_reqs_dict = {}
     with open(str(reqs_file), "r") as f_hdl:
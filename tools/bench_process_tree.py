@@ -0,0 +1,140 @@
+# -------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# --------------------------------------------------------------------------
+"""
+Benchmark process tree path building.
+
+Builds a synthetic set of keyed processes (the input to the path
+building stage of `build_process_tree`) with deep process chains and
+compares `_build_proc_tree` with the previous level-by-level
+implementation that used `isin`/`merge` for each tree level.
+It then times tree navigation queries using the process DataFrame
+and a `ProcessTreeIndex`.
+
+Example
+-------
+python tools/bench_process_tree.py --procs 1000000 --depth 50
+
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from msticpy.nbtools.nbwidgets import Progress
+from msticpy.sectools.process_tree_utils import (
+    ProcessTreeIndex,
+    _build_proc_tree,
+    get_ancestors,
+    get_children,
+    get_descendents,
+)
+
+__author__ = "Ian Hellen"
+
+
+def _make_data(procs: int, depth: int, roots: int) -> pd.DataFrame:
+    """Return keyed processes - each process has a random parent above it."""
+    rng = np.random.default_rng(0)
+    parents = np.full(procs, -1)
+    # each process is attached to a random process in the preceding
+    # block so that the trees are approximately `depth` levels deep
+    block = max(procs // depth, roots)
+    pos = np.arange(block, procs)
+    parents[block:] = pos - block + rng.integers(0, block, len(pos)) // 2
+    parents[roots:block] = rng.integers(0, roots, block - roots)
+    src_index = np.arange(procs).astype(str)
+    proc_keys = np.char.add("proc", src_index)
+    parent_keys = np.where(parents >= 0, np.char.add("proc", parents.astype(str)), None)
+    data = pd.DataFrame(
+        {
+            "parent_key": parent_keys,
+            "source_index": src_index,
+            "IsRoot": parents < 0,
+        },
+        index=pd.Index(proc_keys, name="proc_key"),
+    )
+    # shuffle the rows so that parents are not always before children
+    return data.sample(frac=1, random_state=1)
+
+
+def _legacy_build_proc_tree(input_tree: pd.DataFrame) -> pd.DataFrame:
+    """Level by level path building (previous implementation)."""
+    input_tree["path"] = input_tree["source_index"]
+    cur_level = input_tree[input_tree["IsRoot"]]
+    while True:
+        sel_crit = input_tree["parent_key"].isin(cur_level.index)
+        next_level = input_tree[sel_crit].copy()
+        if next_level.empty:
+            break
+        tmp_df = next_level.merge(
+            cur_level[["source_index", "path"]],
+            how="inner",
+            left_on="parent_key",
+            right_index=True,
+        )
+        next_level.loc[tmp_df.index, "path"] = (
+            tmp_df["path_y"] + "/" + tmp_df["source_index_x"]
+        )
+        input_tree.loc[next_level.index, "path"] = next_level["path"]
+        input_tree.loc[tmp_df.index, "parent_index"] = tmp_df["source_index_y"]
+        cur_level = next_level
+    return input_tree
+
+
+def _run_benchmark(procs: int, depth: int, roots: int, queries: int):
+    data = _make_data(procs, depth, roots)
+
+    start = time.perf_counter()
+    tree = _build_proc_tree(data.copy(), Progress(procs, visible=False))
+    elapsed = time.perf_counter() - start
+    max_depth = tree["path"].str.count("/").max() + 1
+    print(
+        f"_build_proc_tree: {procs:,} processes, depth {max_depth}",
+        f"in {elapsed:.3f} sec",
+    )
+
+    start = time.perf_counter()
+    legacy_tree = _legacy_build_proc_tree(data.copy())
+    legacy_elapsed = time.perf_counter() - start
+    print(f"level-by-level: {legacy_elapsed:.3f} sec")
+    matched = tree["path"].equals(legacy_tree["path"]) and tree[
+        "parent_index"
+    ].equals(legacy_tree["parent_index"])
+    print(
+        f"Speedup: {legacy_elapsed / elapsed:,.1f}x - results",
+        "match" if matched else "DIFFER",
+    )
+    _run_query_benchmark(tree, queries)
+
+
+def _run_query_benchmark(tree: pd.DataFrame, queries: int):
+    start = time.perf_counter()
+    tree_index = ProcessTreeIndex(tree)
+    print(f"ProcessTreeIndex: built in {time.perf_counter() - start:.3f} sec")
+
+    sample = tree.sample(queries, random_state=2)
+    for func in (get_children, get_descendents, get_ancestors):
+        timings = []
+        for procs in (tree, tree_index):
+            start = time.perf_counter()
+            for _, proc in sample.iterrows():
+                func(procs, proc)
+            timings.append((time.perf_counter() - start) / queries)
+        print(
+            f"{func.__name__}: DataFrame {timings[0] * 1000:.2f} ms,",
+            f"ProcessTreeIndex {timings[1] * 1000:.2f} ms per query",
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--procs", type=int, default=1_000_000)
+    parser.add_argument("--depth", type=int, default=50)
+    parser.add_argument("--roots", type=int, default=100)
+    parser.add_argument("--queries", type=int, default=20)
+    args = parser.parse_args()
+    _run_benchmark(args.procs, args.depth, args.roots, args.queries)
@@ -0,0 +1,133 @@
+# -------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for
+# license information.
+# --------------------------------------------------------------------------
+"""
+Benchmark anomalous_sequence sessionizing.
+
+Times `create_session_col` on synthetic user activity events and
+compares the result and timing with the previous row-by-row
+implementation on a (smaller) sample of the data.
+
+Example
+-------
+python tools/bench_sessionize.py --rows 1000000 10000000
+
+"""
+import argparse
+import time
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from msticpy.analysis.anomalous_sequence.sessionize import create_session_col
+
+__author__ = "Ian Hellen"
+
+_MAX_SES_MINS = 20
+_MAX_SEP_MINS = 2
+
+
+def _make_data(rows: int, users: int) -> pd.DataFrame:
+    """Return events with bursts of activity for each user."""
+    rng = np.random.default_rng(0)
+    user_ids = np.sort(rng.integers(0, users, rows))
+    # mostly short gaps between events with occasional long gaps
+    gaps = np.where(
+        rng.random(rows) < 0.05,
+        rng.integers(0, 3600, rows),
+        rng.integers(0, 60, rows),
+    )
+    offsets = np.cumsum(gaps)
+    # each user's events start at the beginning of the time range
+    user_starts = np.searchsorted(user_ids, user_ids)
+    times = pd.Timestamp("2021-01-01", tz="UTC") + pd.to_timedelta(
+        offsets - offsets[user_starts], unit="s"
+    )
+    return pd.DataFrame(
+        {
+            "UserId": user_ids.astype(str),
+            "ClientIP": (user_ids % 7).astype(str),
+            "TimeGenerated": times,
+            "Operation": rng.choice(["Set-Mailbox", "Set-User", "New-Item"], rows),
+        }
+    ).sample(frac=1, random_state=1)
+
+
+def _legacy_create_session_col(
+    data: pd.DataFrame, user_identifier_cols: List[str], time_col: str
+) -> pd.DataFrame:
+    """Row by row sessionizing (previous implementation)."""
+    max_sep = pd.to_timedelta(_MAX_SEP_MINS, unit="min")
+    max_ses = pd.to_timedelta(_MAX_SES_MINS, unit="min")
+    df_with_sesind = data.sort_values(user_identifier_cols + [time_col]).reset_index(
+        drop=True
+    )
+    ses_ind = 0
+    df_with_sesind.loc[0, "cml_time"] = pd.to_timedelta(0)
+    df_with_sesind.loc[0, "session_ind"] = ses_ind
+    for i in range(1, len(df_with_sesind)):
+        cur = df_with_sesind.iloc[i]
+        prev = df_with_sesind.iloc[i - 1]
+        new_flag = any(cur[col] != prev[col] for col in user_identifier_cols)
+        dif = cur[time_col] - prev[time_col]
+        cml = prev["cml_time"] + dif
+        if new_flag or dif > max_sep or cml > max_ses:
+            cml = pd.to_timedelta(0)
+            ses_ind += 1
+        df_with_sesind.loc[i, "cml_time"] = cml
+        df_with_sesind.loc[i, "session_ind"] = ses_ind
+    return df_with_sesind
+
+
+def _run_benchmark(rows: int, users: int, legacy_rows: int):
+    data = _make_data(rows, users)
+    user_cols = ["UserId", "ClientIP"]
+
+    start = time.perf_counter()
+    result = create_session_col(
+        data, user_cols, "TimeGenerated", _MAX_SES_MINS, _MAX_SEP_MINS
+    )
+    elapsed = time.perf_counter() - start
+    print(
+        f"create_session_col: {rows:,} events,",
+        f"{result['session_ind'].max() + 1:,} sessions in {elapsed:.3f} sec",
+    )
+
+    if not legacy_rows:
+        return
+    sample = data.iloc[:legacy_rows]
+    start = time.perf_counter()
+    result = create_session_col(
+        sample, user_cols, "TimeGenerated", _MAX_SES_MINS, _MAX_SEP_MINS
+    )
+    elapsed = time.perf_counter() - start
+    start = time.perf_counter()
+    legacy_result = _legacy_create_session_col(sample, user_cols, "TimeGenerated")
+    legacy_elapsed = time.perf_counter() - start
+    matched = np.array_equal(
+        result["session_ind"].to_numpy(), legacy_result["session_ind"].to_numpy()
+    )
+    print(
+        f"{legacy_rows:,} events: row-by-row {legacy_elapsed:.3f} sec,",
+        f"vectorized {elapsed:.3f} sec,",
+        f"speedup {legacy_elapsed / elapsed:,.1f}x - results",
+        "match" if matched else "DIFFER",
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000])
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument(
+        "--legacy-rows",
+        type=int,
+        default=10_000,
+        help="Number of events to run the row-by-row implementation on.",
+    )
+    args = parser.parse_args()
+    for n_rows in args.rows:
+        _run_benchmark(n_rows, args.users, args.legacy_rows)